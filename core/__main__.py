@@ -47,6 +47,8 @@ parser.add_argument('-m', '--manhole', action='store_true',
         help='manhole for debugging purposes')
 parser.add_argument('-g', '--no-gui', action='store_true',
         help='does not load the manager gui module')
+parser.add_argument('-i', '--instrument', action='store_true',
+        help='records latency histograms of the instrumented code paths')
 parser.add_argument('-c', '--config', default='', help='configuration file')
 parser.add_argument('-l', '--logdir', default='', help='log directory')
 args = parser.parse_args()
@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains the Qudi instrumentation for timing hot code paths.
+
+Annotated functions, code blocks and signal deliveries record their duration into latency
+histograms, which can be looked at while Qudi is running (Manager, remote module server) and
+exported. Recording is off by default and costs a single attribute lookup per call then.
+
+Usage:
+    from core.instrumentation import instrumentation, timed, timing
+
+    class MyLogic(GenericLogic):
+        @timed()
+        def _scan_line(self):
+            ...
+            with timing('mylogic.readout'):
+                data = self._device.get_data()
+
+    instrumentation.enable()
+    print(instrumentation.summary())
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import collections
+import csv
+import functools
+import json
+import math
+import threading
+import time
+from qtpy import QtCore
+
+
+class LatencyHistogram:
+    """ Histogram of durations with logarithmic bins, 10 per decade from 100 ns to 1000 s.
+
+    Durations outside of this range are counted in the first or last bin. Count, sum, minimum and
+    maximum are kept exactly, percentiles are interpolated within the bins.
+    """
+    min_exponent = -7
+    max_exponent = 3
+    bins_per_decade = 10
+    num_bins = (max_exponent - min_exponent) * bins_per_decade
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * self.num_bins
+            self.count = 0
+            self.total = 0.0
+            self.min = math.inf
+            self.max = 0.0
+
+    @classmethod
+    def bin_edges(cls):
+        """ @return list(float): the num_bins + 1 bin edges in s """
+        return [10 ** (cls.min_exponent + i / cls.bins_per_decade) for i in range(cls.num_bins + 1)]
+
+    def record(self, duration):
+        """ Add a duration.
+
+        @param float duration: duration in s
+        """
+        if duration > 0:
+            index = int((math.log10(duration) - self.min_exponent) * self.bins_per_decade)
+            index = min(max(index, 0), self.num_bins - 1)
+        else:
+            index = 0
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += duration
+            if duration < self.min:
+                self.min = duration
+            if duration > self.max:
+                self.max = duration
+
+    def percentile(self, q):
+        """ Estimate a percentile of the recorded durations.
+
+        @param float q: percentile in [0, 100]
+
+        @return float: the percentile in s, NaN if nothing was recorded
+        """
+        with self._lock:
+            counts = list(self.counts)
+            count = self.count
+            low, high = self.min, self.max
+        if count == 0:
+            return math.nan
+        target = q / 100 * count
+        cumulative = 0
+        for index, in_bin in enumerate(counts):
+            if in_bin > 0 and cumulative + in_bin >= target:
+                fraction = (target - cumulative) / in_bin
+                exponent = self.min_exponent + (index + fraction) / self.bins_per_decade
+                return min(max(10 ** exponent, low), high)
+            cumulative += in_bin
+        return high
+
+    def statistics(self):
+        """ @return dict: count, total, mean, min, max, p50, p90 and p99 of the durations in s """
+        with self._lock:
+            count, total, low, high = self.count, self.total, self.min, self.max
+        return {'count': count,
+                'total': total,
+                'mean': total / count if count else math.nan,
+                'min': low if count else math.nan,
+                'max': high if count else math.nan,
+                'p50': self.percentile(50),
+                'p90': self.percentile(90),
+                'p99': self.percentile(99)}
+
+
+class Instrumentation:
+    """ Collection of the latency histograms of all instrumented code paths.
+
+    There is a single instance of this class, core.instrumentation.instrumentation, which is
+    used by the timed decorator, the timing context manager and the signal probes.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._histograms = collections.OrderedDict()
+        self._signal_probes = list()
+
+    def enable(self):
+        """ Start recording. """
+        with self._lock:
+            self.enabled = True
+            for probe in self._signal_probes:
+                probe.attach()
+
+    def disable(self):
+        """ Stop recording, the histograms recorded so far are kept. """
+        with self._lock:
+            self.enabled = False
+            for probe in self._signal_probes:
+                probe.detach()
+
+    def reset(self):
+        """ Discard all recorded durations. """
+        with self._lock:
+            self._histograms.clear()
+
+    def histogram(self, name):
+        """ Get the histogram of a code path, it is created if it does not exist yet.
+
+        @param str name: name of the code path
+
+        @return LatencyHistogram: the histogram
+        """
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def record(self, name, duration):
+        """ Add a duration to the histogram of a code path, if recording is enabled.
+
+        @param str name: name of the code path
+        @param float duration: duration in s
+        """
+        if self.enabled:
+            self.histogram(name).record(duration)
+
+    def names(self):
+        """ @return list(str): names of all code paths with recorded durations """
+        with self._lock:
+            return list(self._histograms)
+
+    def summary(self):
+        """ Statistics of all code paths.
+
+        @return dict: code path name: dict with count, total, mean, min, max, p50, p90 and p99
+        """
+        with self._lock:
+            histograms = list(self._histograms.items())
+        return collections.OrderedDict(
+            (name, histogram.statistics()) for name, histogram in histograms)
+
+    def report(self):
+        """ Summary as text table, durations in ms.
+
+        @return str: the table
+        """
+        lines = ['{0:<50}{1:>10}{2:>12}{3:>12}{4:>12}{5:>12}{6:>12}'.format(
+            'code path', 'count', 'mean (ms)', 'p50 (ms)', 'p90 (ms)', 'p99 (ms)', 'max (ms)')]
+        for name, stats in self.summary().items():
+            lines.append('{0:<50}{1:>10d}{2:>12.3f}{3:>12.3f}{4:>12.3f}{5:>12.3f}{6:>12.3f}'.format(
+                name, stats['count'], *(1e3 * stats[key]
+                                        for key in ('mean', 'p50', 'p90', 'p99', 'max'))))
+        return '\n'.join(lines)
+
+    def export(self, filename):
+        """ Write all histograms to a file.
+
+        @param str filename: file path, a .csv file gets the summary table, any other file the
+                             summary and the complete histograms as JSON
+        """
+        summary = self.summary()
+        if filename.lower().endswith('.csv'):
+            with open(filename, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(['code path', 'count', 'total (s)', 'mean (s)', 'min (s)',
+                                 'max (s)', 'p50 (s)', 'p90 (s)', 'p99 (s)'])
+                for name, stats in summary.items():
+                    writer.writerow([name] + [stats[key] for key in (
+                        'count', 'total', 'mean', 'min', 'max', 'p50', 'p90', 'p99')])
+            return
+
+        with self._lock:
+            histograms = list(self._histograms.items())
+        code_paths = dict()
+        for name, histogram in histograms:
+            stats = summary.get(name, histogram.statistics())
+            # NaN is not valid JSON
+            stats = {key: None if isinstance(value, float) and math.isnan(value) else value
+                     for key, value in stats.items()}
+            code_paths[name] = {'statistics': stats, 'counts': list(histogram.counts)}
+        with open(filename, 'w') as file:
+            json.dump({'bin_edges': LatencyHistogram.bin_edges(), 'code_paths': code_paths},
+                      file, indent=2)
+
+    def _register_probe(self, probe):
+        with self._lock:
+            self._signal_probes.append(probe)
+            if self.enabled:
+                probe.attach()
+
+    def _unregister_probe(self, probe):
+        with self._lock:
+            if probe in self._signal_probes:
+                self._signal_probes.remove(probe)
+            probe.detach()
+
+
+instrumentation = Instrumentation()
+
+
+def timed(name=None):
+    """ Decorator recording the duration of every call of a function or method.
+
+    @param str name: optional, name of the code path. Defaults to <module name>.<method name> for
+                     methods of Qudi modules and to the qualified function name otherwise.
+
+    Stack it below QtCore.Slot for slots.
+    """
+    def decorator(func):
+        default_name = name if name is not None else func.__qualname__
+        names = dict()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not instrumentation.enabled:
+                return func(*args, **kwargs)
+            path = default_name
+            if name is None and args:
+                module_name = getattr(args[0], '_name', None)
+                if isinstance(module_name, str):
+                    path = names.get(module_name)
+                    if path is None:
+                        path = names.setdefault(module_name,
+                                                '{0}.{1}'.format(module_name, func.__name__))
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                instrumentation.record(path, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class timing:
+    """ Context manager recording the duration of a code block.
+
+    with timing('fastcounter.get_data_trace'):
+        data = self.fastcounter().get_data_trace()
+
+    Arguments after the name are formatted into it only if the duration is recorded, so a name
+    like timing('{0}.count_odmr', self._name) costs nothing while the instrumentation is disabled.
+    """
+    __slots__ = ('name', 'args', '_start')
+
+    def __init__(self, name, *args):
+        self.name = name
+        self.args = args
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter() if instrumentation.enabled else None
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._start is not None:
+            duration = time.perf_counter() - self._start
+            instrumentation.record(self.name.format(*self.args) if self.args else self.name,
+                                   duration)
+        return False
+
+
+class SignalProbe(QtCore.QObject):
+    """ Measures the time from emitting a signal until its delivery in the thread of a receiver.
+
+    The probe lives in the thread of the receiver and is connected to the signal twice: directly,
+    to take the time of the emission, and queued, to take the time when the event loop of the
+    receiver thread delivers the signal. Queued signals of one thread are delivered in order, so
+    the difference is the queue latency, including the execution time of the slots connected
+    before the probe. The probe is only connected while the instrumentation is enabled.
+    """
+
+    def __init__(self, signal, name, receiver):
+        """
+        @param signal: bound Qt signal
+        @param str name: name of the code path, e.g. 'odmrlogic.sigNextLine'
+        @param QObject receiver: object whose thread receives the signal
+        """
+        super().__init__()
+        self.moveToThread(receiver.thread())
+        self._signal = signal
+        self.name = name
+        self._emitted = collections.deque()
+        self._attached = False
+
+    def attach(self):
+        if not self._attached:
+            self._emitted.clear()
+            self._signal.connect(self._on_emitted, QtCore.Qt.DirectConnection)
+            self._signal.connect(self._on_delivered, QtCore.Qt.QueuedConnection)
+            self._attached = True
+
+    def detach(self):
+        if self._attached:
+            self._signal.disconnect(self._on_emitted)
+            self._signal.disconnect(self._on_delivered)
+            self._attached = False
+
+    def _on_emitted(self, *args):
+        self._emitted.append(time.perf_counter())
+
+    def _on_delivered(self, *args):
+        if self._emitted:
+            instrumentation.record(self.name, time.perf_counter() - self._emitted.popleft())
+
+
+def probe_signal(signal, name, receiver):
+    """ Record the delivery latency of a queued signal while the instrumentation is enabled.
+
+    @param signal: bound Qt signal
+    @param str name: name of the code path
+    @param QObject receiver: object whose thread receives the signal, usually the module itself
+
+    @return SignalProbe: the probe, pass it to remove_signal_probe when the module deactivates
+    """
+    probe = SignalProbe(signal, name, receiver)
+    instrumentation._register_probe(probe)
+    return probe
+
+
+def remove_signal_probe(probe):
+    """ Disconnect and forget a probe created by probe_signal.
+
+    @param SignalProbe probe: the probe
+    """
+    instrumentation._unregister_probe(probe)
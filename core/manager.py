@@ -41,6 +41,7 @@ from .util.modules import toposort, is_base
 from collections import OrderedDict
 from .logger import register_exception_handler
 from .threadmanager import ThreadManager
+from .instrumentation import instrumentation
 
 # try to import RemoteObjectManager. Might fail if rpyc is not installed.
 try:
@@ -106,6 +107,10 @@ class Manager(QtCore.QObject):
         self.baseDir = None
         self.alreadyQuit = False
         self.remote_server = False
+        # latency histograms of the instrumented code paths, see core.instrumentation
+        self.instrumentation = instrumentation
+        if getattr(args, 'instrument', False):
+            instrumentation.enable()
 
         try:
             # Initialize parent class QObject
@@ -1364,6 +1369,8 @@ class Manager(QtCore.QObject):
                     sorteddeps.append(m)
 
         logger.debug('Deactivating {}'.format(sorteddeps))
+        if instrumentation.enabled and instrumentation.names():
+            logger.info('Instrumented code paths:\n{0}'.format(instrumentation.report()))
 
         for module in reversed(sorteddeps):
             base = self.findBase(module)
@@ -1398,3 +1405,27 @@ class Manager(QtCore.QObject):
                 logger.error('You tried to remove the task runner but none was registered.')
             else:
                 logger.warning('Replacing task runner.')
+
+    def setInstrumentationEnabled(self, enabled):
+        """ Start or stop recording the durations of the instrumented code paths.
+
+          @param bool enabled: whether to record
+        """
+        if enabled:
+            instrumentation.enable()
+        else:
+            instrumentation.disable()
+
+    def getInstrumentationSummary(self):
+        """ Get the statistics of all instrumented code paths recorded so far.
+
+          @return dict: code path name: dict with count, total, mean, min, max, p50, p90, p99 in s
+        """
+        return instrumentation.summary()
+
+    def exportInstrumentation(self, filename):
+        """ Write the latency histograms of the instrumented code paths to a file.
+
+          @param str filename: .csv for the summary table, .json for summary and histograms
+        """
+        instrumentation.export(filename)
@@ -27,6 +27,8 @@ from qtpy.QtCore import QObject
 from urllib.parse import urlparse
 import ssl
 from .util.models import DictTableModel, ListTableModel
+from .util.network import evaluate_requests, netfetch, send_data
+from .util.network import is_local_host, register_local_connection
 import rpyc
 from rpyc.utils.server import ThreadedServer
 rpyc.core.protocol.DEFAULT_CONFIG['allow_pickle'] = True
@@ -121,6 +123,54 @@ class RemoteObjectManager(QObject):
                     else:
                         logger.error('Client requested a module that is not shared.')
                         return None
+
+            def exposed_pack_object(self, obj, compression=None, shared_memory=False):
+                """ Pack an object of this server for efficient transfer to the client.
+                Numpy arrays are sent as raw buffers, see core.util.network.netobtain.
+
+                  @param object obj: object to transfer (passed back by the client as netref)
+                  @param str compression: None or 'zlib'
+                  @param bool shared_memory: client runs on the same computer, use shared memory
+
+                  @return tuple: transport message for core.util.network.receive_data
+                """
+                return send_data(obj, compression, shared_memory)
+
+            def exposed_fetch(self, module, requests, compression=None, shared_memory=False):
+                """ Get several attributes and/or method results of a shared module at once.
+
+                  @param object module: unique module name or the module object itself
+                  @param tuple requests: attribute names or tuples (method_name, args, kwargs)
+                  @param str compression: None or 'zlib'
+                  @param bool shared_memory: client runs on the same computer, use shared memory
+
+                  @return tuple: transport message for core.util.network.receive_data
+                """
+                if isinstance(module, str):
+                    module = self.exposed_getModule(module)
+                    if module is None:
+                        raise KeyError('Remote module is not shared.')
+                return send_data(evaluate_requests(module, requests), compression, shared_memory)
+
+            def exposed_get_instrumentation(self, compression=None, shared_memory=False):
+                """ Get the statistics of all instrumented code paths of this server.
+
+                  @param str compression: None or 'zlib'
+                  @param bool shared_memory: client runs on the same computer, use shared memory
+
+                  @return tuple: transport message for core.util.network.receive_data of the
+                                 summary dict, see Manager.getInstrumentationSummary
+                """
+                return send_data(dict(self._manager.getInstrumentationSummary()),
+                                 compression,
+                                 shared_memory)
+
+            def exposed_set_instrumentation_enabled(self, enabled):
+                """ Start or stop recording the instrumented code paths of this server.
+
+                  @param bool enabled: whether to record
+                """
+                self._manager.setInstrumentationEnabled(bool(enabled))
         return RemoteModuleService
 
     def createServer(self, hostname, port, certfile=None, keyfile=None, cacertfile=None):
@@ -273,5 +323,17 @@ class RemoteModule:
                 cert_reqs=ssl.CERT_REQUIRED)
         else:
             self.connection = rpyc.connect(host, port, config={'allow_all_attrs': True})
+        if is_local_host(host):
+            register_local_connection(self.connection)
         self.module = self.connection.root.getModule(name)
         self.name = name
+
+    def fetch(self, requests, compression=None):
+        """ Get several attributes and/or method results of the remote module in one round-trip.
+
+          @param list requests: attribute names (str) or tuples (method_name, args, kwargs)
+          @param str compression: optional, 'zlib' to compress array buffers before transfer
+
+          @return list: requested values in the order of requests
+        """
+        return netfetch(self.module, requests, compression=compression)
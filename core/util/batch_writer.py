@@ -0,0 +1,441 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains the Qudi writer of buffered data points in batches.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import collections
+import json
+import logging
+import os
+import threading
+import time
+
+__all__ = ['BatchWriter', 'BatchedChannelLogger']
+
+
+class BatchWriter:
+    """ Buffers data points in memory and writes them in batches from a background thread.
+
+    The buffered points are written as soon as batch_size points are buffered or flush_interval
+    after the oldest buffered point, whatever comes first, so a slow backend like a database on
+    the network is called once per batch instead of once per point. Adding points never waits for
+    the backend.
+
+    At most max_buffered points are kept in memory. If the backend stalls (write_points raises)
+    and the buffer is full, the oldest points are dropped, or appended to the spill file if one is
+    given. The writer retries the backend every retry_interval and writes the spilled points after
+    the buffered ones when it is reachable again. Spilled points must be serializable to JSON.
+
+        writer = BatchWriter(client.write_points, batch_size=1000, flush_interval=1)
+        writer.start()
+        writer.add([point])
+        ...
+        writer.stop()
+    """
+
+    def __init__(self, write_points, batch_size=1000, flush_interval=1, max_buffered=100000,
+                 spill_file=None, retry_interval=1, name='BatchWriter', log=None):
+        """
+        @param callable write_points: backend writing a list of points, raises on failure
+        @param int batch_size: maximum number of points written at once
+        @param float flush_interval: time in s after which buffered points are written anyway
+        @param int max_buffered: maximum number of points in memory
+        @param str spill_file: optional, file for the points exceeding max_buffered
+        @param float retry_interval: time in s between retries of a stalled backend
+        @param str name: name of the writer thread
+        @param logging.Logger log: optional, logger for stalls and lost points
+        """
+        if batch_size < 1 or max_buffered < batch_size:
+            raise ValueError('BatchWriter needs 1 <= batch_size <= max_buffered, got {0} and {1}.'
+                             ''.format(batch_size, max_buffered))
+        self._write_points = write_points
+        self.batch_size = int(batch_size)
+        self.flush_interval = flush_interval
+        self.max_buffered = int(max_buffered)
+        self.spill_file = spill_file
+        self.retry_interval = retry_interval
+        self.name = name
+        self.log = logging.getLogger(__name__) if log is None else log
+
+        self._buffer = collections.deque()
+        # guards the buffer and the state below, notified when points are added or written
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stop_requested = False
+        self._flush_requested = False
+        self._oldest_point_time = None
+        self._points_in_flight = 0
+        # oldest points of the batch being written, dropped if writing it fails
+        self._flight_dropped = 0
+        self._flight_from_buffer = False
+        self._stalled = False
+        self._losing_points = False
+
+        # the spill file is appended by add and read from _spill_offset by the writer thread
+        self._spill_lock = threading.Lock()
+        self._spill_offset = 0
+        self._spilled_pending = 0
+
+        self.written = 0
+        self.dropped = 0
+        self.spilled = 0
+
+    @property
+    def pending(self):
+        """ Number of points not written yet, in memory or in the spill file. """
+        with self._condition:
+            return len(self._buffer) + self._points_in_flight - self._flight_dropped \
+                + self._spilled_pending
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """ Start the writer thread. Points left in the spill file from before are written too. """
+        if self.is_running:
+            return
+        if self.spill_file is not None and os.path.isfile(self.spill_file):
+            with self._spill_lock, open(self.spill_file, 'rb') as file:
+                self._spilled_pending = sum(1 for line in file if line.strip())
+                self._spill_offset = 0
+        self._stop_requested = False
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """ Write the buffered points and stop the writer thread.
+
+        Points which can not be written because the backend is stalled are spilled, or lost if
+        there is no spill file.
+
+        @param float timeout: optional, maximum time in s to wait for the writer thread
+
+        @return int: number of points left in memory or in the spill file
+        """
+        if self._thread is None:
+            return self.pending
+        with self._condition:
+            self._stop_requested = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self._thread = None
+        return self.pending
+
+    def add(self, points):
+        """ Buffer points to be written, without waiting for the backend.
+
+        @param list points: points in the format of the backend
+        """
+        with self._condition:
+            # the writer waits without timeout for the first point or for a full batch
+            notify = not self._buffer
+            if not self._buffer:
+                self._oldest_point_time = time.monotonic()
+            self._buffer.extend(points)
+            overflow = self._take_overflow()
+            if notify or len(self._buffer) >= self.batch_size:
+                self._condition.notify_all()
+        if overflow:
+            self._handle_overflow(overflow)
+
+    def flush(self, timeout=None):
+        """ Write all buffered points now and wait until they are written.
+
+        @param float timeout: optional, maximum time in s to wait
+
+        @return bool: True if all points are written, False if the timeout passed before
+        """
+        if not self.is_running:
+            return self.pending == 0
+        with self._condition:
+            self._flush_requested = True
+            self._condition.notify_all()
+            done = self._condition.wait_for(
+                lambda: not self._buffer and not self._points_in_flight
+                and not self._spilled_pending, timeout)
+            self._flush_requested = False
+            return done
+
+    def _take_overflow(self):
+        """ Remove the oldest points exceeding max_buffered, call with the condition held. """
+        # the batch being written counts as well, it returns to the buffer if writing fails
+        excess = len(self._buffer) + self._points_in_flight - self._flight_dropped \
+            - self.max_buffered
+        if excess <= 0:
+            return []
+        if self._flight_from_buffer:
+            # the batch holds the oldest points, they are dropped first once writing it fails
+            from_flight = min(excess, self._points_in_flight - self._flight_dropped)
+            self._flight_dropped += from_flight
+            excess -= from_flight
+        return [self._buffer.popleft() for i in range(excess)]
+
+    def _handle_overflow(self, points):
+        """ Spill the points or drop them if there is no spill file. """
+        if self.spill_file is not None:
+            try:
+                with self._spill_lock:
+                    with open(self.spill_file, 'ab') as file:
+                        file.writelines(json.dumps(point).encode() + b'\n' for point in points)
+                    self._spilled_pending += len(points)
+                self.spilled += len(points)
+                if not self._losing_points:
+                    self._losing_points = True
+                    self.log.warning('{0}: buffer of {1:d} points is full, spilling points to {2}.'
+                                     ''.format(self.name, self.max_buffered, self.spill_file))
+                return
+            except (OSError, TypeError, ValueError):
+                self.log.exception('{0}: could not spill points to {1}, they are dropped.'
+                                   ''.format(self.name, self.spill_file))
+        self.dropped += len(points)
+        if not self._losing_points:
+            self._losing_points = True
+            self.log.warning('{0}: buffer of {1:d} points is full, dropping the oldest points.'
+                             ''.format(self.name, self.max_buffered))
+
+    def _read_spilled(self):
+        """ Read the next batch of spilled points.
+
+        @return list, int: points, offset in the spill file after them
+        """
+        points = list()
+        with self._spill_lock, open(self.spill_file, 'rb') as file:
+            file.seek(self._spill_offset)
+            while len(points) < self.batch_size:
+                line = file.readline()
+                if not line:
+                    break
+                try:
+                    if line.strip():
+                        points.append(json.loads(line))
+                except ValueError:
+                    self.dropped += 1
+                    self.log.warning('{0}: dropped an unreadable point of {1}.'
+                                     ''.format(self.name, self.spill_file))
+            return points, file.tell()
+
+    def _commit_spilled(self, num_points, offset):
+        """ Mark spilled points as written, the spill file is emptied after its last point. """
+        with self._spill_lock:
+            self._spill_offset = offset
+            self._spilled_pending = max(self._spilled_pending - num_points, 0)
+            if self._spilled_pending == 0:
+                open(self.spill_file, 'wb').close()
+                self._spill_offset = 0
+
+    def _next_batch(self):
+        """ Wait until a batch is due and take it from the buffer, call with the condition held.
+
+        @return list: points of the batch, empty if spilled points are due or the writer stops
+        """
+        while True:
+            now = time.monotonic()
+            if self._buffer and (self._stop_requested or self._flush_requested
+                                 or len(self._buffer) >= self.batch_size
+                                 or now >= self._oldest_point_time + self.flush_interval):
+                break
+            if self._stop_requested or (self._spilled_pending and not self._buffer):
+                return []
+            timeout = self._oldest_point_time + self.flush_interval - now if self._buffer else None
+            self._condition.wait(timeout)
+        batch = [self._buffer.popleft() for i in range(min(self.batch_size, len(self._buffer)))]
+        # the rest of the buffer is due as well, it is as old as the batch or exceeds a batch
+        self._points_in_flight = len(batch)
+        self._flight_from_buffer = True
+        return batch
+
+    def _write(self, batch):
+        """ Write a batch to the backend, logging stalls and recoveries only once.
+
+        @return bool: True if the batch is written
+        """
+        try:
+            self._write_points(batch)
+        except Exception:
+            if not self._stalled:
+                self._stalled = True
+                self.log.exception('{0}: writing points failed, retrying every {1} s.'
+                                   ''.format(self.name, self.retry_interval))
+            return False
+        self.written += len(batch)
+        if self._stalled:
+            self._stalled = False
+            self.log.info('{0}: writing points works again.'.format(self.name))
+        self._losing_points = False
+        return True
+
+    def _run(self):
+        """ Loop of the writer thread. """
+        while True:
+            spilled_offset = None
+            with self._condition:
+                batch = self._next_batch()
+                stopping = self._stop_requested
+            if not batch and self._spilled_pending:
+                batch, spilled_offset = self._read_spilled()
+                if not batch:
+                    # nothing readable is left in the spill file
+                    self._commit_spilled(self._spilled_pending, spilled_offset)
+                    with self._condition:
+                        self._condition.notify_all()
+                    continue
+                with self._condition:
+                    self._points_in_flight = len(batch)
+                    self._flight_from_buffer = False
+
+            if batch and self._write(batch):
+                if spilled_offset is not None:
+                    self._commit_spilled(len(batch), spilled_offset)
+                with self._condition:
+                    self._points_in_flight = 0
+                    self._flight_dropped = 0
+                    self._condition.notify_all()
+                continue
+
+            with self._condition:
+                flight_dropped = self._flight_dropped
+                self._points_in_flight = 0
+                self._flight_dropped = 0
+                overflow = list()
+                if batch and spilled_offset is None:
+                    # back to the front of the buffer, the oldest points overflow first
+                    overflow = batch[:flight_dropped]
+                    self._buffer.extendleft(reversed(batch[flight_dropped:]))
+                    overflow.extend(self._take_overflow())
+                    if self._oldest_point_time is None:
+                        self._oldest_point_time = time.monotonic()
+                self._condition.notify_all()
+                if stopping:
+                    overflow.extend(self._buffer)
+                    self._buffer.clear()
+            if overflow:
+                self._handle_overflow(overflow)
+            if stopping:
+                return
+            with self._condition:
+                self._condition.wait_for(lambda: self._stop_requested, self.retry_interval)
+
+
+class BatchedChannelLogger:
+    """ Logging channels of a data logger module writing the logged points with a BatchWriter.
+
+    Implements the channel part of the DataLoggerInterface for InfluxLogger and DataLoggerDummy.
+    The module provides _write_points(points), which writes a batch of points in the format of
+    format_data to its database and is called by the writer thread. It creates the dict
+    log_channels in __init__ and calls _start_writer on activation and _stop_writer on
+    deactivation. Inherit it before the interface:
+
+        class MyLogger(Base, BatchedChannelLogger, DataLoggerInterface):
+    """
+
+    _writer = None
+
+    def _start_writer(self, batch_size, flush_interval, buffer_size, spill_file,
+                      retry_interval=1):
+        """ Create and start the writer of the logged points, see BatchWriter. """
+        self._writer = BatchWriter(self._write_points,
+                                   batch_size=batch_size,
+                                   flush_interval=flush_interval,
+                                   max_buffered=buffer_size,
+                                   spill_file=spill_file,
+                                   retry_interval=retry_interval,
+                                   name='{0}_writer'.format(self._name),
+                                   log=self.log)
+        self._writer.start()
+
+    def _stop_writer(self):
+        """ Write the buffered points and stop the writer, warn about the points not written. """
+        not_written = self._writer.stop(timeout=10 * self._writer.flush_interval + 10)
+        if not_written:
+            self.log.warning('{0:d} logged points could not be written to the database.'
+                             ''.format(not_written))
+        self._writer = None
+
+    def get_log_channels(self):
+        """ Get the logging channels.
+
+            @return dict: channel name: dict with the 'fields' and 'tags' of the channel
+        """
+        return self.log_channels
+
+    def set_log_channels(self, channelspec):
+        """ Add, change or remove logging channels.
+
+            @param channelspec dict: channel name: list of field names, or dict with the list
+                                     'fields' and optionally the dict 'tags' of every point,
+                                     None removes the channel
+        """
+        for name, spec in channelspec.items():
+            if spec is None:
+                self.log_channels.pop(name, None)
+                continue
+            if not isinstance(spec, dict):
+                spec = {'fields': spec}
+            self.log_channels[name] = {'fields': list(spec['fields']),
+                                       'tags': dict(spec.get('tags', {}))}
+
+    def log_to_channel(self, channel, values):
+        """ Log values to a specific channel. The values are written to the database later.
+
+            @param channel str: channel name
+            @param values list: data to be logged, one value per field of the channel, or a dict
+                                of field name: value
+
+            @return int: error code (0:OK, -1:error)
+        """
+        if channel not in self.log_channels:
+            self.log.error('Logging channel {0} is not set up.'.format(channel))
+            return -1
+        fields = self.log_channels[channel]['fields']
+        if not isinstance(values, dict):
+            if len(values) != len(fields):
+                self.log.error('Logging channel {0} needs {1:d} values, got {2:d}.'
+                               ''.format(channel, len(fields), len(values)))
+                return -1
+            values = dict(zip(fields, values))
+        self._writer.add(self.format_data(channel, values, self.log_channels[channel]['tags']))
+        return 0
+
+    def flush(self, timeout=None):
+        """ Write all logged values to the database now.
+
+            @param timeout float: optional, maximum time in s to wait for the database
+
+            @return bool: True if all values are written
+        """
+        return self._writer.flush(timeout)
+
+    def format_data(self, channel_name, values, tags, timestamp=None):
+        """ Format data as points of the InfluxDB JSON API.
+
+            @param channel_name str: channel name
+            @param values dict: field name: value
+            @param tags dict: tag name: value
+            @param timestamp int: optional, time in us since the epoch, now if None
+
+            @return list: the point
+        """
+        return [{
+            'measurement': channel_name,
+            'fields': values,
+            'tags': tags,
+            'time': int(round(time.time() * 1e6)) if timestamp is None else timestamp
+        }]
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains the Qudi coordinate transformation of scanner positions.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import numpy as np
+
+__all__ = ['CoordinateTransform']
+
+
+# number of points evaluated at once
+_BLOCK_SIZE = 8192
+
+# the identity: coefficients[axis, i, j] of x**i * y**j, linear[axis] of (z, a)
+_IDENTITY_COEFFICIENTS = np.zeros((4, 2, 2))
+_IDENTITY_COEFFICIENTS[0, 1, 0] = 1
+_IDENTITY_COEFFICIENTS[1, 0, 1] = 1
+_IDENTITY_LINEAR = np.zeros((4, 2))
+_IDENTITY_LINEAR[2, 0] = 1
+_IDENTITY_LINEAR[3, 1] = 1
+
+
+def _padded(coefficients, shape):
+    """ Coefficient array padded with zeros to at least the given shape of its last two axes. """
+    pad = [(0, 0)] * (coefficients.ndim - 2) + [
+        (0, max(shape[0] - coefficients.shape[-2], 0)),
+        (0, max(shape[1] - coefficients.shape[-1], 0))]
+    return np.pad(coefficients, pad, mode='constant')
+
+
+def _add(a, b):
+    """ Sum of two 2D polynomials with coefficient arrays of different shapes. """
+    shape = (max(a.shape[-2], b.shape[-2]), max(a.shape[-1], b.shape[-1]))
+    return _padded(a, shape) + _padded(b, shape)
+
+
+def _polymul2d(a, b):
+    """ Product of two 2D polynomials, given by their coefficients c[i, j] of x**i * y**j. """
+    product = np.zeros((a.shape[0] + b.shape[0] - 1, a.shape[1] + b.shape[1] - 1))
+    for (i, j), coefficient in np.ndenumerate(a):
+        if coefficient != 0:
+            product[i:i + b.shape[0], j:j + b.shape[1]] += coefficient * b
+    return product
+
+
+def _polycompose2d(poly, x, y):
+    """ Coefficients of poly(x(u, v), y(u, v)), with all polynomials given by their coefficients. """
+    result = np.zeros((1, 1))
+    x_power = np.ones((1, 1))
+    for i in range(poly.shape[0]):
+        term = np.ones((1, 1))
+        for j in range(poly.shape[1]):
+            if poly[i, j] != 0:
+                result = _add(result, poly[i, j] * _polymul2d(x_power, term))
+            term = _polymul2d(term, y)
+        x_power = _polymul2d(x_power, x)
+    return result
+
+
+def _trimmed(coefficients):
+    """ Coefficient array without trailing powers which are zero for all axes. """
+    nonzero = np.argwhere(coefficients != 0)
+    if nonzero.size == 0:
+        return coefficients[:, :1, :1]
+    return coefficients[:, :nonzero[:, 1].max() + 1, :nonzero[:, 2].max() + 1]
+
+
+class CoordinateTransform:
+    """ Transformation of the scanner positions (x, y, z, a) by a chain of corrections.
+
+    The corrections (tilt, 2D polynomial of x and y, affine) are merged into stages, which compute
+    every output axis in a single evaluation as a 2D polynomial of the input x and y plus a linear
+    function of the input z and a. Another stage is only needed if a polynomial follows a
+    correction mixing z or a into x or y, which would not be a polynomial of x and y anymore.
+
+    Transforms are immutable, every correction returns a new transform:
+
+        transform = CoordinateTransform().tilt(0.01, 0.02).polynomial(poly_x, poly_y)
+        transformed_path = transform.apply(line_path)
+    """
+
+    def __init__(self, stages=None):
+        if stages is None:
+            stages = [(_IDENTITY_COEFFICIENTS, _IDENTITY_LINEAR)]
+        self._stages = stages
+        # what to compute for every axis is decided once, not for every applied line
+        self._plans = [self._plan(coefficients, linear) for coefficients, linear in stages]
+        self._affine_changes = self._plan_affine_changes(stages)
+
+    def __eq__(self, other):
+        if not isinstance(other, CoordinateTransform) or len(self._stages) != len(other._stages):
+            return False
+        return all(np.array_equal(c1, c2) and np.array_equal(l1, l2)
+                   for (c1, l1), (c2, l2) in zip(self._stages, other._stages))
+
+    __hash__ = None
+
+    @property
+    def num_stages(self):
+        """ Number of evaluations needed to apply the transform. """
+        return len(self._stages)
+
+    @property
+    def is_identity(self):
+        """ True if the transform does not change any position. """
+        return len(self._stages) == 1 \
+            and np.array_equal(self._stages[0][0], _IDENTITY_COEFFICIENTS) \
+            and np.array_equal(self._stages[0][1], _IDENTITY_LINEAR)
+
+    @property
+    def is_affine(self):
+        """ True if the transform is an affine transformation, e.g. a tilt correction. """
+        return self._affine_changes is not None
+
+    def then(self, other):
+        """ Transform applying this transform first and the other one to its result.
+
+        @param CoordinateTransform other: transform to apply afterwards
+
+        @return CoordinateTransform: merged transform
+        """
+        stages = list(self._stages)
+        for stage in other._stages:
+            merged = self._compose(stages[-1], stage)
+            if merged is None:
+                stages.append(stage)
+            else:
+                stages[-1] = merged
+        return CoordinateTransform(stages)
+
+    def affine(self, matrix=None, offset=None):
+        """ Append an affine transformation: position = matrix @ position + offset.
+
+        @param matrix: 4x4 matrix acting on (x, y, z, a), identity if None
+        @param offset: 4 offsets added to (x, y, z, a), none if None
+
+        @return CoordinateTransform: the transform followed by the affine transformation
+        """
+        matrix = np.eye(4) if matrix is None else np.asarray(matrix, dtype=float)
+        offset = np.zeros(4) if offset is None else np.asarray(offset, dtype=float)
+        coefficients = np.zeros((4, 2, 2))
+        coefficients[:, 0, 0] = offset
+        coefficients[:, 1, 0] = matrix[:, 0]
+        coefficients[:, 0, 1] = matrix[:, 1]
+        return self.then(CoordinateTransform([(coefficients, matrix[:, 2:].copy())]))
+
+    def tilt(self, slope_x, slope_y, reference_x=0, reference_y=0):
+        """ Append the z correction of a tilted surface:
+        z = z - (x - reference_x) * slope_x - (y - reference_y) * slope_y
+
+        @return CoordinateTransform: the transform followed by the tilt correction
+        """
+        matrix = np.eye(4)
+        matrix[2, 0] = -slope_x
+        matrix[2, 1] = -slope_y
+        offset = np.zeros(4)
+        offset[2] = reference_x * slope_x + reference_y * slope_y
+        return self.affine(matrix, offset)
+
+    def polynomial(self, poly2d_x, poly2d_y):
+        """ Append a 2D polynomial transformation of x and y, z and a are left unchanged.
+
+        @param poly2d_x: coefficients c[i, j] of x**i * y**j of the new x, as for
+                         numpy.polynomial.polynomial.polyval2d
+        @param poly2d_y: coefficients of the new y
+
+        @return CoordinateTransform: the transform followed by the polynomial transformation
+        """
+        poly2d_x = np.atleast_2d(np.asarray(poly2d_x, dtype=float))
+        poly2d_y = np.atleast_2d(np.asarray(poly2d_y, dtype=float))
+        shape = (max(poly2d_x.shape[0], poly2d_y.shape[0], 2),
+                 max(poly2d_x.shape[1], poly2d_y.shape[1], 2))
+        coefficients = np.zeros((4,) + shape)
+        coefficients[0] = _padded(poly2d_x, shape)
+        coefficients[1] = _padded(poly2d_y, shape)
+        linear = np.zeros((4, 2))
+        linear[2, 0] = 1
+        linear[3, 1] = 1
+        return self.then(CoordinateTransform([(coefficients, linear)]))
+
+    def apply(self, positions):
+        """ Transform positions.
+
+        @param numpy.ndarray positions: positions with the axes (x, y[, z[, a]]) along the first
+                                        dimension, e.g. a line path or a grid of positions
+
+        @return numpy.ndarray: transformed positions, same shape as positions
+        """
+        positions = np.asarray(positions, dtype=float)
+        shape = positions.shape
+        positions = positions.reshape(shape[0], -1)
+        if self._affine_changes is not None:
+            return self._apply_affine(positions).reshape(shape)
+        result = np.empty(positions.shape)
+        # blocks of points keep the intermediate powers in the cache for a whole image
+        for start in range(0, max(positions.shape[1], 1), _BLOCK_SIZE):
+            block = positions[:, start:start + _BLOCK_SIZE]
+            for plan in self._plans:
+                block = self._evaluate(plan, block)
+            result[:, start:start + _BLOCK_SIZE] = block
+        return result.reshape(shape)
+
+    def _apply_affine(self, positions):
+        """ Apply an affine transform to a copy of the positions (axes along the first dimension of
+        a 2D array), changing only the axes which are not passed through, like the z axis by a tilt
+        correction.
+        """
+        result = positions.copy()
+        num_axes = positions.shape[0]
+        for axis, constant, terms in self._affine_changes:
+            if axis >= num_axes:
+                continue
+            out = result[axis]
+            if constant != 0:
+                out += constant
+            for column, factor in terms:
+                if column < num_axes:
+                    out += factor * positions[column]
+        return result
+
+    @staticmethod
+    def _plan_affine_changes(stages):
+        """ Changes of an affine transform to the axes: for every changed axis the constant and the
+        terms (input axis, factor) added to its input value. None if the transform is not affine.
+        """
+        if len(stages) != 1:
+            return None
+        coefficients, linear = stages[0]
+        padded = _padded(coefficients, (2, 2))
+        nonlinear = padded.copy()
+        nonlinear[:, 0, 0] = nonlinear[:, 1, 0] = nonlinear[:, 0, 1] = 0
+        if np.any(nonlinear):
+            return None
+        # factors of the input axes (x, y, z, a) minus the identity
+        matrix = np.column_stack((padded[:, 1, 0], padded[:, 0, 1], linear)) - np.eye(4)
+        changes = list()
+        for axis in range(4):
+            terms = [(column, matrix[axis, column]) for column in range(4)
+                     if matrix[axis, column] != 0]
+            if terms or padded[axis, 0, 0] != 0:
+                changes.append((axis, padded[axis, 0, 0], terms))
+        return changes
+
+    @staticmethod
+    def _plan(coefficients, linear):
+        """ Evaluation plan of a stage: for every axis the affine terms (constant, x, y) or the
+        polynomial coefficients, and the nonzero terms (input axis, factor) of z and a.
+        """
+        padded = _padded(coefficients, (2, 2))
+        nonlinear = padded.copy()
+        nonlinear[:, 0, 0] = nonlinear[:, 1, 0] = nonlinear[:, 0, 1] = 0
+        axes = list()
+        for axis in range(4):
+            linear_terms = [(2 + column, linear[axis, column]) for column in range(2)
+                            if linear[axis, column] != 0]
+            if np.any(nonlinear[axis]):
+                axes.append((coefficients[axis], None, linear_terms))
+            else:
+                affine_terms = [(column, padded[axis, i, j])
+                                for column, (i, j) in enumerate(((1, 0), (0, 1)))
+                                if padded[axis, i, j] != 0]
+                axes.append((padded[axis, 0, 0], affine_terms, linear_terms))
+        return coefficients.shape[1:], axes
+
+    @staticmethod
+    def _evaluate(plan, positions):
+        """ Evaluate one stage for positions of shape (axes, points). """
+        (degree_x, degree_y), axes = plan
+        num_axes, num_points = positions.shape
+        if num_axes < 2:
+            positions = np.vstack((positions, np.zeros((2 - num_axes, num_points))))
+        result = np.empty((num_axes, num_points))
+        x_powers = y_powers = None
+        for axis in range(num_axes):
+            out = result[axis]
+            constant, affine_terms, linear_terms = axes[axis]
+            if affine_terms is None:
+                if x_powers is None:
+                    # powers of x and y, shared by all output axes
+                    x_powers = np.ones((degree_x, num_points))
+                    for i in range(1, degree_x):
+                        np.multiply(x_powers[i - 1], positions[0], out=x_powers[i])
+                    y_powers = np.ones((degree_y, num_points))
+                    for j in range(1, degree_y):
+                        np.multiply(y_powers[j - 1], positions[1], out=y_powers[j])
+                np.einsum('in,in->n', constant @ y_powers, x_powers, out=out)
+            else:
+                if constant == 0 and affine_terms and affine_terms[0][1] == 1:
+                    # e.g. x or y passed through unchanged
+                    np.copyto(out, positions[affine_terms[0][0]])
+                    affine_terms = affine_terms[1:]
+                else:
+                    out.fill(constant)
+                for column, factor in affine_terms:
+                    if factor == 1:
+                        out += positions[column]
+                    else:
+                        out += factor * positions[column]
+            for column, factor in linear_terms:
+                if column < num_axes:
+                    out += factor * positions[column]
+        return result
+
+    @staticmethod
+    def _compose(first, second):
+        """ Merge two stages into one, None if the result is no stage anymore. """
+        coefficients_a, linear_a = first
+        coefficients_b, linear_b = second
+        coefficients_b = _padded(coefficients_b, (2, 2))
+        nonlinear = coefficients_b.copy()
+        nonlinear[:, 0, 0] = nonlinear[:, 1, 0] = nonlinear[:, 0, 1] = 0
+        if np.any(nonlinear) and np.any(linear_a[:2]):
+            return None
+        # the affine part of the second stage acting on the outputs of the first
+        matrix = np.column_stack((coefficients_b[:, 1, 0], coefficients_b[:, 0, 1], linear_b))
+        coefficients = np.einsum('kl,lij->kij', matrix, coefficients_a)
+        coefficients[:, 0, 0] += coefficients_b[:, 0, 0]
+        linear = matrix @ linear_a
+        for axis in range(4):
+            if np.any(nonlinear[axis]):
+                term = _polycompose2d(nonlinear[axis], coefficients_a[0], coefficients_a[1])
+                coefficients = _add(coefficients, np.pad(
+                    term[np.newaxis], ((axis, 3 - axis), (0, 0), (0, 0)), mode='constant'))
+        return _trimmed(coefficients), linear
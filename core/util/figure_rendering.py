@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains the functions rendering the figures saved along with measurement data, used by
+the SaveLogic in worker processes or, if no worker processes are used, in the calling thread.
+
+A figure is either passed as a matplotlib figure object or as a FigureSpec, i.e. a drawing function
+together with its arguments, in which case the figure is also built in the worker. Both are
+pickled by the caller when the save is requested, so the worker renders the data of that moment
+while the measurement continues to change its buffers.
+
+This module must not import Qt, it is imported by the worker processes.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import pickle
+
+
+class FigureSpec:
+    """ Plot specification: a drawing function and the keyword arguments to call it with.
+
+    The function has to be defined at module level (so it can be pickled by reference) and return
+    a matplotlib figure. It should not apply a matplotlib style, the style of the SaveLogic is
+    applied before it is called.
+
+    Example:
+        FigureSpec(draw_scan_image, data=image, image_extent=extent)
+    """
+    __slots__ = ('function', 'kwargs')
+
+    def __init__(self, function, **kwargs):
+        self.function = function
+        self.kwargs = kwargs
+
+    def __getstate__(self):
+        return self.function, self.kwargs
+
+    def __setstate__(self, state):
+        self.function, self.kwargs = state
+
+    def draw(self):
+        return self.function(**self.kwargs)
+
+
+def serialize_figure(figure):
+    """ Pickle a figure or FigureSpec, which freezes the data to render.
+
+    @param figure: matplotlib figure or FigureSpec
+
+    @return bytes: the pickled figure
+    """
+    return pickle.dumps(figure, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def init_worker():
+    """ Initializer of the worker processes: render without display. """
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def render_figure(figure, file_base, metadata, style=None, save_pdf=True, save_png=True):
+    """ Build (if needed) and write a figure as PDF and PNG with metadata.
+
+    @param figure: matplotlib figure, FigureSpec or a figure pickled with serialize_figure
+    @param str file_base: path and file name without extension, '_fig.pdf' and '_fig.png' are added
+    @param dict metadata: metadata of the files, e.g. Title, Author, CreationDate (datetime)
+    @param dict style: optional, matplotlib style applied before drawing and rendering
+    @param bool save_pdf: write the PDF file
+    @param bool save_png: write the PNG file
+
+    @return list(str): paths of the written files
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+    from PIL import Image
+    from PIL import PngImagePlugin
+
+    if style is not None:
+        plt.style.use(style)
+    if isinstance(figure, bytes):
+        figure = pickle.loads(figure)
+    if isinstance(figure, FigureSpec):
+        figure = figure.draw()
+
+    written = list()
+    try:
+        if save_pdf:
+            fig_fname_vector = file_base + '_fig.pdf'
+            # The with statement makes sure that the PdfPages object is closed properly at
+            # the end of the block, even if an Exception occurs.
+            with PdfPages(fig_fname_vector) as pdf:
+                pdf.savefig(figure, bbox_inches='tight', pad_inches=0.05)
+                pdf_metadata = pdf.infodict()
+                for key, value in metadata.items():
+                    pdf_metadata[key] = value
+            written.append(fig_fname_vector)
+
+        if save_png:
+            fig_fname_image = file_base + '_fig.png'
+            figure.savefig(fig_fname_image, bbox_inches='tight', pad_inches=0.05)
+
+            # Use Pillow (an fork for PIL) to attach metadata to the PNG
+            png_image = Image.open(fig_fname_image)
+            png_metadata = PngImagePlugin.PngInfo()
+            for key, value in metadata.items():
+                # PIL can only handle strings
+                if hasattr(value, 'strftime'):
+                    value = value.strftime('%Y%m%d-%H%M-%S')
+                png_metadata.add_text(key, str(value))
+            png_image.save(fig_fname_image, 'png', pnginfo=png_metadata)
+            written.append(fig_fname_image)
+    finally:
+        plt.close(figure)
+    return written
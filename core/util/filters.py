@@ -26,7 +26,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-def scan_blink_correction(image, axis=1):
+def scan_blink_correction(image, axis=1, cval=None):
     """
     This filter can be used to filter out impulsive noise from a 2D array along a single axis.
     As filter we apply a sequence of two filters. First a min-filter and then a max-filter.
@@ -38,6 +38,7 @@ def scan_blink_correction(image, axis=1):
 
     @param numpy.ndarray image: A 2D numpy array to be filtered (e.g. image data)
     @param int axis: The axis along which to apply the 1D filter
+    @param float cval: optional, value to pad the image boundaries with. Median of the image if None
     @return numpy.ndarray: The filtered image. Same dimensions as input image
     """
 
@@ -53,7 +54,7 @@ def scan_blink_correction(image, axis=1):
 
     # Calculate median value of the image. This value is used for padding image boundaries during
     # filtering.
-    median = np.median(image)
+    median = np.median(image) if cval is None else cval
     # Apply a minimum filter along the chosen axis.
     filt_img = minimum_filter1d(image, size=2, axis=axis, mode='constant', cval=median)
     # Apply a maximum filter along the chosen axis. Flip the previous filter result to avoid
@@ -62,3 +63,152 @@ def scan_blink_correction(image, axis=1):
         np.flip(filt_img, axis), size=2, axis=axis, mode='constant', cval=median)
     # Flip back the image to obtain original orientation and return result.
     return np.flip(filt_img, axis)
+
+
+class ScanBlinkCorrection:
+    """
+    Blink correction (see scan_blink_correction) of an image which changes row by row, like a scan
+    image during the scan.
+
+    The filtered image is kept and only the rows which changed since the last call are filtered
+    again, together with their neighbour rows if the filter is applied along axis 0. The image
+    boundaries are padded with the median of the row medians, which is updated with the changed
+    rows instead of taking the median of the whole image. The pixels next to the boundaries are
+    filtered again whenever this padding value changes.
+    """
+
+    def __init__(self, axis=1):
+        self.axis = axis
+        self.image = None       # copy of the last unfiltered image
+        self.filtered = None
+        self.cval = None
+        self._row_medians = None
+
+    def reset(self):
+        """ Forget the last image, the next one is filtered completely. """
+        self.image = None
+        self.filtered = None
+        self.cval = None
+        self._row_medians = None
+
+    def apply(self, image, changed_rows=None):
+        """
+        Filter the image, reusing the result of the last call for the rows which did not change.
+
+        @param numpy.ndarray image: A 2D numpy array to be filtered (e.g. image data)
+        @param changed_rows: optional, indices of the rows which changed since the last call.
+                             The image is compared with the last one if None.
+        @return numpy.ndarray: The filtered image. It is updated in place by the next call.
+        """
+        if not isinstance(image, np.ndarray) or image.ndim != 2 or self.axis not in (0, 1):
+            self.reset()
+            return scan_blink_correction(image=image, axis=self.axis)
+
+        if self.image is None or self.image.shape != image.shape \
+                or self.image.dtype != image.dtype:
+            self.image = image.copy()
+            self._row_medians = np.median(image, axis=1)
+            self.cval = np.median(self._row_medians)
+            self.filtered = scan_blink_correction(image=self.image, axis=self.axis, cval=self.cval)
+            return self.filtered
+
+        if changed_rows is None:
+            changed_rows = np.flatnonzero(np.any(image != self.image, axis=1))
+        else:
+            changed_rows = np.unique(np.asarray(changed_rows, dtype=int))
+        if changed_rows.size == 0:
+            return self.filtered
+
+        self.image[changed_rows] = image[changed_rows]
+        self._row_medians[changed_rows] = np.median(self.image[changed_rows], axis=1)
+        cval = np.median(self._row_medians)
+        boundaries_changed = cval != self.cval
+        self.cval = cval
+
+        if self.axis == 1:
+            self.filtered[changed_rows] = scan_blink_correction(
+                image=self.image[changed_rows], axis=1, cval=cval)
+            if boundaries_changed:
+                # The first and last pixel of a row only depend on their neighbour in the row
+                self.filtered[:, :1] = scan_blink_correction(
+                    image=self.image[:, :2], axis=1, cval=cval)[:, :1]
+                self.filtered[:, -1:] = scan_blink_correction(
+                    image=self.image[:, -2:], axis=1, cval=cval)[:, -1:]
+            return self.filtered
+
+        # Along axis 0 a filtered row depends on the rows before and after it
+        num_rows = self.image.shape[0]
+        rows = np.concatenate((changed_rows - 1, changed_rows, changed_rows + 1))
+        if boundaries_changed:
+            rows = np.concatenate((rows, [0, num_rows - 1]))
+        rows = np.unique(np.clip(rows, 0, num_rows - 1))
+        # Filter each contiguous block of rows together with the rows next to it
+        gaps = np.flatnonzero(np.diff(rows) > 1)
+        for first, last in zip(rows[np.r_[0, gaps + 1]], rows[np.r_[gaps, rows.size - 1]]):
+            start = max(first - 1, 0)
+            stop = min(last + 2, num_rows)
+            filtered = scan_blink_correction(image=self.image[start:stop], axis=0, cval=cval)
+            self.filtered[first:last + 1] = filtered[first - start:last + 1 - start]
+        return self.filtered
+
+
+def correct_pixel_lag(line, lag):
+    """
+    Shifts the data of a scanned line back by the delay of the detection behind the scanner
+    position, so the data of each pixel is the one recorded at its position.
+
+    The data of pixel i is interpolated linearly between the samples recorded at i + lag. Pixels
+    at the end of the line, whose data was not recorded anymore, get the data of the last sample.
+
+    @param numpy.ndarray line: line data in the order it was scanned, 1D or 2D with the pixels
+                               along axis 0 (e.g. one column per counter channel)
+    @param float lag: delay in pixels, may be fractional. Positive if the data lags behind.
+    @return numpy.ndarray: The corrected line. Same dimensions as input line
+    """
+    if lag == 0 or len(line) < 2:
+        return line
+    line = np.asarray(line)
+    pixels = np.arange(line.shape[0])
+    positions = pixels + lag
+    if line.ndim == 1:
+        return np.interp(positions, pixels, line)
+    corrected = np.empty(line.shape, dtype=np.float64)
+    for column in range(line.shape[1]):
+        corrected[:, column] = np.interp(positions, pixels, line[:, column])
+    return corrected
+
+
+def scan_serpentine_line(scan_line, line, row, num_rows, bidirectional=True, forward_lag=0,
+                         backward_lag=0):
+    """
+    Scans a row of an image. In a bidirectional (serpentine) scan every second row is scanned from
+    its end to its start, so the scanner does not have to return to the start of the next row.
+    The counts are corrected for the pixel lag of the scan direction (see correct_pixel_lag).
+
+    @param callable scan_line: scans the positions in the given order and returns the counts,
+                               called as scan_line(line, backward)
+    @param numpy.ndarray line: positions of the row from its start to its end, with the axes
+                               along axis 0
+    @param int row: index of the row in the image
+    @param int num_rows: number of rows of the image
+    @param bool bidirectional: whether every second row is scanned backwards
+    @param float forward_lag: pixel lag of the rows scanned from their start to their end
+    @param float backward_lag: pixel lag of the rows scanned from their end to their start
+    @return (numpy.ndarray, bool): The counts of the row from its start to its end (the counts of
+                                   scan_line unchanged if they contain its error value -1), and
+                                   whether the scanner has to return to the start of the next row
+    """
+    backward = bidirectional and row % 2 == 1
+    if backward:
+        line = line[:, ::-1]
+    counts = scan_line(line, backward)
+    if np.any(counts == -1):
+        return counts, False
+    if backward:
+        counts = correct_pixel_lag(counts, backward_lag)[::-1]
+    else:
+        counts = correct_pixel_lag(counts, forward_lag)
+    # the next row starts where this one ended, except for the first row after the last one,
+    # which is scanned forwards
+    return_to_start = not bidirectional or (not backward and row >= num_rows - 1)
+    return counts, return_to_start
@@ -19,14 +19,322 @@ Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
 top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
 """
 
+import json
+import pickle
+import socket
+import struct
+import weakref
+import zlib
+import numpy as np
 import rpyc.core.netref
 import rpyc.utils.classic
 
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python < 3.8
+    shared_memory = None
 
-def netobtain(obj):
+# Magic bytes and header layout of a packed data block:
+# 4 bytes magic, uint32 length of the JSON header, JSON header, raw buffers
+_BLOCK_MAGIC = b'QDNB'
+_BLOCK_PREFIX = struct.Struct('<4sI')
+
+# Connections to remote module servers running on this very computer. Data from these
+# servers is handed over via shared memory instead of being sent through the socket.
+_local_connections = weakref.WeakSet()
+
+
+class _ArrayPlaceholder:
+    """ Stands in for a numpy array inside the pickled skeleton of a packed data block. """
+    __slots__ = ('index',)
+
+    def __init__(self, index):
+        self.index = index
+
+    def __reduce__(self):
+        return _ArrayPlaceholder, (self.index,)
+
+
+def netobtain(obj, compression=None):
+    """ Transfer a remote object (rpyc netref) to the local computer.
+
+    If the object lives in a qudi remote module server, numpy arrays contained in the object are
+    transferred as raw buffers (see pack_data) instead of being pickled element by element.
+    Connections to other rpyc servers fall back to rpyc.utils.classic.obtain.
+    Local tuples, lists and dicts containing netrefs (e.g. a tuple returned by a remote method)
+    are obtained as a whole in a single call. Other local objects are returned unchanged.
+
+    @param object obj: object to obtain
+    @param str compression: optional, 'zlib' to compress the array buffers before transfer
+
+    @return object: local copy of the object
+    """
+    conn = _find_connection(obj)
+    if conn is None:
+        return obj
+    try:
+        packer = conn.root.pack_object
+    except AttributeError:
+        return _classic_obtain(obj)
+    return receive_data(packer(obj, compression, conn in _local_connections))
+
+
+def netfetch(module, requests, compression=None):
+    """ Get several attributes and/or method results of a (remote) module in a single call.
+
+    Each request is either an attribute name or a tuple (method_name, args, kwargs) with args and
+    kwargs being optional. For a remote module all requests are evaluated on the server and the
+    results are sent back in one packed data block, so only a single round-trip is needed.
+
+    @param object module: local qudi module or rpyc netref to a remote qudi module
+    @param list requests: attribute names (str) or tuples (method_name, args, kwargs)
+    @param str compression: optional, 'zlib' to compress the array buffers before transfer
+
+    @return list: requested values in the order of requests
+    """
+    if isinstance(module, rpyc.core.netref.BaseNetref):
+        conn = object.__getattribute__(module, '____conn__')
+        try:
+            fetcher = conn.root.fetch
+        except AttributeError:
+            return [netobtain(value) for value in evaluate_requests(module, requests)]
+        return receive_data(fetcher(module, tuple(requests), compression,
+                                    conn in _local_connections))
+    else:
+        return evaluate_requests(module, requests)
+
+
+def evaluate_requests(module, requests):
+    """ Evaluate attribute and method requests as passed to netfetch on a module.
+
+    @param object module: module to get the attributes from or to call the methods of
+    @param list requests: attribute names (str) or tuples (method_name, args, kwargs)
+
+    @return list: requested values in the order of requests
+    """
+    results = list()
+    for request in requests:
+        if isinstance(request, str):
+            results.append(getattr(module, request))
+            continue
+        method_name = request[0]
+        args = tuple(request[1]) if len(request) > 1 and request[1] is not None else tuple()
+        kwargs = dict(request[2]) if len(request) > 2 and request[2] is not None else dict()
+        results.append(getattr(module, method_name)(*args, **kwargs))
+    return results
+
+
+def register_local_connection(connection):
+    """ Mark a rpyc connection as going to a server on this computer. Data obtained through this
+    connection is then transferred via shared memory if possible.
+
+    @param rpyc.Connection connection: the connection to register
+    """
+    _local_connections.add(connection)
+
+
+def is_local_host(host):
+    """ Check if a host name or address refers to this computer.
+
+    @param str host: host name or IP address
+
+    @return bool: True if the host is the local computer, False otherwise
+    """
+    try:
+        address = socket.gethostbyname(host)
+    except OSError:
+        return False
+    if address.startswith('127.'):
+        return True
+    try:
+        return address == socket.gethostbyname(socket.gethostname())
+    except OSError:
+        return False
+
+
+def pack_data(obj, compression=None):
+    """ Serialize an object into a single bytes block for network transfer.
+
+    Numpy arrays (also nested in lists, tuples and dicts) are stored as raw memory buffers
+    described by their dtype and shape. Everything else is pickled.
+
+    @param object obj: the object to serialize
+    @param str compression: optional, 'zlib' to compress the array buffers
+
+    @return bytes: packed data block
+    """
+    header, buffers = _pack_buffers(obj, compression)
+    return b''.join([header] + buffers)
+
+
+def unpack_data(block):
+    """ Deserialize a data block created by pack_data.
+
+    @param bytes block: packed data block (bytes, bytearray or memoryview)
+
+    @return object: the deserialized object. Arrays are writeable copies.
+    """
+    block = memoryview(block)
+    magic, header_length = _BLOCK_PREFIX.unpack_from(block, 0)
+    if magic != _BLOCK_MAGIC:
+        raise ValueError('Data block to unpack is not a valid qudi data block.')
+    offset = _BLOCK_PREFIX.size
+    header = json.loads(bytes(block[offset:offset + header_length]).decode('utf-8'))
+    offset += header_length
+
+    arrays = list()
+    for desc in header['arrays']:
+        raw = block[offset:offset + desc['stored']]
+        offset += desc['stored']
+        if header['compression'] == 'zlib':
+            raw = zlib.decompress(raw)
+        arr = np.frombuffer(raw, dtype=np.dtype(desc['dtype'])).reshape(desc['shape'])
+        arrays.append(arr.copy())
+    skeleton = pickle.loads(block[offset:offset + header['skeleton']])
+    return _fill_placeholders(skeleton, arrays)
+
+
+def pack_data_shared(obj, compression=None):
+    """ Serialize an object like pack_data but into a new shared memory block.
+
+    The receiver is responsible for releasing the shared memory (see unpack_data_shared).
+
+    @param object obj: the object to serialize
+    @param str compression: optional, 'zlib' to compress the array buffers
+
+    @return tuple(str, int): name and size of the shared memory block
+    """
+    header, buffers = _pack_buffers(obj, compression)
+    size = len(header) + sum(len(buf) for buf in buffers)
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        offset = 0
+        for buf in (header, *buffers):
+            length = len(buf)
+            shm.buf[offset:offset + length] = buf
+            offset += length
+        name = shm.name
+    finally:
+        shm.close()
+    return name, size
+
+
+def unpack_data_shared(name, size):
+    """ Deserialize a shared memory block created by pack_data_shared and release it.
+
+    @param str name: name of the shared memory block
+    @param int size: size of the packed data in bytes
+
+    @return object: the deserialized object
     """
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        buf = shm.buf[:size]
+        try:
+            return unpack_data(buf)
+        finally:
+            buf.release()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def send_data(obj, compression=None, use_shared_memory=False):
+    """ Pack an object for transfer to a client. Counterpart of receive_data.
+
+    @param object obj: the object to send
+    @param str compression: optional, 'zlib' to compress the array buffers
+    @param bool use_shared_memory: use shared memory instead of bytes if available
+
+    @return tuple: transport message to be returned to the client
     """
+    if use_shared_memory and shared_memory is not None:
+        return ('shm', ) + pack_data_shared(obj, compression)
+    return 'bytes', pack_data(obj, compression)
+
+
+def receive_data(message):
+    """ Unpack a transport message created by send_data.
+
+    @param tuple message: transport message as returned by send_data (or a netref to it)
+
+    @return object: the transferred object
+    """
+    transport = str(message[0])
+    if transport == 'shm':
+        return unpack_data_shared(str(message[1]), int(message[2]))
+    return unpack_data(message[1])
+
+
+def _find_connection(obj):
+    """ Return the rpyc connection of obj or of the first netref inside a local container. """
     if isinstance(obj, rpyc.core.netref.BaseNetref):
-        return rpyc.utils.classic.obtain(obj)
+        return object.__getattribute__(obj, '____conn__')
+    elif type(obj) in (list, tuple):
+        items = obj
+    elif type(obj) is dict:
+        items = obj.values()
     else:
-        return obj
+        return None
+    for item in items:
+        conn = _find_connection(item)
+        if conn is not None:
+            return conn
+    return None
+
+
+def _classic_obtain(obj):
+    """ Obtain netrefs (also inside local containers) via rpyc.utils.classic.obtain. """
+    if isinstance(obj, rpyc.core.netref.BaseNetref):
+        return rpyc.utils.classic.obtain(obj)
+    elif type(obj) in (list, tuple):
+        return type(obj)(_classic_obtain(item) for item in obj)
+    elif type(obj) is dict:
+        return {key: _classic_obtain(value) for key, value in obj.items()}
+    return obj
+
+
+def _pack_buffers(obj, compression):
+    """ Create header and list of raw buffers for pack_data and pack_data_shared. """
+    if compression not in (None, 'zlib'):
+        raise ValueError('Unknown compression "{0}". Use None or "zlib".'.format(compression))
+    arrays = list()
+    skeleton = _replace_arrays(obj, arrays)
+    descriptions = list()
+    buffers = list()
+    for arr in arrays:
+        raw = memoryview(np.ascontiguousarray(arr)).cast('B')
+        if compression == 'zlib':
+            raw = zlib.compress(raw, 1)
+        descriptions.append({'dtype': arr.dtype.str, 'shape': arr.shape, 'stored': len(raw)})
+        buffers.append(raw)
+    skeleton = pickle.dumps(skeleton, protocol=pickle.HIGHEST_PROTOCOL)
+    buffers.append(skeleton)
+    header = json.dumps({'compression': compression,
+                         'arrays': descriptions,
+                         'skeleton': len(skeleton)}).encode('utf-8')
+    return _BLOCK_PREFIX.pack(_BLOCK_MAGIC, len(header)) + header, buffers
+
+
+def _replace_arrays(obj, arrays):
+    """ Recursively replace numpy arrays in obj by placeholders and collect them in arrays. """
+    if isinstance(obj, np.ndarray) and not obj.dtype.hasobject and obj.dtype.fields is None:
+        arrays.append(obj)
+        return _ArrayPlaceholder(len(arrays) - 1)
+    elif type(obj) in (list, tuple):
+        return type(obj)(_replace_arrays(item, arrays) for item in obj)
+    elif type(obj) is dict:
+        return {key: _replace_arrays(value, arrays) for key, value in obj.items()}
+    return obj
+
+
+def _fill_placeholders(obj, arrays):
+    """ Inverse of _replace_arrays. """
+    if isinstance(obj, _ArrayPlaceholder):
+        return arrays[obj.index]
+    elif type(obj) in (list, tuple):
+        return type(obj)(_fill_placeholders(item, arrays) for item in obj)
+    elif type(obj) is dict:
+        return {key: _fill_placeholders(value, arrays) for key, value in obj.items()}
+    return obj
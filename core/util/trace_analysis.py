@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains vectorized primitives for the analysis of (single shot readout) time traces,
+e.g. threshold digitization, run-length encoding, transition counting and dwell time histograms.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import numpy as np
+
+
+def digitize_trace(trace, threshold):
+    """ Convert an analog trace into a digital trace.
+
+    @param numpy.ndarray trace: 1D array of analog values (e.g. counts)
+    @param float threshold: values greater or equal threshold are mapped to 1, all others to 0
+
+    @return numpy.ndarray: 1D int8 array of the same length as trace containing 0 and 1
+    """
+    return (np.asarray(trace) >= threshold).astype(np.int8)
+
+
+def classify_trace(trace, low_threshold, high_threshold):
+    """ Classify each point of a trace into one of three states:
+        0: value < low_threshold
+        1: value > high_threshold
+        2: neither of the above (e.g. value equal to a single threshold or inside a margin)
+    If the thresholds overlap (low_threshold > high_threshold), state 1 takes precedence.
+
+    @param numpy.ndarray trace: 1D array of analog values
+    @param float low_threshold: upper bound (exclusive) of state 0
+    @param float high_threshold: lower bound (exclusive) of state 1
+
+    @return numpy.ndarray: 1D int8 array of states
+    """
+    trace = np.asarray(trace)
+    states = np.full(trace.shape, 2, dtype=np.int8)
+    states[trace < low_threshold] = 0
+    states[trace > high_threshold] = 1
+    return states
+
+
+def run_length_encode(trace):
+    """ Run-length encode a 1D array, i.e. find all runs of consecutive identical values.
+
+    @param numpy.ndarray trace: 1D array (e.g. a digital trace)
+
+    @return tuple(values, lengths, starts):
+                numpy.ndarray values: value of each run
+                numpy.ndarray lengths: number of points in each run
+                numpy.ndarray starts: index of the first point of each run in trace
+    """
+    trace = np.asarray(trace)
+    if trace.size == 0:
+        return trace[:0], np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    starts = np.concatenate(([0], np.flatnonzero(trace[1:] != trace[:-1]) + 1))
+    lengths = np.diff(np.append(starts, trace.size))
+    return trace[starts], lengths, starts
+
+
+def transition_matrix(states, num_states=None):
+    """ Count the transitions between consecutive points of a trace of integer states.
+
+    @param numpy.ndarray states: 1D array of non-negative integer states
+    @param int num_states: optional, number of states. Defaults to max(states) + 1
+
+    @return numpy.ndarray: 2D array M of shape (num_states, num_states), where M[i, j] is the number
+                           of times state i was directly followed by state j.
+    """
+    states = np.asarray(states, dtype=np.int64)
+    if num_states is None:
+        num_states = int(states.max()) + 1 if states.size > 0 else 0
+    pairs = states[:-1] * num_states + states[1:]
+    return np.bincount(pairs, minlength=num_states ** 2).reshape(num_states, num_states)
+
+
+def count_transitions(from_mask, to_mask):
+    """ Count how often a point fulfilling from_mask is directly followed by a point fulfilling
+    to_mask. The masks may overlap, i.e. a point can be in several states at once.
+
+    @param numpy.ndarray from_mask: 1D bool array
+    @param numpy.ndarray to_mask: 1D bool array of same length as from_mask
+
+    @return int: number of transitions
+    """
+    return int(np.count_nonzero(from_mask[:-1] & to_mask[1:]))
+
+
+def dwell_times(digital_trace, dt=1.0):
+    """ Calculate the dwell times of all runs of a digital trace.
+
+    @param numpy.ndarray digital_trace: 1D array containing 0 and 1
+    @param float dt: time per point of the trace
+
+    @return numpy.ndarray: 1D array of signed dwell times in the order of occurrence. Times spent
+                           in state 1 are positive, times spent in state 0 negative.
+    """
+    values, lengths, _ = run_length_encode(digital_trace)
+    return np.where(values == 1, lengths, -lengths) * dt
+
+
+def dwell_time_histogram(times, num_bins):
+    """ Calculate a histogram of dwell times and return only the occupied bins.
+
+    @param numpy.ndarray times: 1D array of dwell times
+    @param int num_bins: number of histogram bins
+
+    @return tuple(bin_edges, counts):
+                numpy.ndarray bin_edges: left edges of all bins with non-zero counts
+                numpy.ndarray counts: counts of these bins
+    """
+    counts, edges = np.histogram(times, bins=num_bins)
+    occupied = np.flatnonzero(counts)
+    return edges[occupied], counts[occupied]
+
+
+def window_sums(data, windows):
+    """ Sum each row of a 2D array within several column windows, e.g. the laser pulses of each row
+    of an ungated fast counter trace.
+
+    @param numpy.ndarray data: 2D array, the windows are applied along axis 1
+    @param list windows: list of (start, stop) column index tuples, stop is exclusive
+
+    @return numpy.ndarray: 2D array with shape (data.shape[0], len(windows)). Integer data is summed
+                           with the same accumulator type as numpy.sum.
+    """
+    data = np.asarray(data)
+    windows = np.asarray(windows, dtype=np.int64).reshape(-1, 2)
+    dtype = np.add.reduce(np.zeros(1, dtype=data.dtype)).dtype
+    if len(windows) == 0:
+        return np.zeros((data.shape[0], 0), dtype=dtype)
+
+    starts = np.clip(windows[:, 0], 0, data.shape[1])
+    stops = np.clip(windows[:, 1], 0, data.shape[1])
+    if np.all(starts < stops) and np.all(stops[:-1] <= starts[1:]):
+        # sorted, non-empty and non-overlapping windows: all sums in one pass over the data.
+        # reduceat sums from each edge to the next one, every second segment is a window.
+        edges = np.column_stack((starts, stops)).ravel()
+        if edges[-1] == data.shape[1]:
+            edges = edges[:-1]
+        return np.add.reduceat(data, edges, axis=1, dtype=dtype)[:, ::2]
+
+    sums = np.zeros((data.shape[0], len(windows)), dtype=dtype)
+    for ii, (start, stop) in enumerate(zip(starts, stops)):
+        if start < stop:
+            sums[:, ii] = data[:, start:stop].sum(axis=1, dtype=dtype)
+    return sums
+
+
+def iter_binnings(signal, bin_sizes):
+    """ Lazily sum consecutive rows of a signal into bins of different sizes.
+
+    All binnings are derived from one prefix sum of the signal, so each binning costs only one
+    subtraction per bin. Rows which do not fill a complete bin at the end are dropped. Only one
+    binning is held in memory at a time.
+
+    @param numpy.ndarray signal: 1D or 2D array, rows are summed along axis 0
+    @param iterable bin_sizes: number of rows per bin for each binning
+
+    @return generator: yields the binned arrays with shape (len(signal) // bin_size, ...)
+    """
+    signal = np.asarray(signal)
+    dtype = np.add.reduce(np.zeros(1, dtype=signal.dtype)).dtype
+    prefix = np.zeros((signal.shape[0] + 1,) + signal.shape[1:], dtype=dtype)
+    np.cumsum(signal, axis=0, dtype=dtype, out=prefix[1:])
+    for bin_size in bin_sizes:
+        edges = prefix[::bin_size]
+        yield edges[1:] - edges[:-1]
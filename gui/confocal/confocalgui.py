@@ -34,6 +34,7 @@ from gui.guiutils import ColorBar
 from gui.colordefs import ColorScaleInferno
 from gui.colordefs import QudiPalettePale as palette
 from gui.fitsettings import FitParametersWidget
+from gui.render_scheduler import RenderScheduler, RowCachedImage
 from qtpy import QtCore
 from qtpy import QtGui
 from qtpy import QtWidgets
@@ -124,6 +125,7 @@ class ConfocalGui(GUIBase):
     image_z_padding = ConfigOption('image_z_padding', 0.02)
 
     default_meter_prefix = ConfigOption('default_meter_prefix', None)  # assume the unit prefix of position spinbox
+    max_refresh_rate = ConfigOption('max_refresh_rate', 20)  # maximum image refreshes per second
 
     # status var
     adjust_cursor_roi = StatusVar(default=True)
@@ -150,6 +152,18 @@ class ConfocalGui(GUIBase):
 
         self._hardware_state = True
 
+        # image refreshes are coalesced to at most max_refresh_rate per second.
+        # The cached images are contiguous copies of the displayed count
+        # channel, only the rows scanned since the last refresh are copied.
+        self._render_scheduler = RenderScheduler(self.max_refresh_rate)
+        self._xy_render_image = RowCachedImage()
+        self._depth_render_image = RowCachedImage()
+        # own copies of the logic images, kept up to date from the published snapshots
+        self._image_mirrors = dict()
+        self._image_mirror_versions = dict()
+        # rows of the own copies changed since their last refresh, None for the whole image
+        self._image_changed_rows = dict()
+
         self.initMainUI()      # initialize the main GUI
         self.initSettingsUI()  # initialize the settings GUI
         self.initOptimizerSettingsUI()  # initialize the optimizer settings GUI
@@ -487,10 +501,10 @@ class ConfocalGui(GUIBase):
 
         # Connect the emitted signal of an image change from the logic with
         # a refresh of the GUI picture:
-        self._scanning_logic.signal_xy_image_updated.connect(self.refresh_xy_image)
-        self._scanning_logic.signal_xy_image_updated.connect(self.refresh_scan_line)
-        self._scanning_logic.signal_depth_image_updated.connect(self.refresh_scan_line)
-        self._scanning_logic.signal_depth_image_updated.connect(self.refresh_depth_image)
+        self._scanning_logic.signal_xy_image_updated.connect(self.request_xy_image_refresh)
+        self._scanning_logic.signal_depth_image_updated.connect(self.request_depth_image_refresh)
+        self._apply_image_snapshot(self._scanning_logic.get_snapshot('xy_image'))
+        self._apply_image_snapshot(self._scanning_logic.get_snapshot('depth_image'))
         self._optimizer_logic.sigImageUpdated.connect(self.refresh_refocus_image)
         self._scanning_logic.sigImageXYInitialized.connect(self.adjust_xy_window)
         self._scanning_logic.sigImageDepthInitialized.connect(self.adjust_depth_window)
@@ -648,6 +662,9 @@ class ConfocalGui(GUIBase):
 
         @return int: error code (0:OK, -1:error)
         """
+        self._render_scheduler.stop()
+        self._scanning_logic.signal_xy_image_updated.disconnect(self.request_xy_image_refresh)
+        self._scanning_logic.signal_depth_image_updated.disconnect(self.request_depth_image_refresh)
         self._mw.close()
         return 0
 
@@ -704,22 +721,21 @@ class ConfocalGui(GUIBase):
     def get_xy_cb_range(self):
         """ Determines the cb_min and cb_max values for the xy scan image
         """
+        # Calculate cb range from percentiles of the streaming histogram of
+        # the displayed image. Zeros (which are typically due to unfinished
+        # scan) are excluded there.
+        centile_range = None
+        if not self._mw.xy_cb_manual_RadioButton.isChecked():
+            centile_range = self._xy_render_image.percentile_range(
+                self._mw.xy_cb_low_percentile_DoubleSpinBox.value(),
+                self._mw.xy_cb_high_percentile_DoubleSpinBox.value())
+
         # If "Manual" is checked, or the image data is empty (all zeros), then take manual cb range.
-        if self._mw.xy_cb_manual_RadioButton.isChecked() or np.count_nonzero(self.xy_image.image) < 1:
+        if centile_range is None:
             cb_min = self._mw.xy_cb_min_DoubleSpinBox.value()
             cb_max = self._mw.xy_cb_max_DoubleSpinBox.value()
-
-        # Otherwise, calculate cb range from percentiles.
         else:
-            # Exclude any zeros (which are typically due to unfinished scan)
-            xy_image_nonzero = self.xy_image.image[np.nonzero(self.xy_image.image)]
-
-            # Read centile range
-            low_centile = self._mw.xy_cb_low_percentile_DoubleSpinBox.value()
-            high_centile = self._mw.xy_cb_high_percentile_DoubleSpinBox.value()
-
-            cb_min = np.percentile(xy_image_nonzero, low_centile)
-            cb_max = np.percentile(xy_image_nonzero, high_centile)
+            cb_min, cb_max = centile_range
 
         cb_range = [cb_min, cb_max]
 
@@ -728,22 +744,21 @@ class ConfocalGui(GUIBase):
     def get_depth_cb_range(self):
         """ Determines the cb_min and cb_max values for the xy scan image
         """
+        # Calculate cb range from percentiles of the streaming histogram of
+        # the displayed image. Zeros (which are typically due to unfinished
+        # scan) are excluded there.
+        centile_range = None
+        if not self._mw.depth_cb_manual_RadioButton.isChecked():
+            centile_range = self._depth_render_image.percentile_range(
+                self._mw.depth_cb_low_percentile_DoubleSpinBox.value(),
+                self._mw.depth_cb_high_percentile_DoubleSpinBox.value())
+
         # If "Manual" is checked, or the image data is empty (all zeros), then take manual cb range.
-        if self._mw.depth_cb_manual_RadioButton.isChecked() or np.count_nonzero(self.depth_image.image) < 1:
+        if centile_range is None:
             cb_min = self._mw.depth_cb_min_DoubleSpinBox.value()
             cb_max = self._mw.depth_cb_max_DoubleSpinBox.value()
-
-        # Otherwise, calculate cb range from percentiles.
         else:
-            # Exclude any zeros (which are typically due to unfinished scan)
-            depth_image_nonzero = self.depth_image.image[np.nonzero(self.depth_image.image)]
-
-            # Read centile range
-            low_centile = self._mw.depth_cb_low_percentile_DoubleSpinBox.value()
-            high_centile = self._mw.depth_cb_high_percentile_DoubleSpinBox.value()
-
-            cb_min = np.percentile(depth_image_nonzero, low_centile)
-            cb_max = np.percentile(depth_image_nonzero, high_centile)
+            cb_min, cb_max = centile_range
 
         cb_range = [cb_min, cb_max]
         return cb_range
@@ -1334,6 +1349,7 @@ class ConfocalGui(GUIBase):
             @param index int: index of selected channel item in combo box
         """
         self.xy_channel = int(self._mw.xy_channel_ComboBox.itemData(index, QtCore.Qt.UserRole))
+        self._image_changed_rows['xy_image'] = None
         self.refresh_xy_image()
 
     def update_depth_channel(self, index):
@@ -1342,6 +1358,7 @@ class ConfocalGui(GUIBase):
             @param index int: index of selected channel item in combo box
         """
         self.depth_channel = int(self._mw.depth_channel_ComboBox.itemData(index, QtCore.Qt.UserRole))
+        self._image_changed_rows['depth_image'] = None
         self.refresh_depth_image()
 
     def shortcut_to_xy_cb_manual(self):
@@ -1376,21 +1393,73 @@ class ConfocalGui(GUIBase):
         self.refresh_depth_colorbar()
         self.refresh_depth_image()
 
+    def _apply_image_snapshot(self, snapshot):
+        """ Bring the own copy of an image up to date with a snapshot published by the logic.
+
+        @param DataSnapshot snapshot: either a whole image ('xy_image', 'depth_image') or a single
+                                      line of it ('xy_image_line', 'depth_image_line')
+        """
+        if snapshot is None:
+            return
+        if snapshot.row is None:
+            self._image_mirrors[snapshot.name] = np.array(snapshot.image)
+            self._image_mirror_versions[snapshot.name] = snapshot.version
+            self._image_changed_rows[snapshot.name] = None
+            return
+
+        name = snapshot.name[:-len('_line')]
+        if self._image_mirror_versions.get(name) != snapshot.image_version:
+            # the line belongs to an image we have not seen yet, e.g. a freshly initialized one
+            self._apply_image_snapshot(self._scanning_logic.get_snapshot(name))
+            if self._image_mirror_versions.get(name) != snapshot.image_version:
+                return
+        self._image_mirrors[name][snapshot.row] = snapshot.line
+        changed_rows = self._image_changed_rows.setdefault(name, set())
+        if changed_rows is not None:
+            changed_rows.add(snapshot.row)
+
+    def request_xy_image_refresh(self, snapshot=None):
+        """ Refresh the xy image and the scan line with the next frame of the
+            render scheduler.
+
+        @param DataSnapshot snapshot: image data published by the logic
+        """
+        self._apply_image_snapshot(snapshot)
+        self._render_scheduler.request(self.refresh_xy_image)
+        self._render_scheduler.request(self.refresh_scan_line)
+
+    def request_depth_image_refresh(self, snapshot=None):
+        """ Refresh the depth image and the scan line with the next frame of
+            the render scheduler.
+
+        @param DataSnapshot snapshot: image data published by the logic
+        """
+        self._apply_image_snapshot(snapshot)
+        self._render_scheduler.request(self.refresh_depth_image)
+        self._render_scheduler.request(self.refresh_scan_line)
+
     def refresh_xy_image(self):
         """ Update the current XY image from the logic.
 
-        Everytime the scanner is scanning a line in xy the
-        image is rebuild and updated in the GUI.
+        Everytime the scanner is scanning a line in xy the rows scanned since
+        the last refresh are copied and updated in the GUI.
         """
+        image = self._image_mirrors.get('xy_image')
+        if image is None:
+            return
         self.xy_image.getViewBox().updateAutoRange()
 
-        xy_image_data = self._scanning_logic.xy_image[:, :, 3 + self.xy_channel]
+        changed_rows = self._image_changed_rows.pop('xy_image', ())
+        changed_rows = self._xy_render_image.update(
+            image[:, :, 3 + self.xy_channel],
+            rows=None if changed_rows is None else list(changed_rows))
 
         cb_range = self.get_xy_cb_range()
 
         # Now update image with new color scale, and update colorbar
-        self.xy_image.setImage(image=xy_image_data, levels=(cb_range[0], cb_range[1]))
-        self.refresh_xy_colorbar()
+        self.xy_image.setImage(image=self._xy_render_image.image, levels=(cb_range[0], cb_range[1]),
+                               changed_rows=changed_rows)
+        self.xy_cb.refresh_colorbar(cb_range[0], cb_range[1])
 
         # Unlock state widget if scan is finished
         if self._scanning_logic.module_state() != 'locked':
@@ -1402,15 +1471,22 @@ class ConfocalGui(GUIBase):
         Everytime the scanner is scanning a line in depth the
         image is rebuild and updated in the GUI.
         """
+        image = self._image_mirrors.get('depth_image')
+        if image is None:
+            return
 
         self.depth_image.getViewBox().enableAutoRange()
 
-        depth_image_data = self._scanning_logic.depth_image[:, :, 3 + self.depth_channel]
+        changed_rows = self._image_changed_rows.pop('depth_image', ())
+        changed_rows = self._depth_render_image.update(
+            image[:, :, 3 + self.depth_channel],
+            rows=None if changed_rows is None else list(changed_rows))
         cb_range = self.get_depth_cb_range()
 
         # Now update image with new color scale, and update colorbar
-        self.depth_image.setImage(image=depth_image_data, levels=(cb_range[0], cb_range[1]))
-        self.refresh_depth_colorbar()
+        self.depth_image.setImage(image=self._depth_render_image.image,
+                                  levels=(cb_range[0], cb_range[1]), changed_rows=changed_rows)
+        self.depth_cb.refresh_colorbar(cb_range[0], cb_range[1])
 
         # Unlock state widget if scan is finished
         if self._scanning_logic.module_state() != 'locked':
@@ -1470,10 +1546,10 @@ class ConfocalGui(GUIBase):
         """ Get the previously scanned image line and display it in the scan line plot. """
         sc = self._scanning_logic._scan_counter
         sc = sc - 1 if sc >= 1 else sc
-        if self._scanning_logic._zscan:
-            self.scan_line_plot.setData(self._scanning_logic.depth_image[sc, :, 0:4:3])
-        else:
-            self.scan_line_plot.setData(self._scanning_logic.xy_image[sc, :, 0:4:3])
+        image = self._image_mirrors.get(
+            'depth_image' if self._scanning_logic._zscan else 'xy_image')
+        if image is not None and sc < image.shape[0]:
+            self.scan_line_plot.setData(image[sc, :, 0:4:3])
 
     def adjust_xy_window(self):
         """ Fit the visible window in the xy scan to full view.
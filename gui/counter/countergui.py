@@ -268,33 +268,36 @@ class CounterGui(GUIBase):
         self._mw.close()
         return
 
-    def updateData(self):
+    def updateData(self, snapshot=None):
         """ The function that grabs the data and sends it to the plot.
+
+        @param DataSnapshot snapshot: count traces published by the logic, defaults to the most
+                                      recent ones
         """
+        if snapshot is None:
+            snapshot = self._counting_logic.get_snapshot('counts')
 
-        if self._counting_logic.module_state() == 'locked':
-            if 0 < self._counting_logic.countdata_smoothed[(self._display_trace-1), -1] < 10:
+        if self._counting_logic.module_state() == 'locked' and snapshot is not None:
+            countdata = snapshot.countdata
+            countdata_smoothed = snapshot.countdata_smoothed
+            if 0 < countdata_smoothed[(self._display_trace-1), -1] < 10:
                 self._mw.count_value_Label.setText(
-                    '{0:,.6f}'.format(self._counting_logic.countdata_smoothed[(self._display_trace-1), -1]))
+                    '{0:,.6f}'.format(countdata_smoothed[(self._display_trace-1), -1]))
             else:
                 self._mw.count_value_Label.setText(
-                    '{0:,.0f}'.format(self._counting_logic.countdata_smoothed[(self._display_trace-1), -1]))
+                    '{0:,.0f}'.format(countdata_smoothed[(self._display_trace-1), -1]))
 
-            x_vals = (
-                np.arange(0, self._counting_logic.get_count_length())
-                / self._counting_logic.get_count_frequency())
+            x_vals = np.arange(0, countdata.shape[-1]) / self._counting_logic.get_count_frequency()
 
             ymax = -1
             ymin = 2000000000
             for i, ch in enumerate(self._counting_logic.get_channels()):
-                self.curves[2 * i].setData(y=self._counting_logic.countdata[i], x=x_vals)
-                self.curves[2 * i + 1].setData(y=self._counting_logic.countdata_smoothed[i],
-                                               x=x_vals
-                                               )
-                if ymax < self._counting_logic.countdata[i].max() and self._trace_selection[i]:
-                    ymax = self._counting_logic.countdata[i].max()
-                if ymin > self._counting_logic.countdata[i].min() and self._trace_selection[i]:
-                    ymin = self._counting_logic.countdata[i].min()
+                self.curves[2 * i].setData(y=countdata[i], x=x_vals)
+                self.curves[2 * i + 1].setData(y=countdata_smoothed[i], x=x_vals)
+                if ymax < countdata[i].max() and self._trace_selection[i]:
+                    ymax = countdata[i].max()
+                if ymin > countdata[i].min() and self._trace_selection[i]:
+                    ymin = countdata[i].min()
 
             if ymin == ymax:
                 ymax += 0.1
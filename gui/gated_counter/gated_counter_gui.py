@@ -243,12 +243,18 @@ class GatedCounterGui(GUIBase):
         """
         self._counter_logic.set_counting_samples(samples=self._mw.count_per_readout_SpinBox.value())
 
-    def update_trace(self):
-        """ The function that grabs the data and sends it to the plot. """
+    def update_trace(self, snapshot=None):
+        """ The function that grabs the data and sends it to the plot.
 
-        if self._counter_logic.module_state() == 'locked':
-            self._trace1.setData(x=np.arange(0, self._counter_logic.get_count_length()),
-                                 y=self._counter_logic.countdata[0] )
+        @param DataSnapshot snapshot: count traces published by the logic, defaults to the most
+                                      recent ones
+        """
+        if snapshot is None:
+            snapshot = self._counter_logic.get_snapshot('counts')
+
+        if self._counter_logic.module_state() == 'locked' and snapshot is not None:
+            self._trace1.setData(x=np.arange(0, snapshot.countdata.shape[-1]),
+                                 y=snapshot.countdata[0])
 
     def update_histogram(self):
         """ Update procedure for the histogram to display the new data. """
@@ -23,6 +23,7 @@ import numpy as np
 import os
 import pyqtgraph as pg
 
+from core.configoption import ConfigOption
 from core.connector import Connector
 from core.util import units
 from gui.guibase import GUIBase
@@ -30,6 +31,7 @@ from gui.guiutils import ColorBar
 from gui.colordefs import ColorScaleInferno
 from gui.colordefs import QudiPalettePale as palette
 from gui.fitsettings import FitSettingsDialog, FitSettingsComboBox
+from gui.render_scheduler import RenderScheduler, RowCachedImage
 from qtpy import QtCore
 from qtpy import QtCore, QtWidgets, uic
 from qtwidgets.scientific_spinbox import ScienDSpinBox
@@ -75,6 +77,9 @@ class ODMRGui(GUIBase):
     odmrlogic1 = Connector(interface='ODMRLogic')
     savelogic = Connector(interface='SaveLogic')
 
+    # maximum number of plot refreshes per second
+    max_refresh_rate = ConfigOption('max_refresh_rate', 20)
+
     sigStartOdmrScan = QtCore.Signal()
     sigStopOdmrScan = QtCore.Signal()
     sigContinueOdmrScan = QtCore.Signal()
@@ -106,6 +111,14 @@ class ODMRGui(GUIBase):
 
         self._odmr_logic = self.odmrlogic1()
 
+        # plot updates are coalesced to at most max_refresh_rate per second.
+        # The cached matrix is a contiguous copy of the displayed matrix range,
+        # which also keeps the histogram for the colour scale up to date.
+        self._render_scheduler = RenderScheduler(self.max_refresh_rate)
+        self._matrix_render_image = RowCachedImage()
+        # start time and number of sweeps of the cached matrix, None if unknown
+        self._matrix_sweeps = None
+
         # Use the inherited class 'Ui_ODMRGuiUI' to create now the GUI element:
         self._mw = ODMRMainWindow()
         self._sd = ODMRSettingDialog()
@@ -395,7 +408,8 @@ class ODMRGui(GUIBase):
                                                      QtCore.Qt.QueuedConnection)
         self._odmr_logic.sigOutputStateUpdated.connect(self.update_status,
                                                        QtCore.Qt.QueuedConnection)
-        self._odmr_logic.sigOdmrPlotsUpdated.connect(self.update_plots, QtCore.Qt.QueuedConnection)
+        self._odmr_logic.sigOdmrPlotsUpdated.connect(self.request_plots_update,
+                                                     QtCore.Qt.QueuedConnection)
         self._odmr_logic.sigOdmrFitUpdated.connect(self.update_fit, QtCore.Qt.QueuedConnection)
         self._odmr_logic.sigOdmrElapsedTimeUpdated.connect(self.update_elapsedtime,
                                                            QtCore.Qt.QueuedConnection)
@@ -416,6 +430,7 @@ class ODMRGui(GUIBase):
 
         @return int: error code (0:OK, -1:error)
         """
+        self._render_scheduler.stop()
         # Disconnect signals
         self._sd.buttonBox.button(QtWidgets.QDialogButtonBox.Apply).clicked.disconnect()
         self._sd.accepted.disconnect()
@@ -815,13 +830,15 @@ class ODMRGui(GUIBase):
         self.sigClearData.emit()
         return
 
+    def request_plots_update(self, odmr_data_x, odmr_data_y, odmr_matrix):
+        """ Refresh the plot widgets with the next frame of the render scheduler. """
+        self._render_scheduler.request(self.update_plots, odmr_data_x, odmr_data_y, odmr_matrix)
+
     def update_plots(self, odmr_data_x, odmr_data_y, odmr_matrix):
         """ Refresh the plot widgets with new data. """
         # Update mean signal plot
         self.odmr_image.setData(odmr_data_x, odmr_data_y[self.display_channel])
         # Update raw data matrix plot
-        cb_range = self.get_matrix_cb_range()
-        self.update_colorbar(cb_range)
         matrix_range = self._mw.odmr_control_DockWidget.matrix_range_SpinBox.value()
         start = self._odmr_logic.mw_starts[matrix_range]
         step = self._odmr_logic.mw_steps[matrix_range]
@@ -836,19 +853,32 @@ class ODMRGui(GUIBase):
                 odmr_matrix.shape[0])
         )
 
+        # only the sweeps added at the top of the matrix since the last update are copied
+        new_sweeps = None
+        snapshot = self._odmr_logic.get_snapshot('odmr_plots')
+        if snapshot is not None and snapshot.xy is odmr_matrix and 'sweeps' in snapshot:
+            if self._matrix_sweeps is not None and self._matrix_sweeps[0] == snapshot.start_time \
+                    and snapshot.sweeps > self._matrix_sweeps[1]:
+                new_sweeps = snapshot.sweeps - self._matrix_sweeps[1]
+            self._matrix_sweeps = (snapshot.start_time, snapshot.sweeps)
+        else:
+            self._matrix_sweeps = None
         odmr_matrix_range = self._odmr_logic.select_odmr_matrix_data(odmr_matrix, self.display_channel, matrix_range)
+        self._matrix_render_image.update(odmr_matrix_range, shift=new_sweeps)
+        cb_range = self.get_matrix_cb_range()
+        self.update_colorbar(cb_range)
         self.odmr_matrix_image.setImage(
-            image=odmr_matrix_range,
+            image=self._matrix_render_image.image,
             axisOrder='row-major',
             levels=(cb_range[0], cb_range[1]))
 
     def update_channel(self, index):
         self.display_channel = int(
             self._mw.odmr_channel_ComboBox.itemData(index, QtCore.Qt.UserRole))
-        self.update_plots(
-            self._odmr_logic.odmr_plot_x,
-            self._odmr_logic.odmr_plot_y,
-            self._odmr_logic.odmr_plot_xy)
+        self._matrix_sweeps = None
+        snapshot = self._odmr_logic.get_snapshot('odmr_plots')
+        if snapshot is not None:
+            self.update_plots(snapshot.x, snapshot.y, snapshot.xy)
 
     def average_level_changed(self):
         """
@@ -880,23 +910,20 @@ class ODMRGui(GUIBase):
         """
         Determines the cb_min and cb_max values for the matrix plot
         """
-        matrix_image = self.odmr_matrix_image.image
+        # Calculate cb range from percentiles of the streaming histogram of the displayed
+        # matrix. Zeros (which are typically due to unfinished scan) are excluded there.
+        centile_range = None
+        if not self._mw.odmr_cb_manual_RadioButton.isChecked():
+            centile_range = self._matrix_render_image.percentile_range(
+                self._mw.odmr_cb_low_percentile_DoubleSpinBox.value(),
+                self._mw.odmr_cb_high_percentile_DoubleSpinBox.value())
 
         # If "Manual" is checked or the image is empty (all zeros), then take manual cb range.
-        # Otherwise, calculate cb range from percentiles.
-        if self._mw.odmr_cb_manual_RadioButton.isChecked() or np.count_nonzero(matrix_image) < 1:
+        if centile_range is None:
             cb_min = self._mw.odmr_cb_min_DoubleSpinBox.value()
             cb_max = self._mw.odmr_cb_max_DoubleSpinBox.value()
         else:
-            # Exclude any zeros (which are typically due to unfinished scan)
-            matrix_image_nonzero = matrix_image[np.nonzero(matrix_image)]
-
-            # Read centile range
-            low_centile = self._mw.odmr_cb_low_percentile_DoubleSpinBox.value()
-            high_centile = self._mw.odmr_cb_high_percentile_DoubleSpinBox.value()
-
-            cb_min = np.percentile(matrix_image_nonzero, low_centile)
-            cb_max = np.percentile(matrix_image_nonzero, high_centile)
+            cb_min, cb_max = centile_range
 
         cb_range = [cb_min, cb_max]
         return cb_range
@@ -909,6 +936,8 @@ class ODMRGui(GUIBase):
         """ Updates current elapsed measurement time and completed frequency sweeps """
         self._mw.elapsed_time_DisplayWidget.display(int(np.rint(elapsed_time)))
         self._mw.elapsed_sweeps_DisplayWidget.display(scanned_lines)
+        self._mw.elapsed_sweeps_DisplayWidget.setToolTip(
+            'Duty cycle: {0:.1%}'.format(self._odmr_logic.duty_cycle))
         return
 
     def update_settings(self):
@@ -973,9 +1002,14 @@ class ODMRGui(GUIBase):
         self._odmr_logic.matrix_range = self._mw.odmr_control_DockWidget.matrix_range_SpinBox.value()
         # need to update the plot that is showed
         key = 'Matrix range: {}'.format(self._odmr_logic.matrix_range)
-        self.odmr_matrix_image.setImage(self._odmr_logic.select_odmr_matrix_data(self._odmr_logic.odmr_plot_xy,
-                                                                                 self.display_channel,
-                                                                                 self._odmr_logic.matrix_range))
+        snapshot = self._odmr_logic.get_snapshot('odmr_plots')
+        if snapshot is None:
+            return
+        self._matrix_sweeps = None
+        self._matrix_render_image.update(self._odmr_logic.select_odmr_matrix_data(snapshot.xy,
+                                                                                  self.display_channel,
+                                                                                  self._odmr_logic.matrix_range))
+        self.odmr_matrix_image.setImage(self._matrix_render_image.image)
         return
 
     def update_parameter(self, param_dict):
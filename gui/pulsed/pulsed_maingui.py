@@ -2305,15 +2305,21 @@ class PulsedMeasurementGui(GUIBase):
         self._pa.ana_param_fc_bins_ComboBox.blockSignals(False)
         return
 
-    @QtCore.Slot()
-    def measurement_data_updated(self):
+    @QtCore.Slot(object)
+    def measurement_data_updated(self, snapshot=None):
         """
 
+        @param DataSnapshot snapshot: measurement data published by the logic, defaults to the
+                                      most recent one
         @return:
         """
-        signal_data = self.pulsedmasterlogic().signal_data
-        signal_alt_data = self.pulsedmasterlogic().signal_alt_data
-        measurement_error = self.pulsedmasterlogic().measurement_error
+        if snapshot is None:
+            snapshot = self.pulsedmasterlogic().measurement_snapshot
+            if snapshot is None:
+                return
+        signal_data = snapshot.signal_data
+        signal_alt_data = snapshot.signal_alt_data
+        measurement_error = snapshot.measurement_error
 
         # Adjust number of data sets to plot
         self.set_plot_dimensions()
@@ -2357,7 +2363,7 @@ class PulsedMeasurementGui(GUIBase):
             self.measuring_error_image2.setData(x=measurement_error[0], y=measurement_error[2])
 
         # dealing with the laser plot
-        self.update_laser_data()
+        self._plot_laser_data(snapshot)
         return
 
     @QtCore.Slot()
@@ -3076,24 +3082,34 @@ class PulsedMeasurementGui(GUIBase):
 
         @return:
         """
+        self._plot_laser_data(self.pulsedmasterlogic().measurement_snapshot)
+        return
+
+    def _plot_laser_data(self, snapshot):
+        """ Plot the laser pulse of the measurement data snapshot selected in the GUI.
+
+        @param DataSnapshot snapshot: measurement data published by the logic
+        """
+        if snapshot is None:
+            return
         laser_index = self._pe.laserpulses_ComboBox.currentIndex()
         show_raw = self._pe.laserpulses_display_raw_CheckBox.isChecked()
-        is_gated = len(self.pulsedmasterlogic().raw_data.shape) > 1
+        is_gated = len(snapshot.raw_data.shape) > 1
 
         # Determine the right array to plot as y-data
         if show_raw:
             if is_gated:
                 if laser_index == 0:
-                    y_data = np.sum(self.pulsedmasterlogic().raw_data, axis=0)
+                    y_data = np.sum(snapshot.raw_data, axis=0)
                 else:
-                    y_data = self.pulsedmasterlogic().raw_data[laser_index - 1]
+                    y_data = snapshot.raw_data[laser_index - 1]
             else:
-                y_data = self.pulsedmasterlogic().raw_data
+                y_data = snapshot.raw_data
         else:
             if laser_index == 0:
-                y_data = np.sum(self.pulsedmasterlogic().laser_data, axis=0)
+                y_data = np.sum(snapshot.laser_data, axis=0)
             else:
-                y_data = self.pulsedmasterlogic().laser_data[laser_index - 1]
+                y_data = snapshot.laser_data[laser_index - 1]
 
         # Calculate the x-axis of the laser plot here
         bin_width = self.pulsedmasterlogic().fast_counter_settings['bin_width']
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains helpers to limit the rate of image refreshes in the GUI modules.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import time
+import numpy as np
+from collections import OrderedDict
+from qtpy import QtCore
+
+
+class RenderScheduler(QtCore.QObject):
+    """ Coalesces refresh requests and executes them at most max_fps times per second.
+
+    Connect the data update signals of a logic to request() instead of directly to the refresh
+    method. Requests arriving while a refresh is pending are merged, so the refresh method runs
+    once with the latest data no matter how many updates arrived in between. The first request
+    after an idle period is executed right away.
+
+    Usage:
+        self._render_scheduler = RenderScheduler(max_fps=20)
+        self._logic.sigDataUpdated.connect(
+            lambda: self._render_scheduler.request(self.refresh_image))
+    """
+
+    def __init__(self, max_fps=20, parent=None):
+        super().__init__(parent)
+        self._min_interval = 1 / max_fps if max_fps > 0 else 0
+        self._last_render = 0
+        self._pending = OrderedDict()
+        self._timer = QtCore.QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._render)
+
+    @property
+    def max_fps(self):
+        return 1 / self._min_interval if self._min_interval > 0 else 0
+
+    @max_fps.setter
+    def max_fps(self, value):
+        self._min_interval = 1 / value if value > 0 else 0
+
+    def request(self, callback, *args):
+        """ Schedule a call of callback. A pending call of the same callback is replaced.
+
+        @param callable callback: the refresh method to call
+        @param args: arguments passed to callback, only the ones of the last request are used
+        """
+        self._pending[callback] = args
+        if not self._timer.isActive():
+            delay = self._last_render + self._min_interval - time.perf_counter()
+            self._timer.start(max(0, int(round(1000 * delay))))
+
+    def flush(self):
+        """ Execute all pending calls now. """
+        self._timer.stop()
+        self._render()
+
+    def stop(self):
+        """ Discard all pending calls. """
+        self._timer.stop()
+        self._pending.clear()
+
+    def _render(self):
+        self._last_render = time.perf_counter()
+        pending = self._pending
+        self._pending = OrderedDict()
+        for callback, args in pending.items():
+            callback(*args)
+
+
+class StreamingHistogram:
+    """ Histogram with a fixed number of equally wide bins, whose range grows when needed.
+
+    Values can be added and removed again, so the histogram of an image can be kept up to date by
+    removing the old and adding the new values of the changed rows only. Percentiles are
+    interpolated linearly within the bins, i.e. they are accurate to one bin width.
+    """
+
+    def __init__(self, num_bins=4096):
+        self.num_bins = int(num_bins)
+        self.clear()
+
+    def clear(self):
+        self.counts = np.zeros(self.num_bins, dtype=np.int64)
+        self.low = None
+        self.width = None
+        self.total = 0
+
+    def _fit_range(self, vmin, vmax):
+        """ Change the binning such that [vmin, vmax] is covered. Bins are only ever merged, so the
+        bin of each value added before stays well defined.
+        """
+        if self.low is None:
+            span = vmax - vmin
+            if span <= 0:
+                span = max(abs(vmin), 1) * 1e-6
+            # leave some headroom on both sides
+            self.width = 2 * span / self.num_bins
+            self.low = vmin - self.num_bins // 4 * self.width
+            return
+
+        high = self.low + self.num_bins * self.width
+        if vmin >= self.low and vmax < high:
+            return
+
+        # shift: number of old bins added below, factor: number of old bins merged into a new one
+        shift = int(np.ceil((self.low - vmin) / self.width)) if vmin < self.low else 0
+        new_low = self.low - shift * self.width
+        new_high = max(high, vmax)
+        factor = 2
+        while new_high - new_low >= self.num_bins * factor * self.width:
+            factor *= 2
+
+        counts = np.zeros(self.num_bins, dtype=np.int64)
+        indices = np.minimum((np.arange(self.num_bins) + shift) // factor, self.num_bins - 1)
+        np.add.at(counts, indices, self.counts)
+        self.counts = counts
+        self.low = new_low
+        self.width *= factor
+
+    def _bin_counts(self, values):
+        indices = ((values - self.low) / self.width).astype(np.int64)
+        np.clip(indices, 0, self.num_bins - 1, out=indices)
+        return np.bincount(indices, minlength=self.num_bins)
+
+    def add(self, values):
+        """ Add values (1D array) to the histogram. """
+        if values.size == 0:
+            return
+        self._fit_range(values.min(), values.max())
+        self.counts += self._bin_counts(values)
+        self.total += values.size
+
+    def remove(self, values):
+        """ Remove values (1D array), which have been added before, from the histogram. """
+        if values.size == 0 or self.low is None:
+            return
+        self.counts -= self._bin_counts(values)
+        np.maximum(self.counts, 0, out=self.counts)
+        self.total = max(self.total - values.size, 0)
+
+    def percentile(self, q):
+        """ Estimate percentiles of all values in the histogram.
+
+        @param q: percentile or sequence of percentiles in [0, 100]
+
+        @return: the percentile(s), NaN if the histogram is empty
+        """
+        q = np.asarray(q, dtype=float)
+        if self.total == 0:
+            return np.full(q.shape, np.nan) if q.ndim else np.nan
+        cumulative = np.cumsum(self.counts)
+        target = np.clip(q / 100, 0, 1) * cumulative[-1]
+        index = np.minimum(np.searchsorted(cumulative, target, side='left'), self.num_bins - 1)
+        below = np.where(index > 0, cumulative[index - 1], 0)
+        in_bin = np.maximum(self.counts[index], 1)
+        fraction = np.clip((target - below) / in_bin, 0, 1)
+        return self.low + (index + fraction) * self.width
+
+
+class RowCachedImage:
+    """ Contiguous display copy of a 2D image, which is updated row by row, together with a
+    streaming histogram of its non-zero values for the percentile colour scaling.
+
+    The caller tells which rows changed (e.g. the line the logic just scanned) and only these
+    rows are copied. Images to which new rows are added at the top while the others move down
+    (like the ODMR matrix) are updated by shifting the cached rows.
+    """
+
+    def __init__(self, num_bins=4096):
+        self.image = None
+        self.histogram = StreamingHistogram(num_bins)
+
+    @staticmethod
+    def _valid(values):
+        """ Non-zero and finite values, zeros are usually pixels which are not measured yet. """
+        values = values.ravel()
+        return values[(values != 0) & np.isfinite(values)]
+
+    def reset(self):
+        self.image = None
+        self.histogram.clear()
+
+    def update(self, source, rows=None, shift=None):
+        """ Bring the cached image up to date with source.
+
+        Only the rows given by the caller are copied, the images are never compared. Without rows
+        and shift, or if the shape changed, the whole image is copied.
+
+        @param numpy.ndarray source: 2D image, may be a non-contiguous view
+        @param rows: optional, indices of the rows which changed, e.g. the scanned line
+        @param int shift: optional, number of new rows added at the top while the other rows
+                          moved down (like the ODMR matrix, where the newest sweep is on top)
+
+        @return numpy.ndarray: indices of the rows which changed
+        """
+        source = np.asarray(source)
+        num_rows = source.shape[0]
+        if self.image is None or self.image.shape != source.shape \
+                or (rows is None and (shift is None or not 0 <= shift < num_rows)):
+            self.image = np.array(source, dtype=float, order='C')
+            self.histogram.clear()
+            self.histogram.add(self._valid(self.image))
+            return np.arange(num_rows)
+
+        if rows is None:
+            if shift == 0:
+                return np.arange(0)
+            self.histogram.remove(self._valid(self.image[-shift:]))
+            self.image[shift:] = self.image[:-shift]
+            self.image[:shift] = source[:shift]
+            self.histogram.add(self._valid(self.image[:shift]))
+            return np.arange(num_rows)
+
+        rows = np.unique(np.asarray(rows, dtype=int))
+        if rows.size > 0:
+            self.histogram.remove(self._valid(self.image[rows]))
+            self.image[rows] = source[rows]
+            self.histogram.add(self._valid(self.image[rows]))
+        return rows
+
+    def percentile_range(self, low_centile, high_centile):
+        """ Colour scale range from the percentiles of the non-zero pixels.
+
+        @return tuple: (cb_min, cb_max), None if there are no non-zero pixels
+        """
+        if self.histogram.total < 1:
+            return None
+        cb_min, cb_max = self.histogram.percentile([low_centile, high_centile])
+        return cb_min, cb_max
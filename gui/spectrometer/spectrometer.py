@@ -811,8 +811,10 @@ class Main(GUIBase):
             x = self.spectrumlogic().wavelength_spectrum
             if self._spectrum_dark.shape[-1] == data.shape[-1]:
                 # TODO : fix bug with dark in multiple tracks and data in FVB : broadcasting error
-                y = data - self._spectrum_dark
+                dark = self._spectrum_dark
+                y = data - dark
             else:
+                dark = 0
                 y = data
                 self._spectrum_tab.dark_acquired_msg.setText("No Dark Acquired")
 
@@ -824,7 +826,7 @@ class Main(GUIBase):
                     tracks = y[-1]
                     if self.spectrumlogic().number_of_scan == y.shape[0]:
                         if self._spectrum_tab.multipe_scan_mode.currentText() == "Scan Average":
-                            tracks = np.mean(y.transpose(0,2,1), axis=0).T
+                            tracks = self.spectrumlogic().averaged_data - dark
                         if self._spectrum_tab.multipe_scan_mode.currentText() == "Scan Median":
                             tracks = np.median(y.transpose(0,2,1), axis=0).T
                     i = 0
@@ -835,7 +837,7 @@ class Main(GUIBase):
                     tracks = y[-1]
                     if self.spectrumlogic().number_of_scan == y.shape[0]:
                         if self._spectrum_tab.multipe_scan_mode.currentText() == "Scan Average":
-                            tracks = np.mean(y, axis=0)
+                            tracks = self.spectrumlogic().averaged_data - dark
                         if self._spectrum_tab.multipe_scan_mode.currentText() == "Scan Median":
                             tracks = np.median(y, axis=0)
                     self._spectrum_tab.graph.plot(x, tracks, pen=self.plot_colors[0])
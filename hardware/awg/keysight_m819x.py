@@ -25,7 +25,6 @@ import visa
 import os
 import time
 import numpy as np
-import scipy.interpolate
 from fnmatch import fnmatch
 from collections import OrderedDict
 from abc import abstractmethod
@@ -54,6 +53,10 @@ class AWGM819X(Base, PulserInterface):
     _wave_mem_mode = None
     _wave_file_extension = '.bin'
     _wave_transfer_datatype = 'h'
+    # samples converted to binary at once, the intermediate float arrays stay in the CPU cache
+    _conversion_chunk_size = 2 ** 16
+    # bytes of a binary block sent with a single VISA write
+    _bin_write_chunk_size = 2 ** 20
 
     # explicitly set low/high levels for [[d_ch1_low, d_ch1_high], [d_ch2_low, d_ch2_high], ...]
     _d_ch_level_low_high = ConfigOption(name='d_ch_level_low_high', default=[], missing='nothing')
@@ -69,6 +72,10 @@ class AWGM819X(Base, PulserInterface):
         self._sequence_mode = False         # set in on_activate()
         self._debug_check_all_commands = False       # # For development purpose, might slow down
 
+        # binary samples of the waveform written in chunks, uploaded with the last chunk
+        self._wave_buffers = None
+        self._wave_buffer_offset = 0
+
     @property
     @abstractmethod
     def n_ch(self):
@@ -787,6 +794,9 @@ class AWGM819X(Base, PulserInterface):
 
         @return (int, list): Number of samples written (-1 indicates failed process) and list of
                              created waveform names
+
+        The chunks are converted to the binary format of the device into buffers allocated for the
+        entire waveform with the first chunk. The waveform is uploaded with the last chunk.
         """
 
         waveforms = []
@@ -814,16 +824,48 @@ class AWGM819X(Base, PulserInterface):
                                      set(analog_samples.keys()).union(set(digital_samples.keys()))))
             return -1, waveforms
 
+        if is_first_chunk:
+            self._wave_buffers = OrderedDict()
+            for ch_str in active_analog:
+                self._wave_buffers[ch_str] = np.empty(
+                    total_number_of_samples * self._bin_sample_width(ch_str),
+                    dtype=self._wave_transfer_datatype)
+            self._wave_buffer_offset = 0
+        elif self._wave_buffers is None:
+            self.log.error('Unable to write waveform.\nThe first chunk of waveform "{0}" was not '
+                           'written.'.format(name))
+            return -1, waveforms
+
+        number_of_samples = len(analog_samples[active_analog[0]])
+        offset = self._wave_buffer_offset
+        if offset + number_of_samples > total_number_of_samples:
+            self.log.error('Unable to write waveform.\nThe chunks contain more samples than the '
+                           'total number of samples ({0:d}).'.format(total_number_of_samples))
+            self._wave_buffers = None
+            return -1, waveforms
+
+        for ch_str in active_analog:
+            width = self._bin_sample_width(ch_str)
+            self._compile_bin_samples(
+                analog_samples, digital_samples, ch_str,
+                out=self._wave_buffers[ch_str][offset * width:(offset + number_of_samples) * width])
+        self._wave_buffer_offset += number_of_samples
+
+        if not is_last_chunk:
+            return number_of_samples, waveforms
+
         to_segment_id = 1  # pc_hdd mode
         if self._wave_mem_mode == 'awg_segments':
             to_segment_id = -1
 
-        waveforms = self._write_wave_to_memory(name, analog_samples, digital_samples, active_analog,
+        bin_samples = self._wave_buffers
+        self._wave_buffers = None
+        waveforms = self._write_wave_to_memory(name, bin_samples, active_analog,
                                                to_segment_id=to_segment_id)
 
         self.check_dev_error()
 
-        return total_number_of_samples, waveforms
+        return number_of_samples, waveforms
 
     def write_sequence(self, name, sequence_parameters):
         """
@@ -1396,10 +1438,10 @@ class AWGM819X(Base, PulserInterface):
         pass
 
     @abstractmethod
-    def float_to_sample(self, val):
+    def float_to_sample(self, val, out=None):
        pass
 
-    def _float_to_int(self, val, n_bits):
+    def _float_to_int(self, val, n_bits, out=None, shift_bits=0, markers=None):
 
         """
         :param val: np.array(dtype=float64) of sampled values from sequencegenerator.sample_pulse_block_ensemble().
@@ -1407,8 +1449,18 @@ class AWGM819X(Base, PulserInterface):
                     If MW ampl in 'PulsedGui/Predefined methods' < as full Vpp, amplitude reduction will be
                     performed digitally (reducing the effective digital resolution in bits).
         :param n_bits: number of bits; sets the highest integer allowed. Eg. 8 bits -> int in [-128, 127]
-        :return:    np.array(dtype=int16)
+        :param out: optional np.array of an int type with the size of val the result is written to
+        :param shift_bits: number of bits the integers are shifted to the left
+        :param markers: optional tuple of two np.ndarrays of digital samples added as the lowest two bits
+        :return:    np.array(dtype=int16) or out
+
+        The samples are scaled, clipped, shifted and combined with the markers in chunks of
+        _conversion_chunk_size samples directly into the output array. The arithmetic is the one of
+        the former linear interpolation with scipy.interpolate.interp1d, so the integers are identical.
         """
+        val = np.asarray(val)
+        if out is None:
+            out = np.empty(val.size, dtype=np.int16)
 
         bitsize = int(2 ** n_bits)
         min_intval = -bitsize / 2
@@ -1416,19 +1468,51 @@ class AWGM819X(Base, PulserInterface):
 
         max_u_samples = 1  # data should be normalized in (-1..1)
 
-        if max(abs(val)) > 1:
+        if val.size == 0:
+            return out
+        val_min = np.min(val)
+        val_max = np.max(val)
+        if max(-val_min, val_max) > 1:
             self.log.warning("Samples from sequencegenerator out of range. Normalizing to -1..1. Please change the "
                              "maximum peak to peak Voltage in the Pulse Generator Settings if you want to use a higher "
                              "power.")
-            biggest_val = max([abs(np.min(val)), np.max(val)])
+            biggest_val = max([abs(val_min), val_max])
             max_u_samples = biggest_val
         # manual 8.22.4 Waveform Data Format in Direct Mode
         # 2 bits LSB reserved for markers
-        mapper = scipy.interpolate.interp1d([-max_u_samples, max_u_samples], [min_intval, max_intval])
-
-        return mapper(val)
-
-    def bool_to_sample(self, val_dch_1, val_dch_2, int_type_str='int16'):
+        x_range = np.array([-max_u_samples, max_u_samples])
+        y_range = np.array([min_intval, max_intval])
+        slope = (y_range[1] - y_range[0]) / (x_range[1] - x_range[0])
+
+        chunk_size = min(self._conversion_chunk_size, val.size)
+        diff_dtype = np.result_type(val.dtype, x_range.dtype)
+        scaled = np.empty(chunk_size, dtype=np.float64)
+        diff = scaled if diff_dtype == scaled.dtype else np.empty(chunk_size, dtype=diff_dtype)
+        if markers is not None:
+            marker_bits = np.empty(chunk_size, dtype=out.dtype)
+
+        for start in range(0, val.size, chunk_size):
+            stop = min(start + chunk_size, val.size)
+            n = stop - start
+            np.subtract(val[start:stop], x_range[:1], out=diff[:n])
+            np.multiply(diff[:n], slope, out=scaled[:n])
+            np.add(scaled[:n], y_range[0], out=scaled[:n])
+            np.clip(scaled[:n], min_intval, max_intval, out=scaled[:n])
+            # truncation towards zero like astype()
+            out_chunk = out[start:stop]
+            np.copyto(out_chunk, scaled[:n], casting='unsafe')
+            if shift_bits:
+                np.left_shift(out_chunk, shift_bits, out=out_chunk)
+            if markers is not None:
+                for bit, marker in enumerate(markers):
+                    np.copyto(marker_bits[:n], marker[start:stop], casting='unsafe')
+                    if bit:
+                        np.left_shift(marker_bits[:n], bit, out=marker_bits[:n])
+                    np.bitwise_and(marker_bits[:n], 0x1 << bit, out=marker_bits[:n])
+                    np.add(out_chunk, marker_bits[:n], out=out_chunk)
+        return out
+
+    def bool_to_sample(self, val_dch_1, val_dch_2, int_type_str='int16', out=None):
         """
         Takes 2 digital sample values from the sequence generator and converts them to int.
         For AWG819x always two digital channels are tied with a single analogue output.
@@ -1436,20 +1520,32 @@ class AWGM819X(Base, PulserInterface):
         :param vals_dch_1: np.ndarray, digital samples from the sequence generator
         :param vals_dch_2: np.ndarray, digital samples from the sequence generator
         :param int_type_str: int type the output is casted to
+        :param out: optional np.array of int_type_str the result is written to
         :return:
         """
+        if out is None:
+            out = np.empty(len(val_dch_1), dtype=int_type_str)
 
-        bit_dch_1 = 0x1 & np.asarray(val_dch_1).astype(int_type_str)
+        np.copyto(out, val_dch_1, casting='unsafe')
+        np.bitwise_and(out, 0x1, out=out)
         bit_dch_2 = 0x2 & (np.asarray(val_dch_2).astype(int_type_str) << 1)
+        np.add(out, bit_dch_2, out=out)
 
-        return bit_dch_1 + bit_dch_2
+        return out
+
+    def _bin_sample_width(self, ch_str):
+        """
+        Number of values in the binary samples per sample of the analog channel.
+        """
+        return 1
 
     @abstractmethod
-    def _compile_bin_samples(self, analog_samples, digital_samples, ch_num):
+    def _compile_bin_samples(self, analog_samples, digital_samples, ch_num, out=None):
         """
         Creates a binary sample output that combines analog and digital samples
         from the sequence generator in the correct format.
 
+        :param out: optional np.array of the binary samples the result is written to
         :return binary samples as expected from awg hardware
         """
         pass
@@ -1491,11 +1587,10 @@ class AWGM819X(Base, PulserInterface):
 
         return 0
 
-    def _write_wave_to_memory(self, name, analog_samples, digital_samples, active_analog, to_segment_id=1):
+    def _write_wave_to_memory(self, name, bin_samples, active_analog, to_segment_id=1):
         """
         :param name:
-        :param analog_samples:
-        :param digital_samples:
+        :param bin_samples: dict of the binary samples (see _compile_bin_samples) for every active analog channel
         :param active_analog:
         :param to_segment_id: id of the segment table the wave will be written to. -1: take next free segment.
         :return:
@@ -1507,7 +1602,8 @@ class AWGM819X(Base, PulserInterface):
             ch_num = self.chstr_2_chnum(ch_str)
             wave_name = self._name_with_ch(name, ch_num)
 
-            comb_samples = self._compile_bin_samples(analog_samples, digital_samples, ch_str)
+            comb_samples = bin_samples[ch_str]
+            number_of_samples = comb_samples.size // self._bin_sample_width(ch_str)
 
             t_start = time.perf_counter()
 
@@ -1541,7 +1637,7 @@ class AWGM819X(Base, PulserInterface):
                     self.log.warning("Loading wave to specified segment ({}) via name will deprecate.".format(segment_id))
                 if segment_id == -1:
                     # to next free segment
-                    segment_id = self.query('TRAC{0:d}:DEF:NEW? {1:d}'.format(ch_num, len(analog_samples[ch_str])))
+                    segment_id = self.query('TRAC{0:d}:DEF:NEW? {1:d}'.format(ch_num, number_of_samples))
                     # only need the next free id, definition and writing is performed below again
                     # so delete defined segment again
                     self.write("TRAC{:d}:DEL {}".format(ch_num, segment_id))
@@ -1558,7 +1654,7 @@ class AWGM819X(Base, PulserInterface):
                 # define the size of a waveform segment, marker samples do not count. If the channel is sourced from
                 # Extended Memory, the same segment is defined on all other channels sourced from Extended Memory.
                 # Comb samples written, but len(comb_samples) doesn't know whether interleaved data.
-                self.write(':TRAC{0}:DEF {1}, {2}, {3}'.format(int(ch_num), segment_id, len(analog_samples[ch_str]), 0))
+                self.write(':TRAC{0}:DEF {1}, {2}, {3}'.format(int(ch_num), segment_id, number_of_samples, 0))
 
                 # name the segment
                 self.write(':TRAC{0}:NAME {1}, "{2}"'.format(int(ch_num), segment_id, wave_name))  # name the segment
@@ -1574,9 +1670,9 @@ class AWGM819X(Base, PulserInterface):
                 raise ValueError("Unknown memory mode: {}".format(self._wave_mem_mode))
             try:
                 transfer_speed_mbs = (comb_samples.nbytes/(1024*1024))/(time.perf_counter() - t_start)
-                self.log.debug('Written ({2:.1f} MB/s) to ch={0}: max ampl: {1}'.format(ch_str,
-                                                                                analog_samples[ch_str].max(),
-                                                                                transfer_speed_mbs))
+                self.log.debug('Written ({2:.1f} MB/s) to ch={0}: samples: {1}'.format(ch_str,
+                                                                               number_of_samples,
+                                                                               transfer_speed_mbs))
             except ZeroDivisionError:
                 pass
             
@@ -1605,16 +1701,39 @@ class AWGM819X(Base, PulserInterface):
         return int(enum_status_code)
 
     def write_bin(self, command, values):
-        """ Sends a command string to the device.
+        """ Sends a command string followed by the values as binary IEEE 488.2 block to the device.
 
                     @param string command: string containing the command
+                    @param values: np.array or list of the binary samples (datatype _wave_transfer_datatype)
 
                     @return int: error code (0:OK, -1:error)
+
+        The bytes of the values are sent without packing them again, in parts of _bin_write_chunk_size
+        bytes. The END indicator is only sent with the last part, so the device receives a single message.
         """
+        datatype = np.dtype(self._wave_transfer_datatype).newbyteorder('<')
+        data = np.ascontiguousarray(values, dtype=datatype).reshape(-1).view(np.uint8)
+        length = str(data.size)
+        header = '{0}#{1:d}{2}'.format(command, len(length), length).encode('ascii')
+        termination = self.awg.write_termination.encode('ascii') if self.awg.write_termination else b''
+
         self.awg.timeout = None
-        bytes_written, enum_status_code = self.awg.write_binary_values(command, datatype=self._wave_transfer_datatype, is_big_endian=False,
-                                                                       values=values)
-        self.awg.timeout = self._awg_timeout * 1000
+        try:
+            self.awg.send_end = False
+            self.awg.write_raw(header)
+            stops = list(range(self._bin_write_chunk_size, data.size, self._bin_write_chunk_size))
+            stops.append(data.size)
+            start = 0
+            for stop in stops:
+                message = data[start:stop].tobytes()
+                if stop == data.size:
+                    message += termination
+                    self.awg.send_end = True
+                bytes_written, enum_status_code = self.awg.write_raw(message)
+                start = stop
+        finally:
+            self.awg.send_end = True
+            self.awg.timeout = self._awg_timeout * 1000
         return int(enum_status_code)
 
     def write_all_ch(self, command, *args, all_by_one=None):
@@ -2301,23 +2420,28 @@ class AWGM8195A(AWGM819X):
     def _write_output_on(self):
         self.write_all_ch("OUTP{} ON")
 
-    def _compile_bin_samples(self, analog_samples, digital_samples, ch_str):
+    def _bin_sample_width(self, ch_str):
+        # a_ch1 carries the markers interleaved with the analog samples
+        if ch_str == 'a_ch1' and self.interleaved_wavefile:
+            return 2
+        return 1
+
+    def _compile_bin_samples(self, analog_samples, digital_samples, ch_str, out=None):
 
         interleaved = self.interleaved_wavefile
         self.log.debug("Compiling samples for {}, interleaved: {}".format(ch_str, interleaved))
 
-        a_samples = self.float_to_sample(analog_samples[ch_str])
-
         if interleaved and ch_str == 'a_ch1':
-            d_samples = self.bool_to_sample(digital_samples['d_ch1'], digital_samples['d_ch2'],
-                                            int_type_str='int8')
+            if out is None:
+                out = np.empty(2 * len(analog_samples[ch_str]), dtype=np.int8)
             # the analog and digital samples are stored in the following format: a1, d1, a2, d2, a3, d3, ...
-            comb_samples = np.zeros(2 * a_samples.size, dtype=np.int8)
-            comb_samples[::2] =  a_samples
-            comb_samples[1::2] = d_samples
+            self.float_to_sample(analog_samples[ch_str], out=out[::2])
+            self.bool_to_sample(digital_samples['d_ch1'], digital_samples['d_ch2'],
+                                int_type_str='int8', out=out[1::2])
+            comb_samples = out
 
         else:
-            comb_samples = a_samples
+            comb_samples = self.float_to_sample(analog_samples[ch_str], out=out)
 
         return comb_samples
 
@@ -2404,11 +2528,12 @@ class AWGM8195A(AWGM819X):
             else:
                 self.write('OUTP{0:d} OFF'.format(dch_num))
 
-    def float_to_sample(self, val):
+    def float_to_sample(self, val, out=None):
 
-        val_int = self._float_to_int(val, self._dac_resolution)
+        if out is None:
+            out = np.empty(len(val), dtype=np.int8)
 
-        return val_int.astype('int8')
+        return self._float_to_int(val, self._dac_resolution, out=out)
 
     def _define_new_sequence(self, name, num_steps):
         # no storage system for sequences on 8195a
@@ -2664,18 +2789,17 @@ class AWGM8190A(AWGM819X):
     def _write_output_on(self):
         self.write_all_ch("OUTP{}:NORM ON")
 
-    def _compile_bin_samples(self, analog_samples, digital_samples, ch_num):
+    def _compile_bin_samples(self, analog_samples, digital_samples, ch_num, out=None):
 
         marker = self.marker_on
 
-        a_samples = self.float_to_sample(analog_samples[ch_num])
         marker_sample = digital_samples[self._analogue_ch_corresponding_digital_chs(ch_num)[0]]
         marker_sync = digital_samples[self._analogue_ch_corresponding_digital_chs(ch_num)[1]]
-        d_samples = self.bool_to_sample(marker_sample, marker_sync, int_type_str='int16')
         if marker:
-            comb_samples = a_samples + d_samples
+            comb_samples = self.float_to_sample(analog_samples[ch_num], out=out,
+                                                markers=(marker_sample, marker_sync))
         else:
-            comb_samples = a_samples
+            comb_samples = self.float_to_sample(analog_samples[ch_num], out=out)
 
         return comb_samples
 
@@ -2752,12 +2876,12 @@ class AWGM8190A(AWGM819X):
             else:
                 self.write('OUTP{0:d}:NORM OFF'.format(ach_num))
 
-    def float_to_sample(self, val):
+    def float_to_sample(self, val, out=None, markers=None):
 
-        val_int = self._float_to_int(val, self._dac_resolution)
         shiftbits = 16 - self._dac_resolution  # 2 for marker, dac: 12 -> 2, dac: 14 -> 4
 
-        return val_int.astype('int16') << shiftbits
+        return self._float_to_int(val, self._dac_resolution, out=out, shift_bits=shiftbits,
+                                  markers=markers)
 
     def _delete_all_sequences(self):
 
@@ -36,6 +36,8 @@ class ConfocalScannerDummy(Base, ConfocalScannerInterface):
     confocal_scanner_dummy:
         module.Class: 'confocal_scanner_dummy.ConfocalScannerDummy'
         clock_frequency: 100 # in Hz
+        line_setup_time: 0 # optional, simulated task setup time per line in s
+        pixel_lag: 0 # optional, simulated delay of the counts behind the scanner in pixels
         fitlogic: 'fitlogic' # name of the fitlogic module, see default config
 
     """
@@ -45,12 +47,18 @@ class ConfocalScannerDummy(Base, ConfocalScannerInterface):
 
     # config
     _clock_frequency = ConfigOption('clock_frequency', 100, missing='warn')
+    # time needed to set up the tasks of a real scanner for a single line, not spent in the line
+    # stream mode
+    _line_setup_time = ConfigOption('line_setup_time', 0)
+    # delay of the counts behind the scanner position in pixels, like the one of a detector
+    _pixel_lag = ConfigOption('pixel_lag', 0)
 
     def __init__(self, config, **kwargs):
         super().__init__(config=config, **kwargs)
 
         # Internal parameters
         self._line_length = None
+        self._line_stream_max_length = None
         self._voltage_range = [-10, 10]
 
         self._position_range = [[0, 100e-6], [0, 100e-6], [0, 100e-6], [0, 1e-6]]
@@ -313,7 +321,16 @@ class ConfocalScannerDummy(Base, ConfocalScannerInterface):
             self.log.error('Given voltage list is no array type.')
             return np.array([[-1.]])
 
-        if np.shape(line_path)[1] != self._line_length:
+        if self._line_stream_max_length is not None:
+            if np.shape(line_path)[1] > self._line_stream_max_length:
+                self.log.error('Line with {0} pixels is longer than the {1} pixels the line stream '
+                               'was set up for.'.format(np.shape(line_path)[1],
+                                                        self._line_stream_max_length))
+                return np.array([[-1.]])
+            self._line_length = np.shape(line_path)[1]
+        else:
+            # the tasks are set up for every single line
+            time.sleep(self._line_setup_time)
             self._set_up_line(np.shape(line_path)[1])
 
         count_data = np.random.uniform(0, 2e4, self._line_length)
@@ -323,6 +340,12 @@ class ConfocalScannerDummy(Base, ConfocalScannerInterface):
         #the gaussian functions
         x_data = np.array(line_path[0, :])
         y_data = np.array(line_path[1, :])
+        if self._pixel_lag != 0:
+            # every sample counts at the position the scanner had pixel_lag samples before
+            pixels = np.arange(self._line_length)
+            x_data = np.interp(pixels - self._pixel_lag, pixels, x_data)
+            y_data = np.interp(pixels - self._pixel_lag, pixels, y_data)
+            z_data = np.interp(pixels - self._pixel_lag, pixels, z_data)
         for i in range(self._num_points):
             count_data += self.twoD_gaussian_function((x_data, y_data), *(self._points[i])
                 ) * self.gaussian_function(np.array(z_data), *(self._points_z[i]))
@@ -339,12 +362,34 @@ class ConfocalScannerDummy(Base, ConfocalScannerInterface):
                 np.ones(count_data.shape) * line_path[1, 0] * 100
             ]).transpose()
 
+    def set_up_line_stream(self, max_line_length):
+        """ Prepares the scanner to scan successive lines without setting it up for every line.
+
+        @param int max_line_length: maximum number of pixels of the lines scanned in this mode
+
+        @return int: error code (0:OK, -1:error)
+        """
+        if max_line_length < 1:
+            self.log.error('Line stream needs a positive line length.')
+            return -1
+        time.sleep(self._line_setup_time)
+        self._line_stream_max_length = int(max_line_length)
+        return 0
+
+    def close_line_stream(self):
+        """ Ends the line streaming mode.
+
+        @return int: error code (0:OK, -1:error)
+        """
+        self._line_stream_max_length = None
+        return 0
+
     def close_scanner(self):
         """ Closes the scanner and cleans up afterwards.
 
         @return int: error code (0:OK, -1:error)
         """
-
+        self.close_line_stream()
         self.log.debug('ConfocalScannerDummy>close_scanner')
         return 0
 
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+A dummy data logger, which logs to a local SQLite database instead of InfluxDB.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+from core.module import Base
+from core.configoption import ConfigOption
+from core.util.batch_writer import BatchedChannelLogger
+from interface.data_logger_interface import DataLoggerInterface
+
+
+class DataLoggerDummy(Base, BatchedChannelLogger, DataLoggerInterface):
+    """ Log instrument values to a local SQLite database, like InfluxLogger does to InfluxDB.
+
+    The logging channels, the point format and the buffered writes in batches by a background
+    thread are the ones of InfluxLogger, so they can be used and tested without a database server. write_latency delays
+    every write like the round trip to a database on the network, stall_database lets the
+    writes fail like an unreachable database.
+
+    Example config for copy-paste:
+
+    data_logger_dummy:
+        module.Class: 'data_logger_dummy.DataLoggerDummy'
+        database: 'C:\\Data\\data_logger_dummy.sqlite'  # optional, in the temp directory
+        batch_size: 1000        # optional
+        flush_interval: 1       # optional, in s
+        buffer_size: 100000     # optional
+        spill_file: 'C:\\Data\\data_logger_spill.jsonl'  # optional
+        write_latency: 0.01     # optional, in s
+
+    """
+
+    _database = ConfigOption('database', None)
+    _batch_size = ConfigOption('batch_size', 1000)
+    _flush_interval = ConfigOption('flush_interval', 1)
+    _buffer_size = ConfigOption('buffer_size', 100000)
+    _spill_file = ConfigOption('spill_file', None)
+    _write_latency = ConfigOption('write_latency', 0)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.log_channels = {}
+        self.database_stalled = False
+        self.write_calls = 0
+        self._connection = None
+
+    def on_activate(self):
+        """ Activate module.
+        """
+        if self._database is None:
+            self._database = os.path.join(tempfile.gettempdir(), 'qudi_data_logger_dummy.sqlite')
+        # only used by one thread at a time, the writer thread while it runs
+        self._connection = sqlite3.connect(self._database, check_same_thread=False)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS points '
+                                 '(time INTEGER, measurement TEXT, tags TEXT, fields TEXT)')
+        self._connection.commit()
+        self._start_writer(self._batch_size, self._flush_interval, self._buffer_size,
+                           self._spill_file, retry_interval=min(self._flush_interval, 1))
+
+    def on_deactivate(self):
+        """ Deactivate module.
+        """
+        self._stop_writer()
+        self._connection.close()
+        self._connection = None
+
+    def _write_points(self, points):
+        """ Write a batch of points to the database, called by the writer thread. """
+        self.write_calls += 1
+        time.sleep(self._write_latency)
+        if self.database_stalled:
+            raise ConnectionError('The dummy database is stalled.')
+        with self._connection:
+            self._connection.executemany(
+                'INSERT INTO points VALUES (?, ?, ?, ?)',
+                [(point['time'], point['measurement'], json.dumps(point['tags']),
+                  json.dumps(point['fields'])) for point in points])
+
+    def stall_database(self, stalled=True):
+        """ Let the writes to the database fail, like a database which can not be reached.
+
+            @param stalled bool: True to stall, False to work again
+        """
+        self.database_stalled = stalled
+
+    def get_logged_points(self, channel=None):
+        """ Read back the points written to the database.
+
+            @param channel str: optional, only points of this channel
+
+            @return list: points in the format of format_data
+        """
+        connection = sqlite3.connect(self._database)
+        try:
+            query = 'SELECT time, measurement, tags, fields FROM points'
+            if channel is None:
+                rows = connection.execute(query).fetchall()
+            else:
+                rows = connection.execute(query + ' WHERE measurement = ?', (channel, )).fetchall()
+        finally:
+            connection.close()
+        return [{'measurement': measurement, 'fields': json.loads(fields),
+                 'tags': json.loads(tags), 'time': timestamp}
+                for timestamp, measurement, tags, fields in rows]
+
+    def get_writer_statistics(self):
+        """ Points written, dropped and spilled by the writer so far and the pending ones.
+
+            @return dict: number of points
+        """
+        return {'written': self._writer.written, 'dropped': self._writer.dropped,
+                'spilled': self._writer.spilled, 'pending': self._writer.pending}
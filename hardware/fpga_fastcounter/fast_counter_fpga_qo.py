@@ -58,6 +58,7 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
         #threshV_ch6: 0.5   # optional, threshold voltage for detection
         #threshV_ch7: 0.5   # optional, threshold voltage for detection
         #threshV_ch8: 0.5   # optional, threshold voltage for detection
+        #partial_readout: False  # optional, transfer only the gates in use
     """
 
     _serial = ConfigOption('fpgacounter_serial', missing='error')
@@ -78,6 +79,9 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
     _threshold_ch6 = ConfigOption('threshV_ch6', default=0.5, missing='nothing')
     _threshold_ch7 = ConfigOption('threshV_ch7', default=0.5, missing='nothing')
     _threshold_ch8 = ConfigOption('threshV_ch8', default=0.5, missing='nothing')
+    # The histogram memory is streamed gate by gate. Set to False if the bitfile requires the
+    # whole memory to be read out on every data request.
+    _partial_readout = ConfigOption('partial_readout', default=False, missing='nothing')
 
     # The following is the encoding (status flags and errors) of the FPGA status register
     __status_encoding = {0x00000001: 'initialization',
@@ -148,6 +152,9 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
                                     'Please contact hardware manufacturer.'}
 
     __internal_clock_hz = 950e6  # that is a fixed number, 950MHz
+    # size of the histogram memory, the data of a gate is transferred in 32 bit words
+    __max_gates = 512
+    __max_gate_length_bins = 65536
 
     def __init__(self, config, **kwargs):
         super().__init__(config=config, **kwargs)
@@ -162,6 +169,9 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
         self.count_data = None
         self.saved_count_data = None  # Count data stored to continue measurement
         self._fpga = None
+        # buffers allocated by configure and reused by every data request
+        self._data_buffer = None
+        self._saved_count_buffer = None
 
     def on_activate(self):
         """ Connect and configure the access to the FPGA.
@@ -184,6 +194,9 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
 
         self.count_data = None
         self.saved_count_data = None    # Count data stored to continue measurement
+        self._data_buffer = None
+        self._saved_count_buffer = None
+        self._allocate_buffers()
 
         # Create an instance of the Opal Kelly FrontPanel. The Frontpanel is a C dll which was
         # wrapped for use with python.
@@ -388,16 +401,38 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
 
         self._number_of_gates = number_of_gates
 
+        self._allocate_buffers()
         self._statusvar = 1
         return binwidth_s, gate_length_s, number_of_gates
 
+    def _allocate_buffers(self):
+        """ Allocate the read buffer for the USB transfer and the count data arrays for the
+        configured gates, unless the present ones have the right size.
+        """
+        # The counts of gates and bins beyond the histogram memory are not available
+        shape = (min(max(self._number_of_gates, 0), self.__max_gates),
+                 min(max(self._gate_length_bins, 0), self.__max_gate_length_bins))
+        if self._partial_readout:
+            # at least one gate is transferred, which is a multiple of the pipe block size
+            read_gates = max(shape[0], 1)
+        else:
+            read_gates = self.__max_gates
+        # one timebin of the data to read is 32 bit wide and the data is transferred in bytes.
+        buffersize = read_gates * self.__max_gate_length_bins * 4
+        if self._data_buffer is None or len(self._data_buffer) != buffersize:
+            self._data_buffer = bytearray(buffersize)
+        if self.count_data is None or self.count_data.shape != shape:
+            self.count_data = np.zeros(shape, dtype='int64')
+            self._saved_count_buffer = np.zeros(shape, dtype='int64')
+        self.saved_count_data = None
+        return
+
     def start_measure(self):
         """ Start the fast counter. """
         with self.threadlock:
             self.saved_count_data = None
             # initialize the data array
-            self.count_data = np.zeros([self._number_of_gates, self._gate_length_bins],
-                                       dtype='int64')
+            self.count_data.fill(0)
             # Start the counter.
             self._fpga.ActivateTriggerIn(0x40, 0)
             timeout = 5
@@ -424,6 +459,10 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
         The binning, specified by calling configure() in forehand, must be taken
         care of in this hardware class. A possible overflow of the histogram
         bins must be caught here and taken care of.
+
+        The data is read into the buffer allocated by configure. With partial_readout only the
+        gates in use are transferred, which needs a bitfile streaming the histogram gate by gate.
+        The returned array is reused and overwritten by the next call, copy it to keep the counts.
         """
         # TODO : implement info_dict according to hardware capabilities
         info_dict = {'elapsed_sweeps': None, 'elapsed_time': None}
@@ -447,34 +486,29 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
                                                                 self._gate_length_bins))
                 return self.count_data, info_dict
 
-            # initialize the read buffer for the USB transfer.
-            # one timebin of the data to read is 32 bit wide and the data is transferred in bytes.
-            buffersize = 128 * 1024 * 1024  # 128 MB
-            data_buffer = bytearray(buffersize)
-
             # trigger the data read in the FPGA
             self._fpga.ActivateTriggerIn(0x40, 2)
-            # Read data from FPGA
-            read_err_code = self._fpga.ReadFromBlockPipeOut(0xA0, 1024, data_buffer)
-            if read_err_code != buffersize:
+            # Read data from FPGA into the buffer allocated by configure
+            read_err_code = self._fpga.ReadFromBlockPipeOut(0xA0, 1024, self._data_buffer)
+            if read_err_code != len(self._data_buffer):
                 self.log.error('Data transfer from FPGA via USB failed with error code {0}. '
                                'Returning old count data.'.format(read_err_code))
                 return self.count_data, info_dict
 
             # Encode bytes into 32bit unsigned integers
-            buffer_encode = np.frombuffer(data_buffer, dtype='uint32')
+            buffer_encode = np.frombuffer(self._data_buffer, dtype='uint32')
 
             # Extract only the requested number of gates and gate length
-            buffer_encode = buffer_encode.reshape(512, 65536)[0:self._number_of_gates,
-                                                              0:self._gate_length_bins]
+            gates, bins = self.count_data.shape
+            buffer_encode = buffer_encode.reshape(-1, self.__max_gate_length_bins)[:gates, :bins]
 
             # convert into int64 values
-            self.count_data = buffer_encode.astype('int64', casting='safe')
+            np.copyto(self.count_data, buffer_encode, casting='safe')
 
             # Add saved count data (in case of continued measurement)
             if self.saved_count_data is not None:
                 if self.saved_count_data.shape == self.count_data.shape:
-                    self.count_data = self.count_data + self.saved_count_data
+                    self.count_data += self.saved_count_data
                 else:
                     self.log.error('Count data before pausing measurement had different shape than '
                                    'after measurement. Can not properly continue measurement.')
@@ -513,7 +547,12 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
         Fast counter must be initially in the run state to make it pause.
         """
         # stop FPGA timetagger
-        self.saved_count_data = self.get_data_trace()[0]
+        count_data = self.get_data_trace()[0]
+        # keep the counts in a buffer of their own, the count data is overwritten by the next call
+        if self._saved_count_buffer.shape != count_data.shape:
+            self._saved_count_buffer = np.zeros(count_data.shape, dtype='int64')
+        np.copyto(self._saved_count_buffer, count_data)
+        self.saved_count_data = self._saved_count_buffer
         with self.threadlock:
             self._fpga.ActivateTriggerIn(0x40, 1)
             # Check status and wait until stopped
@@ -538,8 +577,7 @@ class FastCounterFPGAQO(Base, FastCounterInterface):
         If fast counter is in pause state, then fast counter will be continued.
         """
         with self.threadlock:
-            self.count_data = np.zeros([self._number_of_gates, self._gate_length_bins],
-                                       dtype='int64')
+            self.count_data.fill(0)
             # Check if fastcounter was in pause state
             if self._statusvar != 3:
                 self.log.error('Can not continue fast counter since it was not in a paused state.')
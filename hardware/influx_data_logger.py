@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 """
-A module to control the QO Raspberry Pi based H-Bridge hardware.
+A module to log instrument values to InfluxDB.
 
 Qudi is free software: you can redistribute it and/or modify
 it under the terms of the GNU General Public License as published by
@@ -21,13 +21,20 @@ top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi
 
 from core.module import Base
 from core.configoption import ConfigOption
+from core.util.batch_writer import BatchedChannelLogger
 from interface.data_logger_interface import DataLoggerInterface
 
 from influxdb import InfluxDBClient
 
-class InfluxLogger(Base, DataLoggerInterface):
+
+class InfluxLogger(Base, BatchedChannelLogger, DataLoggerInterface):
     """ Log instrument values to InfluxDB.
 
+    The logged values are buffered and written to the database in batches by a background thread,
+    when batch_size points are buffered or flush_interval seconds after the oldest one. While the
+    database is not reachable at most buffer_size points are kept in memory, the oldest points
+    beyond are appended to spill_file and written later, or dropped without a spill file.
+
     Example config for copy-paste:
 
     influx_data_logger:
@@ -37,9 +44,10 @@ class InfluxLogger(Base, DataLoggerInterface):
         dbname: 'db_name'
         host: 'localhost'
         port: 8086
-        dataseries: 'data_series_name'
-        field: 'field_name'
-        criterion: 'criterion_name'
+        batch_size: 1000        # optional
+        flush_interval: 1       # optional, in s
+        buffer_size: 100000     # optional
+        spill_file: 'C:\\Data\\influx_spill.jsonl'   # optional
 
     """
 
@@ -48,9 +56,10 @@ class InfluxLogger(Base, DataLoggerInterface):
     dbname = ConfigOption('dbname', missing='error')
     host = ConfigOption('host', missing='error')
     port = ConfigOption('port', 8086)
-    series = ConfigOption('dataseries', missing='error')
-    field = ConfigOption('field', missing='error')
-    cr = ConfigOption('criterion', missing='error')
+    _batch_size = ConfigOption('batch_size', 1000)
+    _flush_interval = ConfigOption('flush_interval', 1)
+    _buffer_size = ConfigOption('buffer_size', 100000)
+    _spill_file = ConfigOption('spill_file', None)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -60,57 +69,20 @@ class InfluxLogger(Base, DataLoggerInterface):
         """ Activate module.
         """
         self.connect_db()
+        self._start_writer(self._batch_size, self._flush_interval, self._buffer_size,
+                           self._spill_file)
 
     def on_deactivate(self):
         """ Deactivate module.
         """
+        self._stop_writer()
         del self.conn
 
     def connect_db(self):
         """ Connect to Influx database """
         self.conn = InfluxDBClient(self.host, self.port, self.user, self.pw, self.dbname)
 
-    def get_log_channels(self):
-        """ Get number of logging channels
-
-            @return int: number of channels
-        """
-        return self.log_channels
-
-    def set_log_channels(self, channelspec):
-        """ Set number of logging channels.
-
-            @param channelspec dict: name, spec
-        """
-        for name, spec in channelspec.items():
-            if spec is None and name in self.log_channels:
-                self.log_channels.pop(name)
-            elif name in self.log_channels:
-                pass
-            else:
-                pass
-                if True:
-                    pass
-
-    def log_to_channel(self, channel, values):
-        """ Log values to a specific channel.
-
-            @param channel str: channel name
-            @param values list: data to be logged
-        """
-        if channel in self.log_channels.keys() and len(values) == len(self.log_channels[channel][values]):
-            conn.write_points(format_data(channel, values, channeltags))
-
-    def format_data(self, channel_name, values, tags):
-        """ Format data according to InfluxDB JSON API.
-
-            @param channel_name str: channel name
-            @param values list: data
-            @param tags list(str): list of tags
-        """
-        return [{
-             'measurement': channel_name,
-             'fields': values,
-             'tags': tags
-            }]
-
+    def _write_points(self, points):
+        """ Write a batch of points to the database, called by the writer thread. """
+        if not self.conn.write_points(points, time_precision='u'):
+            raise RuntimeError('InfluxDB did not accept the points.')
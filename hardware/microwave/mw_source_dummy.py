@@ -23,6 +23,7 @@ top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi
 import random
 
 from core.module import Base
+from core.configoption import ConfigOption
 from interface.microwave_interface import MicrowaveInterface
 from interface.microwave_interface import MicrowaveLimits
 from interface.microwave_interface import MicrowaveMode
@@ -37,9 +38,11 @@ class MicrowaveDummy(Base, MicrowaveInterface):
 
     mw_source_dummy:
         module.Class: 'microwave.mw_source_dummy.MicrowaveDummy'
-
+        reset_time: 0 # in s, simulated duration of resetting the list/sweep position
     """
 
+    _reset_time = ConfigOption('reset_time', 0.0)
+
     def on_activate(self):
         """ Initialisation performed during activation of the module.
         """
@@ -210,6 +213,7 @@ class MicrowaveDummy(Base, MicrowaveInterface):
 
         @return int: error code (0:OK, -1:error)
         """
+        time.sleep(self._reset_time)
         return 0
 
     def sweep_on(self):
@@ -253,6 +257,7 @@ class MicrowaveDummy(Base, MicrowaveInterface):
 
         @return int: error code (0:OK, -1:error)
         """
+        time.sleep(self._reset_time)
         return 0
 
     def set_ext_trigger(self, pol, timing):
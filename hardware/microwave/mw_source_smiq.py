@@ -85,6 +85,9 @@ class MicrowaveSmiq(Base, MicrowaveInterface):
         self.model = self._gpib_connection.query('*IDN?').split(',')[1]
         self._command_wait('*CLS')
         self._command_wait('*RST')
+        # frequencies and power of the list programmed by set_list, to skip unchanged uploads
+        self._programmed_list_freq = None
+        self._programmed_list_power = None
         return
 
     def on_deactivate(self):
@@ -100,8 +103,7 @@ class MicrowaveSmiq(Base, MicrowaveInterface):
 
         @param command_str: The command to be written
         """
-        self._gpib_connection.write(command_str)
-        self._gpib_connection.write('*WAI')
+        self._gpib_connection.write(command_str + ';*WAI')
         while int(float(self._gpib_connection.query('*OPC?'))) != 1:
             time.sleep(0.2)
         return
@@ -325,42 +327,56 @@ class MicrowaveSmiq(Base, MicrowaveInterface):
             current frequencies in Hz,
             current power in dBm,
             current mode
+
+        The list settings are sent in a single message. Frequencies and power equal to the ones
+        programmed by the last call are not sent again, the list is not uploaded at all if the
+        device is still in list mode with them.
         """
         mode, is_running = self.get_status()
         if is_running:
             self.off()
 
-        # Cant change list parameters if in list mode
-        if mode != 'cw':
-            self.set_cw()
-
-        self._gpib_connection.write(":LIST:SEL 'QUDI'")
-        self._gpib_connection.write('*WAI')
-
-        # Set list frequencies
         if frequency is not None:
-            s = ' {0:f},'.format(frequency[0])
-            for f in frequency[:-1]:
-                s += ' {0:f},'.format(f)
-            s += ' {0:f}'.format(frequency[-1])
-            self._gpib_connection.write(':LIST:FREQ' + s)
-            self._gpib_connection.write('*WAI')
-            self._gpib_connection.write(':LIST:MODE STEP')
-            self._gpib_connection.write('*WAI')
-
-        # Set list power
-        if power is not None:
-            self._gpib_connection.write(':LIST:POW {0:f}'.format(power))
-            self._gpib_connection.write('*WAI')
-
-        self._command_wait(':TRIG1:LIST:SOUR EXT')
-
-        # Apply settings in hardware
-        self._command_wait(':LIST:LEARN')
-        # If there are timeout  problems after this command, update the smiq  firmware to > 5.90
-        # as there was a problem with excessive wait times after issuing :LIST:LEARN over a
-        # GPIB connection in firmware 5.88
-        self._command_wait(':FREQ:MODE LIST')
+            frequency = tuple(float(f) for f in frequency)
+            if frequency == self._programmed_list_freq:
+                frequency = None
+        if power is not None and power == self._programmed_list_power:
+            power = None
+        upload = frequency is not None or power is not None or self._programmed_list_freq is None
+
+        if upload or mode != 'list':
+            # Cant change list parameters if in list mode
+            if mode != 'cw':
+                self.set_cw()
+
+            if upload:
+                commands = [":LIST:SEL 'QUDI'"]
+
+                # Set list frequencies
+                if frequency is not None:
+                    s = ' {0:f},'.format(frequency[0])
+                    s += ','.join(' {0:f}'.format(f) for f in frequency)
+                    commands.append(':LIST:FREQ' + s)
+                    commands.append(':LIST:MODE STEP')
+
+                # Set list power
+                if power is not None:
+                    commands.append(':LIST:POW {0:f}'.format(power))
+
+                commands.append(':TRIG1:LIST:SOUR EXT')
+                programmed_freq = self._programmed_list_freq
+                self._programmed_list_freq = None
+                self._command_wait(';'.join(commands))
+                self._programmed_list_freq = programmed_freq if frequency is None else frequency
+                if power is not None:
+                    self._programmed_list_power = power
+
+            # Apply settings in hardware
+            self._command_wait(':LIST:LEARN')
+            # If there are timeout  problems after this command, update the smiq  firmware to > 5.90
+            # as there was a problem with excessive wait times after issuing :LIST:LEARN over a
+            # GPIB connection in firmware 5.88
+            self._command_wait(':FREQ:MODE LIST')
 
         actual_freq = self.get_frequency()
         actual_power = self.get_power()
@@ -40,11 +40,15 @@ class MicrowaveSRSSG(Base, MicrowaveInterface):
         module.Class: 'microwave.mw_source_srssg.MicrowaveSRSSG'
         gpib_address: 'GPIB0::12::INSTR'
         gpib_timeout: 10
+        max_message_length: 1024 # optional, maximum length of a message with several commands
 
     """
 
     _gpib_address = ConfigOption('gpib_address', missing='error')
     _gpib_timeout = ConfigOption('gpib_timeout', 10, missing='warn')
+    # Several commands are sent in one message, separated by semicolons. The input buffer of the
+    # device holds off the transfer of longer messages until they are processed.
+    _max_message_length = ConfigOption('max_message_length', 1024)
 
     _internal_mode = 'cw'   # list and sweep might also be possible, but start
                             # always with cw
@@ -81,6 +85,9 @@ class MicrowaveSRSSG(Base, MicrowaveInterface):
                                              self._SERIALNUMBER,
                                              self._FIRMWARE_VERSION))
 
+        # frequencies and power of the list programmed by set_list, to skip an unchanged upload
+        self._programmed_list = None
+
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module."""
 
@@ -233,27 +240,35 @@ class MicrowaveSRSSG(Base, MicrowaveInterface):
         @param float power: MW power of the frequency list in dBm
 
         @return int: error code (0:OK, -1:error)
-        """
-
-        # delete a previously created list:
-        self._gpib_connection.write('LSTD')
 
+        The list points are sent with several in one message and a single *WAI at the end. If the
+        list and power are the ones programmed by the last call, the upload is skipped.
+        """
         num_freq = len(frequency)
+        requested_list = (tuple(float(entry) for entry in frequency), power)
 
         if num_freq > self._MAX_LIST_ENTRIES:
+            # delete a previously created list:
+            self._gpib_connection.write('LSTD')
+            self._programmed_list = None
             self.log.error('The frequency list exceeds the hardware limitation '
                            'of {0} list entries. Aborting creation of a list '
                            'due to potential overwrite of the firmware on the '
                            'device.'.format(self._MAX_LIST_ENTRIES))
+        elif requested_list == self._programmed_list:
+            # the list on the device is unchanged, make sure it is enabled
+            self._write('LSTE 1')
         else:
+            self._programmed_list = None
+            # delete a previously created list and ask for a new one:
+            self._ask('LSTD;LSTC? {0:d}'.format(num_freq))
 
-            # ask for a new list
-            self._ask('LSTC? {0:d}'.format(num_freq))
-
-
-            for index, entry in enumerate(frequency):
-                self._write('LSTP {0:d},{1:e},N,N,N,{2:f},N,N,N,N,N,N,N,N,N,N'
-                            ''.format(index, entry, power))
+            self._write_batch(['LSTP {0:d},{1:e},N,N,N,{2:f},N,N,N,N,N,N,N,N,N,N'
+                               ''.format(index, entry, power)
+                               for index, entry in enumerate(frequency)]
+                              # enable the created list:
+                              + ['LSTE 1'])
+            self._programmed_list = requested_list
 
             # the commands contains 15 entries, which are related to the
             # following commands (in brackets the explanation), if parameter is
@@ -325,9 +340,6 @@ class MicrowaveSRSSG(Base, MicrowaveInterface):
             #  14 = Amplitude of HF (RF doubler output)
             #  15 = Offset of rear DC
 
-            # enable the created list:
-            self._write('LSTE 1')
-
         self._internal_mode = 'list'    # now the device should be in list mode
         curr_freq = self.get_frequency()
         curr_power = self.get_power()
@@ -369,6 +381,7 @@ class MicrowaveSRSSG(Base, MicrowaveInterface):
         rate = (sweep_length/step) * time_per_freq
         mod_type = 5 # blank
         mod_func = 3 # blank
+        self._programmed_list = None
         self._write('LSTP {0:d},{1:e},N,N,N,{2:f},N,N,{3},{4},{5:e},{6:e},N,N,N,N'.format(index, start, power, mod_type, mod_func, rate, sweep_length))
         self._internal_mode = 'sweep'
 
@@ -436,9 +449,29 @@ class MicrowaveSRSSG(Base, MicrowaveInterface):
 
         @return: str: the statuscode of the write command.
         """
-        statuscode = self._gpib_connection.write(command)
         if wait:
-            self._gpib_connection.write('*WAI')
+            command += ';*WAI'
+        statuscode = self._gpib_connection.write(command)
+        return statuscode
+
+    def _write_batch(self, commands):
+        """ Writes the commands with as few messages as possible and waits after the last one.
+
+        @param list(str) commands: commands to the device
+
+        @return: str: the statuscode of the last write command.
+        """
+        statuscode = None
+        message = ''
+        # leave room for the *WAI of the last message
+        max_length = self._max_message_length - len(';*WAI')
+        for command in commands:
+            if message and len(message) + len(command) + 1 > max_length:
+                statuscode = self._write(message, wait=False)
+                message = ''
+            message = command if not message else message + ';' + command
+        if message:
+            statuscode = self._write(message)
         return statuscode
 
     def on(self):
@@ -478,6 +511,7 @@ class MicrowaveSRSSG(Base, MicrowaveInterface):
 
     def reset_device(self):
         """ Resets the device and sets the default values."""
+        self._programmed_list = None
         self._write('*RST')
         self._write('ENBR 0')   # turn off Type N output
         self._write('ENBL 0')   # turn off BNC output
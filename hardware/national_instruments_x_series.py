@@ -142,6 +142,17 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         self._oversampling = 0
         self._lock_in_active = False
 
+        # state of the line streaming mode of the scanner
+        self._line_stream_active = False
+        self._line_stream_max_length = 0
+        self._line_stream_first_line = True
+        self._line_stream_clock_samples = None
+        self._line_stream_pixel_clock = False
+
+        # state of the continuous counting mode of the ODMR counter
+        self._odmr_stream_active = False
+        self._odmr_stream_buffer_length = 0
+
         self._photon_sources = self._photon_sources if self._photon_sources is not None else list()
         self._scanner_counter_channels = self._scanner_counter_channels if self._scanner_counter_channels is not None else list()
         self._scanner_ai_channels = self._scanner_ai_channels if self._scanner_ai_channels is not None else list()
@@ -1021,6 +1032,10 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             self.log.error('Another scan_line is already running, close this one first.')
             return -1
 
+        # the analog output can only be written on demand again after the line stream is closed
+        if self._line_stream_active:
+            self.close_line_stream()
+
         if x is not None:
             if not(self._scanner_position_ranges[0][0] <= x <= self._scanner_position_ranges[0][1]):
                 self.log.error('You want to set x out of range: {0:f}.'.format(x))
@@ -1266,6 +1281,10 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         if not isinstance(line_path, (frozenset, list, set, tuple, np.ndarray, ) ):
             self.log.error('Given line_path list is not array type.')
             return np.array([[-1.]])
+
+        if self._line_stream_active:
+            return self._stream_line(line_path, pixel_clock)
+
         try:
             # set task timing to use a sampling clock:
             # specify how the Data of the selected task is collected, i.e. set it
@@ -1405,11 +1424,258 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         # return values is a rate of counts/s
         return all_data.transpose()
 
+    def set_up_line_stream(self, max_line_length):
+        """ Configures the scanner tasks once for streaming many successive lines.
+
+        @param int max_line_length: maximum number of pixels of the lines scanned in this mode
+
+        @return int: error code (0:OK, -1:error)
+
+        Analog output, counters and analog input are set up for continuous sampling with the
+        scanner clock and stay running until close_line_stream is called. For every line only the
+        positions are written to the analog output buffer and the finite scanner clock is started,
+        the samples are read into buffers allocated here. Between lines of different length only the
+        number of clock pulses is changed.
+        """
+        if self._scanner_counter_channels and len(self._scanner_counter_daq_tasks) < 1:
+            self.log.error('Configured counter is not running, cannot set up line stream.')
+            return -1
+
+        if self._scanner_ai_channels and self._scanner_analog_daq_task is None:
+            self.log.error('Configured analog input is not running, cannot set up line stream.')
+            return -1
+
+        if self._line_stream_active:
+            self.close_line_stream()
+
+        max_line_length = int(max_line_length)
+        if max_line_length < 1:
+            self.log.error('Line stream needs a positive line length.')
+            return -1
+        # every line is one clock pulse longer than the number of pixels
+        buffer_length = 2 * (max_line_length + 1)
+
+        try:
+            # Analog output: continuous, clocked by the scanner clock. No regeneration, so every
+            # written sample is output exactly once and the scanner stays at the last position
+            # while the clock is stopped between lines.
+            daq.DAQmxSetSampTimingType(self._scanner_ao_task, daq.DAQmx_Val_SampClk)
+            daq.DAQmxCfgSampClkTiming(
+                self._scanner_ao_task,
+                self._my_scanner_clock_channel + 'InternalOutput',
+                self._scanner_clock_frequency,
+                daq.DAQmx_Val_Rising,
+                daq.DAQmx_Val_ContSamps,
+                buffer_length)
+            daq.DAQmxSetWriteRegenMode(self._scanner_ao_task, daq.DAQmx_Val_DoNotAllowRegen)
+            daq.DAQmxCfgOutputBuffer(self._scanner_ao_task, buffer_length)
+
+            for i, task in enumerate(self._scanner_counter_daq_tasks):
+                # Continuous semi period counting, two samples per clock pulse. The samples of
+                # each line are read relative to the previous read.
+                daq.DAQmxStopTask(task)
+                daq.DAQmxCfgImplicitTiming(task, daq.DAQmx_Val_ContSamps, 2 * buffer_length)
+                daq.DAQmxSetReadRelativeTo(task, daq.DAQmx_Val_CurrReadPos)
+                daq.DAQmxSetReadOffset(task, 0)
+                daq.DAQmxSetReadOverWrite(task, daq.DAQmx_Val_DoNotOverwriteUnreadSamps)
+
+            if self._scanner_ai_channels:
+                daq.DAQmxStopTask(self._scanner_analog_daq_task)
+                daq.DAQmxCfgSampClkTiming(
+                    self._scanner_analog_daq_task,
+                    self._scanner_clock_channel + 'InternalOutput',
+                    self._scanner_clock_frequency,
+                    daq.DAQmx_Val_Rising,
+                    daq.DAQmx_Val_ContSamps,
+                    buffer_length)
+
+            daq.DAQmxStopTask(self._scanner_clock_daq_task)
+            daq.DAQmxCfgImplicitTiming(
+                self._scanner_clock_daq_task,
+                daq.DAQmx_Val_FiniteSamps,
+                max_line_length + 1)
+            self._line_stream_clock_samples = max_line_length + 1
+
+            # commit all tasks, so starting and stopping them does not verify and reserve the
+            # resources again
+            tasks = [self._scanner_ao_task, self._scanner_clock_daq_task]
+            tasks.extend(self._scanner_counter_daq_tasks)
+            if self._scanner_ai_channels:
+                tasks.append(self._scanner_analog_daq_task)
+            for task in tasks:
+                daq.DAQmxTaskControl(task, daq.DAQmx_Val_Task_Commit)
+
+            # start the acquisition, it only runs while the scanner clock is running. The analog
+            # output is started with the first line, as it needs data in its buffer.
+            for i, task in enumerate(self._scanner_counter_daq_tasks):
+                daq.DAQmxStartTask(task)
+            if self._scanner_ai_channels:
+                daq.DAQmxStartTask(self._scanner_analog_daq_task)
+        except:
+            self.log.exception('Error while setting up the line stream.')
+            self._line_stream_active = True
+            self.close_line_stream()
+            return -1
+
+        # buffers for the positions and the samples of one line. The arrays for a line are
+        # contiguous views of the beginning of the flat buffers.
+        self._line_stream_volts = np.empty(
+            len(self._scanner_ao_channels) * (max_line_length + 1), dtype=np.float64)
+        self._line_stream_counts = np.empty(
+            (len(self._scanner_counter_daq_tasks), 2 * max_line_length + 2), dtype=np.uint32)
+        self._line_stream_pixels = np.empty(
+            (len(self._scanner_counter_daq_tasks), max_line_length), dtype=np.uint32)
+        self._line_stream_analog = np.empty(
+            len(self._scanner_ai_channels) * (max_line_length + 1), dtype=np.float64)
+
+        self._line_stream_max_length = max_line_length
+        self._line_stream_first_line = True
+        self._line_stream_pixel_clock = False
+        self._line_stream_active = True
+        return 0
+
+    def _set_line_stream_pixel_clock(self, pixel_clock):
+        """ Routes the scanner clock to the pixel clock output, if the requested state changed.
+
+        @param bool pixel_clock: whether the pixel clock is output for the next line
+        """
+        pixel_clock = bool(pixel_clock) and self._pixel_clock_channel is not None
+        if pixel_clock == self._line_stream_pixel_clock:
+            return
+        if pixel_clock:
+            daq.DAQmxConnectTerms(
+                self._scanner_clock_channel + 'InternalOutput',
+                self._pixel_clock_channel,
+                daq.DAQmx_Val_DoNotInvertPolarity)
+        else:
+            daq.DAQmxDisconnectTerms(
+                self._scanner_clock_channel + 'InternalOutput',
+                self._pixel_clock_channel)
+        self._line_stream_pixel_clock = pixel_clock
+
+    def _stream_line(self, line_path, pixel_clock=False):
+        """ Scans a line with the tasks configured by set_up_line_stream.
+
+        @param float[c][m] line_path: array of c-tuples defining the voltage points
+        @param bool pixel_clock: whether we need to output a pixel clock for this line
+
+        @return float[m][n]: m (samples per line) n-channel photon counts per second
+        """
+        length = np.shape(line_path)[1]
+        if length > self._line_stream_max_length:
+            self.log.error('Line with {0} pixels is longer than the {1} pixels the line stream '
+                           'was set up for.'.format(length, self._line_stream_max_length))
+            return np.array([[-1.]])
+
+        try:
+            # the last position is repeated for the extra clock pulse at the end of the line
+            volts = self._line_stream_volts[:len(self._scanner_ao_channels) * (length + 1)]
+            volts = volts.reshape(len(self._scanner_ao_channels), length + 1)
+            volts[:, :length] = self._scanner_position_to_volt(line_path)
+            volts[:, length] = volts[:, length - 1]
+
+            if self._line_stream_clock_samples != length + 1:
+                daq.DAQmxCfgImplicitTiming(
+                    self._scanner_clock_daq_task,
+                    daq.DAQmx_Val_FiniteSamps,
+                    length + 1)
+                self._line_stream_clock_samples = length + 1
+
+            self._write_scanner_ao(voltages=volts, length=length + 1, start=False)
+            if self._line_stream_first_line:
+                daq.DAQmxStartTask(self._scanner_ao_task)
+            self._set_line_stream_pixel_clock(pixel_clock)
+
+            daq.DAQmxStartTask(self._scanner_clock_daq_task)
+            daq.DAQmxWaitUntilTaskDone(
+                self._scanner_clock_daq_task,
+                self._RWTimeout * 2 * length)
+            daq.DAQmxStopTask(self._scanner_clock_daq_task)
+
+            # Every clock pulse gives two semi period samples. The first sample of each line ends
+            # with the first falling clock edge and is skipped, as in scan_line. All lines but the
+            # first one additionally start with the idle time since the previous line.
+            skip = 1 if self._line_stream_first_line else 2
+            n_samples = 2 * length + skip
+            n_read_samples = daq.int32()
+            for i, task in enumerate(self._scanner_counter_daq_tasks):
+                daq.DAQmxReadCounterU32(
+                    task,
+                    n_samples,
+                    self._RWTimeout,
+                    self._line_stream_counts[i, :n_samples],
+                    n_samples,
+                    daq.byref(n_read_samples),
+                    None)
+
+            all_data = np.empty((len(self.get_scanner_count_channels()), length), dtype=np.float64)
+            n_counters = len(self._scanner_counter_daq_tasks)
+            if n_counters > 0:
+                # add up adjoint semi periods to also get the counts from the low time of the clock
+                samples = self._line_stream_counts[:, skip:n_samples]
+                pixels = self._line_stream_pixels[:, :length]
+                np.add(samples[:, ::2], samples[:, 1::2], out=pixels)
+                np.multiply(pixels, self._scanner_clock_frequency, out=all_data[:n_counters])
+
+            if self._scanner_ai_channels:
+                analog_data = self._line_stream_analog[:len(self._scanner_ai_channels) * (length + 1)]
+                analog_data = analog_data.reshape(len(self._scanner_ai_channels), length + 1)
+                analog_read_samples = daq.int32()
+                daq.DAQmxReadAnalogF64(
+                    self._scanner_analog_daq_task,
+                    length + 1,
+                    self._RWTimeout,
+                    daq.DAQmx_Val_GroupByChannel,
+                    analog_data,
+                    analog_data.size,
+                    daq.byref(analog_read_samples),
+                    None)
+                all_data[n_counters:] = analog_data[:, :-1]
+
+            self._line_stream_first_line = False
+            # update the scanner position instance variable
+            self._current_position = np.array(line_path[:, -1])
+        except:
+            self.log.exception('Error while scanning line.')
+            return np.array([[-1.]])
+        # return values is a rate of counts/s
+        return all_data.transpose()
+
+    def close_line_stream(self):
+        """ Stops the tasks of the line stream and returns to scanning line by line.
+
+        @return int: error code (0:OK, -1:error)
+        """
+        if not self._line_stream_active:
+            return 0
+        retval = 0
+        try:
+            daq.DAQmxStopTask(self._scanner_clock_daq_task)
+            for i, task in enumerate(self._scanner_counter_daq_tasks):
+                daq.DAQmxStopTask(task)
+            if self._scanner_ai_channels:
+                daq.DAQmxStopTask(self._scanner_analog_daq_task)
+            self._set_line_stream_pixel_clock(False)
+        except:
+            self.log.exception('Error while stopping the line stream.')
+            retval = -1
+        if self._stop_analog_output() < 0:
+            retval = -1
+        try:
+            daq.DAQmxResetWriteRegenMode(self._scanner_ao_task)
+        except:
+            self.log.exception('Error resetting analog output regeneration mode.')
+            retval = -1
+        self._line_stream_active = False
+        self._line_stream_clock_samples = None
+        return retval
+
     def close_scanner(self):
         """ Closes the scanner and cleans up afterwards.
 
         @return int: error code (0:OK, -1:error)
         """
+        self.close_line_stream()
         a = self._stop_analog_output()
 
         b = 0
@@ -1868,12 +2134,173 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
             self.log.exception('Error while counting for ODMR.')
             return True, np.full((len(self.get_odmr_channels()), 1), [-1.])
 
+    def start_odmr_stream(self, length=100):
+        """ Starts counting continuously, the microwave is triggered through its list (or sweep)
+        of length frequencies over and over again.
+
+        @param int length: length of microwave sweep in pixel
+
+        @return int: error code (0:OK, -1:error)
+
+        The ODMR clock runs continuously and triggers the microwave with every pulse, counter and
+        analog input sample into the circular buffers of their tasks, which hold 10 s of data (at
+        least 10 sweeps). Not available in lock-in mode.
+        """
+        if self.lock_in_active:
+            self.log.error('Continuous ODMR counting is not possible in lock-in mode.')
+            return -1
+
+        if self._scanner_counter_channels and len(self._scanner_counter_daq_tasks) < 1:
+            self.log.error('No counter is running, cannot do ODMR without one.')
+            return -1
+
+        if self._scanner_ai_channels and self._scanner_analog_daq_task is None:
+            self.log.error('No analog task is running, cannot do ODMR without one.')
+            return -1
+
+        if self._odmr_stream_active:
+            self.stop_odmr_stream()
+
+        self._odmr_length = length
+        buffer_length = max(10 * length, int(10 * self._scanner_clock_frequency))
+        try:
+            daq.DAQmxCfgImplicitTiming(
+                self._scanner_clock_daq_task,
+                daq.DAQmx_Val_ContSamps,
+                buffer_length)
+
+            if self._scanner_counter_channels:
+                # two semi period samples for each clock pulse
+                daq.DAQmxCfgImplicitTiming(
+                    self._scanner_counter_daq_tasks[0],
+                    daq.DAQmx_Val_ContSamps,
+                    2 * buffer_length)
+                daq.DAQmxSetReadRelativeTo(
+                    self._scanner_counter_daq_tasks[0],
+                    daq.DAQmx_Val_CurrReadPos)
+                daq.DAQmxSetReadOffset(self._scanner_counter_daq_tasks[0], 0)
+                # a buffer overflow is reported as error instead of losing samples silently
+                daq.DAQmxSetReadOverWrite(
+                    self._scanner_counter_daq_tasks[0],
+                    daq.DAQmx_Val_DoNotOverwriteUnreadSamps)
+                daq.DAQmxStartTask(self._scanner_counter_daq_tasks[0])
+
+            if self._scanner_ai_channels:
+                daq.DAQmxCfgSampClkTiming(
+                    self._scanner_analog_daq_task,
+                    self._scanner_clock_channel + 'InternalOutput',
+                    self._scanner_clock_frequency,
+                    daq.DAQmx_Val_Rising,
+                    daq.DAQmx_Val_ContSamps,
+                    buffer_length)
+                daq.DAQmxStartTask(self._scanner_analog_daq_task)
+
+            daq.DAQmxStartTask(self._scanner_clock_daq_task)
+        except:
+            self.log.exception('Error while starting continuous ODMR counting.')
+            self._odmr_stream_active = True
+            self.stop_odmr_stream()
+            return -1
+
+        # read buffers, large enough for the whole task buffers
+        self._odmr_stream_counts = np.empty((2 * buffer_length, ), dtype=np.uint32)
+        self._odmr_stream_analog = np.empty(
+            len(self._scanner_ai_channels) * buffer_length, dtype=np.float64)
+        self._odmr_stream_buffer_length = buffer_length
+        self._odmr_stream_active = True
+        return 0
+
+    def read_odmr_stream(self):
+        """ Returns the pixels counted since the previous call (or since start_odmr_stream).
+
+        @return (bool, float[c][n]): tuple: was there an error, the photon counts per second of the
+                                     n new pixels for each of the c channels
+        """
+        if not self._odmr_stream_active:
+            self.log.error('No ODMR stream running, call start_odmr_stream first.')
+            return True, None
+
+        try:
+            # only read pixels which are complete in all channels
+            available = daq.uInt32()
+            n_pixels = self._odmr_stream_buffer_length
+            if self._scanner_counter_channels:
+                daq.DAQmxGetReadAvailSampPerChan(
+                    self._scanner_counter_daq_tasks[0],
+                    daq.byref(available))
+                n_pixels = min(n_pixels, available.value // 2)
+            if self._scanner_ai_channels:
+                daq.DAQmxGetReadAvailSampPerChan(
+                    self._scanner_analog_daq_task,
+                    daq.byref(available))
+                n_pixels = min(n_pixels, available.value)
+
+            all_data = np.empty((len(self.get_odmr_channels()), n_pixels), dtype=np.float64)
+            if n_pixels < 1:
+                return False, all_data
+
+            start_index = 0
+            n_read_samples = daq.int32()
+            if self._scanner_counter_channels:
+                samples = self._odmr_stream_counts[:2 * n_pixels]
+                daq.DAQmxReadCounterU32(
+                    self._scanner_counter_daq_tasks[0],
+                    2 * n_pixels,
+                    self._RWTimeout,
+                    samples,
+                    2 * n_pixels,
+                    daq.byref(n_read_samples),
+                    None)
+                # add up adjoint semi periods to also get the counts from the low time of the clock
+                np.add(samples[::2], samples[1::2], out=all_data[0])
+                all_data[0] *= self._scanner_clock_frequency
+                start_index += 1
+
+            if self._scanner_ai_channels:
+                analog_data = self._odmr_stream_analog[:len(self._scanner_ai_channels) * n_pixels]
+                analog_data = analog_data.reshape(len(self._scanner_ai_channels), n_pixels)
+                daq.DAQmxReadAnalogF64(
+                    self._scanner_analog_daq_task,
+                    n_pixels,
+                    self._RWTimeout,
+                    daq.DAQmx_Val_GroupByChannel,
+                    analog_data,
+                    analog_data.size,
+                    daq.byref(n_read_samples),
+                    None)
+                all_data[start_index:] = analog_data
+        except:
+            self.log.exception('Error while reading the continuous ODMR counts.')
+            return True, None
+        return False, all_data
+
+    def stop_odmr_stream(self):
+        """ Stops the continuous counting started with start_odmr_stream.
+
+        @return int: error code (0:OK, -1:error)
+        """
+        if not self._odmr_stream_active:
+            return 0
+        retval = 0
+        try:
+            daq.DAQmxStopTask(self._scanner_clock_daq_task)
+            if self._scanner_counter_channels:
+                daq.DAQmxStopTask(self._scanner_counter_daq_tasks[0])
+            if self._scanner_ai_channels:
+                daq.DAQmxStopTask(self._scanner_analog_daq_task)
+        except:
+            self.log.exception('Error while stopping continuous ODMR counting.')
+            retval = -1
+        self._odmr_stream_active = False
+        self._odmr_stream_buffer_length = 0
+        return retval
+
     def close_odmr(self):
         """ Closes the odmr and cleans up afterwards.
 
         @return int: error code (0:OK, -1:error)
         """
-        retval = 0
+        retval = self.stop_odmr_stream()
         try:
             # disconnect the trigger channel
             daq.DAQmxDisconnectTerms(
@@ -37,6 +37,7 @@ class ODMRCounterDummy(Base, ODMRCounterInterface):
         module.Class: 'odmr_counter_dummy.ODMRCounterDummy'
         clock_frequency: 100 # in Hz
         number_of_channels: 2
+        count_setup_time: 0 # in s, simulated setup of the counter for every sweep in count_odmr
         fitlogic: 'fitlogic' # name of the fitlogic module, see default config
 
     """
@@ -47,6 +48,7 @@ class ODMRCounterDummy(Base, ODMRCounterInterface):
     # config options
     _clock_frequency = ConfigOption('clock_frequency', 100, missing='warn')
     _number_of_channels = ConfigOption('number_of_channels', 2, missing='warn')
+    _count_setup_time = ConfigOption('count_setup_time', 0.0)
 
     def __init__(self, config, **kwargs):
         super().__init__(config=config, **kwargs)
@@ -56,6 +58,9 @@ class ODMRCounterDummy(Base, ODMRCounterInterface):
         self._pulse_out_channel = 'dummy'
         self._lock_in_active = False
         self._oversampling = 10
+        self._spectrum = None
+        self._stream_start = None
+        self._stream_pixels = 0
 
     def on_activate(self):
         """ Initialisation performed during activation of the module.
@@ -120,6 +125,32 @@ class ODMRCounterDummy(Base, ODMRCounterInterface):
         self._odmr_length = length
         return 0
 
+    def _simulate_counts(self, pixels, length):
+        """ Simulated count rates of a double lorentzian ODMR spectrum with noise.
+
+        @param int[] pixels: indices of the pixels in the sweep
+        @param int length: length of microwave sweep in pixel
+
+        @return float[c][n]: the photon counts per second for the c channels and n pixels
+        """
+        if self._spectrum is None or self._spectrum.size != length:
+            lorentians, params = self._fit_logic.make_lorentziandouble_model()
+
+            sigma = 3.
+
+            params.add('l0_amplitude', value=-30000)
+            params.add('l0_center', value=length/3)
+            params.add('l0_sigma', value=sigma)
+            params.add('l1_amplitude', value=-30000)
+            params.add('l1_center', value=2*length/3)
+            params.add('l1_sigma', value=sigma)
+            params.add('offset', value=50000.)
+            self._spectrum = lorentians.eval(x=np.arange(1, length + 1, 1), params=params)
+
+        ret = np.random.uniform(0, 5e4, (self._number_of_channels, len(pixels)))
+        ret += np.arange(1, self._number_of_channels + 1)[:, np.newaxis] * self._spectrum[pixels]
+        return ret
+
     def count_odmr(self, length=100):
         """ Sweeps the microwave and returns the counts on that sweep.
 
@@ -137,31 +168,55 @@ class ODMRCounterDummy(Base, ODMRCounterInterface):
 
         self._odmr_length = length
 
-        lorentians, params = self._fit_logic.make_lorentziandouble_model()
+        ret = self._simulate_counts(np.arange(length), length)
+
+        time.sleep(self._count_setup_time + self._odmr_length*1./self._clock_frequency)
+
+        self.module_state.unlock()
+        return False, ret
+
+    def start_odmr_stream(self, length=100):
+        """ Starts counting continuously, the microwave is triggered through its list (or sweep)
+        of length frequencies over and over again.
+
+        @param int length: length of microwave sweep in pixel
 
-        sigma = 3.
+        @return int: error code (0:OK, -1:error)
+        """
+        if self.module_state() == 'locked' or self._stream_start is not None:
+            self.log.error('ODMR counter is already running, close this one first.')
+            return -1
 
-        params.add('l0_amplitude', value=-30000)
-        params.add('l0_center', value=length/3)
-        params.add('l0_sigma', value=sigma)
-        params.add('l1_amplitude', value=-30000)
-        params.add('l1_center', value=2*length/3)
-        params.add('l1_sigma', value=sigma)
-        params.add('offset', value=50000.)
+        self.module_state.lock()
+        self._odmr_length = length
+        self._stream_pixels = 0
+        self._stream_start = time.perf_counter()
+        return 0
 
-        ret = np.empty((self._number_of_channels, length))
+    def read_odmr_stream(self):
+        """ Returns the pixels counted since the previous call (or since start_odmr_stream).
 
-        for chnl_index in range(self._number_of_channels):
-            count_data = np.random.uniform(0, 5e4, length)
-            count_data += (chnl_index + 1) * lorentians.eval(x=np.arange(1, length + 1, 1),
-                                                             params=params)
-            ret[chnl_index] = count_data
+        @return (bool, float[c][n]): tuple: was there an error, the photon counts per second of the
+                                     n new pixels for each of the c channels
+        """
+        if self._stream_start is None:
+            self.log.error('No ODMR stream running, call start_odmr_stream first.')
+            return True, None
 
-        time.sleep(self._odmr_length*1./self._clock_frequency)
+        acquired = int((time.perf_counter() - self._stream_start) * self._clock_frequency)
+        pixels = np.arange(self._stream_pixels, acquired) % self._odmr_length
+        self._stream_pixels = acquired
+        return False, self._simulate_counts(pixels, self._odmr_length)
 
-        self.module_state.unlock()
-        return False, ret
+    def stop_odmr_stream(self):
+        """ Stops the continuous counting started with start_odmr_stream.
 
+        @return int: error code (0:OK, -1:error)
+        """
+        if self._stream_start is not None:
+            self._stream_start = None
+            self.module_state.unlock()
+        return 0
 
     def close_odmr(self):
         """ Closes the odmr and cleans up afterwards.
@@ -171,6 +226,8 @@ class ODMRCounterDummy(Base, ODMRCounterInterface):
 
         self.log.info('ODMRCounterDummy>close_odmr')
 
+        self.stop_odmr_stream()
+
         self._scanner_counter_daq_task = None
 
         return 0
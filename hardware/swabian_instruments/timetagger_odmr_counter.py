@@ -55,6 +55,10 @@ class TimeTaggerODMRCounter(Base, ODMRCounterInterface):
     _channel_apd_1 = ConfigOption('timetagger_channel_apd_1', None, missing='warn')
     _cw_channel_trigger = ConfigOption('cw_timetagger_channel_trigger', missing='error')
     _pulsed_channel_trigger = ConfigOption('pulsed_timetagger_channel_trigger', missing='error')
+    # maximum time count_odmr waits for the counter to be filled in s
+    _count_timeout = ConfigOption('count_timeout', 5)
+    # interval of checking whether the counter is filled in s
+    _poll_interval = 1e-3
     sweep_length = 100
 
     def on_activate(self):
@@ -136,13 +140,13 @@ class TimeTaggerODMRCounter(Base, ODMRCounterInterface):
         counter was initialized.
         """
 
-        t0 = time.time()
+        t0 = time.perf_counter()
         t = 0
-        while (not self.triggered_counter.ready()) and (t < 5):
-            time.sleep(0.1)
-            t = time.time()-t0
+        while (not self.triggered_counter.ready()) and (t < self._count_timeout):
+            time.sleep(self._poll_interval)
+            t = time.perf_counter() - t0
 
-        if t >= 5:
+        if t >= self._count_timeout:
             self.log.error('ODMR measurement timed out after {:03.2f} seconds'.format(t))
             err = True
             count_rates = []
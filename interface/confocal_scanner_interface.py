@@ -180,6 +180,28 @@ class ConfocalScannerInterface(metaclass=InterfaceMetaclass):
         """
         pass
 
+    def set_up_line_stream(self, max_line_length):
+        """ Prepares the scanner to scan many successive lines without reconfiguring the hardware
+        for every single line.
+
+        @param int max_line_length: maximum number of pixels of the lines scanned in this mode
+
+        @return int: error code (0:OK, -1:error or not supported)
+
+        Optional. After a successful call, scan_line accepts lines of up to max_line_length pixels
+        and streams them through tasks which are configured only once, until close_line_stream or
+        close_scanner is called. Hardware without such a mode keeps this default, the caller then
+        simply uses scan_line as before.
+        """
+        return -1
+
+    def close_line_stream(self):
+        """ Ends the line streaming mode started with set_up_line_stream.
+
+        @return int: error code (0:OK, -1:error)
+        """
+        return 0
+
     @abstract_interface_method
     def close_scanner(self):
         """ Closes the scanner and cleans up afterwards.
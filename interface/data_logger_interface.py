@@ -25,20 +25,39 @@ from core.meta import InterfaceMetaclass
 
 
 class DataLoggerInterface(metaclass=InterfaceMetaclass):
-    """
+    """ Interface to log values of instruments, e.g. temperatures or pressures, as time series to
+    some place like a database.
 
-    TODO: This interface has no documentation nor dummy module or logic :'(
+    Every logging channel has the names of the fields logged together and tags added to every
+    logged point. Implementations may buffer the values and write them later.
+    See InfluxLogger and DataLoggerDummy.
     """
 
     @abstract_interface_method
     def get_log_channels(self):
+        """ Get the logging channels.
+
+            @return dict: channel name: dict with the 'fields' and 'tags' of the channel
+        """
         pass
 
     @abstract_interface_method
     def set_log_channels(self, channelspec):
+        """ Add, change or remove logging channels.
+
+            @param channelspec dict: channel name: list of field names, or dict with the list
+                                     'fields' and optionally the dict 'tags' of every point,
+                                     None removes the channel
+        """
         pass
 
     @abstract_interface_method
     def log_to_channel(self, channel, value):
-        pass
+        """ Log values to a specific channel.
+
+            @param channel str: channel name
+            @param value list: one value per field of the channel, or a dict of field name: value
 
+            @return int: error code (0:OK, -1:error)
+        """
+        pass
@@ -77,6 +77,38 @@ class ODMRCounterInterface(metaclass=InterfaceMetaclass):
         """
         pass
 
+    def start_odmr_stream(self, length=100):
+        """ Starts counting continuously, the microwave is triggered through its list (or sweep)
+        of length frequencies over and over again.
+
+        @param int length: length of microwave sweep in pixel
+
+        @return int: error code (0:OK, -1:error or not supported)
+
+        Optional. In contrast to count_odmr, the clock, the counter and thereby the microwave
+        triggers are not stopped between sweeps. The samples are buffered by the hardware until
+        read_odmr_stream is called. The microwave source has to be set up to return to the first
+        frequency after the last one on the next trigger. Hardware without such a mode keeps this
+        default, the caller then uses count_odmr for every sweep as before.
+        """
+        return -1
+
+    def read_odmr_stream(self):
+        """ Returns the pixels counted since the previous call (or since start_odmr_stream).
+
+        @return (bool, float[c][n]): tuple: was there an error, the photon counts per second of the
+                                     n new pixels for each of the c channels. Pixel k of the
+                                     stream belongs to frequency k modulo length.
+        """
+        return True, None
+
+    def stop_odmr_stream(self):
+        """ Stops the continuous counting started with start_odmr_stream.
+
+        @return int: error code (0:OK, -1:error)
+        """
+        return 0
+
     @abstract_interface_method
     def close_odmr(self):
         """ Close the odmr and clean up afterwards.
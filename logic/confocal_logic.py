@@ -22,18 +22,163 @@ top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi
 from qtpy import QtCore
 from collections import OrderedDict
 from copy import copy
+import os
+import tempfile
 import time
 import datetime
+import weakref
+import zlib
 import numpy as np
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 
 from logic.generic_logic import GenericLogic
+from core.util.figure_rendering import FigureSpec
+from core.util.filters import scan_serpentine_line
 from core.util.mutex import Mutex
+from core.instrumentation import probe_signal, remove_signal_probe, timed
 from core.connector import Connector
+from core.configoption import ConfigOption
 from core.statusvariable import StatusVar
 
 
+def draw_scan_image(data, image_extent, scan_axis=None, cbar_range=None, percentile_range=None,
+                    crosshair_pos=None):
+    """ Create a 2-D color map figure of the scan image.
+
+    @param: array data: The NxM array of count values from a scan with NxM pixels.
+
+    @param: list image_extent: The scan range in the form [hor_min, hor_max, ver_min, ver_max]
+
+    @param: list axes: Names of the horizontal and vertical axes in the image
+
+    @param: list cbar_range: (optional) [color_scale_min, color_scale_max].  If not supplied then a default of
+                             data_min to data_max will be used.
+
+    @param: list percentile_range: (optional) Percentile range of the chosen cbar_range.
+
+    @param: list crosshair_pos: (optional) crosshair position as [hor, vert] in the chosen image axes.
+
+    @return: fig fig: a matplotlib figure object to be saved to file.
+
+    Defined at module level, so the SaveLogic can draw it in a figure rendering process.
+    """
+    if scan_axis is None:
+        scan_axis = ['X', 'Y']
+
+    # If no colorbar range was given, take full range of data
+    if cbar_range is None:
+        cbar_range = [np.min(data), np.max(data)]
+
+    # Scale color values using SI prefix
+    prefix = ['', 'k', 'M', 'G']
+    prefix_count = 0
+    image_data = data
+    draw_cb_range = np.array(cbar_range)
+    image_dimension = image_extent.copy()
+
+    while draw_cb_range[1] > 1000:
+        image_data = image_data/1000
+        draw_cb_range = draw_cb_range/1000
+        prefix_count = prefix_count + 1
+
+    c_prefix = prefix[prefix_count]
+
+
+    # Scale axes values using SI prefix
+    axes_prefix = ['', 'm', r'$\mathrm{\mu}$', 'n']
+    x_prefix_count = 0
+    y_prefix_count = 0
+
+    while np.abs(image_dimension[1]-image_dimension[0]) < 1:
+        image_dimension[0] = image_dimension[0] * 1000.
+        image_dimension[1] = image_dimension[1] * 1000.
+        x_prefix_count = x_prefix_count + 1
+
+    while np.abs(image_dimension[3] - image_dimension[2]) < 1:
+        image_dimension[2] = image_dimension[2] * 1000.
+        image_dimension[3] = image_dimension[3] * 1000.
+        y_prefix_count = y_prefix_count + 1
+
+    x_prefix = axes_prefix[x_prefix_count]
+    y_prefix = axes_prefix[y_prefix_count]
+
+    # Create figure
+    fig, ax = plt.subplots()
+
+    # Create image plot
+    cfimage = ax.imshow(image_data,
+                        cmap=plt.get_cmap('inferno'), # reference the right place in qd
+                        origin="lower",
+                        vmin=draw_cb_range[0],
+                        vmax=draw_cb_range[1],
+                        interpolation='none',
+                        extent=image_dimension
+                        )
+
+    ax.set_aspect(1)
+    ax.set_xlabel(scan_axis[0] + ' position (' + x_prefix + 'm)')
+    ax.set_ylabel(scan_axis[1] + ' position (' + y_prefix + 'm)')
+    ax.spines['bottom'].set_position(('outward', 10))
+    ax.spines['left'].set_position(('outward', 10))
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.get_xaxis().tick_bottom()
+    ax.get_yaxis().tick_left()
+
+    # draw the crosshair position if defined
+    if crosshair_pos is not None:
+        trans_xmark = mpl.transforms.blended_transform_factory(
+            ax.transData,
+            ax.transAxes)
+
+        trans_ymark = mpl.transforms.blended_transform_factory(
+            ax.transAxes,
+            ax.transData)
+
+        ax.annotate('', xy=(crosshair_pos[0]*np.power(1000,x_prefix_count), 0),
+                    xytext=(crosshair_pos[0]*np.power(1000,x_prefix_count), -0.01), xycoords=trans_xmark,
+                    arrowprops=dict(facecolor='#17becf', shrink=0.05),
+                    )
+
+        ax.annotate('', xy=(0, crosshair_pos[1]*np.power(1000,y_prefix_count)),
+                    xytext=(-0.01, crosshair_pos[1]*np.power(1000,y_prefix_count)), xycoords=trans_ymark,
+                    arrowprops=dict(facecolor='#17becf', shrink=0.05),
+                    )
+
+    # Draw the colorbar
+    cbar = plt.colorbar(cfimage, shrink=0.8)#, fraction=0.046, pad=0.08, shrink=0.75)
+    cbar.set_label('Fluorescence (' + c_prefix + 'c/s)')
+
+    # remove ticks from colorbar for cleaner image
+    cbar.ax.tick_params(which=u'both', length=0)
+
+    # If we have percentile information, draw that to the figure
+    if percentile_range is not None:
+        cbar.ax.annotate(str(percentile_range[0]),
+                         xy=(-0.3, 0.0),
+                         xycoords='axes fraction',
+                         horizontalalignment='right',
+                         verticalalignment='center',
+                         rotation=90
+                         )
+        cbar.ax.annotate(str(percentile_range[1]),
+                         xy=(-0.3, 1.0),
+                         xycoords='axes fraction',
+                         horizontalalignment='right',
+                         verticalalignment='center',
+                         rotation=90
+                         )
+        cbar.ax.annotate('(percentile)',
+                         xy=(-0.3, 0.5),
+                         xycoords='axes fraction',
+                         horizontalalignment='right',
+                         verticalalignment='center',
+                         rotation=90
+                         )
+    return fig
+
+
 class OldConfigFileError(Exception):
     """ Exception that is thrown when an old config file is loaded.
     """
@@ -41,6 +186,143 @@ class OldConfigFileError(Exception):
         super().__init__('Old configuration file detected. Ignoring confocal history.')
 
 
+class CompactScanImage:
+    """ Memory efficient, immutable copy of a confocal scan image.
+
+    A scan image has the shape (rows, columns, 3 + count channels) where the first three planes
+    are the x, y and z coordinates of each pixel. The coordinate planes are usually constant along
+    one image axis, so only one row or column of each is stored (the full plane otherwise) and
+    regenerated when the image is expanded again. The count channels are kept as they are and can
+    additionally be compressed or moved to a file on disk.
+    """
+
+    def __init__(self, image):
+        image = np.asarray(image)
+        self.shape = image.shape
+        self.dtype = image.dtype
+        self._coordinates = [self._compact_plane(image[:, :, i]) for i in range(3)]
+        self._counts = np.array(image[:, :, 3:])
+        self._compressed = None
+        self._filename = None
+
+    @staticmethod
+    def _compact_plane(plane):
+        """ Store a coordinate plane as one row, one column or (if necessary) completely. """
+        if np.all(plane == plane[0]):
+            return 'rows', plane[0].copy()
+        if np.all(plane == plane[:, :1]):
+            return 'columns', plane[:, 0].copy()
+        return 'full', plane.copy()
+
+    def _expand_plane(self, mode, values):
+        if mode == 'rows':
+            return values[np.newaxis, :]
+        if mode == 'columns':
+            return values[:, np.newaxis]
+        return values
+
+    @property
+    def storage(self):
+        """ Where the count data is kept: 'memory', 'compressed' or 'disk' """
+        if self._filename is not None:
+            return 'disk'
+        if self._compressed is not None:
+            return 'compressed'
+        return 'memory'
+
+    @property
+    def nbytes(self):
+        """ Number of bytes held in memory """
+        coordinate_bytes = sum(values.nbytes for _, values in self._coordinates)
+        if self._counts is not None:
+            return coordinate_bytes + self._counts.nbytes
+        if self._compressed is not None:
+            return coordinate_bytes + len(self._compressed)
+        return coordinate_bytes
+
+    @property
+    def counts(self):
+        """ The count channels of the image, shape (rows, columns, channels) """
+        if self._counts is not None:
+            return self._counts
+        if self._compressed is not None:
+            raw = zlib.decompress(self._compressed)
+        else:
+            with open(self._filename, 'rb') as file:
+                raw = file.read()
+        return np.frombuffer(raw, dtype=self.dtype).reshape(
+            self.shape[:2] + (self.shape[2] - 3,)).copy()
+
+    def to_array(self):
+        """ Expand into a full scan image including the coordinate planes.
+
+        @return numpy.ndarray: new scan image array
+        """
+        image = np.empty(self.shape, dtype=self.dtype)
+        for index, (mode, values) in enumerate(self._coordinates):
+            image[:, :, index] = self._expand_plane(mode, values)
+        image[:, :, 3:] = self.counts
+        return image
+
+    def matches(self, image):
+        """ Check if a full scan image is equal to this compact image. Only images with the count
+        data in memory are compared, compressed or spilled images never match.
+
+        @param numpy.ndarray image: full scan image
+
+        @return bool: True if the images are equal
+        """
+        if self._counts is None or image.shape != self.shape:
+            return False
+        for index, (mode, values) in enumerate(self._coordinates):
+            if not np.array_equal(image[:, :, index],
+                                  np.broadcast_to(self._expand_plane(mode, values),
+                                                  self.shape[:2])):
+                return False
+        return np.array_equal(image[:, :, 3:], self._counts)
+
+    def compress(self):
+        """ Compress the count data in memory. """
+        if self._counts is not None:
+            self._compressed = zlib.compress(np.ascontiguousarray(self._counts).tobytes(), 1)
+            self._counts = None
+
+    def spill(self, directory=None):
+        """ Move the count data into a file. The file is deleted with this object.
+
+        @param str directory: optional, directory for the file. Defaults to the temp directory.
+        """
+        if self._filename is not None:
+            return
+        counts = self.counts
+        handle, self._filename = tempfile.mkstemp(prefix='confocal_history_', suffix='.raw',
+                                                  dir=directory)
+        with os.fdopen(handle, 'wb') as file:
+            file.write(np.ascontiguousarray(counts).tobytes())
+        self._counts = None
+        self._compressed = None
+        weakref.finalize(self, os.remove, self._filename)
+
+    def serialize(self):
+        """ Give out a dictionary that can be saved via the usual means """
+        return {'shape': list(self.shape),
+                'coordinates': [[mode, values] for mode, values in self._coordinates],
+                'counts': self.counts}
+
+    @classmethod
+    def deserialize(cls, serialized):
+        """ Create a compact image from a dict created by serialize """
+        image = cls.__new__(cls)
+        image.shape = tuple(serialized['shape'])
+        image._coordinates = [(str(mode), np.asarray(values))
+                              for mode, values in serialized['coordinates']]
+        image._counts = np.asarray(serialized['counts'])
+        image.dtype = image._counts.dtype
+        image._compressed = None
+        image._filename = None
+        return image
+
+
 class ConfocalHistoryEntry(QtCore.QObject):
     """ This class contains all relevant parameters of a Confocal scan.
         It provides methods to extract, restore and serialize this data.
@@ -103,6 +385,59 @@ class ConfocalHistoryEntry(QtCore.QObject):
         self.tilt_reference_x = 0
         self.tilt_reference_y = 0
 
+        # compact copies of the scan images (CompactScanImage), possibly shared with other entries
+        self.xy_image_compact = None
+        self.depth_image_compact = None
+
+    @property
+    def xy_image(self):
+        return None if self.xy_image_compact is None else self.xy_image_compact.to_array()
+
+    @xy_image.setter
+    def xy_image(self, image):
+        self.xy_image_compact = CompactScanImage(image)
+
+    @property
+    def depth_image(self):
+        return None if self.depth_image_compact is None else self.depth_image_compact.to_array()
+
+    @depth_image.setter
+    def depth_image(self, image):
+        self.depth_image_compact = CompactScanImage(image)
+
+    @property
+    def nbytes(self):
+        """ Memory used by the images of this entry (shared images are counted fully) """
+        return sum(image.nbytes for image in (self.xy_image_compact, self.depth_image_compact)
+                   if image is not None)
+
+    def archive(self, storage='compressed', directory=None, keep=()):
+        """ Reduce the memory footprint of the images of this entry.
+
+        @param str storage: 'compressed' to compress the count data in memory, 'disk' to move it to
+                            files, 'memory' to keep it as it is
+        @param str directory: optional, directory for the files if storage is 'disk'
+        @param keep: optional, images left in memory because they are shared with history entries
+                     which are not archived
+        """
+        for image in (self.xy_image_compact, self.depth_image_compact):
+            if image is None or any(image is kept for kept in keep):
+                continue
+            if storage == 'compressed':
+                image.compress()
+            elif storage == 'disk':
+                image.spill(directory)
+
+    def resolve_shared_images(self, entries):
+        """ Share the images referenced during deserialization with the other history entries.
+
+        @param dict entries: deserialized history entries by their serialization index
+        """
+        for name, ref in getattr(self, '_image_refs', dict()).items():
+            if ref in entries:
+                setattr(self, name + '_compact', getattr(entries[ref], name + '_compact'))
+        self._image_refs = dict()
+
     def restore(self, confocal):
         """ Write data back into confocal logic and pull all the necessary strings """
         confocal._current_x = self.current_x
@@ -131,23 +466,26 @@ class ConfocalHistoryEntry(QtCore.QObject):
         confocal._scanning_device.tiltcorrection = self.tilt_correction
 
         confocal.initialize_image()
-        try:
-            if confocal.xy_image.shape == self.xy_image.shape:
-                confocal.xy_image = np.copy(self.xy_image)
-        except AttributeError:
-            self.xy_image = np.copy(confocal.xy_image)
+        if self.xy_image_compact is None:
+            self.xy_image = confocal.xy_image
+        elif confocal.xy_image.shape == self.xy_image_compact.shape:
+            confocal.xy_image = self.xy_image_compact.to_array()
 
         confocal._zscan = True
         confocal.initialize_image()
-        try:
-            if confocal.depth_image.shape == self.depth_image.shape:
-                confocal.depth_image = np.copy(self.depth_image)
-        except AttributeError:
-            self.depth_image = np.copy(confocal.depth_image)
+        if self.depth_image_compact is None:
+            self.depth_image = confocal.depth_image
+        elif confocal.depth_image.shape == self.depth_image_compact.shape:
+            confocal.depth_image = self.depth_image_compact.to_array()
         confocal._zscan = False
 
-    def snapshot(self, confocal):
-        """ Extract all necessary data from a confocal logic and keep it for later use """
+    def snapshot(self, confocal, previous=None):
+        """ Extract all necessary data from a confocal logic and keep it for later use
+
+        @param ConfocalLogic confocal: the logic to take the snapshot of
+        @param ConfocalHistoryEntry previous: optional, the previous history entry. Images that did
+                                              not change since then are shared instead of copied.
+        """
         self.current_x = confocal._current_x
         self.current_y = confocal._current_y
         self.current_z = confocal._current_z
@@ -172,11 +510,27 @@ class ConfocalHistoryEntry(QtCore.QObject):
         self.point1 = np.copy(confocal.point1)
         self.point2 = np.copy(confocal.point2)
         self.point3 = np.copy(confocal.point3)
-        self.xy_image = np.copy(confocal.xy_image)
-        self.depth_image = np.copy(confocal.depth_image)
+        if (previous is not None and previous.xy_image_compact is not None
+                and previous.xy_image_compact.matches(confocal.xy_image)):
+            self.xy_image_compact = previous.xy_image_compact
+        else:
+            self.xy_image = confocal.xy_image
+        if (previous is not None and previous.depth_image_compact is not None
+                and previous.depth_image_compact.matches(confocal.depth_image)):
+            self.depth_image_compact = previous.depth_image_compact
+        else:
+            self.depth_image = confocal.depth_image
 
-    def serialize(self):
-        """ Give out a dictionary that can be saved via the usual means """
+    def serialize(self, serialized_images=None, index=0):
+        """ Give out a dictionary that can be saved via the usual means
+
+        @param dict serialized_images: optional, maps id() of images already serialized with other
+                                       history entries to their index. Shared images are then
+                                       serialized only once and referenced by index.
+        @param int index: index this entry is serialized with
+        """
+        if serialized_images is None:
+            serialized_images = dict()
         serialized = dict()
         serialized['focus_position'] = [self.current_x, self.current_y, self.current_z, self.current_a]
         serialized['x_range'] = list(self.image_x_range)
@@ -197,12 +551,21 @@ class ConfocalHistoryEntry(QtCore.QObject):
         serialized['tilt_point3'] = list(self.point3)
         serialized['tilt_reference'] = [self.tilt_reference_x, self.tilt_reference_y]
         serialized['tilt_slope'] = [self.tilt_slope_x, self.tilt_slope_y]
-        serialized['xy_image'] = self.xy_image
-        serialized['depth_image'] = self.depth_image
+        for name in ('xy_image', 'depth_image'):
+            image = getattr(self, name + '_compact')
+            if image is None:
+                continue
+            if id(image) in serialized_images:
+                serialized[name + '_ref'] = serialized_images[id(image)]
+            else:
+                serialized[name + '_compact'] = image.serialize()
+                serialized_images[id(image)] = index
         return serialized
 
     def deserialize(self, serialized):
-        """ Restore Confocal history object from a dict """
+        """ Restore Confocal history object from a dict.
+        Images referenced by index are resolved later with resolve_shared_images.
+        """
         if 'focus_position' in serialized and len(serialized['focus_position']) == 4:
             self.current_x = serialized['focus_position'][0]
             self.current_y = serialized['focus_position'][1]
@@ -236,14 +599,21 @@ class ConfocalHistoryEntry(QtCore.QObject):
             self.point2 = np.array(serialized['tilt_point2'])
         if 'tilt_point3' in serialized and len(serialized['tilt_point3']) == 3:
             self.point3 = np.array(serialized['tilt_point3'])
-        if 'xy_image' in serialized:
+        self._image_refs = {name: serialized[name + '_ref']
+                            for name in ('xy_image', 'depth_image') if name + '_ref' in serialized}
+        if 'xy_image_compact' in serialized:
+            self.xy_image_compact = CompactScanImage.deserialize(serialized['xy_image_compact'])
+        elif 'xy_image' in serialized:
             if isinstance(serialized['xy_image'], np.ndarray):
                 self.xy_image = serialized['xy_image']
             else:
                 raise OldConfigFileError()
-        if 'depth_image' in serialized:
+        if 'depth_image_compact' in serialized:
+            self.depth_image_compact = CompactScanImage.deserialize(
+                serialized['depth_image_compact'])
+        elif 'depth_image' in serialized:
             if isinstance(serialized['depth_image'], np.ndarray):
-                self.depth_image = serialized['depth_image'].copy()
+                self.depth_image = serialized['depth_image']
             else:
                 raise OldConfigFileError()
 
@@ -251,24 +621,56 @@ class ConfocalHistoryEntry(QtCore.QObject):
 class ConfocalLogic(GenericLogic):
     """
     This is the Logic class for confocal scanning.
+
+    Example config for copy-paste:
+
+    scannerlogic:
+        module.Class: 'confocal_logic.ConfocalLogic'
+        connect:
+            confocalscanner1: 'scanner_tilt_interfuse'
+            savelogic: 'savelogic'
+        history_storage: 'compressed'  # optional, 'memory', 'compressed' or 'disk'
+        history_memory_length: 2  # optional, most recent history entries kept uncompressed
+        history_directory: 'C:/Temp'  # optional, only used for history_storage 'disk'
+        use_line_stream: True  # optional, scan all lines of an image with persistent hardware tasks
+        forward_pixel_lag: 0  # optional, delay of the counts behind the scanner in pixels
+        backward_pixel_lag: 0  # optional, the same for the backward lines of bidirectional scans
     """
 
     # declare connectors
     confocalscanner1 = Connector(interface='ConfocalScannerInterface')
     savelogic = Connector(interface='SaveLogic')
 
+    # config options
+    # how history entries except the most recent ones are kept: 'memory', 'compressed' or 'disk'
+    _history_storage = ConfigOption('history_storage', 'memory')
+    # number of most recent history entries which are always kept uncompressed in memory
+    _history_memory_length = ConfigOption('history_memory_length', 2)
+    # directory for history entries with history_storage 'disk'. Defaults to the temp directory.
+    _history_directory = ConfigOption('history_directory', None)
+    # let the scanner stream all lines of an image instead of setting it up for every line,
+    # only used if the scanner supports it
+    _use_line_stream = ConfigOption('use_line_stream', True)
+    # delay of the counts behind the scanner position in pixels (may be fractional), for lines
+    # scanned forwards and backwards. The counts are shifted back by it.
+    _forward_pixel_lag = ConfigOption('forward_pixel_lag', 0)
+    _backward_pixel_lag = ConfigOption('backward_pixel_lag', 0)
+
     # status vars
     _clock_frequency = StatusVar('clock_frequency', 500)
     return_slowness = StatusVar(default=50)
     max_history_length = StatusVar(default=10)
+    # scan every second line backwards and record it instead of returning without counting
+    bidirectional_scan = StatusVar(default=False)
 
     # signals
     signal_start_scanning = QtCore.Signal(str)
     signal_continue_scanning = QtCore.Signal(str)
     signal_stop_scanning = QtCore.Signal()
     signal_scan_lines_next = QtCore.Signal()
-    signal_xy_image_updated = QtCore.Signal()
-    signal_depth_image_updated = QtCore.Signal()
+    # carry a DataSnapshot of either the whole image or of the line scanned last
+    signal_xy_image_updated = QtCore.Signal(object)
+    signal_depth_image_updated = QtCore.Signal(object)
     signal_change_position = QtCore.Signal(str)
     signal_save_started = QtCore.Signal()
     signal_xy_data_saved = QtCore.Signal()
@@ -299,6 +701,11 @@ class ConfocalLogic(GenericLogic):
         self.depth_scan_dir_is_xz = True
         self.depth_img_is_xz = True
         self.permanent_scan = False
+        # coordinate transformation of the scanner interfuses and the positions of the image
+        # pixels before and after it, computed at the start of a scan
+        self._scan_transform = None
+        self._scan_grid = None
+        self._transformed_scan_grid = None
 
     def on_activate(self):
         """ Initialisation performed during activation of the module.
@@ -313,12 +720,14 @@ class ConfocalLogic(GenericLogic):
 
         # restore here ...
         self.history = []
+        loaded_history = dict()
         for i in reversed(range(1, self.max_history_length)):
             try:
                 new_history_item = ConfocalHistoryEntry(self)
                 new_history_item.deserialize(
                     self._statusVariables['history_{0}'.format(i)])
                 self.history.append(new_history_item)
+                loaded_history[i] = new_history_item
             except KeyError:
                 pass
             except OldConfigFileError:
@@ -330,23 +739,31 @@ class ConfocalLogic(GenericLogic):
         try:
             new_state = ConfocalHistoryEntry(self)
             new_state.deserialize(self._statusVariables['history_0'])
+            loaded_history[0] = new_state
             new_state.restore(self)
         except:
             new_state = ConfocalHistoryEntry(self)
             new_state.restore(self)
         finally:
             self.history.append(new_state)
+        # images shared between history entries are only saved once
+        for history_item in loaded_history.values():
+            history_item.resolve_shared_images(loaded_history)
 
-        self.history_index = len(self.history) - 1
+        self._trim_history()
 
         # Sets connections between signals and functions
         self.signal_scan_lines_next.connect(self._scan_line, QtCore.Qt.QueuedConnection)
+        self._scan_lines_next_probe = probe_signal(
+            self.signal_scan_lines_next, '{0}.signal_scan_lines_next'.format(self._name), self)
         self.signal_start_scanning.connect(self.start_scanner, QtCore.Qt.QueuedConnection)
         self.signal_continue_scanning.connect(self.continue_scanner, QtCore.Qt.QueuedConnection)
 
         self._signal_save_xy.connect(self._save_xy_data, QtCore.Qt.QueuedConnection)
         self._signal_save_depth.connect(self._save_depth_data, QtCore.Qt.QueuedConnection)
 
+        self._publish_image('xy_image')
+        self._publish_image('depth_image')
         self._change_position('activation')
 
     def on_deactivate(self):
@@ -354,12 +771,15 @@ class ConfocalLogic(GenericLogic):
 
         @return int: error code (0:OK, -1:error)
         """
+        remove_signal_probe(self._scan_lines_next_probe)
         closing_state = ConfocalHistoryEntry(self)
-        closing_state.snapshot(self)
+        closing_state.snapshot(self, self.history[-1] if self.history else None)
         self.history.append(closing_state)
+        serialized_images = dict()
         histindex = 0
         for state in reversed(self.history):
-            self._statusVariables['history_{0}'.format(histindex)] = state.serialize()
+            self._statusVariables['history_{0}'.format(histindex)] = state.serialize(
+                serialized_images, histindex)
             histindex += 1
         return 0
 
@@ -389,6 +809,20 @@ class ConfocalLogic(GenericLogic):
         else:
             return 0
 
+    def set_bidirectional_scan(self, bidirectional):
+        """Sets whether every second line is scanned backwards (serpentine scan), recording
+        counts on the way back instead of returning to the start of the next line.
+
+        @param bool bidirectional: scan bidirectionally
+
+        @return int: error code (0:OK, -1:error)
+        """
+        if self.module_state() == 'locked':
+            self.log.error('Can not change the scan direction during a scan.')
+            return -1
+        self.bidirectional_scan = bool(bidirectional)
+        return 0
+
     def start_scanning(self, zscan = False, tag='logic'):
         """Starts scanning
 
@@ -539,6 +973,7 @@ class ConfocalLogic(GenericLogic):
                 self._return_YL = np.linspace(self._YL[-1], self._YL[0], self.return_slowness)
                 self._return_AL = np.zeros(self._return_YL.shape)
 
+            self._publish_image('depth_image')
             self.sigImageDepthInitialized.emit()
 
         # xy scan is in xy plane
@@ -561,6 +996,7 @@ class ConfocalLogic(GenericLogic):
             self.xy_image[:, :, 2] = self._current_z * np.ones(
                 (len(self._image_vert_axis), len(self._X)))
 
+            self._publish_image('xy_image')
             self.sigImageXYInitialized.emit()
         return 0
 
@@ -595,6 +1031,8 @@ class ConfocalLogic(GenericLogic):
             self.set_position('scanner')
             return -1
 
+        self._transform_scan_grid()
+        self._set_up_line_stream()
         self.signal_scan_lines_next.emit()
         return 0
 
@@ -624,14 +1062,90 @@ class ConfocalLogic(GenericLogic):
             self.set_position('scanner')
             return -1
 
+        self._transform_scan_grid()
+        self._set_up_line_stream()
         self.signal_scan_lines_next.emit()
         return 0
 
+    def _transform_scan_grid(self):
+        """ Transforms the positions of all pixels of the image at once, if the scanner is made of
+        coordinate transforming interfuses (see core.util.coordinate_transform), instead of letting
+        every interfuse transform every line on its own.
+        """
+        self._scan_transform = None
+        self._scan_grid = None
+        self._transformed_scan_grid = None
+        if not hasattr(self._scanning_device, 'get_coordinate_transform'):
+            return
+        try:
+            transform, device = self._scanning_device.get_coordinate_transform()
+        except:
+            self.log.exception('Could not get the coordinate transformation of the scanner, the '
+                               'lines are transformed by the scanner.')
+            return
+        if transform.is_affine:
+            # an affine transformation like the tilt correction is as fast on every single line
+            return
+        image = self.depth_image if self._zscan else self.xy_image
+        n_ch = len(self.get_scanner_axes())
+        # the positions of the lines as built by _scan_line
+        grid = np.empty((n_ch, image.shape[0], image.shape[1]))
+        grid[:min(n_ch, 3)] = np.moveaxis(image[:, :, :min(n_ch, 3)], 2, 0)
+        if not self._zscan and n_ch > 2:
+            grid[2] = self._current_z
+        if n_ch > 3:
+            grid[3] = self._current_a
+        self._scan_transform = transform
+        self._scan_grid = grid
+        self._transformed_scan_grid = transform.apply(grid)
+
+    def _scan_device_line(self, line, row=None, backward=False, pixel_clock=False):
+        """ Scans a line with the scanner. If the scanner transforms the coordinates, the line is
+        taken from the transformed image grid if it is the unchanged row of the image, otherwise
+        it is transformed on its own.
+
+        @param numpy.ndarray line: positions of the line
+        @param int row: optional, row of the image the line is made of
+        @param bool backward: the line is the row scanned from its end to its start
+        @param bool pixel_clock: whether we need to output a pixel clock for this line
+
+        @return numpy.ndarray: the counts of the line
+        """
+        if self._scan_transform is None:
+            return self._scanning_device.scan_line(line, pixel_clock=pixel_clock)
+
+        # the corrections of the interfuses may change during the scan, like the tilt correction
+        transform, device = self._scanning_device.get_coordinate_transform()
+        step = -1 if backward else 1
+        if row is not None and (transform is self._scan_transform
+                                or transform == self._scan_transform) \
+                and np.array_equal(line, self._scan_grid[:, row, ::step]):
+            line = np.ascontiguousarray(self._transformed_scan_grid[:, row, ::step])
+        else:
+            line = transform.apply(line)
+        return device.scan_line(line, pixel_clock=pixel_clock)
+
+    def _set_up_line_stream(self):
+        """ Lets the scanner stream all lines of the image (scan lines and return lines) without
+        setting up its tasks for every single line, if it supports that.
+        """
+        if not self._use_line_stream:
+            return
+        image = self.depth_image if self._zscan else self.xy_image
+        max_line_length = max(image.shape[1], self.return_slowness)
+        if self._scanning_device.set_up_line_stream(max_line_length) < 0:
+            self.log.debug('Scanner does not stream lines, it is set up for every line.')
+
     def kill_scanner(self):
         """Closing the scanner device.
 
         @return int: error code (0:OK, -1:error)
         """
+        if self._use_line_stream:
+            try:
+                self._scanning_device.close_line_stream()
+            except Exception as e:
+                self.log.exception('Could not close the line stream of the scanner.')
         try:
             self._scanning_device.close_scanner()
         except Exception as e:
@@ -712,6 +1226,34 @@ class ConfocalLogic(GenericLogic):
         """
         return self._scanning_device.get_scanner_count_channels()
 
+    def _publish_image(self, name):
+        """ Publish a snapshot of a whole image.
+
+        @param str name: 'xy_image' or 'depth_image'
+
+        @return DataSnapshot: snapshot with the image (copied) and row None
+        """
+        image = self.depth_image if name == 'depth_image' else self.xy_image
+        return self.publish_snapshot(name, row=None, image=image)
+
+    def _publish_image_line(self, name, row):
+        """ Publish a snapshot of a single line of an image, to be applied by the receiver on top
+        of the last whole image snapshot. Copying only the new line keeps the cost per line
+        independent of the image size.
+
+        @param str name: 'xy_image' or 'depth_image'
+        @param int row: index of the line
+
+        @return DataSnapshot: snapshot named <name>_line with row, line and image_version, the
+                              version of the whole image snapshot the line belongs to
+        """
+        image = self.depth_image if name == 'depth_image' else self.xy_image
+        return self.publish_snapshot('{0}_line'.format(name),
+                                     row=row,
+                                     line=image[row],
+                                     image_version=self.get_snapshot(name).version)
+
+    @timed()
     def _scan_line(self):
         """scanning an image in either depth or xy
 
@@ -722,8 +1264,8 @@ class ConfocalLogic(GenericLogic):
                 self.kill_scanner()
                 self.stopRequested = False
                 self.module_state.unlock()
-                self.signal_xy_image_updated.emit()
-                self.signal_depth_image_updated.emit()
+                self.signal_xy_image_updated.emit(self._publish_image('xy_image'))
+                self.signal_depth_image_updated.emit(self._publish_image('depth_image'))
                 self.set_position('scanner')
                 if self._zscan:
                     self._depth_line_pos = self._scan_counter
@@ -731,11 +1273,9 @@ class ConfocalLogic(GenericLogic):
                     self._xy_line_pos = self._scan_counter
                 # add new history entry
                 new_history = ConfocalHistoryEntry(self)
-                new_history.snapshot(self)
+                new_history.snapshot(self, self.history[-1] if self.history else None)
                 self.history.append(new_history)
-                if len(self.history) > self.max_history_length:
-                    self.history.pop(0)
-                self.history_index = len(self.history) - 1
+                self._trim_history()
                 return
 
         image = self.depth_image if self._zscan else self.xy_image
@@ -756,7 +1296,7 @@ class ConfocalLogic(GenericLogic):
                     start_line = np.vstack(
                         [lsx, lsy, lsz, np.ones(lsx.shape) * self._current_a])
                 # move to the start position of the scan, counts are thrown away
-                start_line_counts = self._scanning_device.scan_line(start_line)
+                start_line_counts = self._scan_device_line(start_line)
                 if np.any(start_line_counts == -1):
                     self.stopRequested = True
                     self.signal_scan_lines_next.emit()
@@ -777,15 +1317,21 @@ class ConfocalLogic(GenericLogic):
                 line = np.vstack(
                     [lsx, lsy, lsz, np.ones(lsx.shape) * self._current_a])
 
-            # scan the line in the scan
-            line_counts = self._scanning_device.scan_line(line, pixel_clock=True)
+            # scan the line in the scan, in a bidirectional scan every second line backwards
+            line_counts, return_to_start = scan_serpentine_line(
+                lambda scan_line, backward: self._scan_device_line(
+                    scan_line, row=self._scan_counter, backward=backward, pixel_clock=True),
+                line, self._scan_counter, np.size(self._image_vert_axis), self.bidirectional_scan,
+                self._forward_pixel_lag, self._backward_pixel_lag)
             if np.any(line_counts == -1):
                 self.stopRequested = True
                 self.signal_scan_lines_next.emit()
                 return
 
+            if not return_to_start:
+                return_line = None
             # make a line to go to the starting position of the next scan line
-            if self.depth_img_is_xz or not self._zscan:
+            elif self.depth_img_is_xz or not self._zscan:
                 if n_ch <= 3:
                     return_line = np.vstack([
                         self._return_XL,
@@ -815,11 +1361,12 @@ class ConfocalLogic(GenericLogic):
                         ])
 
             # return the scanner to the start of next line, counts are thrown away
-            return_line_counts = self._scanning_device.scan_line(return_line)
-            if np.any(return_line_counts == -1):
-                self.stopRequested = True
-                self.signal_scan_lines_next.emit()
-                return
+            if return_line is not None:
+                return_line_counts = self._scan_device_line(return_line)
+                if np.any(return_line_counts == -1):
+                    self.stopRequested = True
+                    self.signal_scan_lines_next.emit()
+                    return
 
             # update image with counts from the line we just scanned
             if self._zscan:
@@ -827,10 +1374,12 @@ class ConfocalLogic(GenericLogic):
                     self.depth_image[self._scan_counter, :, 3:3 + s_ch] = line_counts
                 else:
                     self.depth_image[self._scan_counter, :, 3:3 + s_ch] = line_counts
-                self.signal_depth_image_updated.emit()
+                self.signal_depth_image_updated.emit(
+                    self._publish_image_line('depth_image', self._scan_counter))
             else:
                 self.xy_image[self._scan_counter, :, 3:3 + s_ch] = line_counts
-                self.signal_xy_image_updated.emit()
+                self.signal_xy_image_updated.emit(
+                    self._publish_image_line('xy_image', self._scan_counter))
 
             # next line in scan
             self._scan_counter += 1
@@ -898,7 +1447,6 @@ class ConfocalLogic(GenericLogic):
         parameters['Return Slowness (Steps during retrace line)'] = self.return_slowness
 
         # Prepare a figure to be saved
-        figure_data = self.xy_image[:, :, 3]
         image_extent = [self.image_x_range[0],
                         self.image_x_range[1],
                         self.image_y_range[0],
@@ -906,12 +1454,14 @@ class ConfocalLogic(GenericLogic):
         axes = ['X', 'Y']
         crosshair_pos = [self.get_position()[0], self.get_position()[1]]
 
-        figs = {ch: self.draw_figure(data=self.xy_image[:, :, 3 + n],
-                                     image_extent=image_extent,
-                                     scan_axis=axes,
-                                     cbar_range=colorscale_range,
-                                     percentile_range=percentile_range,
-                                     crosshair_pos=crosshair_pos)
+        # the figures are drawn by the figure rendering processes of the save logic
+        figs = {ch: FigureSpec(draw_scan_image,
+                               data=self.xy_image[:, :, 3 + n],
+                               image_extent=image_extent,
+                               scan_axis=axes,
+                               cbar_range=colorscale_range,
+                               percentile_range=percentile_range,
+                               crosshair_pos=crosshair_pos)
                 for n, ch in enumerate(self.get_scanner_count_channels())}
 
         # Save the image data and figure
@@ -1015,12 +1565,14 @@ class ConfocalLogic(GenericLogic):
                         self.image_z_range[0],
                         self.image_z_range[1]]
 
-        figs = {ch: self.draw_figure(data=self.depth_image[:, :, 3 + n],
-                                     image_extent=image_extent,
-                                     scan_axis=axes,
-                                     cbar_range=colorscale_range,
-                                     percentile_range=percentile_range,
-                                     crosshair_pos=crosshair_pos)
+        # the figures are drawn by the figure rendering processes of the save logic
+        figs = {ch: FigureSpec(draw_scan_image,
+                               data=self.depth_image[:, :, 3 + n],
+                               image_extent=image_extent,
+                               scan_axis=axes,
+                               cbar_range=colorscale_range,
+                               percentile_range=percentile_range,
+                               crosshair_pos=crosshair_pos)
                 for n, ch in enumerate(self.get_scanner_count_channels())}
 
         # Save the image data and figure
@@ -1066,139 +1618,14 @@ class ConfocalLogic(GenericLogic):
         return
 
     def draw_figure(self, data, image_extent, scan_axis=None, cbar_range=None, percentile_range=None,  crosshair_pos=None):
-        """ Create a 2-D color map figure of the scan image.
-
-        @param: array data: The NxM array of count values from a scan with NxM pixels.
-
-        @param: list image_extent: The scan range in the form [hor_min, hor_max, ver_min, ver_max]
-
-        @param: list axes: Names of the horizontal and vertical axes in the image
-
-        @param: list cbar_range: (optional) [color_scale_min, color_scale_max].  If not supplied then a default of
-                                 data_min to data_max will be used.
-
-        @param: list percentile_range: (optional) Percentile range of the chosen cbar_range.
-
-        @param: list crosshair_pos: (optional) crosshair position as [hor, vert] in the chosen image axes.
+        """ Create a 2-D color map figure of the scan image, see draw_scan_image.
 
         @return: fig fig: a matplotlib figure object to be saved to file.
         """
-        if scan_axis is None:
-            scan_axis = ['X', 'Y']
-
-        # If no colorbar range was given, take full range of data
-        if cbar_range is None:
-            cbar_range = [np.min(data), np.max(data)]
-
-        # Scale color values using SI prefix
-        prefix = ['', 'k', 'M', 'G']
-        prefix_count = 0
-        image_data = data
-        draw_cb_range = np.array(cbar_range)
-        image_dimension = image_extent.copy()
-
-        while draw_cb_range[1] > 1000:
-            image_data = image_data/1000
-            draw_cb_range = draw_cb_range/1000
-            prefix_count = prefix_count + 1
-
-        c_prefix = prefix[prefix_count]
-
-
-        # Scale axes values using SI prefix
-        axes_prefix = ['', 'm', r'$\mathrm{\mu}$', 'n']
-        x_prefix_count = 0
-        y_prefix_count = 0
-
-        while np.abs(image_dimension[1]-image_dimension[0]) < 1:
-            image_dimension[0] = image_dimension[0] * 1000.
-            image_dimension[1] = image_dimension[1] * 1000.
-            x_prefix_count = x_prefix_count + 1
-
-        while np.abs(image_dimension[3] - image_dimension[2]) < 1:
-            image_dimension[2] = image_dimension[2] * 1000.
-            image_dimension[3] = image_dimension[3] * 1000.
-            y_prefix_count = y_prefix_count + 1
-
-        x_prefix = axes_prefix[x_prefix_count]
-        y_prefix = axes_prefix[y_prefix_count]
-
         # Use qudi style
         plt.style.use(self._save_logic.mpl_qd_style)
-
-        # Create figure
-        fig, ax = plt.subplots()
-
-        # Create image plot
-        cfimage = ax.imshow(image_data,
-                            cmap=plt.get_cmap('inferno'), # reference the right place in qd
-                            origin="lower",
-                            vmin=draw_cb_range[0],
-                            vmax=draw_cb_range[1],
-                            interpolation='none',
-                            extent=image_dimension
-                            )
-
-        ax.set_aspect(1)
-        ax.set_xlabel(scan_axis[0] + ' position (' + x_prefix + 'm)')
-        ax.set_ylabel(scan_axis[1] + ' position (' + y_prefix + 'm)')
-        ax.spines['bottom'].set_position(('outward', 10))
-        ax.spines['left'].set_position(('outward', 10))
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.get_xaxis().tick_bottom()
-        ax.get_yaxis().tick_left()
-
-        # draw the crosshair position if defined
-        if crosshair_pos is not None:
-            trans_xmark = mpl.transforms.blended_transform_factory(
-                ax.transData,
-                ax.transAxes)
-
-            trans_ymark = mpl.transforms.blended_transform_factory(
-                ax.transAxes,
-                ax.transData)
-
-            ax.annotate('', xy=(crosshair_pos[0]*np.power(1000,x_prefix_count), 0),
-                        xytext=(crosshair_pos[0]*np.power(1000,x_prefix_count), -0.01), xycoords=trans_xmark,
-                        arrowprops=dict(facecolor='#17becf', shrink=0.05),
-                        )
-
-            ax.annotate('', xy=(0, crosshair_pos[1]*np.power(1000,y_prefix_count)),
-                        xytext=(-0.01, crosshair_pos[1]*np.power(1000,y_prefix_count)), xycoords=trans_ymark,
-                        arrowprops=dict(facecolor='#17becf', shrink=0.05),
-                        )
-
-        # Draw the colorbar
-        cbar = plt.colorbar(cfimage, shrink=0.8)#, fraction=0.046, pad=0.08, shrink=0.75)
-        cbar.set_label('Fluorescence (' + c_prefix + 'c/s)')
-
-        # remove ticks from colorbar for cleaner image
-        cbar.ax.tick_params(which=u'both', length=0)
-
-        # If we have percentile information, draw that to the figure
-        if percentile_range is not None:
-            cbar.ax.annotate(str(percentile_range[0]),
-                             xy=(-0.3, 0.0),
-                             xycoords='axes fraction',
-                             horizontalalignment='right',
-                             verticalalignment='center',
-                             rotation=90
-                             )
-            cbar.ax.annotate(str(percentile_range[1]),
-                             xy=(-0.3, 1.0),
-                             xycoords='axes fraction',
-                             horizontalalignment='right',
-                             verticalalignment='center',
-                             rotation=90
-                             )
-            cbar.ax.annotate('(percentile)',
-                             xy=(-0.3, 0.5),
-                             xycoords='axes fraction',
-                             horizontalalignment='right',
-                             verticalalignment='center',
-                             rotation=90
-                             )
+        fig = draw_scan_image(data, image_extent, scan_axis=scan_axis, cbar_range=cbar_range,
+                              percentile_range=percentile_range, crosshair_pos=crosshair_pos)
         self.signal_draw_figure_completed.emit()
         return fig
 
@@ -1242,14 +1669,30 @@ class ConfocalLogic(GenericLogic):
         self._scanning_device.tilt_reference_y = self._scanning_device.get_scanner_position()[1]
         self.signal_tilt_correction_active.emit(enabled)
 
+    def _trim_history(self):
+        """ Drop the oldest history entries beyond max_history_length and archive all but the most
+        recent entries according to the history_storage config option.
+        """
+        while len(self.history) > max(self.max_history_length, 1):
+            self.history.pop(0)
+        self.history_index = len(self.history) - 1
+        if self._history_storage != 'memory':
+            num_recent = max(self._history_memory_length, 1)
+            # an image shared with a recent entry has to stay in memory for it
+            recent_images = [image for entry in self.history[-num_recent:]
+                             for image in (entry.xy_image_compact, entry.depth_image_compact)
+                             if image is not None]
+            for entry in self.history[:-num_recent]:
+                entry.archive(self._history_storage, self._history_directory, recent_images)
+
     def history_forward(self):
         """ Move forward in confocal image history.
         """
         if self.history_index < len(self.history) - 1:
             self.history_index += 1
             self.history[self.history_index].restore(self)
-            self.signal_xy_image_updated.emit()
-            self.signal_depth_image_updated.emit()
+            self.signal_xy_image_updated.emit(self._publish_image('xy_image'))
+            self.signal_depth_image_updated.emit(self._publish_image('depth_image'))
             self.signal_tilt_correction_update.emit()
             self.signal_tilt_correction_active.emit(self._scanning_device.tiltcorrection)
             self._change_position('history')
@@ -1262,8 +1705,8 @@ class ConfocalLogic(GenericLogic):
         if self.history_index > 0:
             self.history_index -= 1
             self.history[self.history_index].restore(self)
-            self.signal_xy_image_updated.emit()
-            self.signal_depth_image_updated.emit()
+            self.signal_xy_image_updated.emit(self._publish_image('xy_image'))
+            self.signal_depth_image_updated.emit(self._publish_image('depth_image'))
             self.signal_tilt_correction_update.emit()
             self.signal_tilt_correction_active.emit(self._scanning_device.tiltcorrection)
             self._change_position('history')
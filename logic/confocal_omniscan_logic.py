@@ -30,6 +30,7 @@ import matplotlib.pyplot as plt
 from io import BytesIO
 
 from logic.generic_logic import GenericLogic
+from core.util.filters import scan_serpentine_line
 from core.util.mutex import Mutex
 from core.module import Connector
 from core.configoption import ConfigOption
@@ -261,10 +262,18 @@ class ConfocalLogic(GenericLogic):
     confocalscanner1 = Connector(interface='ConfocalScannerInterface')
     savelogic = Connector(interface='SaveLogic')
 
+    # config options
+    # delay of the counts behind the scanner position in pixels (may be fractional), for lines
+    # scanned forwards and backwards. The counts are shifted back by it.
+    _forward_pixel_lag = ConfigOption('forward_pixel_lag', 0)
+    _backward_pixel_lag = ConfigOption('backward_pixel_lag', 0)
+
     # status vars
     _clock_frequency = StatusVar('clock_frequency', 500)
     return_slowness = StatusVar(default=50)
     max_history_length = StatusVar(default=10)
+    # scan every second line backwards and record it instead of returning without counting
+    bidirectional_scan = StatusVar(default=False)
 
     # signals
     signal_start_scanning = QtCore.Signal(str)
@@ -386,6 +395,20 @@ class ConfocalLogic(GenericLogic):
         else:
             return 0
 
+    def set_bidirectional_scan(self, bidirectional):
+        """Sets whether every second line is scanned backwards (serpentine scan), recording
+        counts on the way back instead of returning to the start of the next line.
+
+        @param bool bidirectional: scan bidirectionally
+
+        @return int: error code (0:OK, -1:error)
+        """
+        if self.module_state() == 'locked':
+            self.log.error('Can not change the scan direction during a scan.')
+            return -1
+        self.bidirectional_scan = bool(bidirectional)
+        return 0
+
     def start_scanning(self, zscan=False, tag='logic'):
         """Starts scanning
 
@@ -774,15 +797,21 @@ class ConfocalLogic(GenericLogic):
                 line = np.vstack(
                     [lsx, lsy, lsz, np.ones(lsx.shape) * self._current_a])
 
-            # scan the line in the scan
-            line_counts = self._scanning_device.scan_line(line, pixel_clock=True)
+            # scan the line in the scan, in a bidirectional scan every second line backwards
+            line_counts, return_to_start = scan_serpentine_line(
+                lambda scan_line, backward: self._scanning_device.scan_line(
+                    scan_line, pixel_clock=True),
+                line, self._scan_counter, np.size(self._image_vert_axis), self.bidirectional_scan,
+                self._forward_pixel_lag, self._backward_pixel_lag)
             if np.any(line_counts == -1):
                 self.stopRequested = True
                 self.signal_scan_lines_next.emit()
                 return
 
+            if not return_to_start:
+                return_line = None
             # make a line to go to the starting position of the next scan line
-            if self.depth_img_is_xz or not self._zscan:
+            elif self.depth_img_is_xz or not self._zscan:
                 if n_ch <= 3:
                     return_line = np.vstack([
                         self._return_XL,
@@ -812,11 +841,12 @@ class ConfocalLogic(GenericLogic):
                         ])
 
             # return the scanner to the start of next line, counts are thrown away
-            return_line_counts = self._scanning_device.scan_line(return_line)
-            if np.any(return_line_counts == -1):
-                self.stopRequested = True
-                self.signal_scan_lines_next.emit()
-                return
+            if return_line is not None:
+                return_line_counts = self._scanning_device.scan_line(return_line)
+                if np.any(return_line_counts == -1):
+                    self.stopRequested = True
+                    self.signal_scan_lines_next.emit()
+                    return
 
             # update image with counts from the line we just scanned
             if self._zscan:
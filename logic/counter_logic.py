@@ -30,6 +30,7 @@ from core.statusvariable import StatusVar
 from logic.generic_logic import GenericLogic
 from interface.slow_counter_interface import CountingMode
 from core.util.mutex import Mutex
+from core.instrumentation import probe_signal, remove_signal_probe, timed
 
 
 class CounterLogic(GenericLogic):
@@ -42,7 +43,8 @@ class CounterLogic(GenericLogic):
 
     @return error: 0 is OK, -1 is error
     """
-    sigCounterUpdated = QtCore.Signal()
+    # carries the 'counts' DataSnapshot with countdata and countdata_smoothed
+    sigCounterUpdated = QtCore.Signal(object)
 
     sigCountDataNext = QtCore.Signal()
 
@@ -125,6 +127,8 @@ class CounterLogic(GenericLogic):
 
         # connect signals
         self.sigCountDataNext.connect(self.count_loop_body, QtCore.Qt.QueuedConnection)
+        self._count_data_next_probe = probe_signal(
+            self.sigCountDataNext, '{0}.sigCountDataNext'.format(self._name), self)
         return
 
     def on_deactivate(self):
@@ -137,6 +141,7 @@ class CounterLogic(GenericLogic):
         if self.module_state() == 'locked':
             self._stopCount_wait()
 
+        remove_signal_probe(self._count_data_next_probe)
         self.sigCountDataNext.disconnect()
         return
 
@@ -446,6 +451,7 @@ class CounterLogic(GenericLogic):
                 self.stopRequested = True
         return
 
+    @timed()
     def count_loop_body(self):
         """ This method gets the count data from the hardware for the continuous counting mode (default).
 
@@ -464,7 +470,7 @@ class CounterLogic(GenericLogic):
                     # switch the state variable off again
                     self.stopRequested = False
                     self.module_state.unlock()
-                    self.sigCounterUpdated.emit()
+                    self._publish_counts()
                     return
 
                 # read the current counter value
@@ -483,10 +489,18 @@ class CounterLogic(GenericLogic):
                         self.log.error('No valid counting mode set! Can not process counter data.')
 
             # call this again from event loop
-            self.sigCounterUpdated.emit()
+            self._publish_counts()
             self.sigCountDataNext.emit()
         return
 
+    def _publish_counts(self):
+        """ Publish a snapshot of the count traces and send it with sigCounterUpdated. """
+        snapshot = self.publish_snapshot('counts',
+                                         countdata=self.countdata,
+                                         countdata_smoothed=self.countdata_smoothed)
+        self.sigCounterUpdated.emit(snapshot)
+        return
+
     def save_current_count_trace(self, name_tag=''):
         """ The currently displayed counttrace will be saved.
 
@@ -18,11 +18,70 @@ along with Qudi. If not, see <http://www.gnu.org/licenses/>.
 Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
 top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
 """
+import time
+import numpy as np
+from collections.abc import Mapping
 from qtpy import QtCore
 from core.module import Base
 from core.util.mutex import Mutex
 
 
+class DataSnapshot(Mapping):
+    """ Immutable, versioned bundle of data published by a logic module.
+
+    Arrays are copied when the snapshot is created and marked read-only, so a receiver (usually a
+    GUI) can keep and read them in its own thread without locks, while the logic continues to work
+    on its live buffers. Items are accessed like a dict (snapshot['signal_data']) or as attributes
+    (snapshot.signal_data).
+    """
+    __slots__ = ('name', 'version', 'timestamp', '_data')
+
+    def __init__(self, name, version, data, timestamp=None):
+        """
+        @param str name: name the snapshot is published under
+        @param int version: version number, increasing with every publication of the same name
+        @param dict data: the data, numpy arrays are copied
+        @param float timestamp: optional, time.time() of the publication. Defaults to now.
+        """
+        frozen = dict()
+        for key, value in data.items():
+            if isinstance(value, np.ndarray):
+                value = np.array(value)
+                value.flags.writeable = False
+            frozen[key] = value
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'timestamp', time.time() if timestamp is None else timestamp)
+        object.__setattr__(self, '_data', frozen)
+
+    def __setattr__(self, key, value):
+        raise AttributeError('DataSnapshot is immutable.')
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __getattr__(self, key):
+        if key == '_data':
+            raise AttributeError(key)
+        try:
+            return self._data[key]
+        except KeyError:
+            raise AttributeError(key) from None
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return '<DataSnapshot {0!r} v{1} ({2})>'.format(
+            self.name, self.version, ', '.join(self._data))
+
+    def __reduce__(self):
+        return self.__class__, (self.name, self.version, self._data, self.timestamp)
+
+
 class GenericLogic(Base):
     """A generic logic interface class.
     """
@@ -35,6 +94,7 @@ class GenericLogic(Base):
         """
         super().__init__(**kwargs)
         self.taskLock = Mutex()
+        self._snapshots = dict()
 
     @QtCore.Slot(QtCore.QThread)
     def moveToThread(self, thread):
@@ -59,3 +119,29 @@ class GenericLogic(Base):
                 return self._manager.tr
             else:
                 raise Exception('Tried to access task runner without loading one!')
+
+    def publish_snapshot(self, name, **data):
+        """ Publish an immutable copy of data, to be passed on with the update signal.
+
+        @param str name: name of the snapshot, e.g. 'measurement'
+        @param data: keyword arguments with the data to publish, arrays are copied
+
+        @return DataSnapshot: the new snapshot
+
+        The snapshot replaces the previous one of the same name with a single reference swap, so
+        get_snapshot never returns a partially updated bundle and needs no lock.
+        """
+        previous = self._snapshots.get(name)
+        version = 1 if previous is None else previous.version + 1
+        snapshot = DataSnapshot(name, version, data)
+        self._snapshots[name] = snapshot
+        return snapshot
+
+    def get_snapshot(self, name):
+        """ Get the most recently published snapshot.
+
+        @param str name: name of the snapshot
+
+        @return DataSnapshot: the snapshot, None if nothing was published under this name yet
+        """
+        return self._snapshots.get(name)
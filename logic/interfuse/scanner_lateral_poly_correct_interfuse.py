@@ -22,6 +22,7 @@ import numpy as np
 
 from core.connector import Connector
 from core.configoption import ConfigOption
+from core.util.coordinate_transform import CoordinateTransform
 from logic.generic_logic import GenericLogic
 from interface.confocal_scanner_interface import ConfocalScannerInterface
 
@@ -86,6 +87,8 @@ class ScannerLateralPolyCorrectInterfuse(GenericLogic, ConfocalScannerInterface)
         self._range_x = self.config_range_x
         self._range_y = self.config_range_y
         self._position = np.array([None, None])  # Position can not be known at activation
+        # transformation below and the merged transformation computed last
+        self._transform_cache = None
 
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module """
@@ -181,11 +184,16 @@ class ScannerLateralPolyCorrectInterfuse(GenericLogic, ConfocalScannerInterface)
 
         @return float[]: the photon counts per second
         """
-        transformed = line_path.copy()
-        points_x, points_y = self._convert_point(line_path[0, :], line_path[1, :])
-        transformed[0, :] = points_x
-        transformed[1, :] = points_y
-        return self.scanner().scan_line(transformed, pixel_clock)
+        transform, device = self.get_coordinate_transform()
+        return device.scan_line(transform.apply(line_path), pixel_clock)
+
+    def set_up_line_stream(self, max_line_length):
+        """ Prepares the scanner to scan successive lines without setting it up for every line """
+        return self.scanner().set_up_line_stream(max_line_length)
+
+    def close_line_stream(self):
+        """ Ends the line streaming mode """
+        return self.scanner().close_line_stream()
 
     def close_scanner(self):
         """ Closes the scanner and cleans up afterwards """
@@ -195,6 +203,24 @@ class ScannerLateralPolyCorrectInterfuse(GenericLogic, ConfocalScannerInterface)
         """ Closes the clock and cleans up afterwards """
         return self.scanner().close_scanner_clock()
 
+    def get_coordinate_transform(self):
+        """ Transformation of the positions by this interfuse, merged with the one of the
+        coordinate transforming interfuses connected below it.
+
+        @return (CoordinateTransform, object): merged transformation and the scanner, which scans
+                                               the transformed positions
+        """
+        device = self.scanner()
+        transform_below = None
+        if hasattr(device, 'get_coordinate_transform'):
+            transform_below, device = device.get_coordinate_transform()
+        if self._transform_cache is None or self._transform_cache[0] is not transform_below:
+            transform = CoordinateTransform().polynomial(self._poly2d_x.T, self._poly2d_y.T)
+            if transform_below is not None:
+                transform = transform.then(transform_below)
+            self._transform_cache = (transform_below, transform)
+        return self._transform_cache[1], device
+
     def _convert_point(self, x, y):
         """ Convert one point or an array of point from input coordinate to output coordinate """
         res_x = np.polynomial.polynomial.polyval2d(x, y, self._poly2d_x.T)
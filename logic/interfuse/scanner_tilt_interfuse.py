@@ -19,8 +19,10 @@ top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi
 """
 
 import copy
+import numpy as np
 
 from core.connector import Connector
+from core.util.coordinate_transform import CoordinateTransform
 from logic.generic_logic import GenericLogic
 from interface.confocal_scanner_interface import ConfocalScannerInterface
 
@@ -44,6 +46,8 @@ class ScannerTiltInterfuse(GenericLogic, ConfocalScannerInterface):
         self.tiltcorrection = False
         self.tilt_reference_x = 0
         self.tilt_reference_y = 0
+        # tilt parameters, transformation below and the merged transformation computed last
+        self._transform_cache = None
 
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module.
@@ -182,9 +186,32 @@ class ScannerTiltInterfuse(GenericLogic, ConfocalScannerInterface):
 
         @return float[]: the photon counts per second
         """
-        if self.tiltcorrection:
-            line_path[:][2] += self._calc_dz(line_path[:][0], line_path[:][1])
-        return self._scanning_device.scan_line(line_path, pixel_clock)
+        if not hasattr(self._scanning_device, 'get_coordinate_transform'):
+            # the tilt alone only shifts z, which is cheaper than the merged transformation
+            if self.tiltcorrection:
+                line_path = np.array(line_path, dtype=float)
+                line_path[2] += self._calc_dz(line_path[0], line_path[1])
+            return self._scanning_device.scan_line(line_path, pixel_clock)
+        transform, device = self.get_coordinate_transform()
+        if not transform.is_identity:
+            line_path = transform.apply(line_path)
+        return device.scan_line(line_path, pixel_clock)
+
+    def set_up_line_stream(self, max_line_length):
+        """ Prepares the scanner to scan successive lines without setting it up for every line.
+
+        @param int max_line_length: maximum number of pixels of the lines scanned in this mode
+
+        @return int: error code (0:OK, -1:error or not supported)
+        """
+        return self._scanning_device.set_up_line_stream(max_line_length)
+
+    def close_line_stream(self):
+        """ Ends the line streaming mode.
+
+        @return int: error code (0:OK, -1:error)
+        """
+        return self._scanning_device.close_line_stream()
 
     def close_scanner(self):
         """ Closes the scanner and cleans up afterwards.
@@ -200,6 +227,30 @@ class ScannerTiltInterfuse(GenericLogic, ConfocalScannerInterface):
         """
         return self._scanning_device.close_scanner_clock()
 
+    def get_coordinate_transform(self):
+        """ Transformation of the positions by this interfuse, merged with the one of the
+        coordinate transforming interfuses connected below it.
+
+        @return (CoordinateTransform, object): merged transformation and the scanner, which scans
+                                               the transformed positions
+        """
+        device = self._scanning_device
+        transform_below = None
+        if hasattr(device, 'get_coordinate_transform'):
+            transform_below, device = device.get_coordinate_transform()
+        tilt = (self.tiltcorrection, self.tilt_variable_ax, self.tilt_variable_ay,
+                self.tilt_reference_x, self.tilt_reference_y)
+        if self._transform_cache is None or self._transform_cache[0] != tilt \
+                or self._transform_cache[1] is not transform_below:
+            transform = CoordinateTransform()
+            if self.tiltcorrection:
+                transform = transform.tilt(self.tilt_variable_ax, self.tilt_variable_ay,
+                                           self.tilt_reference_x, self.tilt_reference_y)
+            if transform_below is not None:
+                transform = transform.then(transform_below)
+            self._transform_cache = (tilt, transform_below, transform)
+        return self._transform_cache[2], device
+
     def _calc_dz(self, x, y):
         """Calculates the change in z for given tilt correction."""
         if not self.tiltcorrection:
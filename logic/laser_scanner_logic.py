@@ -29,7 +29,9 @@ import matplotlib.pyplot as plt
 import numpy as np
 import time
 
+from core.configoption import ConfigOption
 from core.connector import Connector
+from core.instrumentation import timed
 from core.statusvariable import StatusVar
 from core.util.mutex import Mutex
 from logic.generic_logic import GenericLogic
@@ -40,6 +42,18 @@ class LaserScannerLogic(GenericLogic):
 
     """This logic module controls scans of DC voltage on the fourth analog
     output channel of the NI Card.  It collects countrate as a function of voltage.
+
+    The up and down ramps of the repeats are scanned as one continuous triangle waveform, streamed
+    to the scanner in blocks of whole repeats.
+
+    Example config for copy-paste:
+
+    laserscannerlogic:
+        module.Class: 'laser_scanner_logic.LaserScannerLogic'
+        block_duration: 1  # optional, maximum duration of one block of the triangle waveform in s
+        connect:
+            confocalscanner1: 'mydummyscanner'
+            savelogic: 'savelogic'
     """
 
     sig_data_updated = QtCore.Signal()
@@ -48,6 +62,10 @@ class LaserScannerLogic(GenericLogic):
     confocalscanner1 = Connector(interface='ConfocalScannerInterface')
     savelogic = Connector(interface='SaveLogic')
 
+    # maximum duration of the part of the triangle waveform scanned with one scan_line call. It
+    # contains at least one up and down ramp and limits the update rate and the reaction to a stop.
+    _block_duration = ConfigOption('block_duration', 1.0)
+
     scan_range = StatusVar('scan_range', [-10, 10])
     number_of_repeats = StatusVar(default=10)
     resolution = StatusVar('resolution', 500)
@@ -78,6 +96,9 @@ class LaserScannerLogic(GenericLogic):
         self.plot_y = []
         self.plot_y2 = []
 
+        # key and result of the last smoothing profile calculation
+        self._smoothing_cache = None
+
     def on_activate(self):
         """ Initialisation performed during activation of the module.
         """
@@ -95,8 +116,8 @@ class LaserScannerLogic(GenericLogic):
         self.set_scan_range(self.scan_range)
 
         # Keep track of the current static voltage even while a scan may cause the real-time
-        # voltage to change.
-        self.goto_voltage(self._static_v)
+        # voltage to change. The saved voltage may be outside of the range of the scanner.
+        self.set_voltage(self._static_v)
 
         # Sets connections between signals and functions
         self.sigChangeVoltage.connect(self._change_voltage, QtCore.Qt.QueuedConnection)
@@ -105,8 +126,8 @@ class LaserScannerLogic(GenericLogic):
         # Initialization of internal counter for scanning
         self._scan_counter_up = 0
         self._scan_counter_down = 0
-        # Keep track of scan direction
-        self.upwards_scan = True
+        # number of repeats scanned in one block of the triangle waveform
+        self._repeats_per_block = 1
 
         # calculated number of points in a scan, depends on speed and max step size
         self._num_of_steps = 50  # initialising.  This is calculated for a given ramp.
@@ -276,12 +297,19 @@ class LaserScannerLogic(GenericLogic):
 
         self._scan_counter_up = 0
         self._scan_counter_down = 0
-        self.upwards_scan = True
 
         # TODO: Generate Ramps
         self._upwards_ramp = self._generate_ramp(v_min, v_max, self._scan_speed)
         self._downwards_ramp = self._generate_ramp(v_max, v_min, self._scan_speed)
 
+        # The triangle waveform of as many repeats as fit into the block duration. The down ramp
+        # starts where the up ramp ends and vice versa, so the repeats are scanned without a break.
+        period = self._upwards_ramp.shape[1] + self._downwards_ramp.shape[1]
+        self._repeats_per_block = int(np.clip(
+            self._block_duration * self._clock_frequency // period, 1, self.number_of_repeats))
+        self._block_ramp = np.tile(np.hstack((self._upwards_ramp, self._downwards_ramp)),
+                                   self._repeats_per_block)
+
         self._initialise_data_matrix(len(self._upwards_ramp[3]))
 
         # Lock and set up scanner
@@ -312,8 +340,10 @@ class LaserScannerLogic(GenericLogic):
             if self.module_state.can('unlock'):
                 self.module_state.unlock()
 
+    @timed()
     def _do_next_line(self):
-        """ If stopRequested then finish the scan, otherwise perform next repeat of the scan line
+        """ If stopRequested then finish the scan, otherwise perform the next block of repeats of
+        the scan line, each with an up and a down ramp.
         """
         # stops scanning
         if self.stopRequested or self._scan_counter_down >= self.number_of_repeats:
@@ -327,18 +357,26 @@ class LaserScannerLogic(GenericLogic):
             # move from current voltage to start of scan range.
             self._goto_during_scan(self.scan_range[0])
 
-        if self.upwards_scan:
-            counts = self._scan_line(self._upwards_ramp)
-            self.scan_matrix[self._scan_counter_up] = counts
-            self.plot_y += counts
-            self._scan_counter_up += 1
-            self.upwards_scan = False
-        else:
-            counts = self._scan_line(self._downwards_ramp)
-            self.scan_matrix2[self._scan_counter_down] = counts
-            self.plot_y2 += counts
-            self._scan_counter_down += 1
-            self.upwards_scan = True
+        # the last block may contain less repeats
+        repeats = min(self._repeats_per_block, self.number_of_repeats - self._scan_counter_up)
+        up_length = self._upwards_ramp.shape[1]
+        period = up_length + self._downwards_ramp.shape[1]
+        counts = self._scan_line(self._block_ramp[:, :repeats * period])
+        if np.size(counts) != repeats * period:
+            self.log.error('The scanner returned no valid counts, stopping the scan.')
+            self.stopRequested = True
+            self.sigScanNextLine.emit()
+            return
+
+        # split the waveform into the up and down ramps of the repeats
+        counts = counts.reshape((repeats, period))
+        rows = slice(self._scan_counter_up, self._scan_counter_up + repeats)
+        self.scan_matrix[rows] = counts[:, :up_length]
+        self.scan_matrix2[rows] = counts[:, up_length:]
+        self.plot_y += counts[:, :up_length].sum(axis=0)
+        self.plot_y2 += counts[:, up_length:].sum(axis=0)
+        self._scan_counter_up += repeats
+        self._scan_counter_down += repeats
 
         self.sigUpdatePlots.emit()
         self.sigScanNextLine.emit()
@@ -364,14 +402,10 @@ class LaserScannerLogic(GenericLogic):
         else:
             # These values help simplify some of the mathematical expressions
             linear_v_step = speed / self._clock_frequency
-            smoothing_range = self._smoothing_steps + 1
-
-            # Sanity check in case the range is too short
 
-            # The voltage range covered while accelerating in the smoothing steps
-            v_range_of_accel = sum(
-                n * linear_v_step / smoothing_range for n in range(0, smoothing_range)
-                )
+            # Voltage steps of the smooth acceleration part of the ramp and the voltage range
+            # covered while accelerating in the smoothing steps
+            smooth_curve, v_range_of_accel = self._smoothing_profile(linear_v_step)
 
             # Obtain voltage bounds for the linear part of the ramp
             v_min_linear = v_min + v_range_of_accel
@@ -382,19 +416,12 @@ class LaserScannerLogic(GenericLogic):
                     'Voltage ramp too short to apply the '
                     'configured smoothing_steps. A simple linear ramp '
                     'was created instead.')
-                num_of_linear_steps = np.rint((v_max - v_min) / linear_v_step)
+                num_of_linear_steps = int(np.rint((v_max - v_min) / linear_v_step))
                 ramp = np.linspace(v_min, v_max, num_of_linear_steps)
 
             else:
 
-                num_of_linear_steps = np.rint((v_max_linear - v_min_linear) / linear_v_step)
-
-                # Calculate voltage step values for smooth acceleration part of ramp
-                smooth_curve = np.array(
-                    [sum(
-                        n * linear_v_step / smoothing_range for n in range(1, N)
-                        ) for N in range(1, smoothing_range)
-                    ])
+                num_of_linear_steps = int(np.rint((v_max_linear - v_min_linear) / linear_v_step))
 
                 accel_part = v_min + smooth_curve
                 decel_part = v_max - smooth_curve[::-1]
@@ -419,6 +446,27 @@ class LaserScannerLogic(GenericLogic):
 
         return scan_line
 
+    def _smoothing_profile(self, linear_v_step):
+        """ Voltage profile of the smoothing steps accelerating a ramp to its linear part.
+
+        The n-th of the smoothing steps changes the voltage by n / (smoothing_steps + 1) of the
+        linear step, so the profile is an arithmetic series. It is cached for the last step size.
+
+        @param float linear_v_step: voltage step per clock cycle of the linear part of the ramp
+
+        @return (numpy.ndarray, float): voltage offsets of the smoothing steps from the start of the
+                                        ramp and the voltage range covered while accelerating
+        """
+        key = (linear_v_step, self._smoothing_steps)
+        if self._smoothing_cache is None or self._smoothing_cache[0] != key:
+            smoothing_range = self._smoothing_steps + 1
+            # offset after k steps: sum of n * linear_v_step / smoothing_range for n = 1 .. k
+            k = np.arange(smoothing_range - 1)
+            smooth_curve = k * (k + 1) / 2 * linear_v_step / smoothing_range
+            v_range_of_accel = (smoothing_range - 1) / 2 * linear_v_step
+            self._smoothing_cache = (key, smooth_curve, v_range_of_accel)
+        return self._smoothing_cache[1], self._smoothing_cache[2]
+
     def _scan_line(self, line_to_scan=None):
         """do a single voltage scan from voltage1 to voltage2
 
@@ -28,6 +28,7 @@ from collections import OrderedDict
 from core.connector import Connector
 from core.statusvariable import StatusVar
 from logic.generic_logic import GenericLogic
+from logic.magnet_pathway_planner import PATHWAY_PLANNERS
 from qtpy import QtCore
 from interface.slow_counter_interface import CountingMode
 
@@ -84,8 +85,12 @@ class MagnetLogic(GenericLogic):
     align_2d_axis1_step = StatusVar('align_2d_axis1_step', 1e-3)
     align_2d_axis1_vel = StatusVar('align_2d_axis1_vel', 10e-6)
     curr_2d_pathway_mode = StatusVar('curr_2d_pathway_mode', 'snake-wise')
+    align_2d_maximize = StatusVar('align_2d_maximize', True)
 
     _checktime = StatusVar('_checktime', 2.5)
+    _settle_time = StatusVar('_settle_time', 0.0)
+    # shortest interval between two status checks of a moving magnet in s
+    _min_checktime = 0.05
     _1D_axis0_data = StatusVar('_1D_axis0_data', default=np.arange(3))
     _2D_axis0_data = StatusVar('_2D_axis0_data', default=np.arange(3))
     _2D_axis1_data = StatusVar('_2D_axis1_data', default=np.arange(2))
@@ -186,6 +191,12 @@ class MagnetLogic(GenericLogic):
 
         self._stop_measure = False
 
+        # state of the move/settle state machine of the alignment:
+        self._motion_state = 'idle'
+        self._motion_callback = None
+        self._motion_abortable = False
+        self._seconds_per_step = None
+
     def on_activate(self):
         """ Definition and initialisation of the GUI.
         """
@@ -218,7 +229,12 @@ class MagnetLogic(GenericLogic):
         self._sigStepwiseAlignmentNext.connect(self._stepwise_loop_body,
                                                QtCore.Qt.QueuedConnection)
 
-        self.pathway_modes = ['spiral-in', 'spiral-out', 'snake-wise', 'diagonal-snake-wise']
+        self._motion_timer = QtCore.QTimer()
+        self._motion_timer.setSingleShot(True)
+        self._motion_timer.timeout.connect(self._check_motion, QtCore.Qt.QueuedConnection)
+
+        self.pathway_modes = ['spiral-in', 'spiral-out', 'diagonal-snake-wise'] + list(PATHWAY_PLANNERS)
+        self._pathway_planner = None
 
         # relative movement settings
 
@@ -288,6 +304,10 @@ class MagnetLogic(GenericLogic):
     def on_deactivate(self):
         """ Deactivate the module properly.
         """
+        self._motion_timer.stop()
+        self._motion_timer.timeout.disconnect()
+        self._motion_state = 'idle'
+
         constraints = self.get_hardware_constraints()
         for axis_label in constraints:
             self._statusVariables[('move_rel_' + axis_label)] = self.move_rel_dict[axis_label]
@@ -453,17 +473,14 @@ class MagnetLogic(GenericLogic):
         and the acceleration of the movement.
         E.g. if no velocity is specified, then nothing will be changed in terms
         of speed during the move.
-        """
-
-        # calculate number of steps (those are NOT the number of points!)
-        axis0_num_of_steps = int(axis0_range / axis0_step)
-        axis1_num_of_steps = int(axis1_range / axis1_step)
 
-        # make an array of movement steps
-        axis0_steparray = [axis0_step] * axis0_num_of_steps
-        axis1_steparray = [axis1_step] * axis1_num_of_steps
+        The order in which the grid points are visited is decided by the
+        pathway planner selected with curr_2d_pathway_mode (see
+        logic/magnet_pathway_planner.py). Adaptive planners can extend the
+        pathway during the measurement.
+        """
 
-        pathway = []
+        self._pathway_planner = None
 
         # FIXME: create these path modes:
         if self.curr_2d_pathway_mode == 'spiral-in':
@@ -481,145 +498,75 @@ class MagnetLogic(GenericLogic):
         elif self.curr_2d_pathway_mode == 'diagonal-snake-wise':
             self.log.error('The pathway creation method "{0}" through the '
                            'matrix is not implemented yet!\nReturn an empty '
-                           'patharray.'.format(self.current_2d_pathway_mode))
+                           'patharray.'.format(self.curr_2d_pathway_mode))
             return [], []
 
         elif self.curr_2d_pathway_mode == 'selected-points':
             self.log.error('The pathway creation method "{0}" through the '
                            'matrix is not implemented yet!\nReturn an empty '
-                           'patharray.'.format(self.current_2d_pathway_mode))
+                           'patharray.'.format(self.curr_2d_pathway_mode))
             return [], []
 
-        # choose the snake-wise as default for now.
-        else:
-
-            # create a snake-wise stepping procedure through the matrix:
-            self.log.debug(axis0_name)
-            self.log.debug(axis0_range)
-            self.log.debug(init_pos[axis0_name])
-            axis0_pos = round(init_pos[axis0_name] - axis0_range / 2, 7)
-            axis1_pos = round(init_pos[axis1_name] - axis1_range / 2, 7)
-
-            # append again so that the for loop later will run once again
-            # through the axis0 array but the last value of axis1_steparray will
-            # not be performed.
-            axis1_steparray.append(axis1_num_of_steps)
-
-            # step_config is the dict containing the commands for one pathway
-            # entry. Move at first to start position:
-            step_config = dict()
-
-            if axis0_vel is None:
-                step_config[axis0_name] = {'move_abs': axis0_pos}
-            else:
-                step_config[axis0_name] = {'move_abs': axis0_pos, 'move_vel': axis0_vel}
-
-            if axis1_vel is None:
-                step_config[axis1_name] = {'move_abs': axis1_pos}
-            else:
-                step_config[axis1_name] = {'move_abs': axis1_pos, 'move_vel': axis1_vel}
-
-            pathway.append(step_config)
-
-            path_index = 0
+        # the remaining modes are handled by the pathway planners, the order
+        # of the grid points is decided there:
+        planner_class = PATHWAY_PLANNERS.get(self.curr_2d_pathway_mode)
+        if planner_class is None:
+            self.log.error('Unknown pathway creation method "{0}". Choose one '
+                           'of {1}.\nReturn an empty patharray.'
+                           ''.format(self.curr_2d_pathway_mode, self.pathway_modes))
+            return [], []
 
-            # these indices should be used to facilitate the mapping to a 2D
-            # array, since the
-            axis0_index = 0
-            axis1_index = 0
+        # +1 because number of points and not number of steps are needed. The
+        # grid is centered around the initial position:
+        axis0_start = init_pos[axis0_name] - axis0_range / 2
+        axis1_start = init_pos[axis1_name] - axis1_range / 2
+        axis0_positions = np.round(axis0_start + np.arange(int(axis0_range / axis0_step) + 1) * axis0_step, 7)
+        axis1_positions = np.round(axis1_start + np.arange(int(axis1_range / axis1_step) + 1) * axis1_step, 7)
 
-            # that is a map to transform a pathway index value back to an
-            # absolute position and index. That will be important for saving the
-            # data corresponding to a certain path_index value.
-            back_map = dict()
-            back_map[path_index] = {axis0_name: axis0_pos,
-                                    axis1_name: axis1_pos,
-                                    'index': (axis0_index, axis1_index)}
+        self._pathway_planner = planner_class(axis0_positions,
+                                              axis1_positions,
+                                              start_pos=(init_pos[axis0_name], init_pos[axis1_name]),
+                                              velocities=(axis0_vel, axis1_vel),
+                                              maximize=self.align_2d_maximize)
 
-            path_index += 1
-            # axis0_index += 1
+        pathway = []
+        back_map = dict()
+        self._append_to_2d_pathway(pathway, back_map, self._pathway_planner.initial_points(),
+                                   axis0_name, axis1_name, axis0_vel, axis1_vel)
+        return pathway, back_map
 
-            go_pos_dir = True
-            for step_in_axis1 in axis1_steparray:
+    def _append_to_2d_pathway(self, pathway, back_map, points, axis0_name, axis1_name,
+                              axis0_vel=None, axis1_vel=None):
+        """ Append grid points given by the pathway planner to a pathway.
 
-                if go_pos_dir:
-                    go_pos_dir = False
-                    direction = +1
-                else:
-                    go_pos_dir = True
-                    direction = -1
-
-                for step_in_axis0 in axis0_steparray:
-
-                    axis0_index += direction
-                    # make move along axis0:
-                    step_config = dict()
-
-                    # relative movement:
-                    # step_config[axis0_name] = {'move_rel': direction*step_in_axis0}
-
-                    # absolute movement:
-                    axis0_pos = round(axis0_pos + direction * step_in_axis0, 7)
-
-                    # if axis0_vel is None:
-                    #     step_config[axis0_name] = {'move_abs': axis0_pos}
-                    #     step_config[axis1_name] = {'move_abs': axis1_pos}
-                    # else:
-                    #     step_config[axis0_name] = {'move_abs': axis0_pos,
-                    #                                'move_vel': axis0_vel}
-                    if axis1_vel is None and axis0_vel is None:
-                        step_config[axis0_name] = {'move_abs': axis0_pos}
-                        step_config[axis1_name] = {'move_abs': axis1_pos}
-                    else:
-                        step_config[axis0_name] = {'move_abs': axis0_pos}
-                        step_config[axis1_name] = {'move_abs': axis1_pos}
-
-                        if axis0_vel is not None:
-                            step_config[axis0_name] = {'move_abs': axis0_pos, 'move_vel': axis0_vel}
-
-                        if axis1_vel is not None:
-                            step_config[axis1_name] = {'move_abs': axis1_pos, 'move_vel': axis1_vel}
-
-                    # append to the pathway
-                    pathway.append(step_config)
-                    back_map[path_index] = {axis0_name: axis0_pos,
-                                            axis1_name: axis1_pos,
-                                            'index': (axis0_index, axis1_index)}
-                    path_index += 1
-
-                if (axis1_index + 1) >= len(axis1_steparray):
-                    break
-
-                # make a move along axis1:
-                step_config = dict()
-
-                # relative movement:
-                # step_config[axis1_name] = {'move_rel' : step_in_axis1}
-
-                # absolute movement:
-                axis1_pos = round(axis1_pos + step_in_axis1, 7)
-
-                if axis1_vel is None and axis0_vel is None:
-                    step_config[axis0_name] = {'move_abs': axis0_pos}
-                    step_config[axis1_name] = {'move_abs': axis1_pos}
-                else:
-                    step_config[axis0_name] = {'move_abs': axis0_pos}
-                    step_config[axis1_name] = {'move_abs': axis1_pos}
+        @param list pathway: the pathway list to extend
+        @param dict back_map: the back_map to extend, maps the pathway index
+                              to the absolute position and the matrix index
+        @param list points: list of (axis0_index, axis1_index) tuples
+        @param str axis0_name:
+        @param str axis1_name:
+        @param float axis0_vel: optional, velocity for the axis0 movements
+        @param float axis1_vel: optional, velocity for the axis1 movements
+        """
+        positions = self._pathway_planner.positions(points)
 
-                    if axis0_vel is not None:
-                        step_config[axis0_name] = {'move_abs': axis0_pos, 'move_vel': axis0_vel}
+        for index, pos in zip(points, positions):
+            axis0_pos = float(pos[0])
+            axis1_pos = float(pos[1])
 
-                    if axis1_vel is not None:
-                        step_config[axis1_name] = {'move_abs': axis1_pos, 'move_vel': axis1_vel}
+            step_config = dict()
+            step_config[axis0_name] = {'move_abs': axis0_pos}
+            step_config[axis1_name] = {'move_abs': axis1_pos}
 
-                pathway.append(step_config)
-                axis1_index += 1
-                back_map[path_index] = {axis0_name: axis0_pos,
-                                        axis1_name: axis1_pos,
-                                        'index': (axis0_index, axis1_index)}
-                path_index += 1
+            if axis0_vel is not None:
+                step_config[axis0_name]['move_vel'] = axis0_vel
+            if axis1_vel is not None:
+                step_config[axis1_name]['move_vel'] = axis1_vel
 
-        return pathway, back_map
+            back_map[len(pathway)] = {axis0_name: axis0_pos,
+                                      axis1_name: axis1_pos,
+                                      'index': index}
+            pathway.append(step_config)
 
     def _create_2d_cont_pathway(self, pathway):
 
@@ -740,11 +687,16 @@ class MagnetLogic(GenericLogic):
                                                                    self._saved_pos_before_align,
                                                                    self.align_2d_axis0_vel,
                                                                    self.align_2d_axis1_vel)
+            if len(self._pathway) == 0:
+                self.log.error('No pathway was created, the 2D alignment is not started.')
+                self.sigMeasurementFinished.emit()
+                return -1
 
             # determine the start point, either relative or absolute!
-            # Now the absolute position will be used:
-            axis0_start = self._backmap[0][self.align_2d_axis0_name]
-            axis1_start = self._backmap[0][self.align_2d_axis1_name]
+            # Now the absolute position will be used. The first pathway point
+            # is not necessarily the first grid point:
+            axis0_start = self._pathway_planner.axis0_positions[0]
+            axis1_start = self._pathway_planner.axis1_positions[0]
 
             prepared_graph = self._prepare_2d_graph(
                 axis0_start,
@@ -787,37 +739,123 @@ class MagnetLogic(GenericLogic):
     def _move_to_curr_pathway_index(self, stepwise_meas):
 
         # move to the passed pathway index in the list _pathway and start the
-        # proper loop for that:
-
-        # move absolute to the index position, which is currently given
-
+        # proper loop for that as soon as the position is reached:
+        self._stepwise_meas = stepwise_meas
+        self._move_to_pathway_point(self._pathway_index)
+
+    def _move_to_pathway_point(self, pathway_index):
+        """ Start the movement to a point of the pathway. The alignment loop
+            body is triggered by _pathway_point_reached after the magnet has
+            arrived and settled.
+        """
         move_dict_vel, \
         move_dict_abs, \
-        move_dict_rel = self._move_to_index(self._pathway_index, self._pathway)
+        move_dict_rel = self._move_to_index(pathway_index, self._pathway)
 
-        self.log.debug("I'm in _move_to_curr_pathway_index: {0}".format(move_dict_abs))
+        self.log.debug('Moving to pathway index {0}: {1}'.format(pathway_index, move_dict_abs))
+        # commenting this out for now, because it is kind of useless for us
         # self.set_velocity(move_dict_vel)
-        self._magnet_device.move_abs(move_dict_abs)
-        # self.move_rel(move_dict_rel)
-        while self._check_is_moving():
-            time.sleep(self._checktime)
-            self.log.debug("Went into while loop in _move_to_curr_pathway_index")
-
-        # this function will return to this function if position is reached:
-        start_pos = self._saved_pos_before_align
-        end_pos = dict()
-        for axis_name in self._saved_pos_before_align:
-            end_pos[axis_name] = self._backmap[self._pathway_index][axis_name]
-
-        self.log.debug("(first movement) magnet moving ? {0}".format(self._check_is_moving()))
+        self._start_motion(move_dict_abs, self._pathway_point_reached, abortable=True)
 
-        if stepwise_meas:
+    def _pathway_point_reached(self):
+        if self._stepwise_meas:
             # start the Stepwise alignment loop body self._stepwise_loop_body:
             self._sigStepwiseAlignmentNext.emit()
         else:
             # start the continuous alignment loop body self._continuous_loop_body:
             self._sigContinuousAlignmentNext.emit()
 
+    def _start_motion(self, move_dict_abs, callback, abortable=False):
+        """ Start an absolute movement and call callback once the magnet has
+            stopped and the settle time has passed.
+
+        @param dict move_dict_abs: the absolute movement, {'axis_label': <a-value>}
+        @param callable callback: called in the logic thread after arrival
+        @param bool abortable: if True, the movement is aborted as soon as the
+                               alignment is stopped and the alignment ends.
+
+        Nothing blocks the logic thread while the magnet moves. The status is
+        checked by the single shot _motion_timer: the first check happens at
+        the arrival time expected from the previous movements, afterwards the
+        check interval doubles from _min_checktime up to _checktime.
+        """
+        start_pos = self.get_pos(list(move_dict_abs))
+        self._magnet_device.move_abs(move_dict_abs)
+
+        self._motion_state = 'moving'
+        self._motion_callback = callback
+        self._motion_abortable = abortable
+        self._motion_start = time.perf_counter()
+        self._motion_last_busy = None
+        self._motion_interval = self._min_checktime
+
+        # distance of the movement in units of alignment steps
+        axis_steps = {self.align_2d_axis0_name: self.align_2d_axis0_step,
+                      self.align_2d_axis1_name: self.align_2d_axis1_step}
+        self._motion_steps = max([abs(move_dict_abs[axis] - start_pos[axis]) / axis_steps.get(axis, 1.0)
+                                  for axis in move_dict_abs] + [0])
+
+        delay = 0
+        if self._seconds_per_step is not None:
+            delay = self._seconds_per_step * self._motion_steps
+        self._motion_timer.start(int(round(1000 * delay)))
+
+    def _check_motion(self):
+        """ Timer slot of the move/settle state machine started by _start_motion.
+        """
+        now = time.perf_counter()
+
+        if self._motion_state == 'moving':
+            if self._motion_abortable and self._stop_measure:
+                self._magnet_device.abort()
+                self._motion_state = 'idle'
+                self._end_alignment_procedure()
+                return
+
+            if self._check_is_moving():
+                self._motion_last_busy = now
+                self._motion_timer.start(int(round(1000 * self._motion_interval)))
+                self._motion_interval = min(2 * self._motion_interval, self._checktime)
+                return
+
+            # the arrival happened between the last two checks, use that to
+            # estimate the duration of the next movement. If already the first
+            # check found the magnet stopped, try a bit earlier next time:
+            if self._motion_steps > 0:
+                if self._motion_last_busy is None:
+                    duration = 0.9 * (now - self._motion_start)
+                else:
+                    duration = (self._motion_last_busy + now) / 2 - self._motion_start
+                seconds_per_step = duration / self._motion_steps
+                if self._seconds_per_step is None:
+                    self._seconds_per_step = seconds_per_step
+                else:
+                    self._seconds_per_step = (self._seconds_per_step + seconds_per_step) / 2
+
+            if self._settle_time > 0:
+                self._motion_state = 'settling'
+                self._motion_timer.start(int(round(1000 * self._settle_time)))
+                return
+
+        self._motion_state = 'idle'
+        callback = self._motion_callback
+        self._motion_callback = None
+        if callback is not None:
+            callback()
+
+    def set_settle_time(self, settle_time):
+        """ Set the time to wait after the magnet has stopped before measuring.
+
+        @param float settle_time: settle time in seconds
+        """
+        if settle_time >= 0:
+            self._settle_time = settle_time
+        else:
+            self.log.warning('Could not set a new value for the settle time, '
+                             'since the passed value "{0}" is negative! The old '
+                             'value will be kept!'.format(settle_time))
+        return self._settle_time
+
     def _stepwise_loop_body(self):
         """ Go one by one through the created path
         @return:
@@ -870,34 +908,22 @@ class MagnetLogic(GenericLogic):
         # increase the index
         self._pathway_index += 1
 
-        if self._pathway_index < len(self._pathway):
+        # adaptive pathway planners decide on further points from the data
+        # measured so far:
+        if self._pathway_index >= len(self._pathway) and self._pathway_planner is not None:
+            self._append_to_2d_pathway(self._pathway,
+                                       self._backmap,
+                                       self._pathway_planner.next_points(self._2D_data_matrix),
+                                       self.align_2d_axis0_name,
+                                       self.align_2d_axis1_name,
+                                       self.align_2d_axis0_vel,
+                                       self.align_2d_axis1_vel)
 
-            #
+        if self._pathway_index < len(self._pathway):
+            # start the next movement right away, the post measurement
+            # procedure runs while the magnet is moving:
+            self._move_to_pathway_point(self._pathway_index)
             self._do_postmeasurement_proc()
-            move_dict_vel, \
-            move_dict_abs, \
-            move_dict_rel = self._move_to_index(self._pathway_index, self._pathway)
-
-            # commenting this out for now, because it is kind of useless for us
-            # self.set_velocity(move_dict_vel)
-            self._magnet_device.move_abs(move_dict_abs)
-
-            while self._check_is_moving():
-                time.sleep(self._checktime)
-                self.log.debug("Went into while loop in stepwise_loop_body")
-
-            self.log.debug("stepwise_loop_body reports magnet moving ? {0}".format(self._check_is_moving()))
-
-            # this function will return to this function if position is reached:
-            start_pos = dict()
-            end_pos = dict()
-            for axis_name in self._saved_pos_before_align:
-                start_pos[axis_name] = self._backmap[self._pathway_index - 1][axis_name]
-                end_pos[axis_name] = self._backmap[self._pathway_index][axis_name]
-
-            # rerun this loop again
-            self._sigStepwiseAlignmentNext.emit()
-
         else:
             self._end_alignment_procedure()
         return
@@ -925,20 +951,10 @@ class MagnetLogic(GenericLogic):
 
     def _end_alignment_procedure(self):
 
-        # 1 check if magnet is moving and stop it
-
         # move back to the first position before the alignment has started:
-        #
-        constraints = self.get_hardware_constraints()
-
-        last_pos = dict()
-        for axis_name in self._saved_pos_before_align:
-            last_pos[axis_name] = self._backmap[self._pathway_index - 1][axis_name]
+        self._start_motion(self._saved_pos_before_align, self._alignment_finished)
 
-        self._magnet_device.move_abs(self._saved_pos_before_align)
-
-        while self._check_is_moving():
-            time.sleep(self._checktime)
+    def _alignment_finished(self):
 
         self.sigMeasurementFinished.emit()
 
@@ -947,8 +963,6 @@ class MagnetLogic(GenericLogic):
 
         self.log.info('Alignment Complete!')
 
-        pass
-
     def _check_position_reached_loop(self, start_pos_dict, end_pos_dict):
         """ Perform just a while loop, which checks everytime the conditions
 
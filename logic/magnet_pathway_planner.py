@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains the pathway planners for the 2D alignment of the magnet logic.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import numpy as np
+
+
+def serpentine_order(shape):
+    """ Raster through a grid along axis0 and change the direction for every axis1 row.
+
+    @param tuple shape: number of grid points along (axis0, axis1)
+
+    @return list: list of (axis0_index, axis1_index) tuples
+    """
+    points = list()
+    for i1 in range(shape[1]):
+        axis0_indices = range(shape[0])
+        if i1 % 2:
+            axis0_indices = reversed(axis0_indices)
+        points.extend((i0, i1) for i0 in axis0_indices)
+    return points
+
+
+class PathwayPlanner:
+    """ Base class for the planners deciding in which order the points of a 2D alignment grid are
+    visited.
+
+    A planner works on grid indices (axis0_index, axis1_index). The travel cost between two points
+    is the time needed if both axes move simultaneously with their respective velocity, i.e. the
+    maximum of the single axis travel times. If no velocities are given, one grid step per time
+    unit is assumed for both axes.
+
+    The magnet logic asks for the first points with initial_points(). Whenever all handed out
+    points have been measured, next_points() is called with the current data matrix. Static
+    planners return an empty list there, adaptive planners can add further points depending on the
+    measured data.
+    """
+
+    def __init__(self, axis0_positions, axis1_positions, start_pos=None, velocities=None,
+                 maximize=True):
+        """
+        @param array axis0_positions: absolute positions of the grid along axis0
+        @param array axis1_positions: absolute positions of the grid along axis1
+        @param tuple start_pos: optional, (axis0, axis1) position of the magnet before the
+                                alignment. Defaults to the first grid point.
+        @param tuple velocities: optional, (axis0, axis1) velocities used as travel cost
+        @param bool maximize: whether the best alignment point has the highest (True) or lowest
+                              (False) measurement value. Only used by adaptive planners.
+        """
+        self.axis0_positions = np.asarray(axis0_positions, dtype=float)
+        self.axis1_positions = np.asarray(axis1_positions, dtype=float)
+        self.shape = (self.axis0_positions.size, self.axis1_positions.size)
+
+        if start_pos is None:
+            start_pos = (self.axis0_positions[0], self.axis1_positions[0])
+        self.start_pos = np.array(start_pos, dtype=float)
+
+        if velocities is None or any(vel is None or vel <= 0 for vel in velocities):
+            velocities = (self._grid_step(self.axis0_positions),
+                          self._grid_step(self.axis1_positions))
+        self.velocities = np.array(velocities, dtype=float)
+
+        self.maximize = maximize
+        self._visited = np.zeros(self.shape, dtype=bool)
+        self._last_pos = self.start_pos.copy()
+
+    @staticmethod
+    def _grid_step(positions):
+        if positions.size > 1 and positions[1] != positions[0]:
+            return abs(positions[1] - positions[0])
+        return 1.0
+
+    def initial_points(self):
+        """ Points to visit at the start of the alignment, by default all grid points in serpentine
+        order.
+
+        @return list: list of (axis0_index, axis1_index) tuples in the order to visit them
+        """
+        return self._hand_out(serpentine_order(self.shape))
+
+    def next_points(self, data_matrix):
+        """ Further points to visit after all previously handed out points have been measured.
+
+        @param numpy.ndarray data_matrix: the 2D alignment data matrix
+
+        @return list: list of (axis0_index, axis1_index) tuples, empty if the alignment is done
+        """
+        return list()
+
+    def positions(self, points):
+        """ Absolute (axis0, axis1) positions of a sequence of grid points.
+
+        @param points: list of (axis0_index, axis1_index) tuples
+
+        @return numpy.ndarray: positions with shape (len(points), 2)
+        """
+        points = np.asarray(points, dtype=int).reshape(-1, 2)
+        return np.column_stack((self.axis0_positions[points[:, 0]],
+                                self.axis1_positions[points[:, 1]]))
+
+    def travel_times(self, positions):
+        """ Cost matrix between all pairs of positions.
+
+        A small fraction of the summed single axis times is added, so that of two moves taking the
+        same time the shorter one is preferred.
+        """
+        times = np.abs(positions[:, np.newaxis, :] - positions[np.newaxis, :, :]) / self.velocities
+        return times.max(axis=2) + 1e-3 * times.sum(axis=2)
+
+    def _hand_out(self, points):
+        """ Mark the points as visited and remember the last position of the pathway. """
+        points = [(int(i0), int(i1)) for i0, i1 in points]
+        if points:
+            self._visited[tuple(np.array(points).T)] = True
+            self._last_pos = self.positions(points[-1:])[0]
+        return points
+
+    def order_nearest_neighbour(self, points, start_pos=None, closed=True, seed_tour=False,
+                                max_two_opt=2000):
+        """ Order points by a nearest-neighbour tour starting at start_pos and improve it with 2-opt
+        moves.
+
+        @param points: list of (axis0_index, axis1_index) tuples
+        @param start_pos: (axis0, axis1) position the tour starts at, defaults to the last handed
+                          out position
+        @param bool closed: whether the tour returns to start_pos afterwards
+        @param bool seed_tour: if True, the given order of the points is used instead of the
+                               nearest-neighbour tour whenever it is shorter
+        @param int max_two_opt: maximum number of points for which the 2-opt improvement is done
+
+        @return list: the ordered points
+        """
+        points = np.asarray(points, dtype=int).reshape(-1, 2)
+        if len(points) < 2:
+            return [tuple(p) for p in points]
+        if start_pos is None:
+            start_pos = self._last_pos
+        # node 0 is the start position and stays fixed at the beginning of the tour
+        costs = self.travel_times(np.vstack((start_pos, self.positions(points))))
+
+        num_nodes = len(costs)
+        tour = np.empty(num_nodes, dtype=int)
+        tour[0] = 0
+        remaining = np.ones(num_nodes, dtype=bool)
+        remaining[0] = False
+        for ii in range(1, num_nodes):
+            row = np.where(remaining, costs[tour[ii - 1]], np.inf)
+            tour[ii] = np.argmin(row)
+            remaining[tour[ii]] = False
+
+        if seed_tour:
+            given_tour = np.arange(num_nodes)
+            if self._tour_cost(given_tour, costs, closed) <= self._tour_cost(tour, costs, closed):
+                tour = given_tour
+
+        if num_nodes <= max_two_opt:
+            tour = self._two_opt(tour, costs, closed)
+        return [tuple(p) for p in points[tour[1:] - 1]]
+
+    @staticmethod
+    def _tour_cost(tour, costs, closed):
+        cost = costs[tour[:-1], tour[1:]].sum()
+        if closed:
+            cost += costs[tour[-1], tour[0]]
+        return cost
+
+    @staticmethod
+    def _two_opt(tour, costs, closed, max_passes=20):
+        """ Improve a tour by reversing segments as long as that shortens it.
+
+        The first node of the tour stays in place. For an open tour the return to the first node is
+        free of cost.
+        """
+        num_nodes = len(tour)
+        for _ in range(max_passes):
+            improved = False
+            for ii in range(num_nodes - 2):
+                a = tour[ii]
+                b = tour[ii + 1]
+                jj = np.arange(ii + 2, num_nodes)
+                c = tour[jj]
+                if closed:
+                    d = tour[(jj + 1) % num_nodes]
+                    cost_cd = costs[c, d]
+                    cost_bd = costs[b, d]
+                else:
+                    last = jj == num_nodes - 1
+                    d = tour[np.minimum(jj + 1, num_nodes - 1)]
+                    cost_cd = np.where(last, 0, costs[c, d])
+                    cost_bd = np.where(last, 0, costs[b, d])
+                gain = costs[a, b] + cost_cd - costs[a, c] - cost_bd
+                best = np.argmax(gain)
+                if gain[best] > 1e-9:
+                    tour[ii + 1:jj[best] + 1] = tour[ii + 1:jj[best] + 1][::-1].copy()
+                    improved = True
+            if not improved:
+                break
+        return tour
+
+
+class SerpentinePlanner(PathwayPlanner):
+    """ Raster through the grid along axis0 and change the direction for every axis1 row, the
+    default pathway of PathwayPlanner.
+    """
+
+
+class NearestNeighbourPlanner(PathwayPlanner):
+    """ Visit all grid points along a short closed tour starting and ending at the start position.
+
+    The tour is built by a nearest neighbour search (or the serpentine raster, if that is shorter)
+    and improved by 2-opt moves, so the magnet does not have to travel to a corner of the grid at
+    the beginning and back from the opposite corner at the end.
+    """
+
+    def initial_points(self):
+        points = serpentine_order(self.shape)
+        return self._hand_out(self.order_nearest_neighbour(points, self.start_pos, seed_tour=True))
+
+
+class AdaptivePlanner(PathwayPlanner):
+    """ Measure a coarse subgrid first and refine around the best point.
+
+    The coarse grid uses every stride-th point along each axis (plus the last one), with the stride
+    being a power of two chosen such that at least coarse_points points per axis are measured.
+    After each level the stride is halved and the unmeasured points of the finer grid within one
+    old stride around the current best point are measured. On the finest level the direct
+    neighbours of the best point are measured until the best point does not change anymore.
+    """
+
+    def __init__(self, *args, coarse_points=5, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._strides = np.array([self._coarse_stride(num, coarse_points) for num in self.shape])
+
+    @staticmethod
+    def _coarse_stride(num_points, coarse_points):
+        stride = 1
+        while (num_points - 1) // (2 * stride) + 1 >= coarse_points:
+            stride *= 2
+        return stride
+
+    def _subgrid(self, low, high, strides):
+        """ Unvisited points of the grid with the given strides within [low, high]. """
+        axes = list()
+        for axis in range(2):
+            indices = np.arange(low[axis], high[axis] + 1)
+            indices = indices[(indices % strides[axis] == 0) | (indices == self.shape[axis] - 1)]
+            axes.append(indices)
+        points = np.array(np.meshgrid(*axes, indexing='ij')).reshape(2, -1).T
+        return points[~self._visited[points[:, 0], points[:, 1]]]
+
+    def initial_points(self):
+        points = self._subgrid((0, 0), np.array(self.shape) - 1, self._strides)
+        return self._hand_out(self.order_nearest_neighbour(points, self.start_pos))
+
+    def best_point(self, data_matrix):
+        """ Index of the best measured point. """
+        data = np.where(self._visited, data_matrix, -np.inf if self.maximize else np.inf)
+        index = np.argmax(data) if self.maximize else np.argmin(data)
+        return np.array(np.unravel_index(index, self.shape))
+
+    def next_points(self, data_matrix):
+        best = self.best_point(data_matrix)
+        while True:
+            window = self._strides
+            self._strides = np.maximum(self._strides // 2, 1)
+            low = np.maximum(best - window, 0)
+            high = np.minimum(best + window, np.array(self.shape) - 1)
+            points = self._subgrid(low, high, self._strides)
+            if len(points) > 0:
+                return self._hand_out(self.order_nearest_neighbour(points, closed=False))
+            if np.all(window == 1):
+                return list()
+
+
+PATHWAY_PLANNERS = {'snake-wise': SerpentinePlanner,
+                    'nearest-neighbour': NearestNeighbourPlanner,
+                    'adaptive': AdaptivePlanner}
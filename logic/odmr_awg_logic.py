@@ -104,6 +104,7 @@ class ODMRAWGLogic(GenericLogic):
     digital_pulse_length = 500e-9  # How long will the digital pulse be
     one_sweep_time = 0.5  # How long will a sweep be
     digital_sync_length = 9e-9 # Synchronize analog and digital channels
+    phase_continuous = False  # Continue the phase of the IQ signal from one frequency to the next
 
     # Internal signals
     sigNextLine = QtCore.Signal()
@@ -121,6 +122,11 @@ class ODMRAWGLogic(GenericLogic):
     def __init__(self, config, **kwargs):
         super().__init__(config=config, **kwargs)
         self.threadlock = Mutex()
+        # (key, analog_samples, digital_samples) of the last synthesized sweep
+        self._waveform_cache = None
+        # key and waveform names of the sweep last written to the AWG
+        self._uploaded_waveform_key = None
+        self._uploaded_waveforms = list()
 
     def on_activate(self):
         print('ODMR logic activated')
@@ -475,46 +481,70 @@ class ODMRAWGLogic(GenericLogic):
         return mode, is_running
 
     def list_to_waveform(self, freq_list):
+        """ Synthesize the IQ sweep over a frequency list and the marker channels for the AWG.
+
+        @param numpy.ndarray freq_list: frequencies of the sweep in Hz
+
+        @return (dict, dict): analog samples (a_ch0: I, a_ch1: Q) and digital samples (d_ch0 and
+                              d_ch5: one pulse at the start of every frequency, d_ch2: gate)
+
+        Every frequency is a segment of samples_per_freq samples of the difference frequency to
+        the CW frequency. All segments are computed at once into preallocated arrays. With
+        phase_continuous the phase of each segment continues where the previous one ended,
+        otherwise every segment starts with phase 0.
+        The result is cached, an unchanged sweep returns the same arrays without synthesis.
+        """
+        freq_list = np.asarray(freq_list, dtype=np.float64)
+        key = (freq_list.tobytes(), float(self.cw_mw_frequency), float(self.sample_rate),
+               int(self.samples_per_freq), self.digital_pulse_length, self.digital_sync_length,
+               bool(self.phase_continuous))
+        if self._waveform_cache is not None and self._waveform_cache[0] == key:
+            return self._waveform_cache[1], self._waveform_cache[2]
+
+        samples_per_freq = int(self.samples_per_freq)
         digital_pulse_samples = int(np.floor(self.sample_rate * self.digital_pulse_length))
-        # analog_samples = {'a_ch0': np.zeros(digital_pulse_samples, dtype=int),'a_ch1': np.zeros(digital_pulse_samples, dtype=int)}
-        # digital_samples = {'d_ch0': [], 'd_ch1': []}
-        analog_samples = {'a_ch0': [], 'a_ch1': []}
-        digital_samples = {'d_ch0': [], 'd_ch2': []}
-        print('CW freq is ', self.cw_mw_frequency)
+        digital_sync_samples = int(np.floor(self.sample_rate * self.digital_sync_length))
+        self.log.debug('Synthesizing ODMR sweep of {0:d} frequencies around the CW frequency '
+                       '{1:.6e} Hz.'.format(freq_list.size, self.cw_mw_frequency))
         # TODO: Take care of negative and positive shifts, at the moment we are assuming the
         #  CW frequency is always higher
         self.shifted_freq_list = self.cw_mw_frequency - freq_list
         self.norm_freq_list = self.shifted_freq_list / self.sample_rate
 
-        x = np.linspace(start=0, stop=int(self.samples_per_freq) - 1, num=self.samples_per_freq)
-        single_digital_pulse = np.concatenate([np.ones(digital_pulse_samples, dtype=int),
-                                               np.zeros(int(self.samples_per_freq) - digital_pulse_samples, dtype=int)])
-        digital_sync_samples = int(np.floor(self.sample_rate * self.digital_sync_length))
-        digital_sync_pulse = np.zeros(int(digital_sync_samples), dtype=int)
-        digital_samples['d_ch0'] = np.append(digital_samples['d_ch0'], digital_sync_pulse)
-        digital_samples['d_ch2'] = np.append(digital_samples['d_ch2'], digital_sync_pulse)
-        single_bias_pulse = np.concatenate([np.ones(digital_pulse_samples, dtype=int),
-                                            -1 * np.ones(int(self.samples_per_freq) - digital_pulse_samples, dtype=int)])
-        # single_bias_pulse = np.concatenate([-1 * np.ones(int(self.samples_per_freq), dtype=int)])
-
-        for norm_freq in self.norm_freq_list:
-            analog_samples['a_ch0'] = np.append(analog_samples['a_ch0'], np.sin(2 * np.pi * norm_freq * x))
-            analog_samples['a_ch1'] = np.append(analog_samples['a_ch1'], np.sin(2 * np.pi * norm_freq * x - np.pi / 2))
-            digital_samples['d_ch0'] = np.append(digital_samples['d_ch0'], single_digital_pulse)
-
-        analog_samples['a_ch0'] = np.append(analog_samples['a_ch0'], np.zeros(2 * digital_pulse_samples + digital_sync_samples))
-        analog_samples['a_ch1'] = np.append(analog_samples['a_ch1'], np.zeros(2 * digital_pulse_samples + digital_sync_samples))
-
-        digital_samples['d_ch0'] = np.append(digital_samples['d_ch0'], np.ones(digital_pulse_samples, dtype=int))
-        digital_samples['d_ch0'] = np.append(digital_samples['d_ch0'], np.zeros(digital_pulse_samples, dtype=int))
-
-        digital_samples['d_ch5'] = digital_samples['d_ch0']
-
-        digital_samples['d_ch2'] = np.append(digital_samples['d_ch2'], np.ones(len(analog_samples['a_ch0']) - len(digital_sync_pulse), dtype=int))
-
-        print('Analog sample array size is', np.size(analog_samples['a_ch0']))
-        print('d_ch0 array size is', np.size(digital_samples['d_ch0']))
-
+        sweep_samples = freq_list.size * samples_per_freq
+        total_samples = sweep_samples + 2 * digital_pulse_samples + digital_sync_samples
+
+        # Phase in cycles of every sample, one row per frequency
+        phase = np.multiply.outer(self.norm_freq_list, np.arange(samples_per_freq, dtype=np.float64))
+        if self.phase_continuous:
+            # Start phase of each segment is the end phase of the previous one (modulo one cycle
+            # to keep the precision of the sine for long sweeps)
+            start_phase = np.cumsum(self.norm_freq_list * samples_per_freq) % 1
+            phase[1:] += start_phase[:-1, np.newaxis]
+        phase *= 2 * np.pi
+
+        # The analog samples stay float64, the spectrum AWG rescales other types by the amplitude
+        a_ch0 = np.zeros(total_samples, dtype=np.float64)
+        a_ch1 = np.zeros(total_samples, dtype=np.float64)
+        np.sin(phase, out=a_ch0[:sweep_samples].reshape(phase.shape))
+        # sin(phi - pi/2) = -cos(phi)
+        np.cos(phase, out=a_ch1[:sweep_samples].reshape(phase.shape))
+        np.negative(a_ch1[:sweep_samples], out=a_ch1[:sweep_samples])
+
+        # Marker pulse at the start of every frequency and one after the sweep, all delayed by the
+        # synchronization samples
+        d_ch0 = np.zeros(total_samples, dtype=bool)
+        pulses = d_ch0[digital_sync_samples:digital_sync_samples + sweep_samples]
+        pulses.reshape(freq_list.size, samples_per_freq)[:, :digital_pulse_samples] = True
+        d_ch0[digital_sync_samples + sweep_samples:
+              digital_sync_samples + sweep_samples + digital_pulse_samples] = True
+        d_ch2 = np.ones(total_samples, dtype=bool)
+        d_ch2[:digital_sync_samples] = False
+
+        analog_samples = {'a_ch0': a_ch0, 'a_ch1': a_ch1}
+        digital_samples = {'d_ch0': d_ch0, 'd_ch2': d_ch2, 'd_ch5': d_ch0}
+        self._waveform_cache = (key, analog_samples, digital_samples)
+        self.log.debug('ODMR sweep waveform has {0:d} samples per channel.'.format(total_samples))
         return analog_samples, digital_samples
 
     def sweep_list(self):
@@ -537,7 +567,6 @@ class ODMRAWGLogic(GenericLogic):
         self.sweep_list()
         self._awg_device.set_analog_level(amplitude={'a_ch0': 500, 'a_ch1': 500})
         analog_samples, digital_samples = self.list_to_waveform(self.freq_list)
-        print(digital_samples)
         num_of_samples, waveform_names = self._awg_device.write_waveform(name='ODMR',
                                                                          analog_samples=analog_samples,
                                                                          digital_samples=digital_samples,
@@ -547,6 +576,37 @@ class ODMRAWGLogic(GenericLogic):
                                                                              analog_samples['a_ch0']))
         return num_of_samples, waveform_names
 
+    def upload_sweep(self):
+        """ Write the sweep waveform of the current frequency list to the AWG and load it.
+
+        @return list: names of the loaded waveforms
+
+        Writing and loading are skipped if the same sweep is still loaded on the AWG.
+        """
+        analog_samples, digital_samples = self.list_to_waveform(self.freq_list)
+        key = self._waveform_cache[0]
+        if key == self._uploaded_waveform_key and self._uploaded_waveforms:
+            loaded_assets, asset_type = self._awg_device.get_loaded_assets()
+            if set(self._uploaded_waveforms).issubset(loaded_assets.values()):
+                self.log.debug('ODMR sweep unchanged, it is not uploaded again.')
+                return self._uploaded_waveforms
+
+        self._uploaded_waveform_key = None
+        num_of_samples, waveform_names = self._awg_device.write_waveform(
+            name='ODMR',
+            analog_samples=analog_samples,
+            digital_samples=digital_samples,
+            is_first_chunk=True,
+            is_last_chunk=True,
+            total_number_of_samples=len(analog_samples['a_ch0']))
+        if num_of_samples < 0:
+            self.log.error('Writing the ODMR sweep waveform to the AWG failed.')
+            return list()
+        self._awg_device.load_waveform(load_dict=waveform_names)
+        self._uploaded_waveform_key = key
+        self._uploaded_waveforms = list(waveform_names)
+        return self._uploaded_waveforms
+
     def mw_sweep_on(self):
         """
         Switching on the mw source in list/sweep mode.
@@ -558,16 +618,7 @@ class ODMRAWGLogic(GenericLogic):
         # TODO: Disable the Sweep option, add an error in case it is enabled.
 
         self._awg_device.set_analog_level(amplitude={'a_ch0': 500, 'a_ch1': 500})
-        analog_samples, digital_samples = self.list_to_waveform(self.freq_list)
-        print(digital_samples)
-        num_of_samples, waveform_names = self._awg_device.write_waveform(name='ODMR',
-                                                                         analog_samples=analog_samples,
-                                                                         digital_samples=digital_samples,
-                                                                         is_first_chunk=True,
-                                                                         is_last_chunk=True,
-                                                                         total_number_of_samples=len(
-                                                                             analog_samples['a_ch0']))
-        self._awg_device.load_waveform(load_dict=waveform_names)
+        self.upload_sweep()
         self._awg_device.set_reps(self.average_factor)
         self._mw_device.cw_on()
         # self._mw_device.pulse_mod_on()
@@ -585,14 +636,41 @@ class ODMRAWGLogic(GenericLogic):
         self.sigOutputStateUpdated.emit(mode, is_running)
         return mode, is_running
 
-    def reset_sweep(self):
+    def _start_sweeps(self):
         """
-        Resets the AWG, starting the sweep from the beginning.
+        Clears the counter and starts the AWG, which plays the sweep average_factor times from the
+        first frequency on.
+
+        @return int: error code (0:OK, -1:error)
         """
+        self._odmr_counter.clear_odmr()
+        # The AWG stops by itself after the last repetition, switching it off only makes sure
+        # the playback starts over
         self._awg_device.pulser_off()
-        time.sleep(0.1)
-        self._awg_device.pulser_on()
-        return
+        if self._awg_device.pulser_on() < 0:
+            self.log.error('Starting the ODMR sweep on the AWG failed.')
+            return -1
+        return 0
+
+    def _acquire_sweeps(self):
+        """
+        Waits until the counter has counted all started sweeps, reads them and starts the next
+        sweeps right away, so they run while the counts are processed.
+
+        @return (bool, numpy.ndarray): tuple: was there an error, the counts of every frequency
+                                       averaged over the sweeps
+        """
+        # count_odmr returns as soon as the counter buffer is filled, or with an error after its
+        # timeout
+        error, counts = self._odmr_counter.count_odmr(length=self.odmr_plot_x.size, pulsed=True)
+        if error:
+            return True, counts
+        if not self.stopRequested and self._start_sweeps() < 0:
+            return True, counts
+        # Average the sweeps, turning the long array into a short one (whose length is the
+        # number of frequencies)
+        counts = np.reshape(counts, (self.average_factor, len(self.freq_list)))
+        return False, np.mean(counts, axis=0)
 
     def mw_off(self):
         """ Switching off the MW source.
@@ -676,7 +754,8 @@ class ODMRAWGLogic(GenericLogic):
                 return -1
 
             mode, is_running = self.mw_sweep_on()
-            if not is_running:
+            if not is_running or self._start_sweeps() < 0:
+                self.mw_off()
                 self._stop_odmr_counter()
                 self.module_state.unlock()
                 return -1
@@ -722,7 +801,8 @@ class ODMRAWGLogic(GenericLogic):
                 return -1
 
             mode, is_running = self.mw_sweep_on()
-            if not is_running:
+            if not is_running or self._start_sweeps() < 0:
+                self.mw_off()
                 self._stop_odmr_counter()
                 self.module_state.unlock()
                 return -1
@@ -750,6 +830,19 @@ class ODMRAWGLogic(GenericLogic):
                 self._clearOdmrData = True
         return
 
+    @property
+    def duty_cycle(self):
+        """ Fraction of the elapsed measurement time spent sweeping, i.e. without the dead time
+        between the lines.
+
+        @return float: duty cycle between 0 and 1
+        """
+        if self.elapsed_time <= 0:
+            return 0.0
+        counting_time = (self.elapsed_sweeps * self.average_factor * len(self.freq_list)
+                         * self.freq_duration)
+        return min(counting_time / self.elapsed_time, 1.0)
+
     def _scan_odmr_line(self):
         """ Scans one line in ODMR
 
@@ -765,6 +858,8 @@ class ODMRAWGLogic(GenericLogic):
                 self.stopRequested = False
                 self.mw_off()
                 self._stop_odmr_counter()
+                self.log.debug('ODMR scan stopped after {0:d} lines, duty cycle {1:.1%}.'
+                               ''.format(self.elapsed_sweeps, self.duty_cycle))
                 self.module_state.unlock()
                 return
 
@@ -773,22 +868,14 @@ class ODMRAWGLogic(GenericLogic):
             #     self.elapsed_sweeps = 0
             #     self._startTime = time.time()
 
-            # reset position so every line starts from the same frequency
-            self.reset_sweep()
-            self._odmr_counter.clear_odmr()
-            # Acquire count data
-            time.sleep(self.one_sweep_time + 0.05)
-            err, new_counts = self._odmr_counter.count_odmr(length=self.odmr_plot_x.size, pulsed=True)
+            # Acquire count data of the running sweeps, the next ones are started meanwhile
+            err, new_counts = self._acquire_sweeps()
 
             if err:
                 self.stopRequested = True
                 self.sigNextLine.emit()
                 return
 
-            # Average the sweeps, turning the long array into a short one (whose length is the number of frequencies)
-            new_counts = np.reshape(a=new_counts, newshape=(self.average_factor, len(self.freq_list)))
-            new_counts = np.mean(new_counts, axis=0)
-
             # save_count_data(self.iterable, data=new_counts)
             # self.iterable += 1
             # Add new count data to raw_data array and append if array is too small
@@ -915,6 +1002,7 @@ class ODMRAWGLogic(GenericLogic):
             parameters['Microwave Sweep Power (dBm)'] = self.sweep_mw_power
             parameters['Run Time (s)'] = self.run_time
             parameters['Number of frequency sweeps (#)'] = self.elapsed_sweeps
+            parameters['Duty cycle'] = self.duty_cycle
             parameters['Start Frequency (Hz)'] = self.mw_start
             parameters['Stop Frequency (Hz)'] = self.mw_stop
             parameters['Step size (Hz)'] = self.mw_step
@@ -30,13 +30,15 @@ import datetime
 import matplotlib.pyplot as plt
 
 from logic.generic_logic import GenericLogic
+from logic.odmr_stream_mixin import ODMRStreamMixin
 from core.util.mutex import Mutex
+from core.instrumentation import probe_signal, remove_signal_probe
 from core.connector import Connector
 from core.configoption import ConfigOption
 from core.statusvariable import StatusVar
 
 
-class ODMRLogic(GenericLogic):
+class ODMRLogic(GenericLogic, ODMRStreamMixin):
     """This is the Logic class for ODMR."""
 
     # declare connectors
@@ -52,6 +54,8 @@ class ODMRLogic(GenericLogic):
         'LIST',
         missing='warn',
         converter=lambda x: MicrowaveMode[x.upper()])
+    # count continuously over many sweeps, if the ODMR counter supports it
+    _continuous_counting = ConfigOption('continuous_counting', False)
 
     clock_frequency = StatusVar('clock_frequency', 200)
     cw_mw_frequency = StatusVar('cw_mw_frequency', 2870e6)
@@ -112,6 +116,7 @@ class ODMRLogic(GenericLogic):
         # Elapsed measurement time and number of sweeps
         self.elapsed_time = 0.0
         self.elapsed_sweeps = 0
+        self._startTime = time.time()
 
         self.range_to_fit = 0
         self.matrix_range = 0
@@ -139,8 +144,12 @@ class ODMRLogic(GenericLogic):
         self.mw_off()
         self.set_cw_parameters(self.cw_mw_frequency, self.cw_mw_power)
 
+        self._set_up_odmr_stream()
+
         # Connect signals
         self.sigNextLine.connect(self._scan_odmr_line, QtCore.Qt.QueuedConnection)
+        self._next_line_probe = probe_signal(
+            self.sigNextLine, '{0}.sigNextLine'.format(self._name), self)
         return
 
     def on_deactivate(self):
@@ -161,6 +170,8 @@ class ODMRLogic(GenericLogic):
         # Switch off microwave source for sure (also if CW mode is active or module is still locked)
         self._mw_device.off()
         # Disconnect signals
+        self._tear_down_odmr_stream()
+        remove_signal_probe(self._next_line_probe)
         self.sigNextLine.disconnect()
 
     @fc.constructor
@@ -205,6 +216,22 @@ class ODMRLogic(GenericLogic):
         else:
             return None
 
+    def _publish_plots(self):
+        """ Publish a snapshot of the plot data and send it with sigOdmrPlotsUpdated.
+
+        The arrays of the snapshot are copies, so the GUI can draw them while the next sweep is
+        already written into odmr_raw_data. With the same start_time, the matrix of a snapshot
+        with more sweeps is the one before moved down by the new sweeps added on top.
+        """
+        snapshot = self.publish_snapshot('odmr_plots',
+                                         x=self.odmr_plot_x,
+                                         y=self.odmr_plot_y,
+                                         xy=self.odmr_plot_xy,
+                                         sweeps=self.elapsed_sweeps,
+                                         start_time=self._startTime)
+        self.sigOdmrPlotsUpdated.emit(snapshot.x, snapshot.y, snapshot.xy)
+        return
+
     def _initialize_odmr_plots(self):
         """ Initializing the ODMR plots (line and matrix). """
 
@@ -232,7 +259,7 @@ class ODMRLogic(GenericLogic):
 
         self.odmr_fit_y = np.zeros(self.odmr_fit_x.size)
 
-        self.sigOdmrPlotsUpdated.emit(self.odmr_plot_x, self.odmr_plot_y, self.odmr_plot_xy)
+        self._publish_plots()
         current_fit = self.fc.current_fit
         self.sigOdmrFitUpdated.emit(self.odmr_fit_x, self.odmr_fit_y, {}, current_fit)
         return
@@ -281,7 +308,7 @@ class ODMRLogic(GenericLogic):
                 dtype=np.float64
             )
 
-        self.sigOdmrPlotsUpdated.emit(self.odmr_plot_x, self.odmr_plot_y, self.odmr_plot_xy)
+        self._publish_plots()
         self.sigParameterUpdated.emit({'average_length': self.lines_to_average})
         return self.lines_to_average
 
@@ -616,6 +643,7 @@ class ODMRLogic(GenericLogic):
 
         @return int: error code (0:OK, -1:error)
         """
+        self._stop_odmr_stream()
 
         ret_val1 = self._odmr_counter.close_odmr()
         if ret_val1 != 0:
@@ -663,6 +691,8 @@ class ODMRLogic(GenericLogic):
                 return -1
 
             self._initialize_odmr_plots()
+            # the stream is set up with the length of the sweep just initialized
+            self._start_odmr_stream()
             # initialize raw_data array
             estimated_number_of_lines = self.run_time * self.clock_frequency / self.odmr_plot_x.size
             estimated_number_of_lines = int(1.5 * estimated_number_of_lines)  # Safety
@@ -709,6 +739,7 @@ class ODMRLogic(GenericLogic):
                 self._stop_odmr_counter()
                 self.module_state.unlock()
                 return -1
+            self._start_odmr_stream()
 
             self.sigNextLine.emit()
             return 0
@@ -733,91 +764,6 @@ class ODMRLogic(GenericLogic):
                 self._clearOdmrData = True
         return
 
-    def _scan_odmr_line(self):
-        """ Scans one line in ODMR
-
-        (from mw_start to mw_stop in steps of mw_step)
-        """
-        with self.threadlock:
-            # If the odmr measurement is not running do nothing
-            if self.module_state() != 'locked':
-                return
-
-            # Stop measurement if stop has been requested
-            if self.stopRequested:
-                self.stopRequested = False
-                self.mw_off()
-                self._stop_odmr_counter()
-                self.module_state.unlock()
-                return
-
-            # if during the scan a clearing of the ODMR data is needed:
-            if self._clearOdmrData:
-                self.elapsed_sweeps = 0
-                self._startTime = time.time()
-
-            # reset position so every line starts from the same frequency
-            self.reset_sweep()
-
-            # Acquire count data
-            error, new_counts = self._odmr_counter.count_odmr(length=self.odmr_plot_x.size)
-
-            if error:
-                self.stopRequested = True
-                self.sigNextLine.emit()
-                return
-
-            # Add new count data to raw_data array and append if array is too small
-            if self._clearOdmrData:
-                self.odmr_raw_data[:, :, :] = 0
-                self._clearOdmrData = False
-            if self.elapsed_sweeps == (self.odmr_raw_data.shape[0] - 1):
-                expanded_array = np.zeros(self.odmr_raw_data.shape)
-                self.odmr_raw_data = np.concatenate((self.odmr_raw_data, expanded_array), axis=0)
-                self.log.warning('raw data array in ODMRLogic was not big enough for the entire '
-                                 'measurement. Array will be expanded.\nOld array shape was '
-                                 '({0:d}, {1:d}), new shape is ({2:d}, {3:d}).'
-                                 ''.format(self.odmr_raw_data.shape[0] - self.number_of_lines,
-                                           self.odmr_raw_data.shape[1],
-                                           self.odmr_raw_data.shape[0],
-                                           self.odmr_raw_data.shape[1]))
-
-            # shift data in the array "up" and add new data at the "bottom"
-            self.odmr_raw_data = np.roll(self.odmr_raw_data, 1, axis=0)
-
-            self.odmr_raw_data[0] = new_counts
-
-            # Add new count data to mean signal
-            if self._clearOdmrData:
-                self.odmr_plot_y[:, :] = 0
-
-            if self.lines_to_average <= 0:
-                self.odmr_plot_y = np.mean(
-                    self.odmr_raw_data[:max(1, self.elapsed_sweeps), :, :],
-                    axis=0,
-                    dtype=np.float64
-                )
-            else:
-                self.odmr_plot_y = np.mean(
-                    self.odmr_raw_data[:max(1, min(self.lines_to_average, self.elapsed_sweeps)), :, :],
-                    axis=0,
-                    dtype=np.float64
-                )
-
-            # Set plot slice of matrix
-            self.odmr_plot_xy = self.odmr_raw_data[:self.number_of_lines, :, :]
-
-            # Update elapsed time/sweeps
-            self.elapsed_sweeps += 1
-            self.elapsed_time = time.time() - self._startTime
-            if self.elapsed_time >= self.run_time:
-                self.stopRequested = True
-            # Fire update signals
-            self.sigOdmrElapsedTimeUpdated.emit(self.elapsed_time, self.elapsed_sweeps)
-            self.sigOdmrPlotsUpdated.emit(self.odmr_plot_x, self.odmr_plot_y, self.odmr_plot_xy)
-            self.sigNextLine.emit()
-            return
-
     def get_odmr_channels(self):
         return self._odmr_counter.get_odmr_channels()
 
@@ -897,6 +843,7 @@ class ODMRLogic(GenericLogic):
             parameters['Microwave Sweep Power (dBm)'] = self.sweep_mw_power
             parameters['Run Time (s)'] = self.run_time
             parameters['Number of frequency sweeps (#)'] = self.elapsed_sweeps
+            parameters['Duty cycle'] = self.duty_cycle
             parameters['Start Frequencies (Hz)'] = self.mw_starts
             parameters['Stop Frequencies (Hz)'] = self.mw_stops
             parameters['Step sizes (Hz)'] = self.mw_steps
@@ -932,6 +879,7 @@ class ODMRLogic(GenericLogic):
                 parameters['Microwave Sweep Power (dBm)'] = self.sweep_mw_power
                 parameters['Run Time (s)'] = self.run_time
                 parameters['Number of frequency sweeps (#)'] = self.elapsed_sweeps
+                parameters['Duty cycle'] = self.duty_cycle
                 parameters['Start Frequency (Hz)'] = frequency_arr[0]
                 parameters['Stop Frequency (Hz)'] = frequency_arr[-1]
                 parameters['Step size (Hz)'] = frequency_arr[1] - frequency_arr[0]
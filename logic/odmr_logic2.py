@@ -30,13 +30,14 @@ import datetime
 import matplotlib.pyplot as plt
 
 from logic.generic_logic import GenericLogic
+from logic.odmr_stream_mixin import ODMRStreamMixin
 from core.util.mutex import Mutex
 from core.connector import Connector
 from core.configoption import ConfigOption
 from core.statusvariable import StatusVar
 
 
-class ODMRLogic(GenericLogic):
+class ODMRLogic(GenericLogic, ODMRStreamMixin):
     """This is the Logic class for ODMR."""
 
     # declare connectors
@@ -52,6 +53,8 @@ class ODMRLogic(GenericLogic):
                     'LIST',
                     missing='warn',
                     converter=lambda x: MicrowaveMode[x.upper()])
+    # count continuously over many sweeps, if the ODMR counter supports it
+    _continuous_counting = ConfigOption('continuous_counting', False)
 
     clock_frequency = StatusVar('clock_frequency', 200)
     cw_mw_frequency = StatusVar('cw_mw_frequency', 2870e6)
@@ -133,6 +136,8 @@ class ODMRLogic(GenericLogic):
         self.mw_off()
         self.set_cw_parameters(self.cw_mw_frequency, self.cw_mw_power)
 
+        self._set_up_odmr_stream()
+
         # Connect signals
         self.sigNextLine.connect(self._scan_odmr_line, QtCore.Qt.QueuedConnection)
         return
@@ -155,6 +160,7 @@ class ODMRLogic(GenericLogic):
         # Switch off microwave source for sure (also if CW mode is active or module is still locked)
         self._mw_device.off()
         # Disconnect signals
+        self._tear_down_odmr_stream()
         self.sigNextLine.disconnect()
 
     @fc.constructor
@@ -199,6 +205,11 @@ class ODMRLogic(GenericLogic):
         else:
             return None
 
+    def _publish_plots(self):
+        """ Send the plot data with sigOdmrPlotsUpdated. """
+        self.sigOdmrPlotsUpdated.emit(self.odmr_plot_x, self.odmr_plot_y, self.odmr_plot_xy)
+        return
+
     def _initialize_odmr_plots(self):
         """ Initializing the ODMR plots (line and matrix). """
         self.odmr_plot_x = np.arange(self.mw_start, self.mw_stop + self.mw_step, self.mw_step)
@@ -557,6 +568,7 @@ class ODMRLogic(GenericLogic):
 
         @return int: error code (0:OK, -1:error)
         """
+        self._stop_odmr_stream()
 
         ret_val1 = self._odmr_counter.close_odmr()
         if ret_val1 != 0:
@@ -604,6 +616,8 @@ class ODMRLogic(GenericLogic):
                 return -1
 
             self._initialize_odmr_plots()
+            # the stream is set up with the length of the sweep just initialized
+            self._start_odmr_stream()
             # initialize raw_data array
             estimated_number_of_lines = self.run_time * self.clock_frequency / self.odmr_plot_x.size
             estimated_number_of_lines = int(1.5 * estimated_number_of_lines)  # Safety
@@ -650,6 +664,7 @@ class ODMRLogic(GenericLogic):
                 self._stop_odmr_counter()
                 self.module_state.unlock()
                 return -1
+            self._start_odmr_stream()
 
             self.sigNextLine.emit()
             return 0
@@ -674,91 +689,6 @@ class ODMRLogic(GenericLogic):
                 self._clearOdmrData = True
         return
 
-    def _scan_odmr_line(self):
-        """ Scans one line in ODMR
-
-        (from mw_start to mw_stop in steps of mw_step)
-        """
-        with self.threadlock:
-            # If the odmr measurement is not running do nothing
-            if self.module_state() != 'locked':
-                return
-
-            # Stop measurement if stop has been requested
-            if self.stopRequested:
-                self.stopRequested = False
-                self.mw_off()
-                self._stop_odmr_counter()
-                self.module_state.unlock()
-                return
-
-            # if during the scan a clearing of the ODMR data is needed:
-            if self._clearOdmrData:
-                self.elapsed_sweeps = 0
-                self._startTime = time.time()
-
-            # reset position so every line starts from the same frequency
-            self.reset_sweep()
-
-            # Acquire count data
-            error, new_counts = self._odmr_counter.count_odmr(length=self.odmr_plot_x.size)
-
-            if error:
-                self.stopRequested = True
-                self.sigNextLine.emit()
-                return
-
-            # Add new count data to raw_data array and append if array is too small
-            if self._clearOdmrData:
-                self.odmr_raw_data[:, :, :] = 0
-                self._clearOdmrData = False
-            if self.elapsed_sweeps == (self.odmr_raw_data.shape[0] - 1):
-                expanded_array = np.zeros(self.odmr_raw_data.shape)
-                self.odmr_raw_data = np.concatenate((self.odmr_raw_data, expanded_array), axis=0)
-                self.log.warning('raw data array in ODMRLogic was not big enough for the entire '
-                                 'measurement. Array will be expanded.\nOld array shape was '
-                                 '({0:d}, {1:d}), new shape is ({2:d}, {3:d}).'
-                                 ''.format(self.odmr_raw_data.shape[0] - self.number_of_lines,
-                                           self.odmr_raw_data.shape[1],
-                                           self.odmr_raw_data.shape[0],
-                                           self.odmr_raw_data.shape[1]))
-
-            # shift data in the array "up" and add new data at the "bottom"
-            self.odmr_raw_data = np.roll(self.odmr_raw_data, 1, axis=0)
-
-            self.odmr_raw_data[0] = new_counts
-
-            # Add new count data to mean signal
-            if self._clearOdmrData:
-                self.odmr_plot_y[:, :] = 0
-
-            if self.lines_to_average <= 0:
-                self.odmr_plot_y = np.mean(
-                    self.odmr_raw_data[:max(1, self.elapsed_sweeps), :, :],
-                    axis=0,
-                    dtype=np.float64
-                )
-            else:
-                self.odmr_plot_y = np.mean(
-                    self.odmr_raw_data[:max(1, min(self.lines_to_average, self.elapsed_sweeps)), :, :],
-                    axis=0,
-                    dtype=np.float64
-                )
-
-            # Set plot slice of matrix
-            self.odmr_plot_xy = self.odmr_raw_data[:self.number_of_lines, :, :]
-
-            # Update elapsed time/sweeps
-            self.elapsed_sweeps += 1
-            self.elapsed_time = time.time() - self._startTime
-            if self.elapsed_time >= self.run_time:
-                self.stopRequested = True
-            # Fire update signals
-            self.sigOdmrElapsedTimeUpdated.emit(self.elapsed_time, self.elapsed_sweeps)
-            self.sigOdmrPlotsUpdated.emit(self.odmr_plot_x, self.odmr_plot_y, self.odmr_plot_xy)
-            self.sigNextLine.emit()
-            return
-
     def get_odmr_channels(self):
         return self._odmr_counter.get_odmr_channels()
 
@@ -832,6 +762,7 @@ class ODMRLogic(GenericLogic):
             parameters['Microwave Sweep Power (dBm)'] = self.sweep_mw_power
             parameters['Run Time (s)'] = self.run_time
             parameters['Number of frequency sweeps (#)'] = self.elapsed_sweeps
+            parameters['Duty cycle'] = self.duty_cycle
             parameters['Start Frequency (Hz)'] = self.mw_start
             parameters['Stop Frequency (Hz)'] = self.mw_stop
             parameters['Step size (Hz)'] = self.mw_step
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains the sweep acquisition shared by the ODMR logic modules.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+from qtpy import QtCore
+import numpy as np
+import time
+
+from core.instrumentation import timed, timing
+
+
+class ODMRStreamMixin:
+    """ Sweep acquisition of the ODMR logic modules, sweep by sweep or with continuous counting
+    over all sweeps (config option continuous_counting).
+
+    The logic module using it provides the ODMR counter (_odmr_counter), the sweep and plot
+    attributes (odmr_plot_x, odmr_plot_y, odmr_plot_xy, odmr_raw_data, clock_frequency,
+    number_of_lines, lines_to_average, run_time), the scan state (elapsed_sweeps, elapsed_time,
+    _startTime, stopRequested, _clearOdmrData, threadlock), sigNextLine, sigOdmrElapsedTimeUpdated,
+    reset_sweep, mw_off, _stop_odmr_counter and _publish_plots. It calls _set_up_odmr_stream on
+    activation and _tear_down_odmr_stream on deactivation.
+    """
+
+    def _set_up_odmr_stream(self):
+        """ Create the state of the continuous counting, call on activation. """
+        # Continuous counting: samples not yet assigned to a complete sweep and the timer
+        # polling the counter for new samples
+        self._streaming = False
+        self._stream_remainder = None
+        self._stream_timer = QtCore.QTimer()
+        self._stream_timer.setSingleShot(True)
+        self._stream_timer.timeout.connect(self._scan_odmr_line, QtCore.Qt.QueuedConnection)
+
+    def _tear_down_odmr_stream(self):
+        """ Stop and disconnect the polling timer, call on deactivation. """
+        self._stream_timer.stop()
+        self._stream_timer.timeout.disconnect()
+
+    def _start_odmr_stream(self):
+        """
+        Start continuous counting over all sweeps, if configured and supported by the counter.
+        Otherwise every sweep is counted separately by _scan_odmr_line.
+
+        @return bool: whether continuous counting is active
+        """
+        self._streaming = False
+        self._stream_remainder = None
+        if not self._continuous_counting:
+            return False
+        self.reset_sweep()
+        if self._odmr_counter.start_odmr_stream(length=self.odmr_plot_x.size) < 0:
+            self.log.warning('ODMR counter does not support continuous counting, every sweep is '
+                             'counted separately.')
+            return False
+        self._streaming = True
+        return True
+
+    def _stop_odmr_stream(self):
+        """ Stop the continuous counting, if it is active. """
+        if self._streaming:
+            self._stream_timer.stop()
+            self._odmr_counter.stop_odmr_stream()
+            self._streaming = False
+
+    @property
+    def duty_cycle(self):
+        """ Fraction of the elapsed measurement time spent counting, i.e. without the dead time
+        between the sweeps.
+
+        @return float: duty cycle between 0 and 1
+        """
+        if self.elapsed_time <= 0:
+            return 0.0
+        counting_time = self.elapsed_sweeps * self.odmr_plot_x.size / self.clock_frequency
+        return min(counting_time / self.elapsed_time, 1.0)
+
+    @timed()
+    def _scan_odmr_line(self):
+        """ Scans one line in ODMR
+
+        (from mw_start to mw_stop in steps of mw_step)
+
+        With continuous counting all sweeps completed since the last call are added instead.
+        """
+        with self.threadlock:
+            # If the odmr measurement is not running do nothing
+            if self.module_state() != 'locked':
+                return
+
+            # Stop measurement if stop has been requested
+            if self.stopRequested:
+                self.stopRequested = False
+                self.mw_off()
+                self._stop_odmr_counter()
+                self.log.debug('ODMR scan stopped after {0:d} sweeps, duty cycle {1:.1%}.'
+                               ''.format(self.elapsed_sweeps, self.duty_cycle))
+                self.module_state.unlock()
+                return
+
+            # if during the scan a clearing of the ODMR data is needed:
+            if self._clearOdmrData:
+                self.elapsed_sweeps = 0
+                self._startTime = time.time()
+
+            # Acquire count data
+            if self._streaming:
+                error, sweeps = self._read_odmr_stream()
+            else:
+                # reset position so every line starts from the same frequency
+                self.reset_sweep()
+                with timing('{0}.count_odmr', self._name):
+                    error, new_counts = self._odmr_counter.count_odmr(
+                        length=self.odmr_plot_x.size)
+                sweeps = [new_counts]
+
+            if error:
+                self.stopRequested = True
+                self.sigNextLine.emit()
+                return
+
+            for new_counts in sweeps:
+                self._add_sweep(new_counts)
+
+            if len(sweeps) > 0:
+                # Add new count data to mean signal
+                if self.lines_to_average <= 0:
+                    self.odmr_plot_y = np.mean(
+                        self.odmr_raw_data[:max(1, self.elapsed_sweeps), :, :],
+                        axis=0,
+                        dtype=np.float64
+                    )
+                else:
+                    self.odmr_plot_y = np.mean(
+                        self.odmr_raw_data[:max(1, min(self.lines_to_average, self.elapsed_sweeps)), :, :],
+                        axis=0,
+                        dtype=np.float64
+                    )
+
+                # Set plot slice of matrix
+                self.odmr_plot_xy = self.odmr_raw_data[:self.number_of_lines, :, :]
+
+            # Update elapsed time
+            self.elapsed_time = time.time() - self._startTime
+            if self.elapsed_time >= self.run_time:
+                self.stopRequested = True
+            # Fire update signals
+            if len(sweeps) > 0:
+                self.sigOdmrElapsedTimeUpdated.emit(self.elapsed_time, self.elapsed_sweeps)
+                self._publish_plots()
+            if self._streaming and not self.stopRequested:
+                # poll the counter again after about half a sweep
+                self._stream_timer.start(
+                    max(1, int(500 * self.odmr_plot_x.size / self.clock_frequency)))
+            else:
+                self.sigNextLine.emit()
+            return
+
+    def _read_odmr_stream(self):
+        """ Read the new pixels of the continuous counting and cut the complete sweeps out of them.
+        The pixels of an incomplete sweep are kept until the next call.
+
+        @return (bool, list): tuple: was there an error, count arrays of the completed sweeps
+        """
+        with timing('{0}.read_odmr_stream', self._name):
+            error, counts = self._odmr_counter.read_odmr_stream()
+        if error:
+            return True, []
+        length = self.odmr_plot_x.size
+        if self._stream_remainder is not None and self._stream_remainder.shape[1] > 0:
+            counts = np.concatenate((self._stream_remainder, counts), axis=1)
+        num_sweeps = counts.shape[1] // length
+        self._stream_remainder = counts[:, num_sweeps * length:]
+        sweeps = counts[:, :num_sweeps * length].reshape(counts.shape[0], num_sweeps, length)
+        return False, list(sweeps.transpose(1, 0, 2))
+
+    def _add_sweep(self, new_counts):
+        """ Add the counts of one sweep to the raw data matrix.
+
+        @param float[c][n] new_counts: counts of all c channels for the n frequencies of the sweep
+        """
+        # Add new count data to raw_data array and append if array is too small
+        if self._clearOdmrData:
+            self.odmr_raw_data[:, :, :] = 0
+            self.odmr_plot_y[:, :] = 0
+            self._clearOdmrData = False
+        if self.elapsed_sweeps == (self.odmr_raw_data.shape[0] - 1):
+            expanded_array = np.zeros(self.odmr_raw_data.shape)
+            self.odmr_raw_data = np.concatenate((self.odmr_raw_data, expanded_array), axis=0)
+            self.log.warning('raw data array in ODMRLogic was not big enough for the entire '
+                             'measurement. Array will be expanded.\nOld array shape was '
+                             '({0:d}, {1:d}), new shape is ({2:d}, {3:d}).'
+                             ''.format(self.odmr_raw_data.shape[0] - self.number_of_lines,
+                                       self.odmr_raw_data.shape[1],
+                                       self.odmr_raw_data.shape[0],
+                                       self.odmr_raw_data.shape[1]))
+
+        # shift data in the array "up" and add new data at the "bottom"
+        self.odmr_raw_data = np.roll(self.odmr_raw_data, 1, axis=0)
+
+        self.odmr_raw_data[0] = new_counts
+        self.elapsed_sweeps += 1
+        return
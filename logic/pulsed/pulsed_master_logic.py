@@ -67,7 +67,7 @@ class PulsedMasterLogic(GenericLogic):
     sigManuallyPullData = QtCore.Signal()
 
     # signals for master module (i.e. GUI) coming from PulsedMeasurementLogic
-    sigMeasurementDataUpdated = QtCore.Signal()
+    sigMeasurementDataUpdated = QtCore.Signal(object)
     sigTimerUpdated = QtCore.Signal(float, int, float)
     sigFitUpdated = QtCore.Signal(str, np.ndarray, object, bool)
     sigMeasurementStatusUpdated = QtCore.Signal(bool, bool)
@@ -354,6 +354,11 @@ class PulsedMasterLogic(GenericLogic):
     def extraction_settings(self):
         return self.pulsedmeasurementlogic().extraction_settings
 
+    @property
+    def measurement_snapshot(self):
+        """ Most recent DataSnapshot of the measurement data, see sigMeasurementDataUpdated """
+        return self.pulsedmeasurementlogic().get_snapshot('measurement')
+
     @property
     def signal_data(self):
         return self.pulsedmeasurementlogic().signal_data
@@ -31,6 +31,7 @@ from core.connector import Connector
 from core.configoption import ConfigOption
 from core.statusvariable import StatusVar
 from core.util.mutex import Mutex
+from core.instrumentation import timed, timing
 from core.util.network import netobtain
 from core.util import units
 from core.util.math import compute_ft
@@ -98,7 +99,9 @@ class PulsedMeasurementLogic(GenericLogic):
     base_corr = StatusVar(default=True)
 
     # notification signals for master module (i.e. GUI)
-    sigMeasurementDataUpdated = QtCore.Signal()
+    # carries the DataSnapshot 'measurement' with signal_data, signal_alt_data, measurement_error,
+    # laser_data and raw_data
+    sigMeasurementDataUpdated = QtCore.Signal(object)
     sigTimerUpdated = QtCore.Signal(float, int, float)
     sigFitUpdated = QtCore.Signal(str, np.ndarray, object, bool)
     sigMeasurementStatusUpdated = QtCore.Signal(bool, bool)
@@ -133,6 +136,8 @@ class PulsedMeasurementLogic(GenericLogic):
         # measurement data
         self.signal_data = np.empty((2, 0), dtype=float)
         self.signal_alt_data = np.empty((2, 0), dtype=float)
+        # input, settings and result of the last alternative data computation
+        self._alt_data_cache = (None, None, None)
         self.measurement_error = np.empty((2, 0), dtype=float)
         self.laser_data = np.zeros((10, 20), dtype='int64')
         self.raw_data = np.zeros((10, 20), dtype='int64')
@@ -957,7 +962,7 @@ class PulsedMeasurementLogic(GenericLogic):
                 self._alternative_data_type = alt_data_type
 
             self._compute_alt_data()
-            self.sigMeasurementDataUpdated.emit()
+            self._publish_measurement_data()
         return
 
     @QtCore.Slot()
@@ -1097,6 +1102,7 @@ class PulsedMeasurementLogic(GenericLogic):
                                                                         self.__fast_counter_gates))
         return
 
+    @timed()
     def _pulsed_analysis_loop(self):
         """ Acquires laser pulses from fast counter,
             calculates fluorescence signal and creates plots.
@@ -1144,9 +1150,20 @@ class PulsedMeasurementLogic(GenericLogic):
             # emit signals
             self.sigTimerUpdated.emit(self.__elapsed_time, self.__elapsed_sweeps,
                                       self.__timer_interval)
-            self.sigMeasurementDataUpdated.emit()
+            self._publish_measurement_data()
             return
 
+    def _publish_measurement_data(self):
+        """ Publish a snapshot of the measurement data and send it with sigMeasurementDataUpdated.
+        """
+        snapshot = self.publish_snapshot('measurement',
+                                         signal_data=self.signal_data,
+                                         signal_alt_data=self.signal_alt_data,
+                                         measurement_error=self.measurement_error,
+                                         laser_data=self.laser_data,
+                                         raw_data=self.raw_data)
+        self.sigMeasurementDataUpdated.emit(snapshot)
+
     def _extract_laser_pulses(self):
         # Get counter raw data (including recalled raw data from previous measurement)
         fc_data, info_dict = self._get_raw_data()
@@ -1178,12 +1195,13 @@ class PulsedMeasurementLogic(GenericLogic):
                                                  info_dict with keys 'elapsed_sweeps' and 'elapsed_time'
         """
         # get raw data from fast counter
-        fc_data = self.fastcounter().get_data_trace()
+        # obtain the complete return value at once to transfer remote arrays as raw buffers
+        with timing('{0}.get_data_trace', self._name):
+            fc_data = netobtain(self.fastcounter().get_data_trace())
         if type(fc_data) == tuple and len(fc_data) == 2:  # if the hardware implement the new version of the interface
             fc_data, info_dict = fc_data
         else:
             info_dict = {'elapsed_sweeps': None, 'elapsed_time': None}
-        fc_data = netobtain(fc_data)
 
         if isinstance(info_dict, dict) and info_dict.get('elapsed_sweeps') is not None:
             elapsed_sweeps = info_dict['elapsed_sweeps']
@@ -1242,7 +1260,7 @@ class PulsedMeasurementLogic(GenericLogic):
         else:
             self.raw_data = np.zeros(number_of_bins, dtype='int64')
 
-        self.sigMeasurementDataUpdated.emit()
+        self._publish_measurement_data()
         return
 
     # FIXME: Revise everything below
@@ -1594,31 +1612,36 @@ class PulsedMeasurementLogic(GenericLogic):
     def _compute_alt_data(self):
         """
         Performing transformations on the measurement data (e.g. fourier transform).
+
+        The computation is skipped if neither the signal data nor the settings changed since the
+        last call. All signal dimensions are fourier transformed in one go.
         """
+        settings = (self._alternative_data_type, self.zeropad, self.window, self.base_corr,
+                    self.psd)
+        last_input, last_settings, last_result = self._alt_data_cache
+        if last_result is self.signal_alt_data and last_settings == settings \
+                and last_input.shape == self.signal_data.shape \
+                and np.array_equal(last_input, self.signal_data):
+            return
+
         if self._alternative_data_type == 'Delta' and len(self.signal_data) == 3:
             self.signal_alt_data = np.empty((2, self.signal_data.shape[1]), dtype=float)
             self.signal_alt_data[0] = self.signal_data[0]
             self.signal_alt_data[1] = self.signal_data[1] - self.signal_data[2]
         elif self._alternative_data_type == 'FFT' and self.signal_data.shape[1] >= 2:
             fft_x, fft_y = compute_ft(x_val=self.signal_data[0],
-                                      y_val=self.signal_data[1],
+                                      y_val=self.signal_data[1:],
                                       zeropad_num=self.zeropad,
                                       window=self.window,
                                       base_corr=self.base_corr,
                                       psd=self.psd)
             self.signal_alt_data = np.empty((len(self.signal_data), len(fft_x)), dtype=float)
             self.signal_alt_data[0] = fft_x
-            self.signal_alt_data[1] = fft_y
-            for dim in range(2, len(self.signal_data)):
-                dummy, self.signal_alt_data[dim] = compute_ft(x_val=self.signal_data[0],
-                                                              y_val=self.signal_data[dim],
-                                                              zeropad_num=self.zeropad,
-                                                              window=self.window,
-                                                              base_corr=self.base_corr,
-                                                              psd=self.psd)
+            self.signal_alt_data[1:] = fft_y
         else:
             self.signal_alt_data = np.zeros(self.signal_data.shape, dtype=float)
             self.signal_alt_data[0] = self.signal_data[0]
+        self._alt_data_cache = (self.signal_data.copy(), settings, self.signal_alt_data)
         return
 
 
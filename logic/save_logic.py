@@ -24,20 +24,23 @@ import datetime
 import inspect
 import logging
 import matplotlib.pyplot as plt
+import multiprocessing
 import numpy as np
 import os
 import sys
+import threading
 import time
 
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from qtpy import QtCore
 from core.configoption import ConfigOption
 from core.util import units
+from core.util.figure_rendering import FigureSpec, init_worker, render_figure, serialize_figure
 from core.util.mutex import Mutex
 from core.util.network import netobtain
 from logic.generic_logic import GenericLogic
-from matplotlib.backends.backend_pdf import PdfPages
-from PIL import Image
-from PIL import PngImagePlugin
 
 
 class DailyLogHandler(logging.FileHandler):
@@ -129,6 +132,7 @@ class SaveLogic(GenericLogic):
         log_into_daily_directory: True
         save_pdf: True
         save_png: True
+        figure_render_processes: 2  # optional, 0 renders the figures in the calling thread
     """
 
     _win_data_dir = ConfigOption('win_data_directory', 'C:/Data/')
@@ -137,6 +141,13 @@ class SaveLogic(GenericLogic):
         'log_into_daily_directory', False, missing='warn')
     save_pdf = ConfigOption('save_pdf', False)
     save_png = ConfigOption('save_png', True)
+    # number of worker processes rendering the figures, 0 renders them in the calling thread
+    _figure_render_processes = ConfigOption('figure_render_processes', 2)
+
+    # data file name, list of written figure files
+    sigFigureSaved = QtCore.Signal(str, list)
+    # data file name, error message
+    sigFigureSaveFailed = QtCore.Signal(str, str)
 
     # Matplotlib style definition for saving plots
     mpl_qd_style = {
@@ -223,6 +234,11 @@ class SaveLogic(GenericLogic):
 
         self._daily_loghandler = None
 
+        # figure rendering in worker processes, started with the first figure to save
+        self._render_pool = None
+        self._pending_figures = 0
+        self._figures_done = threading.Condition()
+
     def on_activate(self):
         """ Definition, configuration and initialisation of the SaveLogic.
         """
@@ -239,10 +255,30 @@ class SaveLogic(GenericLogic):
             self._daily_loghandler = None
 
     def on_deactivate(self):
+        # finish writing the figures still being rendered
+        if self._render_pool is not None:
+            self._render_pool.shutdown(wait=True)
+            self._render_pool = None
         if self._daily_loghandler is not None:
             # removes the log handler logging into the daily directory
             logging.getLogger().removeHandler(self._daily_loghandler)
 
+    @property
+    def pending_figures(self):
+        """ Number of figures which are still being rendered and written. """
+        with self._figures_done:
+            return self._pending_figures
+
+    def wait_for_figures(self, timeout=None):
+        """ Block until all figures requested so far are written.
+
+        @param float timeout: optional, maximum waiting time in s
+
+        @return bool: True if all figures are written, False on timeout
+        """
+        with self._figures_done:
+            return self._figures_done.wait_for(lambda: self._pending_figures == 0, timeout)
+
     @property
     def dailylog(self):
         """
@@ -330,6 +366,11 @@ class SaveLogic(GenericLogic):
                                               behaviour or failure to save right away.
         @param string delimiter: optional, insert here the delimiter, like '\n' for new line, '\t'
                                  for tab, ',' for a comma ect.
+        @param plotfig: optional, matplotlib figure or core.util.figure_rendering.FigureSpec to
+                        save as PDF and/or PNG next to the data file. The figure is rendered and
+                        written in a worker process, save_data does not wait for it. Completion is
+                        signalled with sigFigureSaved or sigFigureSaveFailed. A FigureSpec is also
+                        drawn in the worker, which takes the figure creation off the calling thread.
 
         1D data
         =======
@@ -580,66 +621,77 @@ class SaveLogic(GenericLogic):
             metadata['Subject'] = 'Find more information on: https://github.com/Ulm-IQO/qudi'
             metadata['Keywords'] = 'Python 3, Qt, experiment control, automation, measurement, software, framework, modular'
             metadata['Producer'] = 'qudi - Software Suite'
-            if timestamp is not None:
-                metadata['CreationDate'] = timestamp
-                metadata['ModDate'] = timestamp
-            else:
-                metadata['CreationDate'] = time
-                metadata['ModDate'] = time
-
-            if self.save_pdf:
-                # determine the PDF-Filename
-                fig_fname_vector = os.path.join(filepath, filename)[
-                    :-4] + '_fig.pdf'
-
-                # Create the PdfPages object to which we will save the pages:
-                # The with statement makes sure that the PdfPages object is closed properly at
-                # the end of the block, even if an Exception occurs.
-                with PdfPages(fig_fname_vector) as pdf:
-                    pdf.savefig(plotfig, bbox_inches='tight', pad_inches=0.05)
-
-                    # We can also set the file's metadata via the PdfPages
-                    # object:
-                    pdf_metadata = pdf.infodict()
-                    for x in metadata:
-                        pdf_metadata[x] = metadata[x]
-
-            if self.save_png:
-                # determine the PNG-Filename and save the plain PNG
-                fig_fname_image = os.path.join(filepath, filename)[
-                    :-4] + '_fig.png'
-                plotfig.savefig(
-                    fig_fname_image,
-                    bbox_inches='tight',
-                    pad_inches=0.05)
-
-                # Use Pillow (an fork for PIL) to attach metadata to the PNG
-                png_image = Image.open(fig_fname_image)
-                png_metadata = PngImagePlugin.PngInfo()
-
-                # PIL can only handle Strings, so let's convert our times
-                metadata['CreationDate'] = metadata['CreationDate'].strftime(
-                    '%Y%m%d-%H%M-%S')
-                metadata['ModDate'] = metadata['ModDate'].strftime(
-                    '%Y%m%d-%H%M-%S')
-
-                for x in metadata:
-                    # make sure every value of the metadata is a string
-                    if not isinstance(metadata[x], str):
-                        metadata[x] = str(metadata[x])
-
-                    # add the metadata to the picture
-                    png_metadata.add_text(x, metadata[x])
-
-                # save the picture again, this time including the metadata
-                png_image.save(fig_fname_image, "png", pnginfo=png_metadata)
-
-            # close matplotlib figure
-            plt.close(plotfig)
-            self.log.debug(
-                'Time needed to save data: {0:.2f}s'.format(
-                    time.time() - start_time))
-            # ----------------------------------------------------------------------------------
+            metadata['CreationDate'] = timestamp
+            metadata['ModDate'] = timestamp
+
+            self._save_figure(plotfig, os.path.join(filepath, filename), metadata)
+        self.log.debug('Time needed to save data: {0:.2f}s'.format(time.time() - start_time))
+
+    def _save_figure(self, plotfig, data_file, metadata):
+        """ Render a figure in a worker process, or right here if no workers are configured.
+
+        @param plotfig: matplotlib figure or FigureSpec
+        @param str data_file: path of the data file the figure belongs to
+        @param dict metadata: metadata for the figure files
+        """
+        file_base = data_file[:-4]
+        args = (file_base, metadata, self.mpl_qd_style, self.save_pdf, self.save_png)
+        if self._figure_render_processes > 0:
+            # freeze the data now, the caller may change its buffers right after this call
+            serialized = serialize_figure(plotfig)
+            if not isinstance(plotfig, FigureSpec):
+                plt.close(plotfig)
+            with self._figures_done:
+                self._pending_figures += 1
+            try:
+                future = self._get_render_pool().submit(render_figure, serialized, *args)
+            except (BrokenProcessPool, RuntimeError):
+                self.log.warning('Figure rendering processes not available, rendering {0} in '
+                                 'this thread.'.format(os.path.basename(file_base)))
+                self._render_pool = None
+                self._render_here(serialized, data_file, args)
+                self._figure_done()
+                return
+            future.add_done_callback(lambda f: self._figure_rendered(f, data_file))
+        else:
+            self._render_here(plotfig, data_file, args)
+
+    def _get_render_pool(self):
+        if self._render_pool is None:
+            # spawn, forking a process with running Qt threads is not safe
+            self._render_pool = ProcessPoolExecutor(
+                max_workers=self._figure_render_processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker)
+        return self._render_pool
+
+    def _render_here(self, plotfig, data_file, args):
+        try:
+            written = render_figure(plotfig, *args)
+        except Exception as e:
+            self.log.exception('Saving figure of {0} failed:'.format(data_file))
+            self.sigFigureSaveFailed.emit(data_file, str(e))
+        else:
+            self.sigFigureSaved.emit(data_file, written)
+
+    def _figure_rendered(self, future, data_file):
+        """ Done callback of a figure rendered in a worker process, called in a pool thread. """
+        try:
+            written = future.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._render_pool = None
+            self.log.error('Saving figure of {0} failed: {1}'.format(data_file, e))
+            self.sigFigureSaveFailed.emit(data_file, str(e))
+        else:
+            self.sigFigureSaved.emit(data_file, written)
+        finally:
+            self._figure_done()
+
+    def _figure_done(self):
+        with self._figures_done:
+            self._pending_figures -= 1
+            self._figures_done.notify_all()
 
     def save_array_as_text(
             self,
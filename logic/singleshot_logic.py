@@ -29,6 +29,7 @@ import time
 from collections import OrderedDict
 from core.connector import Connector
 from core.util.network import netobtain
+from core.util.trace_analysis import iter_binnings, window_sums
 from logic.generic_logic import GenericLogic
 from qtpy import QtCore
 
@@ -191,17 +192,12 @@ class SingleShotLogic(GenericLogic):
         @param float smoothing: If pulse detection doesn't work, change this value
         @return numpy array: dimensionality is n_rows x n_laserpulses
         """
-        sum_single_pulses = []
-        start_stop_tupel_list = self.find_laser(smoothing=smoothing, n_laserpulses=n_laserpulses)
-        if self.data_dict:
-            data = self.data_dict['raw_data']
-            for row in data:
-                laser_pulses = [np.sum(row[jj[0]:jj[1]]) for jj in start_stop_tupel_list]
-                sum_single_pulses.append(laser_pulses)
-        else:
+        if not self.data_dict:
             self.log.error('Pull data from fastcounting device using get_data function before trying to sum_laserpulse.')
+            return np.array([])
 
-        return np.array(sum_single_pulses)
+        start_stop_tupel_list = self.find_laser(smoothing=smoothing, n_laserpulses=n_laserpulses)
+        return window_sums(self.data_dict['raw_data'], start_stop_tupel_list)
 
 
     def get_normalized_signal(self, smoothing=10.0):
@@ -214,13 +210,56 @@ class SingleShotLogic(GenericLogic):
         @return numpy array: 1D array containing the normalized signal
         """
 
-        sum_single_pulses = self.sum_laserpulse()
-        if sum_single_pulses.shape[1] == 2:
-            normalized_signal = np.array([(ii[0] - ii[1])/(ii[0] + ii[1]) for ii in sum_single_pulses])
-        else:
+        sum_single_pulses = self.sum_laserpulse(smoothing=smoothing)
+        if sum_single_pulses.ndim != 2 or sum_single_pulses.shape[1] != 2:
             self.log.warning('could not perform normalisation. Wrong number of laserpulses.')
+            return np.array([])
+
+        return self._normalize(sum_single_pulses)
+
+    @staticmethod
+    def _normalize(signal):
+        """ (first pulse - second pulse) / (first pulse + second pulse) for each row. """
+        return (signal[:, 0] - signal[:, 1]) / (signal[:, 0] + signal[:, 1])
+
+    def iter_binnings(self, num_bins=100):
+        """
+        Lazily calculate reasonable binnings of the signal, one binning at a time. Use this instead
+        of calc_all_binnings to keep the memory bounded for long single shot runs.
+        @param int num_bins: minimal number the binnings can have
+        @return generator: yields the binned data, starting with the initial binning given by the
+                           measurement and then going up. Each binning is a numpy array with
+                           shape (n_rows // bin_size, 2).
+        """
+        if not self.data_dict:
+            self.log.error('Pull data from fastcounting device using get_data function '
+                           'before trying to calc_all_binnings.')
+            return
+
+        # this is just a guess value, at some point it doesn't make
+        # sense anymore to further decrease the number of bins
+        n_rows = self.data_dict['n_rows']
+        max_bin = n_rows // num_bins
+        signal = self.sum_laserpulse()[:n_rows, :2]
+        # bin sizes 1 up to (excluding) max_bin, like the former implementation
+        yield from iter_binnings(signal, range(1, max_bin))
 
-        return normalized_signal
+    def iter_binnings_normalized(self, num_bins=100):
+        """
+        Lazily calculate all normalized binnings from singleshot data, see iter_binnings.
+        @param integer num_bins: Tells how many data points should still remain
+        @return generator: yields 1D numpy arrays of the normalized binnings
+        """
+        for binning in self.iter_binnings(num_bins=num_bins):
+            yield self._normalize(binning)
+
+    @staticmethod
+    def _to_bin_array(bin_list):
+        """ Pack the binnings (of different lengths) into a 1D object array. """
+        bin_array = np.empty(len(bin_list), dtype=object)
+        for ii, binning in enumerate(bin_list):
+            bin_array[ii] = binning
+        return bin_array
 
     def calc_all_binnings(self, num_bins=100):
         """
@@ -231,39 +270,7 @@ class SingleShotLogic(GenericLogic):
                                initial binning given by the measurement and then going up.
         """
 
-        if self.data_dict:
-            data = self.data_dict
-        else:
-            self.log.error('Pull data from fastcounting device using get_data function '
-                           'before trying to calc_all_binnings.')
-
-        NN = data['n_rows']
-        # this is just a guess value, at some point it doesn't make
-        # sense anymore to further decrease the number of bins
-        max_bin = NN // num_bins
-        count_var = 1
-        bin_list = []
-        temp_list = []
-        signal = self.sum_laserpulse()
-        while count_var <= max_bin:
-            # check if the the first run through loop was done
-            if temp_list:
-                app_arr = np.array(temp_list)
-                bin_list.append(app_arr)
-                temp_list = []
-            jj = 0
-            while jj < NN:
-                sum_ind = np.linspace(jj, jj + count_var - 1, count_var, dtype=np.int)
-                # make sure we don't try to adress not reserved memory
-                jj += count_var
-                if sum_ind[-1] < NN:
-                    # normalize
-                    temp_list.append(np.array([np.sum(signal[sum_ind, 0]), np.sum(signal[sum_ind, 1])]))
-                else:
-                    jj = NN
-            count_var += 1
-
-        return np.array(bin_list)
+        return self._to_bin_array(list(self.iter_binnings(num_bins=num_bins)))
 
     def calc_all_binnings_normalized(self, num_bins=100):
         """
@@ -274,13 +281,7 @@ class SingleShotLogic(GenericLogic):
                                           ( 1 to n values)
         """
 
-        bin_list = self.calc_all_binnings(num_bins=num_bins)
-        normalized_bin_list = []
-        for binning in bin_list:
-            normalized_binning = (binning[:, 0] - binning[:, 1])/(binning[:, 0] + binning[:, 1])
-            normalized_bin_list.append(normalized_binning)
-
-        return np.array(normalized_bin_list)
+        return self._to_bin_array(list(self.iter_binnings_normalized(num_bins=num_bins)))
 
 
     def get_timetrace(self):
@@ -294,7 +295,7 @@ class SingleShotLogic(GenericLogic):
         # what needs to be done here now is the basic evaluation steps like fit, threshold
         # readout fidelity
 
-        bin_list = self.calc_all_binnings(self, num_bins=100)
+        bin_list = self.calc_all_binnings(num_bins=100)
 
         param_dict_list = []
         fidelity_list = []
@@ -515,7 +516,7 @@ class SingleShotLogic(GenericLogic):
         @param record_length:
         @return:
         """
-        normalized_bin_list = self.calc_all_binnings_normalized(self, num_bins=100)
+        normalized_bin_list = self.calc_all_binnings_normalized(num_bins=100)
 
         # for now take only the initial binning
         data = normalized_bin_list[0]
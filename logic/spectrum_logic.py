@@ -21,7 +21,11 @@ top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi
 
 from qtpy import QtCore
 from collections import OrderedDict
+import datetime
 import numpy as np
+import os
+import tempfile
+import weakref
 from enum import Enum
 
 from core.connector import Connector
@@ -52,6 +56,118 @@ class AcquisitionMode(Enum):
     LIVE_SCAN = 2
 
 
+def _remove_file(filename):
+    try:
+        os.remove(filename)
+    except OSError:
+        pass
+
+
+class FrameStack:
+    """ Preallocated stack of the frames of a multiple scan acquisition.
+
+    All frames are stored in one array of shape (number_of_frames, ) + frame_shape. If this array
+    would be larger than max_memory bytes, it is a memory mapped temporary file instead, which is
+    deleted together with this object. The running average and variance of the frames are updated
+    with every new frame, so they are available at any time without going over all frames again.
+
+    With cosmic ray rejection, pixels of a new frame exceeding the running average by more than the
+    rejection coefficient times the standard deviation (at least the shot noise) are clipped to that
+    threshold in the accumulation. The stored frames are never altered. Starting from the
+    third frame, the first two frames are accumulated unchecked.
+    """
+
+    def __init__(self, number_of_frames, frame_shape, dtype, max_memory=None, directory=None,
+                 cosmic_rejection=None):
+        """
+        @param int number_of_frames: number of frames to preallocate
+        @param tuple frame_shape: shape of a single frame, e.g. (tracks, pixels)
+        @param dtype: data type of the frames
+        @param int max_memory: optional, maximum size in bytes of the stack kept in memory
+        @param str directory: optional, directory of the temporary file. Defaults to the temp
+                              directory.
+        @param float cosmic_rejection: optional, rejection coefficient. None disables the rejection.
+        """
+        self.number_of_frames = int(number_of_frames)
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.cosmic_rejection = cosmic_rejection
+        self.count = 0
+        self.rejected = 0
+
+        shape = (self.number_of_frames,) + self.frame_shape
+        self.nbytes = int(np.prod(shape)) * self.dtype.itemsize
+        self._filename = None
+        if max_memory is not None and self.nbytes > max_memory:
+            handle, self._filename = tempfile.mkstemp(prefix='spectrum_frames_', suffix='.raw',
+                                                      dir=directory)
+            os.close(handle)
+            self._frames = np.memmap(self._filename, dtype=self.dtype, mode='w+', shape=shape)
+            weakref.finalize(self, _remove_file, self._filename)
+        else:
+            self._frames = np.empty(shape, dtype=self.dtype)
+
+        self._mean = np.zeros(self.frame_shape, dtype=np.float64)
+        self._m2 = np.zeros(self.frame_shape, dtype=np.float64)
+
+    @property
+    def spilled(self):
+        """ True if the frames are stored in a file instead of memory """
+        return self._filename is not None
+
+    @property
+    def full(self):
+        return self.count >= self.number_of_frames
+
+    def append(self, frame):
+        """ Store the next frame and add it to the running average.
+
+        @param numpy.ndarray frame: the new frame with shape frame_shape
+        """
+        if self.full:
+            raise IndexError('All {0} frames of the stack are already acquired.'
+                             ''.format(self.number_of_frames))
+        self._frames[self.count] = frame
+        values = np.array(frame, dtype=np.float64)
+        if self.cosmic_rejection is not None and self.count >= 2:
+            noise = np.sqrt(np.maximum(self._m2 / (self.count - 1), np.abs(self._mean)))
+            threshold = self._mean + self.cosmic_rejection * noise
+            cosmic = values > threshold
+            values[cosmic] = threshold[cosmic]
+            self.rejected += int(np.count_nonzero(cosmic))
+        # Welford's update of the running mean and the sum of squared deviations
+        self.count += 1
+        delta = values - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (values - self._mean)
+
+    @property
+    def data(self):
+        """ Read-only view of the frames acquired so far, no copy is made. """
+        view = self._frames[:self.count]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def last_frame(self):
+        """ Read-only view of the most recent frame """
+        if self.count < 1:
+            return None
+        return self.data[-1]
+
+    @property
+    def average(self):
+        """ Average of the frames acquired so far (without rejected cosmic rays) """
+        return self._mean.copy()
+
+    @property
+    def std(self):
+        """ Standard deviation of each pixel over the frames acquired so far """
+        if self.count < 2:
+            return np.zeros(self.frame_shape)
+        return np.sqrt(self._m2 / (self.count - 1))
+
+
 class SpectrumLogic(GenericLogic):
     """ This logic module handle the spectrometer gratings and camera """
 
@@ -61,6 +177,12 @@ class SpectrumLogic(GenericLogic):
 
     # declare status variables (logic attribute) :
     _reverse_data_with_side_output = ConfigOption('reverse_data_with_side_output', False)
+    # multiple scan acquisitions larger than this (in bytes) are stored in a temporary file
+    _max_stack_memory = ConfigOption('max_stack_memory', 1e9)
+    # directory of that file, defaults to the temp directory
+    _stack_directory = ConfigOption('stack_directory', None)
+    # interval (in s) of the camera status checks after the exposure time passed
+    _status_poll_interval = ConfigOption('status_poll_interval', 0.01)
 
     # declare status variables (logic attribute) :
     _acquired_data = StatusVar('acquired_data', np.empty((2, 0)))
@@ -80,9 +202,9 @@ class SpectrumLogic(GenericLogic):
 
     # cosmic rejection coeff :
     _coeff_rej_cosmic = StatusVar('coeff_cosmic_rejection', 2.2)
+    _cosmic_rejection = StatusVar('cosmic_rejection', False)
 
     _sigStart = QtCore.Signal()
-    _sigCheckStatus = QtCore.Signal()
     sigUpdateData = QtCore.Signal()
     sigUpdateSettings = QtCore.Signal()
 
@@ -116,6 +238,8 @@ class SpectrumLogic(GenericLogic):
         self._trigger_mode = None
         self._loop_counter = None
         self._loop_timer = None
+        self._status_timer = None
+        self._frame_stack = None
         self._acquisition_params = None
 
     def on_activate(self):
@@ -171,7 +295,9 @@ class SpectrumLogic(GenericLogic):
         self._acquisition_params = OrderedDict()
 
         self._sigStart.connect(self._start_acquisition)
-        self._sigCheckStatus.connect(self._check_status, QtCore.Qt.QueuedConnection)
+        self._status_timer = QtCore.QTimer()
+        self._status_timer.setSingleShot(True)
+        self._status_timer.timeout.connect(self._check_status, QtCore.Qt.QueuedConnection)
         self._loop_timer = QtCore.QTimer()
         self._loop_timer.setSingleShot(True)
         self._loop_timer.timeout.connect(self._acquisition_loop, QtCore.Qt.QueuedConnection)
@@ -182,8 +308,9 @@ class SpectrumLogic(GenericLogic):
             self.stop_acquisition()
             self.log.warning('Stopping running acquisition due to module deactivation.')
 
+        self._status_timer.stop()
+        self._status_timer.timeout.disconnect()
         self._sigStart.disconnect()
-        self._sigCheckStatus.disconnect()
         self.sigUpdateSettings.disconnect()
 
     ##############################################################################
@@ -214,7 +341,8 @@ class SpectrumLogic(GenericLogic):
 
     def _start_acquisition(self):
         """ Start acquisition method initializing the acquisitions constants and calling the acquisition method """
-        self._acquired_data = []
+        self._acquired_data = np.empty((0,))
+        self._frame_stack = None
         if self.acquisition_mode == 'MULTI_SCAN':
             self._loop_counter = self.number_of_scan
         self._acquisition_loop()
@@ -227,11 +355,12 @@ class SpectrumLogic(GenericLogic):
         return self.camera().get_ready_state()
 
     def _acquisition_loop(self):
-        """ Acquisition method starting hardware acquisition and emitting Qtimer signal connected to check status method
+        """ Acquisition method starting hardware acquisition and the timer of the check status method.
+        The status is checked for the first time when the exposure time has passed.
         """
         self._loop_counter -= 1
         self.camera().start_acquisition()
-        self._sigCheckStatus.emit()
+        self._status_timer.start(int(round(1000 * (self._exposure_time or 0))))
 
     def _check_status(self):
         """ Method / Slot used by the acquisition call by Qtimer signal to check if the acquisition is complete """
@@ -244,7 +373,7 @@ class SpectrumLogic(GenericLogic):
 
         # If hardware still running
         if not self.get_ready_state():
-            self._sigCheckStatus.emit()
+            self._status_timer.start(int(round(1000 * self._status_poll_interval)))
             return
 
         # Acquisition is finished
@@ -263,7 +392,18 @@ class SpectrumLogic(GenericLogic):
             return
 
         else:
-            self._acquired_data.append(self.get_acquired_data())
+            frame = self.get_acquired_data()
+            if self._frame_stack is None:
+                frame = np.asarray(frame)
+                self._frame_stack = FrameStack(
+                    self.number_of_scan, frame.shape, frame.dtype,
+                    max_memory=self._max_stack_memory, directory=self._stack_directory,
+                    cosmic_rejection=self._coeff_rej_cosmic if self._cosmic_rejection else None)
+                if self._frame_stack.spilled:
+                    self.log.info('Multiple scan acquisition of {0:.0f} MB is stored in a '
+                                  'temporary file.'.format(self._frame_stack.nbytes / 1e6))
+            self._frame_stack.append(frame)
+            self._acquired_data = self._frame_stack.data
             self.sigUpdateData.emit()
 
             if self._loop_counter <= 0:
@@ -283,8 +423,52 @@ class SpectrumLogic(GenericLogic):
 
     @property
     def acquired_data(self):
-        """ Getter method returning the last acquired data. """
-        return np.array(self._acquired_data)
+        """ Getter method returning the last acquired data.
+
+        In multiple scan mode this is a read-only view of all frames acquired so far with shape
+        (frames, ) + frame shape, no copy is made.
+        """
+        return self._acquired_data
+
+    @property
+    def averaged_data(self):
+        """ Getter method returning the average of the frames of the multiple scan acquisition,
+        without the rejected cosmic rays if the cosmic ray rejection is on. In the other
+        acquisition modes, the last acquired data is returned.
+        """
+        if self._frame_stack is None:
+            return self._acquired_data
+        return self._frame_stack.average
+
+    @property
+    def cosmic_rejection(self):
+        """ Getter method returning if cosmic rays are rejected in the average of multiple scans.
+
+        @return: (bool) cosmic ray rejection on
+        """
+        return self._cosmic_rejection
+
+    @cosmic_rejection.setter
+    def cosmic_rejection(self, enabled):
+        """ Setter method turning the cosmic ray rejection of multiple scans on or off.
+
+        @param enabled: (bool) cosmic ray rejection on
+        """
+        if self.module_state() == 'locked':
+            self.log.error("Acquisition process is currently running : you can't change this parameter"
+                           " until the acquisition is completely stopped ")
+            return
+        self._cosmic_rejection = bool(enabled)
+
+    @_acquired_data.representer
+    def sv_get_acquired_data(self, data):
+        """ A multiple scan acquisition stored in a file is not kept, only its average. """
+        if self._frame_stack is not None and self._frame_stack.spilled:
+            self.log.warning('The {0:d} frames of the multiple scan acquisition are stored in a '
+                             'temporary file, only their average is kept as acquired data. Save '
+                             'the acquisition to keep all frames.'.format(self._frame_stack.count))
+            return self._frame_stack.average
+        return np.array(data)
 
     @property
     def acquisition_params(self):
@@ -314,14 +498,33 @@ class SpectrumLogic(GenericLogic):
     def save_acquired_data(self):
 
         filepath = self.savelogic().get_path_for_module(module_name='spectrum')
-        data = self._acquired_data.flatten()/self._acquisition_params['exposure_time (s)']
+        exposure_time = self._acquisition_params['exposure_time (s)']
+        if self._frame_stack is None:
+            frames = [self._acquired_data]
+        else:
+            # the frames are written one by one, the stack may be a file larger than the memory
+            frames = self._acquired_data
 
+        data = np.ravel(frames[0])/exposure_time
         if self.acquisition_params['read_mode'] == 'IMAGE_ADVANCED':
             data = {'data': data}
         else:
             data = {'wavelength (m)' : self.wavelength_spectrum, 'data': data}
 
-        self.savelogic().save_data(data, filepath=filepath, parameters=self.acquisition_params)
+        timestamp = datetime.datetime.now()
+        filelabel = 'spectrum_logic'
+        if self.savelogic().active_poi_name != '':
+            filelabel = self.savelogic().active_poi_name.replace(' ', '_') + '_' + filelabel
+        filename = timestamp.strftime('%Y%m%d-%H%M-%S' + '_' + filelabel + '.dat')
+        self.savelogic().save_data(data, filepath=filepath, parameters=self.acquisition_params,
+                                   filename=filename, timestamp=timestamp)
+
+        # the following frames continue the data column, the wavelength column is already complete
+        for frame in frames[1:]:
+            data = np.ravel(frame)/exposure_time
+            if self.acquisition_params['read_mode'] != 'IMAGE_ADVANCED':
+                data = np.column_stack((np.full(data.size, np.nan), data))
+            self.savelogic().save_array_as_text(data, filename, filepath=filepath, append=True)
 
     ##############################################################################
     #                            Spectrometer functions
@@ -30,11 +30,39 @@ from core.statusvariable import StatusVar
 from core.configoption import ConfigOption
 from logic.generic_logic import GenericLogic
 from core.util.mutex import Mutex
+from core.util.figure_rendering import FigureSpec
+from core.instrumentation import timed
 from core.util.units import ScaledFloat
 from interface.data_instream_interface import StreamChannelType, StreamingMode
 
 import debugpy
 
+
+def draw_time_series(data, timebase, y_unit):
+    """ Draw figure to save with data file.
+
+    @param: nparray data: a numpy array containing counts vs time for all detectors
+    @param float timebase: data rate in Hz
+    @param str y_unit: unit of the data
+
+    @return: fig fig: a matplotlib figure object to be saved to file.
+    """
+    # Create figure and scale data
+    max_abs_value = ScaledFloat(max(data.max(), np.abs(data.min())))
+    time_data = np.arange(data.shape[1]) / timebase
+    fig, ax = plt.subplots()
+    if max_abs_value.scale:
+        ax.plot(time_data,
+                data.transpose() / max_abs_value.scale_val,
+                linestyle=':',
+                linewidth=0.5)
+    else:
+        ax.plot(time_data, data.transpose(), linestyle=':', linewidth=0.5)
+    ax.set_xlabel('Time (s)')
+    ax.set_ylabel('Signal ({0}{1})'.format(max_abs_value.scale, y_unit))
+    return fig
+
+
 class TimeSeriesReaderLogic(GenericLogic):
     """
     This logic module gathers data from a hardware streaming device.
@@ -534,6 +562,7 @@ class TimeSeriesReaderLogic(GenericLogic):
         return 0
 
     @QtCore.Slot()
+    @timed()
     def acquire_data_block(self):
         """
         This method gets the available data from the hardware.
@@ -716,7 +745,9 @@ class TimeSeriesReaderLogic(GenericLogic):
                     occurrences = count
                     y_unit = unit
 
-            fig = self._draw_figure(data_arr, self.data_rate, y_unit) if save_figure else None
+            # drawn by the figure rendering processes of the save logic
+            fig = FigureSpec(draw_time_series, data=data_arr, timebase=self.data_rate,
+                             y_unit=y_unit) if save_figure else None
 
             self._savelogic.save_data(data=data,
                                       filepath=filepath,
@@ -728,31 +759,6 @@ class TimeSeriesReaderLogic(GenericLogic):
             self.log.info('Time series saved to: {0}'.format(filepath))
         return data_arr, parameters
 
-    def _draw_figure(self, data, timebase, y_unit):
-        """ Draw figure to save with data file.
-
-        @param: nparray data: a numpy array containing counts vs time for all detectors
-
-        @return: fig fig: a matplotlib figure object to be saved to file.
-        """
-        # Use qudi style
-        plt.style.use(self._savelogic.mpl_qd_style)
-
-        # Create figure and scale data
-        max_abs_value = ScaledFloat(max(data.max(), np.abs(data.min())))
-        time_data = np.arange(data.shape[1]) / timebase
-        fig, ax = plt.subplots()
-        if max_abs_value.scale:
-            ax.plot(time_data,
-                    data.transpose() / max_abs_value.scale_val,
-                    linestyle=':',
-                    linewidth=0.5)
-        else:
-            ax.plot(time_data, data.transpose(), linestyle=':', linewidth=0.5)
-        ax.set_xlabel('Time (s)')
-        ax.set_ylabel('Signal ({0}{1})'.format(max_abs_value.scale, y_unit))
-        return fig
-
     @QtCore.Slot()
     def save_trace_snapshot(self, to_file=True, name_tag='', save_figure=True):
         """
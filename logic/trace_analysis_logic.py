@@ -24,6 +24,8 @@ from scipy.interpolate import InterpolatedUnivariateSpline
 from collections import OrderedDict
 
 from core.connector import Connector
+from core.util.trace_analysis import classify_trace, count_transitions, digitize_trace
+from core.util.trace_analysis import dwell_times, dwell_time_histogram, transition_matrix
 from logic.generic_logic import GenericLogic
 
 
@@ -232,36 +234,23 @@ class TraceAnalysisLogic(GenericLogic):
                       float lifetime_dark: the lifetime in the dark state in s
                       float lifetime_bright: lifetime in the bright state in s
         """
-        no_flip = 0.0
+        # states: 0 below threshold, 1 above threshold, 2 equal to threshold
+        transitions = transition_matrix(classify_trace(trace, threshold, threshold), num_states=3)
 
         if analyze_mode == 'full':
-            for ii in range(len(trace) - 1):
-                if trace[ii] > threshold and trace[ii + 1] > threshold:
-                    no_flip = no_flip + 1
-
-                elif trace[ii] < threshold and trace[ii + 1] < threshold:
-                    no_flip = no_flip + 1
-
+            no_flip = float(transitions[0, 0] + transitions[1, 1])
             probability = 1.0 - (no_flip / len(trace))
             lost_events = 0.0
 
         if analyze_mode == 'dark':
-            dark_counter = 0.0
-            for ii in range(len(trace) - 1):
-                if trace[ii] < threshold:
-                    dark_counter = dark_counter + 1
-                    if trace[ii + 1] < threshold:
-                        no_flip = no_flip + 1
+            dark_counter = float(transitions[0].sum())
+            no_flip = float(transitions[0, 0])
             probability = 1.0 - (no_flip / dark_counter)
             lost_events = (1.0 - (dark_counter / len(trace))) * 100
 
         if analyze_mode == 'bright':
-            bright_counter = 0.0
-            for ii in range(len(trace) - 1):
-                if trace[ii] > threshold:
-                    bright_counter = bright_counter + 1
-                    if trace[ii + 1] > threshold:
-                        no_flip = no_flip + 1
+            bright_counter = float(transitions[1].sum())
+            no_flip = float(transitions[1, 1])
             probability = 1.0 - (no_flip / bright_counter)
             lost_events = (1.0 - (bright_counter / len(trace))) * 100
 
@@ -284,35 +273,7 @@ class TraceAnalysisLogic(GenericLogic):
         """
         init_threshold = init_threshold if init_threshold is not None else [1, 1]
         ana_threshold = ana_threshold if ana_threshold is not None else [1, 1]
-        no_flip = 0.0
-        flip = 0.0
-
-        # find all indices in the trace-array, where the value is above init_threshold[1]
-        init_high = np.where(trace[:-1] > init_threshold[1])[0]
-        # find all indices in the trace-array, where the value is below init_threshold[0]
-        init_low = np.where(trace[:-1] < init_threshold[0])[0]
-        # find all indices in the trace-array, where the value is above ana_threshold[1]
-        ana_high = np.where(trace > ana_threshold[1])[0]
-        # find all indices in the trace-array, where the value is below ana_threshold[0]
-        ana_low = np.where(trace < ana_threshold[0])[0]
-
-        if analyze_mode == 'bright' or analyze_mode == 'full':
-            # analyze the trace where the data were the nuclear was initalized into one direction
-            for index in init_high:
-                # check if the following data point is in the analysis array
-                if index + 1 in ana_high:
-                    no_flip = no_flip + 1
-                elif index + 1 in ana_low:
-                    flip = flip + 1
-
-        if analyze_mode == 'dark' or analyze_mode == 'full':
-            # repeat the same if the nucleus was initalized into the other array
-            for index in init_low:
-                # check if the following data point is in the analysis array
-                if index + 1 in ana_high:
-                    flip = flip + 1
-                elif index + 1 in ana_low:
-                    no_flip = no_flip + 1
+        no_flip, flip = self._count_ssr_flips(trace, init_threshold, ana_threshold, analyze_mode)
 
         # the flip probability is given by the number of flips divided by the total number of analyzed data points
         if (flip + no_flip) == 0:
@@ -366,33 +327,7 @@ class TraceAnalysisLogic(GenericLogic):
             self.log.warning('Not enough data points yet!')
 
         # calculate the flip probability
-        no_flip = 0.0
-        flip = 0.0
-        # find all indices in the trace-array, where the value is above init_threshold[1]
-        init_high = np.where(trace[:-1] > init_threshold[1])[0]
-        # find all indices in the trace-array, where the value is below init_threshold[0]
-        init_low = np.where(trace[:-1] < init_threshold[0])[0]
-        # find all indices in the trace-array, where the value is above ana_threshold[1]
-        ana_high = np.where(trace > ana_threshold[1])[0]
-        # find all indices in the trace-array, where the value is below ana_threshold[0]
-        ana_low = np.where(trace < ana_threshold[0])[0]
-
-        if analyze_mode == 'bright' or analyze_mode == 'full':
-            # analyze the trace where the data were the nuclear was initalized into one direction
-            for index in init_high:
-                # check if the following data point is in the analysis array
-                if index + 1 in ana_high:
-                    no_flip = no_flip + 1
-                elif index + 1 in ana_low:
-                    flip = flip + 1
-        if analyze_mode == 'dark' or analyze_mode == 'full':
-            # repeat the same if the nucleus was initalized into the other array
-            for index in init_low:
-                # check if the following data point is in the analysis array
-                if index + 1 in ana_high:
-                    flip = flip + 1
-                elif index + 1 in ana_low:
-                    no_flip = no_flip + 1
+        no_flip, flip = self._count_ssr_flips(trace, init_threshold, ana_threshold, analyze_mode)
 
         # the flip probability is given by the number of flips divided by the total number of analyzed data points
         if (flip + no_flip) == 0:
@@ -411,6 +346,41 @@ class TraceAnalysisLogic(GenericLogic):
 
         return self.spin_flip_prob, lost_events, hist_fit_x, hist_fit_y, fit_result
 
+    @staticmethod
+    def _count_ssr_flips(trace, init_threshold, ana_threshold, analyze_mode='full'):
+        """ Count the flips and non-flips between consecutive points of a single shot readout trace.
+
+        A point below init_threshold[0] (above init_threshold[1]) is an initialization into the
+        dark (bright) state. The following point is then analyzed: above ana_threshold[1] counts as
+        bright, otherwise below ana_threshold[0] as dark. Points in between are not analyzed.
+
+        @param np.array trace: 1D trace of data
+        @param list init_threshold: [lower, upper] threshold for initialization
+        @param list ana_threshold: [lower, upper] threshold for analysis
+        @param str analyze_mode: 'full', 'bright' or 'dark'
+
+        @return tuple(float, float): number of non-flips and number of flips
+        """
+        trace = np.asarray(trace)
+        # the analyzed point is bright if above ana_threshold[1] and dark if it is not bright but
+        # below ana_threshold[0]
+        ana_states = classify_trace(trace, ana_threshold[0], ana_threshold[1])
+        ana_high = ana_states == 1
+        ana_low = ana_states == 0
+        no_flip = 0
+        flip = 0
+        if analyze_mode == 'bright' or analyze_mode == 'full':
+            # analyze the trace where the data were the nuclear was initalized into one direction
+            init_high = trace > init_threshold[1]
+            no_flip += count_transitions(init_high, ana_high)
+            flip += count_transitions(init_high, ana_low)
+        if analyze_mode == 'dark' or analyze_mode == 'full':
+            # repeat the same if the nucleus was initalized into the other array
+            init_low = trace < init_threshold[0]
+            flip += count_transitions(init_low, ana_high)
+            no_flip += count_transitions(init_low, ana_low)
+        return float(no_flip), float(flip)
+
     def analyze_flip_prob_postselect(self):
         """ Post select the data trace so that the flip probability is only
             calculated from a jump from below a threshold value to an value
@@ -506,94 +476,36 @@ class TraceAnalysisLogic(GenericLogic):
                                                                                distr='gaussian_normalized')
                 threshold = threshold_fit
 
-            # helper functions to get and analyze the timetrace
-            def analog_digitial_converter(cut_off, data):
-                new_digital_trace = []
-                for data_point in data:
-                    if data_point >= cut_off:
-                        new_digital_trace.append(1)
-                    else:
-                        new_digital_trace.append(0)
-                return new_digital_trace
-
-            def time_in_high_low(raw_digital_trace, local_dt):
-                """
-                What I need this function to do is to get all consecutive {1, ... , n} 1s or 0s and add
-                them up and put into a list to later make a histogram from them.
-                """
-                occurances = []
-                index = 0
-                index2 = 0
-
-                while index < len(raw_digital_trace):
-                    occurances.append(0)
-                    # start following the consecutive 1s
-                    while raw_digital_trace[index] == 1:
-                        occurances[index2] += 1
-                        if index == (len(raw_digital_trace) - 1):
-                            occurances = np.array(occurances)
-                            return occurances * local_dt
-                        else:
-                            index += 1
-                    if raw_digital_trace[index - 1] == 1:
-                        index2 += 1
-                        occurances.append(0)
-                    # start following the consecutive 0s
-                    while raw_digital_trace[index] == 0:
-                        occurances[index2] -= 1
-                        if index == (len(raw_digital_trace) - 1):
-                            occurances = np.array(occurances)
-                            return occurances * local_dt
-                        else:
-                            index += 1
-                    index2 += 1
-
-            digital_trace = analog_digitial_converter(threshold, trace)
-            time_array = time_in_high_low(digital_trace, dt)
-
-            # now we need to make a histogram as well as a fit
-            # what would be a good estimate for the number of bins
-
-            # longest = np.max(np.array(occurances))
-            # number of steps in between, rather not use that for now
-            # est_bins = np.int(longest/dt)
-
-            time_array_high = np.array([ii for ii in filter(lambda x: x > 0, time_array)])
-            time_array_low = np.array([ii for ii in filter(lambda x: x < 0, time_array)])
+            digital_trace = digitize_trace(trace, threshold)
+            time_array = dwell_times(digital_trace, dt)
 
-            # get lifetime of bright state
-            time_hist_high = np.histogram(time_array_high, bins=num_bins)
-            vals = [i for i in filter(lambda x: x[1] > 0, enumerate(time_hist_high[0][0:num_bins]))]
+            time_array_high = time_array[time_array > 0]
+            time_array_low = time_array[time_array < 0]
 
-            indices = np.array([val[0] for val in vals])
-            indices = np.array([np.int(indice) for indice in indices])
+            # get lifetime of bright state
+            hist_x_high, hist_y_high = dwell_time_histogram(time_array_high, num_bins)
             self.log.debug('threshold {0}'.format(threshold))
             self.log.debug('time_array:{0}'.format(time_array))
             self.log.debug('time_array_high:{0}'.format(time_array_high))
-            self.log.debug('time_hist_high:{0}'.format(time_hist_high))
-            self.log.debug('indices: {0}'.format(indices))
-            self.debug_lifetime_x = time_hist_high[1][indices]
-            self.debug_lifetime_y = time_hist_high[0][indices]
+            self.log.debug('time_hist_high:{0}'.format((hist_y_high, hist_x_high)))
+            self.debug_lifetime_x = hist_x_high
+            self.debug_lifetime_y = hist_y_high
             para = dict()
             para['offset'] = {"value": 0.0, "vary": False}
-            result = self._fit_logic.make_decayexponential_fit(time_hist_high[1][indices],
-                                                               time_hist_high[0][indices],
+            result = self._fit_logic.make_decayexponential_fit(hist_x_high,
+                                                               hist_y_high,
                                                                self._fit_logic.estimate_decayexponential,
                                                                add_params=para)
             bright_liftime = result.params['lifetime']
             # for debug purposes give also the results back of the fits for now
             lifetime_dict['result_bright'] = result
             # also give back the data used for the fit
-            lifetime_dict['bright_raw'] = np.array([time_hist_high[1][indices], time_hist_high[0][indices]])
+            lifetime_dict['bright_raw'] = np.array([hist_x_high, hist_y_high])
 
             # get lifetime of dark state
-            time_hist_low = np.histogram(time_array_low, bins=num_bins)
-            vals = [i for i in filter(lambda x: x[1] > 0, enumerate(time_hist_low[0][0:num_bins]))]
-            indices = np.array([val[0] for val in vals])
-            indices = np.array([np.int(indice) for indice in indices])
-            values = np.array([val[1] for val in vals])
+            hist_x_low, values = dwell_time_histogram(time_array_low, num_bins)
             # positive axis
-            mirror_axis = -time_hist_low[1][indices]
+            mirror_axis = -hist_x_low
             result = self._fit_logic.make_decayexponential_fit(mirror_axis,
                                                                values,
                                                                self._fit_logic.estimate_decayexponential,
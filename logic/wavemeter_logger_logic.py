@@ -90,6 +90,47 @@ class HardwarePull(QtCore.QObject):
             self._parentclass.stop_scanning()
 
 
+class GrowingArray:
+
+    """ Preallocated 2D storage for rows of data which grows by doubling its capacity.
+
+    Appending n rows costs O(n) (amortized) instead of copying all previously stored data.
+    """
+
+    def __init__(self, columns, capacity=1024, dtype=float):
+        self._buffer = np.empty((max(int(capacity), 1), columns), dtype=dtype)
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def data(self):
+        """ View of the filled part of the storage. Becomes stale after the next append. """
+        return self._buffer[:self._length]
+
+    def append(self, rows):
+        """ Append rows to the storage.
+
+        @param numpy.ndarray rows: 2D array with the same number of columns as the storage
+        """
+        rows = np.asarray(rows)
+        if rows.size == 0:
+            return
+        new_length = self._length + rows.shape[0]
+        if new_length > self._buffer.shape[0]:
+            new_capacity = max(new_length, 2 * self._buffer.shape[0])
+            new_buffer = np.empty((new_capacity, self._buffer.shape[1]), dtype=self._buffer.dtype)
+            new_buffer[:self._length] = self._buffer[:self._length]
+            self._buffer = new_buffer
+        self._buffer[self._length:new_length] = rows
+        self._length = new_length
+
+    def clear(self):
+        """ Discard all stored rows but keep the allocated memory. """
+        self._length = 0
+
+
 class WavemeterLoggerLogic(GenericLogic):
 
     """This logic module gathers data from wavemeter and the counter logic.
@@ -127,7 +168,8 @@ class WavemeterLoggerLogic(GenericLogic):
         self._data_index = 0
 
         self._recent_wavelength_window = [0, 0]
-        self.counts_with_wavelength = []
+        # columns: measurement time, counts, interpolated wavelength
+        self._counts_with_wavelength = GrowingArray(3)
 
         self._xmin = 650
         self._xmax = 750
@@ -216,6 +258,15 @@ class WavemeterLoggerLogic(GenericLogic):
         if len(self.fc.fit_list) > 0:
             self._statusVariables['fits'] = self.fc.save_to_dict()
 
+    @property
+    def counts_with_wavelength(self):
+        """ Count values with interpolated wavelength.
+
+        @return numpy.ndarray: 2D array with columns measurement time (s), counts (c/s) and
+                               interpolated wavelength (nm)
+        """
+        return self._counts_with_wavelength.data
+
     def get_max_wavelength(self):
         """ Current maximum wavelength of the scan.
 
@@ -301,7 +352,7 @@ class WavemeterLoggerLogic(GenericLogic):
             self.data_index = 0
 
             self._recent_wavelength_window = [0, 0]
-            self.counts_with_wavelength = []
+            self._counts_with_wavelength.clear()
 
             self.rawhisto = np.zeros(self._bins)
             self.sumhisto = np.ones(self._bins) * 1.0e-10
@@ -379,7 +430,7 @@ class WavemeterLoggerLogic(GenericLogic):
         latest_stitched_data = np.insert(latest_counts, 2, values=interpolated_wavelengths, axis=1)
 
         # Add this latest data to the list of counts vs wavelength
-        self.counts_with_wavelength += latest_stitched_data.tolist()
+        self._counts_with_wavelength.append(latest_stitched_data)
 
         # The start of the recent data window for the next round will be the end of this one.
         self._recent_wavelength_window[0] = self._recent_wavelength_window[1]
@@ -428,42 +479,57 @@ class WavemeterLoggerLogic(GenericLogic):
 
         # only do something if there is wavelength data to work with
         if len(self._wavelength_data) > 0:
-
-            for i in self._wavelength_data[self._data_index:]:
-                self._data_index += 1
-
-                if i[1] < self._xmin or i[1] > self._xmax:
-                    continue
-
-                # calculate the bin the new wavelength needs to go in
-                newbin = np.digitize([i[1]], self.histogram_axis)[0]
-                # if the bin make no sense, start from the beginning
-                if newbin > len(self.rawhisto) - 1:
-                    continue
-
-                # sum the counts in rawhisto and count the occurence of the bin in sumhisto
-                interpolation = np.interp(i[0], xp=temp[:, 0], fp=temp[:, 1])
-                self.rawhisto[newbin] += interpolation
-                self.sumhisto[newbin] += 1.0
-
-                self.envelope_histogram[newbin] = np.max([interpolation,
-                                                          self.envelope_histogram[newbin]
-                                                          ])
-
-                datapoint = [i[1], i[0], interpolation]
-                if time.time() - self.last_point_time > 1:
-                    self.sig_new_data_point.emit(self.recent_avg)
-                    self.last_point_time = time.time()
-                    self.recent_count = 0
-                else:
-                    self.recent_count += 1
-                    for j in range(3):
-                        self.recent_avg[j] -= self.recent_avg[j] / self.recent_count
-                        self.recent_avg[j] += datapoint[j] / self.recent_count
+            # the hardware thread keeps appending, so only handle the samples present right now
+            data_stop = len(self._wavelength_data)
+            new_samples = np.array(self._wavelength_data[self._data_index:data_stop]).reshape(-1, 2)
+            self._data_index = data_stop
+            if len(new_samples) > 0:
+                self._add_samples_to_histogram(new_samples, temp)
 
             # the plot data is the summed counts divided by the occurence of the respective bins
             self.histogram = self.rawhisto / self.sumhisto
 
+    def _add_samples_to_histogram(self, samples, count_data):
+        """ Add wavelength samples to the histogram in a single vectorized pass.
+
+        @param numpy.ndarray samples: 2D array with columns time stamp (s) and wavelength (nm)
+        @param numpy.ndarray count_data: 2D array with columns time (s) and counts (c/s) used to
+                                         interpolate the count rate at the time of each sample
+        """
+        time_stamps = samples[:, 0]
+        wavelengths = samples[:, 1]
+
+        # calculate the bins the new wavelengths need to go in and discard all samples out of range
+        bins = np.digitize(wavelengths, self.histogram_axis)
+        valid = ((wavelengths >= self._xmin) & (wavelengths <= self._xmax)
+                 & (bins < len(self.rawhisto)))
+        if not valid.any():
+            return
+        time_stamps = time_stamps[valid]
+        wavelengths = wavelengths[valid]
+        bins = bins[valid]
+
+        # sum the counts in rawhisto and count the occurence of the bin in sumhisto
+        interpolation = np.interp(time_stamps, xp=count_data[:, 0], fp=count_data[:, 1])
+        np.add.at(self.rawhisto, bins, interpolation)
+        np.add.at(self.sumhisto, bins, 1.0)
+        np.maximum.at(self.envelope_histogram, bins, interpolation)
+
+        # running average of the recent data points [wavelength, time, counts], published at most
+        # once per second
+        datapoints = np.column_stack((wavelengths, time_stamps, interpolation))
+        if time.time() - self.last_point_time > 1:
+            self.sig_new_data_point.emit(self.recent_avg)
+            self.last_point_time = time.time()
+            # the point triggering the update is not part of the next average
+            datapoints = datapoints[1:]
+            self.recent_count = 0
+        if len(datapoints) > 0:
+            total_count = self.recent_count + len(datapoints)
+            self.recent_avg = ((np.array(self.recent_avg) * self.recent_count
+                                + datapoints.sum(axis=0)) / total_count).tolist()
+            self.recent_count = total_count
+
     def save_data(self, timestamp=None):
         """ Save the counter trace data and writes it to a file.
 
@@ -558,7 +624,8 @@ class WavemeterLoggerLogic(GenericLogic):
 
         # prepare the data in a dict or in an OrderedDict:
         data = OrderedDict()
-        data['Measurement Time (s), Signal (counts/s), Interpolated Wavelength (nm)'] = np.array(self.counts_with_wavelength)
+        data['Measurement Time (s), Signal (counts/s), Interpolated Wavelength (nm)'] = np.array(
+            self.counts_with_wavelength)
 
         fig = self.draw_figure()
         # write the parameters:
@@ -587,8 +654,8 @@ class WavemeterLoggerLogic(GenericLogic):
         """
         # TODO: Draw plot for second APD if it is connected
 
-        wavelength_data = [entry[2] for entry in self.counts_with_wavelength]
-        count_data = np.array([entry[1] for entry in self.counts_with_wavelength])
+        wavelength_data = self.counts_with_wavelength[:, 2]
+        count_data = self.counts_with_wavelength[:, 1]
 
         # Index of max counts, to use to position "0" of frequency-shift axis
         count_max_index = count_data.argmax()
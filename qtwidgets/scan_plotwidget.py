@@ -20,9 +20,11 @@ Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
 top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
 """
 
+import numpy as np
+import pyqtgraph.functions as fn
 from pyqtgraph import PlotWidget, ImageItem, ViewBox, InfiniteLine, ROI
 from qtpy import QtCore
-from core.util.filters import scan_blink_correction
+from core.util.filters import ScanBlinkCorrection
 
 __all__ = ['ScanImageItem', 'ScanPlotWidget', 'ScanViewBox']
 
@@ -34,7 +36,14 @@ class ScanImageItem(ImageItem):
     coordinate of the click.
     Adds blink correction functionality capable of filtering out single pixel wide artifacts along
     a single image dimension. This is done by applying a non-linear 1D min-max-filter along a
-    single image dimension.
+    single image dimension. The filtered image is kept, so only the rows which changed are filtered
+    again when a new image is set.
+    If the same image array is set again with the rows which changed, only these rows are converted
+    into the displayed QImage instead of the whole image, as long as the levels do not move by more
+    than level_tolerance (fraction of the level range) from the levels of the last full rendering.
+    Small level changes, like the ones of a percentile colour scale during a scan, are therefore
+    shown with the next full rendering only. The row rendering uses the pyqtgraph helpers
+    makeARGB and imageToArray (pyqtgraph 0.10), the whole image is rendered if they fail.
     """
     sigMouseClicked = QtCore.Signal(object, QtCore.QPointF)
 
@@ -42,6 +51,12 @@ class ScanImageItem(ImageItem):
         self.use_blink_correction = False
         self.blink_correction_axis = 0
         self.orig_image = None
+        self._blink_filter = ScanBlinkCorrection(axis=self.blink_correction_axis)
+        # image array last set and the pixel buffer of the QImage rendered from it
+        self._set_image = None
+        self._pixels = None
+        self._pixels_qimage = None
+        self.level_tolerance = 0.02
         super().__init__(*args, **kwargs)
         return
 
@@ -68,25 +83,88 @@ class ScanImageItem(ImageItem):
         if self.use_blink_correction != set_active:
             self.blink_correction_axis = axis
             self.use_blink_correction = set_active
+            self._blink_filter.axis = axis
+            self._blink_filter.reset()
             if set_active:
                 self.setImage(self.image, autoLevels=False)
             else:
                 self.setImage(self.orig_image, autoLevels=False)
         elif axis != self.blink_correction_axis:
             self.blink_correction_axis = axis
+            self._blink_filter.axis = axis
+            self._blink_filter.reset()
             if self.use_blink_correction:
                 self.setImage(self.orig_image, autoLevels=False)
         return
 
-    def setImage(self, image=None, autoLevels=None, **kwargs):
+    def setImage(self, image=None, autoLevels=None, changed_rows=None, **kwargs):
         """
         pg.ImageItem method override to apply optional filter when setting image data.
+
+        @param changed_rows: optional, indices of the image rows which changed since the last call.
+                             If image is the array set before and the levels moved by at most
+                             level_tolerance, only these rows are rendered again. The blink
+                             correction compares the images if None.
         """
         if self.use_blink_correction:
             self.orig_image = image
-            image = scan_blink_correction(image=image, axis=self.blink_correction_axis)
+            image = self._blink_filter.apply(image, changed_rows=changed_rows)
+        elif changed_rows is not None and image is not None and image is self._set_image \
+                and not (autoLevels or (autoLevels is None and 'levels' not in kwargs)) \
+                and self._render_rows(changed_rows, kwargs):
+            return
+        self._set_image = image
         return super().setImage(image=image, autoLevels=autoLevels, **kwargs)
 
+    def render(self):
+        """ pg.ImageItem method override to keep the pixel buffer of the rendered QImage. """
+        super().render()
+        self._pixels_qimage = self.qimage
+        self._pixels = None
+        if self.qimage is not None:
+            try:
+                self._pixels = fn.imageToArray(self.qimage, transpose=False)
+            except Exception:
+                # without access to the pixels every image is rendered completely
+                self._pixels = None
+
+    def _render_rows(self, rows, options):
+        """ Render only some rows of the image into the displayed QImage.
+
+        @param rows: indices of the image rows to render
+        @param dict options: other keyword arguments of setImage
+
+        @return bool: True if done, False if the whole image has to be rendered
+        """
+        if self._pixels is None or self.qimage is None or self.qimage is not self._pixels_qimage \
+                or self.image.dtype.kind != 'f' or self.autoDownsample or callable(self.lut) \
+                or set(options) - {'levels'} or self.levels is None:
+            return False
+        # the rows are rendered with the levels of the last full rendering
+        levels = np.asarray(options.get('levels', self.levels), dtype=float)
+        if levels.shape != self.levels.shape:
+            return False
+        level_range = np.abs(self.levels[..., 1] - self.levels[..., 0])
+        if np.any(np.abs(levels - self.levels) > self.level_tolerance * level_range[..., None]):
+            return False
+        rows = np.unique(np.asarray(rows, dtype=int))
+        if rows.size == 0:
+            return True
+        data = self.image[rows]
+        if self.axisOrder == 'col-major':
+            data = data.transpose((1, 0, 2)[:data.ndim])
+        try:
+            argb, alpha = fn.makeARGB(data, lut=self.lut, levels=self.levels)
+            if self.axisOrder == 'col-major':
+                self._pixels[:, rows] = argb
+            else:
+                self._pixels[rows] = argb
+        except Exception:
+            self._pixels = None
+            return False
+        self.update()
+        return True
+
     def mouseClickEvent(self, ev):
         if not ev.double():
             pos = self.getViewBox().mapSceneToView(ev.scenePos())
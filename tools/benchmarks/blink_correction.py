@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the blink correction of a scan image which is displayed during the scan.
+
+A confocal image with blinking pixels is scanned line by line. After every line the image is
+filtered once completely with scan_blink_correction, as ScanImageItem did before, and once with
+ScanBlinkCorrection, which only filters the changed rows again, with and without the changed rows
+given. The incrementally filtered image has to be equal to the complete filter with the same
+padding value after every line, for both filter axes. The time per line is reported.
+
+Run from the qudi root directory:
+    python tools/benchmarks/blink_correction.py [image_size]
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from core.util.filters import scan_blink_correction, ScanBlinkCorrection
+
+
+def scanned_image(size):
+    """ Counts of a confocal image with a few bright spots and single pixel blinks. """
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:size, 0:size]
+    image = np.full((size, size), 20e3)
+    for cx, cy in rng.uniform(0, size, (10, 2)):
+        image += 100e3 * np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / (0.02 * size) ** 2)
+    image = rng.poisson(image).astype(float)
+    blinks = rng.random((size, size)) < 1e-3
+    image[blinks] += 500e3
+    return image
+
+
+def scan(final_image, axis, mode):
+    """ Filter the image after every scanned line.
+
+    @return float, float: mean time per line in s, largest deviation from the complete filter
+    """
+    image = np.zeros_like(final_image)
+    blink_filter = ScanBlinkCorrection(axis=axis)
+    duration = 0
+    deviation = 0
+    for line in range(final_image.shape[0]):
+        image[line] = final_image[line]
+        start = time.perf_counter()
+        if mode == 'complete':
+            filtered = scan_blink_correction(image, axis=axis)
+        elif mode == 'changed rows given':
+            filtered = blink_filter.apply(image, changed_rows=[line])
+        else:
+            filtered = blink_filter.apply(image)
+        duration += time.perf_counter() - start
+        if mode != 'complete':
+            expected = scan_blink_correction(image, axis=axis, cval=blink_filter.cval)
+            deviation = max(deviation, np.max(np.abs(filtered - expected)))
+    return duration / final_image.shape[0], deviation
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 512
+    final_image = scanned_image(size)
+
+    print('Blink correction of a {0:d}x{0:d} image after every scanned line'.format(size))
+    print('{0:>6}{1:>22}{2:>16}{3:>12}'.format('axis', 'filter', 'line (ms)', 'speedup'))
+    for axis in (0, 1):
+        complete_time = None
+        for mode in ('complete', 'changed rows given', 'images compared'):
+            line_time, deviation = scan(final_image, axis, mode)
+            assert deviation == 0, 'The incremental filter differs for axis {0:d}.'.format(axis)
+            if complete_time is None:
+                complete_time = line_time
+            print('{0:>6d}{1:>22}{2:>16.3f}{3:>11.1f}x'.format(
+                axis, mode, 1e3 * line_time, complete_time / line_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the buffered, batched writes of the data loggers (InfluxLogger, DataLoggerDummy).
+
+A monitoring loop logs temperature and pressure samples to the DataLoggerDummy, whose SQLite
+database is delayed by a modeled network round trip per write. The former one write per logged
+sample is compared with the batched writes from the background thread: the time the monitoring
+loop spends in log_to_channel and the number of writes are reported and all samples have to end
+up in the database. While the database is stalled, the buffer has to stay bounded, dropping the
+oldest samples without a spill file and writing all of them after the recovery with one.
+
+Run from the qudi root directory:
+    python tools/benchmarks/data_logger_batching.py [samples]
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd())
+
+from hardware.data_logger_dummy import DataLoggerDummy
+
+WRITE_LATENCY = 2e-3    # round trip of a write to a database on the network in s
+CHANNELS = {'temperature': {'fields': ['stage', 'cold_finger'], 'tags': {'setup': 'cryo'}},
+            'pressure': ['chamber']}
+
+
+class LegacyLogger(DataLoggerDummy):
+    """ DataLoggerDummy writing every logged sample at once, as log_to_channel was meant to. """
+
+    def log_to_channel(self, channel, values):
+        fields = self.log_channels[channel]['fields']
+        self._write_points(self.format_data(channel, dict(zip(fields, values)),
+                                            self.log_channels[channel]['tags']))
+        return 0
+
+
+def create_logger(cls, directory, name, **config):
+    config.setdefault('write_latency', WRITE_LATENCY)
+    config['database'] = os.path.join(directory, name + '.sqlite')
+    logger = cls(manager=None, name=name, config=config)
+    logger.on_activate()
+    logger.set_log_channels(CHANNELS)
+    return logger
+
+
+def monitor(logger, samples):
+    """ Log samples of all channels.
+
+    @return float: time in s spent in log_to_channel
+    """
+    start = time.perf_counter()
+    for sample in range(samples):
+        assert logger.log_to_channel('temperature', [4.2 + 1e-3 * sample, 3.9]) == 0
+        assert logger.log_to_channel('pressure', [1e-7 * sample]) == 0
+    return time.perf_counter() - start
+
+
+def logged_samples(logger):
+    """ Sample numbers in the database, taken from the pressure channel. """
+    return sorted(int(round(point['fields']['chamber'] / 1e-7))
+                  for point in logger.get_logged_points('pressure'))
+
+
+def main():
+    logging.basicConfig(level=logging.ERROR)
+    # the stalled database is logged as an error
+    logging.getLogger('hardware').setLevel(logging.CRITICAL)
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    with tempfile.TemporaryDirectory() as directory:
+        print('Logging {0:d} samples of 2 channels, {1:.1f} ms per database write'
+              ''.format(samples, 1e3 * WRITE_LATENCY))
+        print('{0:<10}{1:>14}{2:>12}{3:>10}{4:>10}'.format(
+            'writes', 'logging (ms)', 'flush (ms)', 'calls', 'speedup'))
+        durations = dict()
+        for label, cls in (('former', LegacyLogger), ('batched', DataLoggerDummy)):
+            logger = create_logger(cls, directory, label, batch_size=1000, flush_interval=1)
+            duration = monitor(logger, samples)
+            start = time.perf_counter()
+            assert logger.flush(timeout=10)
+            flush_time = time.perf_counter() - start
+            assert logged_samples(logger) == list(range(samples)), label
+            durations[label] = duration
+            print('{0:<10}{1:>14.2f}{2:>12.2f}{3:>10d}{4:>9.1f}x'.format(
+                label, 1e3 * duration, 1e3 * flush_time, logger.write_calls,
+                durations['former'] / duration))
+            logger.on_deactivate()
+
+        print('Database stalled while logging, buffer of {0:d} points'.format(samples // 2))
+        print('{0:<12}{1:>10}{2:>10}{3:>10}{4:>14}'.format(
+            'overflow', 'written', 'dropped', 'spilled', 'max. pending'))
+        for label, spill_file in (('drop', None), ('spill', os.path.join(directory, 'spill.jsonl'))):
+            logger = create_logger(DataLoggerDummy, directory, label, batch_size=50,
+                                   flush_interval=0.05, buffer_size=samples // 2,
+                                   spill_file=spill_file, write_latency=0)
+            logger.stall_database()
+            max_pending = 0
+            for sample in range(samples):
+                logger.log_to_channel('temperature', [4.2, 3.9])
+                logger.log_to_channel('pressure', [1e-7 * sample])
+                max_pending = max(max_pending, logger._writer.pending - logger._writer.spilled)
+            # bounded memory while the database is stalled
+            assert max_pending <= samples // 2, label
+            logger.stall_database(False)
+            assert logger.flush(timeout=10), label
+            statistics = logger.get_writer_statistics()
+            written = logged_samples(logger)
+            if spill_file is None:
+                # the oldest samples are dropped, the newest ones kept in the buffer are written.
+                # A batch which is being written when the database recovers is written instead
+                # of dropped.
+                assert statistics['dropped'] + statistics['written'] == 2 * samples, label
+                assert statistics['dropped'] >= 2 * samples - samples // 2 - 50, label
+                assert written[-(samples // 5):] == list(range(samples))[-(samples // 5):], label
+            else:
+                assert statistics['dropped'] == 0 and written == list(range(samples)), label
+                assert os.path.getsize(spill_file) == 0, label
+            print('{0:<12}{1:>10d}{2:>10d}{3:>10d}{4:>14d}'.format(
+                label, statistics['written'], statistics['dropped'], statistics['spilled'],
+                max_pending))
+            logger.on_deactivate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the data readout of the FPGA based fast counter (FastCounterFPGAQO).
+
+The Opal Kelly FrontPanel is replaced by a fake device holding the histogram memory of 512 gates
+with 65536 bins. The former get_data_trace, which allocated a 128 MB buffer and transferred the
+whole memory on every call, is compared with the partial readout into the buffers allocated by
+configure for several gate configurations: the count data have to be equal and the time of a data request
+is reported together with the transferred bytes and their modeled USB transfer time. A pause and
+continue of the measurement checks the accumulation of the saved counts.
+
+Run from the qudi root directory:
+    python tools/benchmarks/fpga_qo_readout.py [repetitions]
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import logging
+import os
+import sys
+import time
+import types
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+USB_RATE = 340e6    # bytes per s of a block pipe transfer of the XEM6310 over USB 3.0
+CONFIGURATIONS = ((1, 3000), (20, 3000), (100, 6000), (512, 65536))   # (gates, bins)
+BIN_WIDTH = 1 / 950e6
+
+
+class FakeFrontPanel:
+    """ FrontPanel of an XEM6310 with the fast counter bitfile, without USB. """
+
+    def __init__(self):
+        self.memory = np.zeros((512, 65536), dtype=np.uint32)
+        self.running = False
+        self.transferred_bytes = 0
+        self._rng = np.random.default_rng(0)
+
+    def GetDeviceCount(self):
+        return 1
+
+    def OpenBySerial(self, serial):
+        return 0
+
+    def ConfigureFPGA(self, path):
+        return 0
+
+    def IsFrontPanelEnabled(self):
+        return True
+
+    def SetWireInValue(self, address, value):
+        return 0
+
+    def UpdateWireIns(self):
+        return 0
+
+    def UpdateWireOuts(self):
+        return 0
+
+    def GetWireOutValue(self, address):
+        return 0x00000008 if self.running else 0x80000004
+
+    def ActivateTriggerIn(self, address, bit):
+        if address == 0x40 and bit == 0:
+            # a new histogram is accumulated from the start of the counter
+            self.running = True
+            self.memory[:] = 0
+            self.memory[:, :8192] = self._rng.integers(0, 1000, (512, 8192), dtype=np.uint32)
+        elif address == 0x40 and bit == 1:
+            self.running = False
+        return 0
+
+    def ReadFromBlockPipeOut(self, address, block_size, data):
+        if len(data) % block_size != 0:
+            return -1
+        words = np.frombuffer(data, dtype=np.uint32)
+        words[:] = self.memory.reshape(-1)[:words.size]
+        self.transferred_bytes += len(data)
+        return len(data)
+
+
+try:
+    import okfrontpanel
+except ImportError:
+    # The benchmark does not need the FrontPanel library
+    okfrontpanel = types.ModuleType('okfrontpanel')
+    sys.modules['okfrontpanel'] = okfrontpanel
+okfrontpanel.FrontPanel = FakeFrontPanel
+
+from hardware.fpga_fastcounter.fast_counter_fpga_qo import FastCounterFPGAQO
+
+
+def legacy_get_data_trace(counter):
+    """ Data transfer of get_data_trace before the buffers were reused. """
+    data_buffer = bytearray(128 * 1024 * 1024)
+    counter._fpga.ActivateTriggerIn(0x40, 2)
+    read_err_code = counter._fpga.ReadFromBlockPipeOut(0xA0, 1024, data_buffer)
+    if read_err_code != len(data_buffer):
+        raise RuntimeError('Data transfer failed.')
+    buffer_encode = np.frombuffer(data_buffer, dtype='uint32')
+    buffer_encode = buffer_encode.reshape(512, 65536)[0:counter._number_of_gates,
+                                                      0:counter._gate_length_bins]
+    count_data = buffer_encode.astype('int64', casting='safe')
+    if counter.saved_count_data is not None:
+        count_data = count_data + counter.saved_count_data
+    return count_data
+
+
+def best_time(func, repetitions):
+    """ Shortest duration of repeated calls in s. """
+    durations = list()
+    for i in range(repetitions):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('hardware').setLevel(logging.ERROR)
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    counter = FastCounterFPGAQO(manager=None, name='fpga_qo',
+                                config={'fpgacounter_serial': '143400058N',
+                                        'fpga_type': 'XEM6310_LX150',
+                                        'partial_readout': True})
+    counter.on_activate()
+    fpga = counter._fpga
+
+    print('{0:>6}{1:>7}{2:>14}{3:>14}{4:>16}{5:>14}{6:>10}'.format(
+        'gates', 'bins', 'former (ms)', 'reused (ms)', 'transfer (MB)', 'USB (ms)', 'speedup'))
+    for gates, bins in CONFIGURATIONS:
+        counter.configure(BIN_WIDTH, bins * BIN_WIDTH, gates)
+        counter.start_measure()
+        legacy = legacy_get_data_trace(counter)
+        count_data = counter.get_data_trace()[0]
+        assert count_data.dtype == np.int64 and np.array_equal(count_data, legacy), (gates, bins)
+
+        fpga.transferred_bytes = 0
+        counter.get_data_trace()
+        transferred = fpga.transferred_bytes
+        former_time = best_time(lambda: legacy_get_data_trace(counter), repetitions)
+        reused_time = best_time(counter.get_data_trace, repetitions)
+        print('{0:>6d}{1:>7d}{2:>14.2f}{3:>14.2f}{4:>16.1f}{5:>14.2f}{6:>9.1f}x'.format(
+            gates, bins, 1e3 * former_time, 1e3 * reused_time, transferred / 2**20,
+            1e3 * transferred / USB_RATE,
+            (former_time + 128 * 2**20 / USB_RATE) / (reused_time + transferred / USB_RATE)))
+
+        # Counts of a paused and continued measurement are accumulated
+        first_run = counter.get_data_trace()[0].copy()
+        counter.pause_measure()
+        counter.continue_measure()
+        second_run = fpga.memory[:gates, :bins].astype(np.int64)
+        assert np.array_equal(counter.get_data_trace()[0], first_run + second_run), (gates, bins)
+        assert np.array_equal(legacy_get_data_trace(counter), first_run + second_run)
+        counter.stop_measure()
+    print('speedup including the modeled USB transfer time')
+
+
+if __name__ == '__main__':
+    main()
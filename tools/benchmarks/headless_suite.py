@@ -0,0 +1,644 @@
+# -*- coding: utf-8 -*-
+"""
+End-to-end benchmark suite running Qudi headless on dummy hardware.
+
+A Manager without GUI is started with a generated configuration of dummy hardware
+(confocal_scanner_dummy, odmr_counter_dummy, fast_counter_dummy, pulser_dummy,
+data_instream_dummy, slow_counter_dummy) and the logic modules on top of them. The suite then
+measures the throughput and latency of confocal scans, laser scans, ODMR sweeps, pulsed analysis ticks, pulse
+ensemble sampling, time series streaming and saving, using the core.instrumentation histograms of
+the annotated code paths for the latencies.
+
+The results are written as JSON together with the git commit they were measured on. Passing the
+results of an earlier run with --compare prints the relative change of every metric and flags
+regressions, so two commits can be compared on the same machine.
+
+Configuration, status variables, saved data and pulse assets of the run are kept in a temporary
+working directory, the settings of a regular Qudi installation are not touched.
+
+Run from the qudi root directory:
+    python tools/benchmarks/headless_suite.py [-o results.json] [--compare baseline.json]
+                                              [--only confocal odmr ...] [--quick]
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from qtpy import QtCore
+from core import config
+from core.instrumentation import instrumentation
+
+RESULTS_FORMAT = 1
+
+# Durations and sizes of the individual benchmarks, --quick divides the durations by 4
+SETTINGS = {
+    'confocal_resolution': 100,
+    'confocal_clock_frequency': 50000,
+    'laser_scan_resolution': 500,
+    'laser_scan_repeats': 100,
+    'odmr_run_time': 8.0,
+    'odmr_clock_frequency': 2000,
+    'odmr_points': 201,
+    'pulsed_run_time': 8.0,
+    'pulsed_timer_interval': 0.1,
+    'sampling_points': 100,
+    'sampling_repetitions': 5,
+    'time_series_run_time': 8.0,
+    'time_series_data_rate': 10000,
+    'save_rows': 100000,
+    'save_repetitions': 3,
+}
+
+
+def dummy_config(workdir):
+    """ Configuration of the dummy setup benchmarked by the suite.
+
+    @param str workdir: directory for saved data and pulse assets
+
+    @return dict: the configuration, as it would be read from a .cfg file
+    """
+    return {
+        'global': {'startup': ['savelogic']},
+        'hardware': {
+            'mydummyscanner': {
+                'module.Class': 'confocal_scanner_dummy.ConfocalScannerDummy',
+                'clock_frequency': SETTINGS['confocal_clock_frequency'],
+                'line_setup_time': 0,
+                'connect': {'fitlogic': 'fitlogic'}},
+            'mydummyodmrcounter': {
+                'module.Class': 'odmr_counter_dummy.ODMRCounterDummy',
+                'clock_frequency': SETTINGS['odmr_clock_frequency'],
+                'number_of_channels': 2,
+                'connect': {'fitlogic': 'fitlogic'}},
+            'mydummycounter': {
+                'module.Class': 'slow_counter_dummy.SlowCounterDummy',
+                'source_channels': 2,
+                'clock_frequency': 100,
+                'count_distribution': 'dark_bright_poisson'},
+            'mydummyfastcounter': {
+                'module.Class': 'fast_counter_dummy.FastCounterDummy'},
+            'mydummypulser': {
+                'module.Class': 'pulser_dummy.PulserDummy'},
+            'mydummyinstreamer': {
+                'module.Class': 'data_instream_dummy.InStreamDummy',
+                'digital_channels': ['digital 1', 'digital 2'],
+                'analog_channels': ['analog 1', 'analog 2'],
+                'digital_event_rates': [1000, 10000]},
+            'microwave_dummy': {
+                'module.Class': 'microwave.mw_source_dummy.MicrowaveDummy',
+                'gpib_address': 'dummy',
+                'gpib_timeout': 20},
+        },
+        'logic': {
+            'savelogic': {
+                'module.Class': 'save_logic.SaveLogic',
+                'win_data_directory': os.path.join(workdir, 'data'),
+                'unix_data_directory': os.path.join(workdir, 'data'),
+                'log_into_daily_directory': False,
+                'save_pdf': False,
+                'save_png': True},
+            'fitlogic': {
+                'module.Class': 'fit_logic.FitLogic'},
+            'tasklogic': {
+                'module.Class': 'taskrunner.TaskRunner',
+                'tasks': {}},
+            'scannerlogic': {
+                'module.Class': 'confocal_logic.ConfocalLogic',
+                'connect': {'confocalscanner1': 'mydummyscanner', 'savelogic': 'savelogic'}},
+            'laserscannerlogic': {
+                'module.Class': 'laser_scanner_logic.LaserScannerLogic',
+                'connect': {'confocalscanner1': 'mydummyscanner', 'savelogic': 'savelogic'}},
+            'odmrlogic': {
+                'module.Class': 'odmr_logic.ODMRLogic',
+                'connect': {'odmrcounter': 'mydummyodmrcounter',
+                            'fitlogic': 'fitlogic',
+                            'microwave1': 'microwave_dummy',
+                            'savelogic': 'savelogic',
+                            'taskrunner': 'tasklogic'}},
+            'odmrlogic_continuous': {
+                'module.Class': 'odmr_logic.ODMRLogic',
+                'continuous_counting': True,
+                'connect': {'odmrcounter': 'mydummyodmrcounter',
+                            'fitlogic': 'fitlogic',
+                            'microwave1': 'microwave_dummy',
+                            'savelogic': 'savelogic',
+                            'taskrunner': 'tasklogic'}},
+            'odmrlogic2': {
+                'module.Class': 'odmr_logic2.ODMRLogic',
+                'connect': {'odmrcounter': 'mydummyodmrcounter',
+                            'fitlogic': 'fitlogic',
+                            'microwave1': 'microwave_dummy',
+                            'savelogic': 'savelogic',
+                            'taskrunner': 'tasklogic'}},
+            'odmrlogic2_continuous': {
+                'module.Class': 'odmr_logic2.ODMRLogic',
+                'continuous_counting': True,
+                'connect': {'odmrcounter': 'mydummyodmrcounter',
+                            'fitlogic': 'fitlogic',
+                            'microwave1': 'microwave_dummy',
+                            'savelogic': 'savelogic',
+                            'taskrunner': 'tasklogic'}},
+            'counterlogic': {
+                'module.Class': 'counter_logic.CounterLogic',
+                'connect': {'counter1': 'mydummycounter', 'savelogic': 'savelogic'}},
+            'sequencegeneratorlogic': {
+                'module.Class': 'pulsed.sequence_generator_logic.SequenceGeneratorLogic',
+                'assets_storage_path': os.path.join(workdir, 'pulsed_assets'),
+                'connect': {'pulsegenerator': 'mydummypulser'}},
+            'pulsedmeasurementlogic': {
+                'module.Class': 'pulsed.pulsed_measurement_logic.PulsedMeasurementLogic',
+                'connect': {'fastcounter': 'mydummyfastcounter',
+                            'pulsegenerator': 'mydummypulser',
+                            'fitlogic': 'fitlogic',
+                            'savelogic': 'savelogic',
+                            'microwave': 'microwave_dummy'}},
+            'timeserieslogic': {
+                'module.Class': 'time_series_reader_logic.TimeSeriesReaderLogic',
+                'max_frame_rate': 20,
+                'connect': {'_streamer_con': 'mydummyinstreamer',
+                            '_savelogic_con': 'savelogic'}},
+        },
+        'gui': {},
+    }
+
+
+def metric(value, unit, better):
+    """ One benchmark result.
+
+    @param float value: the measured value
+    @param str unit: unit of value
+    @param str better: 'higher' or 'lower', the direction of an improvement
+
+    @return dict: the metric as stored in the results file
+    """
+    value = float(value)
+    return {'value': None if math.isnan(value) else value, 'unit': unit, 'better': better}
+
+
+def latency_metrics(metrics, prefix, code_path):
+    """ Add median and 99th percentile of an instrumented code path to the metrics in ms. """
+    stats = instrumentation.histogram(code_path).statistics()
+    metrics[prefix + '_p50'] = metric(1e3 * stats['p50'], 'ms', 'lower')
+    metrics[prefix + '_p99'] = metric(1e3 * stats['p99'], 'ms', 'lower')
+    return stats
+
+
+def wait_until(condition, timeout):
+    """ Run the Qt event loop of the main thread until condition() is true.
+
+    @param callable condition: function without arguments returning bool
+    @param float timeout: maximum waiting time in s
+    """
+    app = QtCore.QCoreApplication.instance()
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError('Condition not reached within {0:.0f} s.'.format(timeout))
+        app.processEvents()
+        time.sleep(0.002)
+
+
+def run_events(duration):
+    """ Run the Qt event loop of the main thread for duration seconds. """
+    app = QtCore.QCoreApplication.instance()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        app.processEvents()
+        time.sleep(0.002)
+
+
+def logic_module(manager, name):
+    """ Start a logic module with all its dependencies and return it. """
+    if manager.startModule('logic', name) < 0 or not manager.isModuleActive('logic', name):
+        raise RuntimeError('Logic module "{0}" could not be started.'.format(name))
+    return manager.tree['loaded']['logic'][name]
+
+
+def _bench_confocal(manager, bidirectional):
+    logic = logic_module(manager, 'scannerlogic')
+    resolution = SETTINGS['confocal_resolution']
+    logic.set_clock_frequency(SETTINGS['confocal_clock_frequency'])
+    logic.set_bidirectional_scan(bidirectional)
+    logic.xy_resolution = resolution
+    logic.image_x_range = np.array(logic.x_range) / 2
+    logic.image_y_range = np.array(logic.y_range) / 2
+
+    start = time.perf_counter()
+    logic.start_scanning(zscan=False)
+    wait_until(lambda: logic.module_state() == 'locked', 10)
+    wait_until(lambda: logic.module_state() == 'idle', 600)
+    elapsed = time.perf_counter() - start
+    logic.set_bidirectional_scan(False)
+
+    # forward and backward line of every row at the hardware clock, without any overhead. In a
+    # bidirectional scan the backward line is the next row.
+    passes = 1 if bidirectional else 2
+    hardware_time = passes * resolution * resolution / SETTINGS['confocal_clock_frequency']
+    metrics = OrderedDict()
+    metrics['scan_time'] = metric(elapsed, 's', 'lower')
+    metrics['lines_per_second'] = metric(resolution / elapsed, '1/s', 'higher')
+    metrics['pixels_per_second'] = metric(resolution * resolution / elapsed, '1/s', 'higher')
+    metrics['overhead_per_line'] = metric(
+        1e3 * (elapsed - hardware_time) / resolution, 'ms', 'lower')
+    latency_metrics(metrics, 'scan_line', 'scannerlogic._scan_line')
+    latency_metrics(metrics, 'next_line_signal', 'scannerlogic.signal_scan_lines_next')
+    return metrics
+
+
+def bench_confocal(manager, workdir):
+    return _bench_confocal(manager, False)
+
+
+def bench_confocal_bidirectional(manager, workdir):
+    return _bench_confocal(manager, True)
+
+
+def bench_laser_scan(manager, workdir):
+    logic = logic_module(manager, 'laserscannerlogic')
+    # the goto to the idle voltage at activation
+    wait_until(lambda: logic.module_state() == 'idle', 30)
+    repeats = SETTINGS['laser_scan_repeats']
+    resolution = SETTINGS['laser_scan_resolution']
+    # full range of the fourth axis of the dummy scanner, at the confocal clock frequency
+    scan_range = logic.a_range
+    logic.set_scan_range(scan_range)
+    logic.set_scan_speed(
+        (scan_range[1] - scan_range[0]) * SETTINGS['confocal_clock_frequency'] / resolution)
+    logic.set_resolution(resolution)
+    logic.set_scan_lines(repeats)
+
+    start = time.perf_counter()
+    if logic.start_scanning() < 0:
+        raise RuntimeError('Laser scan could not be started.')
+    wait_until(lambda: logic.module_state() == 'idle', 600)
+    elapsed = time.perf_counter() - start
+
+    # every repeat is an up and a down line
+    metrics = OrderedDict()
+    metrics['scan_time'] = metric(elapsed, 's', 'lower')
+    metrics['lines_per_second'] = metric(2 * repeats / elapsed, '1/s', 'higher')
+    stats = latency_metrics(metrics, 'next_block', 'laserscannerlogic._do_next_line')
+    # the last call finishes the scan
+    metrics['blocks'] = metric(stats['count'] - 1, '', 'lower')
+    return metrics
+
+
+def _bench_odmr(manager, name):
+    logic = logic_module(manager, name)
+    run_time = SETTINGS['odmr_run_time']
+    start_frequency = 2.8e9
+    step = 150e6 / (SETTINGS['odmr_points'] - 1)
+    logic.set_clock_frequency(SETTINGS['odmr_clock_frequency'])
+    logic.set_sweep_parameters([start_frequency], [start_frequency + 150e6], [step], -30)
+    logic.set_runtime(run_time)
+
+    start = time.perf_counter()
+    if logic.start_odmr_scan() < 0:
+        raise RuntimeError('ODMR scan of "{0}" could not be started.'.format(name))
+    wait_until(lambda: logic.module_state() == 'idle', run_time + 60)
+    elapsed = time.perf_counter() - start
+
+    metrics = OrderedDict()
+    metrics['sweeps_per_second'] = metric(logic.elapsed_sweeps / elapsed, '1/s', 'higher')
+    metrics['duty_cycle'] = metric(logic.duty_cycle, '', 'higher')
+    latency_metrics(metrics, 'scan_line', '{0}._scan_odmr_line'.format(name))
+    latency_metrics(metrics, 'next_line_signal', '{0}.sigNextLine'.format(name))
+    return metrics
+
+
+def bench_odmr(manager, workdir):
+    return _bench_odmr(manager, 'odmrlogic')
+
+
+def bench_odmr_continuous(manager, workdir):
+    return _bench_odmr(manager, 'odmrlogic_continuous')
+
+
+def _bench_odmr2(manager, name):
+    logic = logic_module(manager, name)
+    run_time = SETTINGS['odmr_run_time']
+    start_frequency = 2.8e9
+    step = 150e6 / (SETTINGS['odmr_points'] - 1)
+    logic.set_clock_frequency(SETTINGS['odmr_clock_frequency'])
+    logic.set_sweep_parameters(start_frequency, start_frequency + 150e6, step, -30)
+    logic.set_runtime(run_time)
+
+    start = time.perf_counter()
+    if logic.start_odmr_scan() < 0:
+        raise RuntimeError('ODMR scan of "{0}" could not be started.'.format(name))
+    wait_until(lambda: logic.module_state() == 'idle', run_time + 60)
+    elapsed = time.perf_counter() - start
+
+    metrics = OrderedDict()
+    metrics['sweeps_per_second'] = metric(logic.elapsed_sweeps / elapsed, '1/s', 'higher')
+    metrics['duty_cycle'] = metric(logic.duty_cycle, '', 'higher')
+    return metrics
+
+
+def bench_odmr2(manager, workdir):
+    return _bench_odmr2(manager, 'odmrlogic2')
+
+
+def bench_odmr2_continuous(manager, workdir):
+    return _bench_odmr2(manager, 'odmrlogic2_continuous')
+
+
+def bench_pulsed_analysis(manager, workdir):
+    logic = logic_module(manager, 'pulsedmeasurementlogic')
+    logic.set_timer_interval(SETTINGS['pulsed_timer_interval'])
+    logic.set_alternative_data_type('FFT')
+
+    logic.start_pulsed_measurement()
+    wait_until(lambda: logic.module_state() == 'locked', 30)
+    run_events(SETTINGS['pulsed_run_time'])
+    logic.stop_pulsed_measurement()
+    wait_until(lambda: logic.module_state() == 'idle', 30)
+
+    metrics = OrderedDict()
+    loop = latency_metrics(metrics, 'analysis_tick', 'pulsedmeasurementlogic._pulsed_analysis_loop')
+    readout = instrumentation.histogram('pulsedmeasurementlogic.get_data_trace').statistics()
+    metrics['ticks'] = metric(loop['count'], '', 'higher')
+    # the dummy fast counter sleeps while returning the trace, leave that out
+    if loop['count'] > 0:
+        analysis = (loop['total'] - readout['total']) / loop['count']
+    else:
+        analysis = math.nan
+    metrics['analysis_time_per_tick'] = metric(1e3 * analysis, 'ms', 'lower')
+    return metrics
+
+
+def bench_ensemble_sampling(manager, workdir):
+    logic = logic_module(manager, 'sequencegeneratorlogic')
+    logic.generate_predefined_sequence(
+        'rabi', {'name': 'benchmark_rabi', 'num_of_points': SETTINGS['sampling_points']})
+    if 'benchmark_rabi' not in logic.saved_pulse_block_ensembles:
+        raise RuntimeError('Generation of the benchmark ensemble failed.')
+
+    durations = list()
+    number_of_samples = 0
+    for _ in range(SETTINGS['sampling_repetitions']):
+        start = time.perf_counter()
+        offset_bin, waveforms, info = logic.sample_pulse_block_ensemble('benchmark_rabi')
+        durations.append(time.perf_counter() - start)
+        if offset_bin < 0:
+            raise RuntimeError('Sampling of the benchmark ensemble failed.')
+        number_of_samples = info['number_of_samples']
+
+    metrics = OrderedDict()
+    metrics['sampling_time'] = metric(np.median(durations), 's', 'lower')
+    metrics['samples_per_second'] = metric(
+        number_of_samples / np.median(durations), '1/s', 'higher')
+    metrics['number_of_samples'] = metric(number_of_samples, '', 'higher')
+    return metrics
+
+
+def bench_time_series(manager, workdir):
+    logic = logic_module(manager, 'timeserieslogic')
+    logic.configure_settings(data_rate=SETTINGS['time_series_data_rate'], oversampling_factor=1)
+
+    if logic.start_reading() < 0:
+        raise RuntimeError('Time series streaming could not be started.')
+    run_events(SETTINGS['time_series_run_time'])
+    logic.stop_reading()
+    wait_until(lambda: logic.module_state() == 'idle', 30)
+
+    metrics = OrderedDict()
+    stats = latency_metrics(metrics, 'acquire_block', 'timeserieslogic.acquire_data_block')
+    metrics['frames_per_second'] = metric(
+        stats['count'] / SETTINGS['time_series_run_time'], '1/s', 'higher')
+    # fraction of the time the logic thread is busy with the stream
+    metrics['load'] = metric(stats['total'] / SETTINGS['time_series_run_time'], '', 'lower')
+    return metrics
+
+
+def bench_saving(manager, workdir):
+    logic = logic_module(manager, 'savelogic')
+    rows = SETTINGS['save_rows']
+    data = OrderedDict()
+    data['x (s)'] = np.linspace(0, 1, rows)
+    data['a (V)'] = np.random.default_rng(0).normal(size=rows)
+    data['b (V)'] = np.random.default_rng(1).normal(size=rows)
+    data['counts'] = np.random.default_rng(2).poisson(100, size=rows).astype(float)
+    filepath = os.path.join(workdir, 'save_benchmark')
+
+    metrics = OrderedDict()
+    for filetype in ('text', 'npz'):
+        durations = list()
+        for repetition in range(SETTINGS['save_repetitions']):
+            start = time.perf_counter()
+            logic.save_data(data, filepath=filepath, filetype=filetype,
+                            filelabel='{0}_{1}'.format(filetype, repetition))
+            durations.append(time.perf_counter() - start)
+        metrics['save_{0}'.format(filetype)] = metric(np.median(durations), 's', 'lower')
+        metrics['save_{0}_rows_per_second'.format(filetype)] = metric(
+            rows / np.median(durations), '1/s', 'higher')
+
+    # complete confocal image save including the figure, uses the image of the confocal benchmark.
+    # The figure is written by the rendering processes of the save logic, the first time is the
+    # one the confocal logic is blocked, the second one until the figure files are written.
+    scanner = logic_module(manager, 'scannerlogic')
+    start = time.perf_counter()
+    scanner.save_xy_data(block=True)
+    metrics['save_confocal_image'] = metric(time.perf_counter() - start, 's', 'lower')
+    if not logic.wait_for_figures(timeout=120):
+        raise TimeoutError('Figures not written within 120 s.')
+    metrics['save_confocal_image_written'] = metric(time.perf_counter() - start, 's', 'lower')
+    return metrics
+
+
+BENCHMARKS = OrderedDict([
+    ('confocal', bench_confocal),
+    ('confocal_bidirectional', bench_confocal_bidirectional),
+    ('laser_scan', bench_laser_scan),
+    ('odmr', bench_odmr),
+    ('odmr_continuous', bench_odmr_continuous),
+    ('odmr2', bench_odmr2),
+    ('odmr2_continuous', bench_odmr2_continuous),
+    ('pulsed_analysis', bench_pulsed_analysis),
+    ('ensemble_sampling', bench_ensemble_sampling),
+    ('time_series', bench_time_series),
+    ('saving', bench_saving),
+])
+
+
+def git_revision():
+    """ @return dict: commit hash and whether the working tree has uncommitted changes """
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                         stderr=subprocess.DEVNULL).decode().strip()
+        status = subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                         stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+    return {'commit': commit, 'dirty': bool(status)}
+
+
+def run_suite(names, workdir):
+    """ Start a headless Manager on the dummy setup and run the benchmarks.
+
+    @param list(str) names: names of the benchmarks to run, see BENCHMARKS
+    @param str workdir: working directory for config, status variables and saved data
+
+    @return dict: benchmark name: metrics dict, or {'error': message} if the benchmark failed
+    """
+    from core.manager import Manager
+
+    config_file = os.path.join(workdir, 'headless_suite.cfg')
+    config.save(config_file, dummy_config(workdir))
+
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication(sys.argv)
+    manager = Manager(args=argparse.Namespace(no_gui=True, config=config_file, instrument=True))
+    results = OrderedDict()
+    try:
+        for name in names:
+            print('{0} ...'.format(name), flush=True)
+            instrumentation.reset()
+            try:
+                results[name] = BENCHMARKS[name](manager, workdir)
+            except Exception as e:
+                logging.getLogger(__name__).exception('Benchmark {0} failed.'.format(name))
+                results[name] = {'error': '{0}: {1}'.format(type(e).__name__, e)}
+    finally:
+        manager.realQuit()
+        manager.tm.quitAllThreads()
+        app.processEvents()
+    return results
+
+
+def print_results(results, baseline=None, threshold=0.1):
+    """ Print the metrics, with the relative change against a baseline if given.
+
+    @return int: number of metrics that got worse by more than threshold
+    """
+    regressions = 0
+    for name, metrics in results['benchmarks'].items():
+        print('\n{0}'.format(name))
+        if 'error' in metrics:
+            print('    failed: {0}'.format(metrics['error']))
+            continue
+        old_metrics = dict() if baseline is None else baseline['benchmarks'].get(name, dict())
+        for key, result in metrics.items():
+            value = result['value']
+            line = '    {0:<28}{1:>14.4g} {2:<4}'.format(
+                key, math.nan if value is None else value, result['unit'])
+            old = old_metrics.get(key) if isinstance(old_metrics.get(key), dict) else None
+            if old is not None and old['value'] and value is not None:
+                change = value / old['value'] - 1
+                worse = -change if result['better'] == 'higher' else change
+                flag = ''
+                if worse > threshold:
+                    flag = '  REGRESSION'
+                    regressions += 1
+                elif worse < -threshold:
+                    flag = '  improved'
+                line += '{0:>10.4g} -> {1:+.1%}{2}'.format(old['value'], change, flag)
+            print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless Qudi benchmarks on dummy hardware.')
+    parser.add_argument('-o', '--output', default='',
+                        help='results file, defaults to benchmark_<commit>.json')
+    parser.add_argument('-c', '--compare', default='',
+                        help='results file of an earlier run to compare with')
+    parser.add_argument('-t', '--threshold', type=float, default=0.1,
+                        help='relative change counted as regression (default 0.1)')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help='run only these benchmarks')
+    parser.add_argument('-q', '--quick', action='store_true',
+                        help='shorter runs, for checking that the suite works')
+    parser.add_argument('-k', '--keep', action='store_true',
+                        help='keep the working directory with config and saved data')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING,
+                        format='%(asctime)s %(name)s %(levelname)s: %(message)s')
+    if args.quick:
+        for key in ('odmr_run_time', 'pulsed_run_time', 'time_series_run_time'):
+            SETTINGS[key] /= 4
+        SETTINGS['confocal_resolution'] //= 2
+        SETTINGS['laser_scan_repeats'] //= 4
+        SETTINGS['sampling_repetitions'] = 2
+        SETTINGS['save_repetitions'] = 1
+    # saving stores the image of the confocal scan
+    names = [name for name in BENCHMARKS if name in args.only]
+    if 'saving' in names and 'confocal' not in names:
+        names.insert(names.index('saving'), 'confocal')
+
+    workdir = tempfile.mkdtemp(prefix='qudi_benchmark_')
+    try:
+        benchmarks = run_suite(names, workdir)
+    finally:
+        if args.keep:
+            print('Working directory: {0}'.format(workdir))
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results = OrderedDict()
+    results['format'] = RESULTS_FORMAT
+    results['timestamp'] = datetime.datetime.now().isoformat(timespec='seconds')
+    results['revision'] = git_revision()
+    results['machine'] = {'platform': platform.platform(),
+                          'processor': platform.processor(),
+                          'cpu_count': os.cpu_count(),
+                          'python': platform.python_version(),
+                          'numpy': np.__version__}
+    results['settings'] = dict(SETTINGS)
+    results['benchmarks'] = benchmarks
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if baseline.get('format') != RESULTS_FORMAT:
+            print('Baseline has a different results format, not comparing.')
+            baseline = None
+        elif baseline.get('settings') != results['settings']:
+            print('Baseline was measured with different settings, changes are not meaningful.')
+    regressions = print_results(results, baseline, args.threshold)
+
+    output = args.output
+    if not output:
+        commit = results['revision']['commit'] or 'unknown'
+        output = 'benchmark_{0}.json'.format(commit[:10])
+    with open(output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print('\nResults written to {0}'.format(output))
+    if baseline is not None:
+        print('{0:d} regression(s) above {1:.0%}'.format(regressions, args.threshold))
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the waveform conversion and upload of the Keysight M819x AWG modules.
+
+The former conversion (scipy interp1d mapping, separate marker arrays) and upload (pyvisa
+write_binary_values, which packs the values with struct) are compared with the conversion into a
+preallocated buffer and the raw IEEE block upload of hardware/awg/keysight_m819x.py. The device is
+replaced by a mocked VISA resource, which answers the queries of the upload and records the bytes
+sent to it. The bytes of both paths have to be identical, for float32 and float64 samples, samples
+exceeding the normalized range, both DAC resolutions of the M8190A and the interleaved markers of
+the M8195A. The waveform is also written in chunks through write_waveform. The throughput is given
+in MB of binary samples per second.
+
+Run from the qudi root directory:
+    python tools/benchmarks/keysight_m819x_upload.py [million_samples]
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import logging
+import os
+import struct
+import sys
+import time
+import numpy as np
+import scipy.interpolate
+
+sys.path.append(os.getcwd())
+
+from hardware.awg.keysight_m819x import AWGM8190A, AWGM8195A
+
+UPLOAD_COMMAND = ':MMEM:DATA "benchmark_ch1.bin", '
+CHUNK_SIZE = 300000     # samples per chunk written with write_waveform
+
+
+class MockVisaResource:
+    """ Message based VISA resource of an M819x AWG without any waveforms on it.
+
+    Writes are collected into complete messages (the END indicator is sent with send_end). The
+    binary data is only stored if record is set, otherwise only the number of bytes is counted.
+    """
+    write_termination = '\n'
+
+    def __init__(self, awg_mode='MARK'):
+        self.timeout = 20000
+        self.send_end = True
+        self.record = True
+        self.messages = list()
+        self.bytes_written = 0
+        self._message = list()
+        self._answers = {':INST:DACM?': awg_mode, ':SYST:ERR?': '0,"No error"',
+                         'MMEM:CAT?': '0,0', ':OUTP1:NORM?': '1', ':OUTP2:NORM?': '1'}
+
+    def query(self, question):
+        if question.startswith(':TRAC') and question.endswith(':CAT?'):
+            return '0,0'
+        return self._answers.get(question, '0')
+
+    def write(self, command):
+        return self.write_raw(command.encode('ascii') + self.write_termination.encode('ascii'))
+
+    def write_raw(self, message):
+        self.bytes_written += len(message)
+        if self.record:
+            self._message.append(bytes(message))
+            if self.send_end:
+                self.messages.append(b''.join(self._message))
+                self._message = list()
+        return len(message), 0
+
+    def write_binary_values(self, message, values, datatype='f', is_big_endian=False,
+                            termination=None, encoding=None):
+        """ write_binary_values of pyvisa 1.8 used by the former upload. """
+        data = struct.pack('{0}{1:d}{2}'.format('>' if is_big_endian else '<', len(values),
+                                                datatype), *values)
+        length = str(len(data))
+        block = '#{0:d}{1}'.format(len(length), length).encode('ascii') + data
+        term = self.write_termination if termination is None else termination
+        message = message.encode('ascii') + block
+        if term:
+            message += term.encode('ascii')
+        return self.write_raw(message)
+
+
+def legacy_float_to_int(val, n_bits):
+    """ _float_to_int of AWGM819X before the fused conversion. """
+    bitsize = int(2 ** n_bits)
+    min_intval = -bitsize / 2
+    max_intval = bitsize / 2 - 1
+    max_u_samples = 1
+    if max(abs(val)) > 1:
+        max_u_samples = max([abs(np.min(val)), np.max(val)])
+    mapper = scipy.interpolate.interp1d([-max_u_samples, max_u_samples], [min_intval, max_intval])
+    return mapper(val)
+
+
+def legacy_bool_to_sample(val_dch_1, val_dch_2, int_type_str='int16'):
+    bit_dch_1 = 0x1 & np.asarray(val_dch_1).astype(int_type_str)
+    bit_dch_2 = 0x2 & (np.asarray(val_dch_2).astype(int_type_str) << 1)
+    return bit_dch_1 + bit_dch_2
+
+
+def legacy_compile_m8190a(analog, marker_sample, marker_sync, n_bits):
+    a_samples = legacy_float_to_int(analog, n_bits).astype('int16') << (16 - n_bits)
+    return a_samples + legacy_bool_to_sample(marker_sample, marker_sync, int_type_str='int16')
+
+
+def legacy_compile_m8195a(analog, marker_1, marker_2):
+    a_samples = legacy_float_to_int(analog, 8).astype('int8')
+    d_samples = legacy_bool_to_sample(marker_1, marker_2, int_type_str='int8')
+    comb_samples = np.zeros(2 * a_samples.size, dtype=np.int8)
+    comb_samples[::2] = a_samples
+    comb_samples[1::2] = d_samples
+    return comb_samples
+
+
+def legacy_write_bin(awg, command, values):
+    """ write_bin of AWGM819X before the raw block upload. """
+    awg.awg.write_binary_values(command, datatype=awg._wave_transfer_datatype,
+                                is_big_endian=False, values=values)
+
+
+def make_awg(cls, dac_resolution=None, awg_mode='MARK'):
+    """ AWG module connected to a MockVisaResource, without activating it. """
+    config = {'awg_visa_address': 'TCPIP0::localhost::hislip0::INSTR',
+              'awg_timeout': 20,
+              'pulsed_file_dir': 'C:/Software/pulsed_files',
+              'assets_storage_path': 'C:/Software/saved_pulsed_assets',
+              'sample_rate_div': 1}
+    if cls is AWGM8190A:
+        config['dac_resolution_bits'] = dac_resolution
+    else:
+        config['awg_mode'] = awg_mode
+    awg = cls(manager=None, name='awg', config=config)
+    awg._MODEL = 'M8190A' if cls is AWGM8190A else 'M8195A'
+    # the samples exceeding the normalized range are checked on purpose
+    awg.log.setLevel(logging.ERROR)
+    awg.awg = MockVisaResource(awg_mode)
+    return awg
+
+
+def make_samples(number_of_samples, dtype, amplitude):
+    rng = np.random.default_rng(0)
+    analog = (amplitude * np.sin(np.linspace(0, 2000 * np.pi, number_of_samples))
+              + rng.normal(0, 1e-3, number_of_samples)).astype(dtype)
+    marker_1 = rng.random(number_of_samples) > 0.5
+    marker_2 = rng.random(number_of_samples) > 0.9
+    return analog, marker_1, marker_2
+
+
+def uploaded_bytes(awg, upload):
+    awg.awg.messages = list()
+    upload()
+    return awg.awg.messages
+
+
+def check_m8190a(number_of_samples):
+    """ Compare the bytes sent by the former and the current path, raise AssertionError if they differ. """
+    for n_bits in (12, 14):
+        awg = make_awg(AWGM8190A, n_bits)
+        for dtype in (np.float32, np.float64):
+            for amplitude in (0.8, 1.3):
+                analog, marker_1, marker_2 = make_samples(number_of_samples, dtype, amplitude)
+                samples = {'a_ch1': analog}
+                digital = {'d_ch1': marker_1, 'd_ch3': marker_2}
+                former = uploaded_bytes(awg, lambda: legacy_write_bin(
+                    awg, UPLOAD_COMMAND, legacy_compile_m8190a(analog, marker_1, marker_2, n_bits)))
+                current = uploaded_bytes(awg, lambda: awg.write_bin(
+                    UPLOAD_COMMAND, awg._compile_bin_samples(samples, digital, 'a_ch1')))
+                assert former == current, (n_bits, dtype, amplitude)
+
+
+def check_m8195a(number_of_samples):
+    awg = make_awg(AWGM8195A)
+    for dtype in (np.float32, np.float64):
+        for amplitude in (0.8, 1.3):
+            analog, marker_1, marker_2 = make_samples(number_of_samples, dtype, amplitude)
+            samples = {'a_ch1': analog}
+            digital = {'d_ch1': marker_1, 'd_ch2': marker_2}
+            former = uploaded_bytes(awg, lambda: legacy_write_bin(
+                awg, UPLOAD_COMMAND, legacy_compile_m8195a(analog, marker_1, marker_2)))
+            current = uploaded_bytes(awg, lambda: awg.write_bin(
+                UPLOAD_COMMAND, awg._compile_bin_samples(samples, digital, 'a_ch1')))
+            assert former == current, (dtype, amplitude)
+
+
+def check_chunked(number_of_samples):
+    """ Write the waveform in chunks with write_waveform and compare with a single conversion. """
+    awg = make_awg(AWGM8190A, 14)
+    awg._wave_mem_mode = 'pc_hdd'
+    analog = {ch: make_samples(number_of_samples, np.float32, 0.8)[0] for ch in ('a_ch1', 'a_ch2')}
+    digital = {ch: make_samples(number_of_samples, np.float32, 0.8)[1]
+               for ch in ('d_ch1', 'd_ch2', 'd_ch3', 'd_ch4')}
+    expected = {ch: awg._compile_bin_samples(analog, digital, ch).tobytes() for ch in analog}
+
+    awg.awg.messages = list()
+    written_waveforms = set()
+    for start in range(0, number_of_samples, CHUNK_SIZE):
+        stop = min(start + CHUNK_SIZE, number_of_samples)
+        written, waveforms = awg.write_waveform(
+            'benchmark',
+            {ch: samples[start:stop] for ch, samples in analog.items()},
+            {ch: samples[start:stop] for ch, samples in digital.items()},
+            is_first_chunk=start == 0,
+            is_last_chunk=stop == number_of_samples,
+            total_number_of_samples=number_of_samples)
+        assert written == stop - start, 'write_waveform returned {0}'.format(written)
+        written_waveforms.update(waveforms)
+    assert written_waveforms == {'benchmark_ch1.bin', 'benchmark_ch2.bin'}, written_waveforms
+    uploads = [msg for msg in awg.awg.messages if msg.startswith(b':MMEM:DATA "benchmark')]
+    assert len(uploads) == 2, 'The waveform was uploaded {0:d} times.'.format(len(uploads))
+    for upload, ch in zip(uploads, ('a_ch1', 'a_ch2')):
+        assert expected[ch] in upload, ch
+
+
+def best_time(func, repetitions=3):
+    durations = list()
+    for i in range(repetitions):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    number_of_samples = int(float(sys.argv[1]) * 1e6) if len(sys.argv) > 1 else 4000000
+
+    check_m8190a(100000)
+    check_m8195a(100000)
+    check_chunked(1000000)
+    print('Uploaded bytes identical to the former conversion and upload '
+          '(M8190A 12/14 bit, M8195A interleaved, float32/float64, chunked write_waveform).\n')
+
+    awg = make_awg(AWGM8190A, 14)
+    awg.awg.record = False
+    analog, marker_1, marker_2 = make_samples(number_of_samples, np.float32, 0.8)
+    samples = {'a_ch1': analog}
+    digital = {'d_ch1': marker_1, 'd_ch3': marker_2}
+    buffer = np.empty(number_of_samples, dtype=np.int16)
+    megabytes = buffer.nbytes / 1e6
+
+    legacy_samples = legacy_compile_m8190a(analog, marker_1, marker_2, 14)
+    timings = (
+        ('conversion', 'former',
+         lambda: legacy_compile_m8190a(analog, marker_1, marker_2, 14)),
+        ('conversion', 'preallocated',
+         lambda: awg._compile_bin_samples(samples, digital, 'a_ch1', out=buffer)),
+        ('upload', 'write_binary_values',
+         lambda: legacy_write_bin(awg, UPLOAD_COMMAND, legacy_samples)),
+        ('upload', 'raw block',
+         lambda: awg.write_bin(UPLOAD_COMMAND, buffer)),
+    )
+    print('M8190A, {0:.1f} million samples ({1:.1f} MB):'.format(number_of_samples / 1e6,
+                                                                  megabytes))
+    print('{0:<12}{1:<22}{2:>10}{3:>10}'.format('step', 'path', 'time (s)', 'MB/s'))
+    for step, label, func in timings:
+        duration = best_time(func)
+        print('{0:<12}{1:<22}{2:>10.3f}{3:>10.1f}'.format(step, label, duration,
+                                                          megabytes / duration))
+
+
+if __name__ == '__main__':
+    main()
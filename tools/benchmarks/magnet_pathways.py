@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Simulation benchmark of the 2D alignment pathway planners of MagnetLogic.
+
+A magnet_dummy-like stage with two axes moving simultaneously at a fixed velocity is simulated on a
+virtual clock, together with a measurement of fixed duration whose signal is a 2D gaussian peak.
+For every pathway planner the total travel distance and the simulated wall time of the alignment
+are reported, once with the former sleep-polling loop (status check every _checktime seconds) and
+once with the timer driven move/settle/measure state machine of MagnetLogic.
+
+Run from the qudi root directory:
+    python tools/benchmarks/magnet_pathways.py [points_per_axis]
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from logic.magnet_pathway_planner import PATHWAY_PLANNERS, SerpentinePlanner
+
+STEP = 1e-3             # grid step of both axes
+VELOCITY = STEP / 47    # about one grid step per minute, typical for a superconducting magnet
+MEASURE_TIME = 30.0     # duration of one alignment measurement in s
+SETTLE_TIME = 5.0       # wait time after the magnet stopped in s
+CHECKTIME = 2.5         # MagnetLogic._checktime
+MIN_CHECKTIME = 0.05    # MagnetLogic._min_checktime
+
+
+class SimulatedMagnet:
+    """ Two magnet_dummy-like axes moving simultaneously with a constant velocity. """
+
+    def __init__(self, start_pos, velocity):
+        self.pos = np.array(start_pos, dtype=float)
+        self.velocity = velocity
+        self.distance = 0.0
+
+    def move_abs(self, target):
+        """ Move to target and return the duration of the movement. """
+        target = np.asarray(target, dtype=float)
+        delta = np.abs(target - self.pos)
+        self.distance += np.sqrt(np.sum(delta ** 2))
+        self.pos = target
+        return delta.max() / self.velocity
+
+
+def wait_sleep_polling(duration):
+    """ Former loop: check the status right away and sleep _checktime while moving. """
+    if duration <= 0:
+        return 0.0
+    return np.ceil(duration / CHECKTIME) * CHECKTIME
+
+
+class TimerPolling:
+    """ Check schedule of MagnetLogic._start_motion / _check_motion. """
+
+    def __init__(self):
+        self.seconds_per_step = None
+
+    def wait(self, duration, steps):
+        now = 0.0
+        if self.seconds_per_step is not None:
+            now = self.seconds_per_step * steps
+        last_busy = None
+        interval = MIN_CHECKTIME
+        while now < duration:
+            last_busy = now
+            now += interval
+            interval = min(2 * interval, CHECKTIME)
+        if steps > 0:
+            if last_busy is None:
+                seconds_per_step = 0.9 * now / steps
+            else:
+                seconds_per_step = ((last_busy + now) / 2) / steps
+            if self.seconds_per_step is None:
+                self.seconds_per_step = seconds_per_step
+            else:
+                self.seconds_per_step = (self.seconds_per_step + seconds_per_step) / 2
+        return now
+
+
+def run_alignment(planner_class, num_points, event_driven):
+    axis = np.round(np.arange(num_points) * STEP, 7)
+    center = (axis[-1] / 2, axis[-1] / 2)
+    # the optimum is off-center and between the grid points
+    peak = (0.3 * axis[-1] + 0.4 * STEP, 0.7 * axis[-1] + 0.2 * STEP)
+    grid0, grid1 = np.meshgrid(axis, axis, indexing='ij')
+    signal = np.exp(-((grid0 - peak[0]) ** 2 + (grid1 - peak[1]) ** 2) / (0.2 * axis[-1]) ** 2)
+
+    magnet = SimulatedMagnet(center, VELOCITY)
+    polling = TimerPolling()
+    data = np.zeros(signal.shape)
+    clock = 0.0
+    measured = 0
+
+    planning_start = time.perf_counter()
+    planner = planner_class(axis, axis, start_pos=center, velocities=(VELOCITY, VELOCITY))
+    points = planner.initial_points()
+    planning = time.perf_counter() - planning_start
+
+    def move(target):
+        start = magnet.pos.copy()
+        duration = magnet.move_abs(target)
+        if event_driven:
+            return polling.wait(duration, np.abs(np.asarray(target) - start).max() / STEP)
+        return wait_sleep_polling(duration)
+
+    while points:
+        for point in points:
+            clock += move(planner.positions([point])[0]) + SETTLE_TIME + MEASURE_TIME
+            data[point] = signal[point]
+            measured += 1
+        planning_start = time.perf_counter()
+        points = planner.next_points(data)
+        planning += time.perf_counter() - planning_start
+    clock += move(center)
+
+    found = np.unravel_index(np.argmax(data), data.shape)
+    best = np.unravel_index(np.argmax(signal), signal.shape)
+    return measured, magnet.distance, clock, planning, found == best
+
+
+def main():
+    num_points = int(sys.argv[1]) if len(sys.argv) > 1 else 21
+    print('{0}x{0} grid, {1:.0f} s per step, {2:.0f} s measurement, {3:.0f} s settle time, '
+          '{4} s checktime'.format(num_points, STEP / VELOCITY, MEASURE_TIME, SETTLE_TIME, CHECKTIME))
+    print('{0:<32}{1:>8}{2:>12}{3:>12}{4:>12}{5:>8}'.format(
+        'planner / status checks', 'points', 'distance', 'time (h)', 'plan (ms)', 'best'))
+
+    results = [('snake-wise (former)', SerpentinePlanner, False)]
+    results += [(name, planner, True) for name, planner in PATHWAY_PLANNERS.items()]
+    reference_time = None
+    for name, planner_class, event_driven in results:
+        measured, distance, clock, planning, best = run_alignment(planner_class, num_points, event_driven)
+        if reference_time is None:
+            reference_time = clock
+        print('{0:<32}{1:>8d}{2:>12.4f}{3:>12.2f}{4:>12.1f}{5:>8}   ({6:.2f}x)'.format(
+            name, measured, distance, clock / 3600, planning * 1e3, 'yes' if best else 'no',
+            reference_time / clock))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the frequency list upload of the SRS SG and the SMIQ microwave sources.
+
+Both hardware modules are connected to a mocked VISA resource, which counts the write and query
+transactions with the bytes sent and answers the queries issued by set_list. The former set_list,
+which sent every list point or setting in a message of its own followed by a *WAI message, is
+compared with the batched upload for an ODMR frequency list. The list is then uploaded a second
+time unchanged and once with a changed power. The bus time is modeled from a fixed latency per
+transaction and the transfer rate of a GPIB bus.
+
+Run from the qudi root directory:
+    python tools/benchmarks/mw_list_upload.py [number_of_frequencies]
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import logging
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from hardware.microwave.mw_source_smiq import MicrowaveSmiq
+from hardware.microwave.mw_source_srssg import MicrowaveSRSSG
+
+TRANSACTION_LATENCY = 2e-3  # handshake and addressing of one GPIB message in s
+BUS_RATE = 300e3            # bytes per s of a GPIB transfer with a usual controller
+POWER = -20.0
+
+
+class MockVisaResource:
+    """ VISA resource counting the messages and answering the queries of set_list. """
+
+    def __init__(self):
+        self.writes = 0
+        self.queries = 0
+        self.bytes = 0
+        self.state = {'OUTP:STAT': '0', ':FREQ:MODE': 'CW', ':LIST:FREQ': '',
+                      ':LIST:POW': '0', 'ENBR': '0', 'FREQ': '2.87e9', 'AMPR': '0'}
+
+    def reset_counters(self):
+        self.writes = self.queries = self.bytes = 0
+
+    def write(self, message):
+        self.writes += 1
+        self.bytes += len(message) + 1
+        for command in message.split(';'):
+            header, _, value = command.strip().partition(' ')
+            header = header.lstrip(':') if header.lstrip(':') in self.state else header
+            if header in self.state:
+                self.state[header] = value.strip()
+            elif header == 'LSTP' and value.startswith('0,'):
+                # the first list point of the SRS SG is output after LSTE 1
+                fields = value.split(',')
+                self.state['FREQ'], self.state['AMPR'] = fields[1], fields[5]
+        return len(message) + 1, 0
+
+    def query(self, message):
+        self.queries += 1
+        self.bytes += len(message) + 1
+        header = message.rstrip('?').strip()
+        if header == '*OPC':
+            return '1'
+        if header == ':FREQ:MODE':
+            return {'CW': 'CW', 'LIST': 'LIST', 'SWEEP': 'SWE'}[self.state[header].upper()]
+        if header in ('FREQ', 'AMPR', 'ENBR'):
+            return self.state[header]
+        if header.startswith('LSTD') or header.startswith('LSTC'):
+            return '1'
+        if header in self.state:
+            return self.state[header]
+        return '0'
+
+    def bus_time(self):
+        return (self.writes + self.queries) * TRANSACTION_LATENCY + self.bytes / BUS_RATE
+
+
+class LegacySmiq(MicrowaveSmiq):
+    """ MicrowaveSmiq with the set_list and _command_wait from before the batched upload. """
+
+    def _command_wait(self, command_str):
+        self._gpib_connection.write(command_str)
+        self._gpib_connection.write('*WAI')
+        while int(float(self._gpib_connection.query('*OPC?'))) != 1:
+            pass
+
+    def set_list(self, frequency=None, power=None):
+        mode, is_running = self.get_status()
+        if is_running:
+            self.off()
+        if mode != 'cw':
+            self.set_cw()
+        self._gpib_connection.write(":LIST:SEL 'QUDI'")
+        self._gpib_connection.write('*WAI')
+        if frequency is not None:
+            s = ' {0:f},'.format(frequency[0])
+            for f in frequency[:-1]:
+                s += ' {0:f},'.format(f)
+            s += ' {0:f}'.format(frequency[-1])
+            self._gpib_connection.write(':LIST:FREQ' + s)
+            self._gpib_connection.write('*WAI')
+            self._gpib_connection.write(':LIST:MODE STEP')
+            self._gpib_connection.write('*WAI')
+        if power is not None:
+            self._gpib_connection.write(':LIST:POW {0:f}'.format(power))
+            self._gpib_connection.write('*WAI')
+        self._command_wait(':TRIG1:LIST:SOUR EXT')
+        self._command_wait(':LIST:LEARN')
+        self._command_wait(':FREQ:MODE LIST')
+        actual_freq = self.get_frequency()
+        actual_power = self.get_power()
+        mode, dummy = self.get_status()
+        return actual_freq, actual_power, mode
+
+
+class LegacySRSSG(MicrowaveSRSSG):
+    """ MicrowaveSRSSG with the set_list and _write from before the batched upload. """
+
+    def _write(self, command, wait=True):
+        statuscode = self._gpib_connection.write(command)
+        if wait:
+            self._gpib_connection.write('*WAI')
+        return statuscode
+
+    def set_list(self, frequency=None, power=None):
+        self._gpib_connection.write('LSTD')
+        self._ask('LSTC? {0:d}'.format(len(frequency)))
+        for index, entry in enumerate(frequency):
+            self._write('LSTP {0:d},{1:e},N,N,N,{2:f},N,N,N,N,N,N,N,N,N,N'
+                        ''.format(index, entry, power))
+        self._write('LSTE 1')
+        self._internal_mode = 'list'
+        curr_freq = self.get_frequency()
+        curr_power = self.get_power()
+        return curr_freq, curr_power, self._internal_mode
+
+
+def create_source(cls, resource):
+    config = {'gpib_address': 'GPIB0::28::INSTR', 'gpib_timeout': 10}
+    source = cls(manager=None, name=cls.__name__, config=config)
+    source._gpib_connection = resource
+    source.model = 'SMIQ03B'
+    source._MODEL = 'SG394'
+    source._programmed_list = None
+    source._programmed_list_freq = None
+    source._programmed_list_power = None
+    return source
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    num_frequencies = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    freq_list = np.linspace(2820e6, 2920e6, num_frequencies)
+    uploads = (('first list', freq_list, POWER),
+               ('unchanged list', freq_list, POWER),
+               ('changed power', freq_list, POWER + 1))
+
+    print('Upload of {0:d} frequencies, modeled with {1:.1f} ms per transaction and {2:.0f} kB/s'
+          ''.format(num_frequencies, 1e3 * TRANSACTION_LATENCY, 1e-3 * BUS_RATE))
+    print('{0:<10}{1:<10}{2:<16}{3:>8}{4:>9}{5:>10}{6:>14}'.format(
+        'source', 'set_list', 'upload', 'writes', 'queries', 'bytes', 'bus time (s)'))
+    for name, legacy_cls, cls in (('SRS SG', LegacySRSSG, MicrowaveSRSSG),
+                                  ('SMIQ', LegacySmiq, MicrowaveSmiq)):
+        for label, source_cls in (('former', legacy_cls), ('batched', cls)):
+            resource = MockVisaResource()
+            source = create_source(source_cls, resource)
+            for upload, frequency, power in uploads:
+                resource.reset_counters()
+                actual_freq, actual_power, mode = source.set_list(frequency, power)
+                assert mode == 'list' and float(actual_power) == power, (name, label, upload)
+                print('{0:<10}{1:<10}{2:<16}{3:>8d}{4:>9d}{5:>10d}{6:>14.3f}'.format(
+                    name, label, upload, resource.writes, resource.queries, resource.bytes,
+                    resource.bus_time()))
+        if name == 'SMIQ':
+            listed = np.array([float(f) for f in resource.state[':LIST:FREQ'].split(',')[1:]])
+            assert np.allclose(listed, freq_list), 'The SMIQ list was not uploaded correctly.'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the duty cycle of the AWG based ODMR (ODMRAWGLogic) on simulated hardware.
+
+An AWG playing the frequency sweep average_factor times and a time tagger counter, which is filled
+when the AWG has played all sweeps started after it was cleared, are simulated in real time. Every
+ODMR line is acquired once with the former sequence (AWG off, 0.1 s pause, AWG on, fixed sleep of
+one_sweep_time + 0.05 s, counter polled every 0.1 s) and once with the completion driven
+acquisition of ODMRAWGLogic, which waits for the counter to be filled and starts the next sweeps
+before the counts are processed. The duty cycle is the fraction of the wall time the AWG sweeps.
+
+Run from the qudi root directory:
+    python tools/benchmarks/odmr_awg_duty_cycle.py [number_of_lines]
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import logging
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from logic.odmr_awg_logic import ODMRAWGLogic
+
+NUM_FREQUENCIES = 76
+START_LATENCY = 2e-3    # time the AWG needs to start the playback in s
+RAW_DATA_LINES = 50
+
+
+class SimulatedAWG:
+    """ AWG playing a sweep of a fixed duration a number of times after pulser_on. """
+
+    def __init__(self, playback_time):
+        self.playback_time = playback_time
+        self.start_time = None
+        self.sweeping_time = 0.0
+
+    def pulser_on(self):
+        time.sleep(START_LATENCY)
+        self.start_time = time.perf_counter()
+        return 0
+
+    def pulser_off(self):
+        if self.start_time is not None:
+            self.sweeping_time += min(time.perf_counter() - self.start_time, self.playback_time)
+        self.start_time = None
+        return 0
+
+    def finished(self):
+        return (self.start_time is not None
+                and time.perf_counter() >= self.start_time + self.playback_time)
+
+
+class SimulatedTimeTagger:
+    """ ODMR counter of the time tagger (CountBetweenMarkers), filled at the end of the playback. """
+
+    def __init__(self, awg, num_bins, poll_interval):
+        self.awg = awg
+        self.poll_interval = poll_interval
+        self.timeout = 5
+        # Counts of one line, returned as a copy like CountBetweenMarkers.getData
+        self._counts = np.random.poisson(1000, num_bins).astype(np.float64)
+
+    def clear_odmr(self):
+        return 0
+
+    def count_odmr(self, length=100, pulsed=False):
+        t0 = time.perf_counter()
+        t = 0
+        while not self.awg.finished() and t < self.timeout:
+            time.sleep(self.poll_interval)
+            t = time.perf_counter() - t0
+        if t >= self.timeout:
+            return True, []
+        return False, self._counts.copy()
+
+
+class AcquisitionLogic:
+    """ The acquisition part of ODMRAWGLogic, without the Qudi module around it. """
+    freq_duration = ODMRAWGLogic.freq_duration
+    one_sweep_time = ODMRAWGLogic.one_sweep_time
+
+    _start_sweeps = ODMRAWGLogic._start_sweeps
+    _acquire_sweeps = ODMRAWGLogic._acquire_sweeps
+
+    def __init__(self, awg, counter):
+        self.log = logging.getLogger('odmr_awg_duty_cycle')
+        self._awg_device = awg
+        self._odmr_counter = counter
+        self.stopRequested = False
+        self.freq_list = np.linspace(2820e6, 2920e6, NUM_FREQUENCIES)
+        self.odmr_plot_x = self.freq_list
+        self.average_factor = int(self.one_sweep_time / (self.freq_duration * len(self.freq_list)))
+        self.odmr_raw_data = np.zeros((RAW_DATA_LINES, 1, self.freq_list.size))
+
+    def add_line(self, new_counts):
+        """ Data handling of ODMRAWGLogic._scan_odmr_line after the acquisition. """
+        self.odmr_raw_data = np.roll(self.odmr_raw_data, 1, axis=0)
+        self.odmr_raw_data[0] = new_counts
+        return np.mean(self.odmr_raw_data, axis=0, dtype=np.float64)
+
+    def playback_time(self):
+        return self.average_factor * len(self.freq_list) * self.freq_duration
+
+
+def run_former(number_of_lines):
+    """ Former _scan_odmr_line: reset_sweep with a pause and a fixed sleep before the readout. """
+    logic = AcquisitionLogic(None, None)
+    awg = SimulatedAWG(logic.playback_time())
+    counter = SimulatedTimeTagger(awg, logic.average_factor * len(logic.freq_list), 0.1)
+    logic._awg_device, logic._odmr_counter = awg, counter
+
+    start = time.perf_counter()
+    for line in range(number_of_lines):
+        awg.pulser_off()
+        time.sleep(0.1)
+        awg.pulser_on()
+        counter.clear_odmr()
+        time.sleep(logic.one_sweep_time + 0.05)
+        err, new_counts = counter.count_odmr(length=logic.odmr_plot_x.size, pulsed=True)
+        if err:
+            raise RuntimeError('Counter timed out.')
+        new_counts = np.reshape(new_counts, (logic.average_factor, len(logic.freq_list)))
+        logic.add_line(np.mean(new_counts, axis=0))
+    awg.pulser_off()
+    return time.perf_counter() - start, awg.sweeping_time
+
+
+def run_completion_driven(number_of_lines):
+    """ ODMRAWGLogic: wait for the filled counter and start the next sweeps before processing. """
+    logic = AcquisitionLogic(None, None)
+    awg = SimulatedAWG(logic.playback_time())
+    counter = SimulatedTimeTagger(awg, logic.average_factor * len(logic.freq_list), 1e-3)
+    logic._awg_device, logic._odmr_counter = awg, counter
+
+    start = time.perf_counter()
+    logic._start_sweeps()
+    for line in range(number_of_lines):
+        if line == number_of_lines - 1:
+            logic.stopRequested = True
+        err, new_counts = logic._acquire_sweeps()
+        if err:
+            raise RuntimeError('Counter timed out.')
+        logic.add_line(new_counts)
+    awg.pulser_off()
+    return time.perf_counter() - start, awg.sweeping_time
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    number_of_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    print('{0:d} ODMR lines of {1:d} frequencies, {2:.3f} s of sweeps per line'.format(
+        number_of_lines, NUM_FREQUENCIES, AcquisitionLogic(None, None).playback_time()))
+    print('{0:<20}{1:>12}{2:>18}{3:>14}'.format(
+        'acquisition', 'wall (s)', 'dead/line (ms)', 'duty cycle'))
+    for label, run in (('former', run_former), ('completion driven', run_completion_driven)):
+        wall_time, sweeping_time = run(number_of_lines)
+        print('{0:<20}{1:>12.2f}{2:>18.1f}{3:>13.1%}'.format(
+            label, wall_time, 1e3 * (wall_time - sweeping_time) / number_of_lines,
+            sweeping_time / wall_time))
+
+
+if __name__ == '__main__':
+    main()
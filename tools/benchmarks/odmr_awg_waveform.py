@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the IQ sweep synthesis and upload of the AWG based ODMR (ODMRAWGLogic).
+
+The former list_to_waveform, which appended every frequency segment with np.append, is compared
+with the vectorized synthesizer of ODMRAWGLogic for several sweep lengths: the samples have to
+be equal and the synthesis time is reported, also for a repeated call answered from the cache.
+The sweep is then uploaded twice to a pulser_dummy with ODMRAWGLogic.upload_sweep, the second
+upload of the unchanged sweep must not write to the device again.
+
+Run from the qudi root directory:
+    python tools/benchmarks/odmr_awg_waveform.py [repetitions]
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import logging
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from logic.odmr_awg_logic import ODMRAWGLogic
+from hardware.pulser_dummy import PulserDummy
+
+CW_FREQUENCY = 2870e6
+NUM_FREQUENCIES = (11, 76, 301, 1001)   # 1001 is about the maximum of 5e6 AWG samples
+
+
+def legacy_list_to_waveform(logic, freq_list):
+    """ list_to_waveform of ODMRAWGLogic before it was vectorized. """
+    digital_pulse_samples = int(np.floor(logic.sample_rate * logic.digital_pulse_length))
+    analog_samples = {'a_ch0': [], 'a_ch1': []}
+    digital_samples = {'d_ch0': [], 'd_ch2': []}
+    norm_freq_list = (logic.cw_mw_frequency - freq_list) / logic.sample_rate
+
+    x = np.linspace(start=0, stop=int(logic.samples_per_freq) - 1, num=logic.samples_per_freq)
+    single_digital_pulse = np.concatenate([np.ones(digital_pulse_samples, dtype=int),
+                                           np.zeros(int(logic.samples_per_freq) - digital_pulse_samples, dtype=int)])
+    digital_sync_samples = int(np.floor(logic.sample_rate * logic.digital_sync_length))
+    digital_sync_pulse = np.zeros(int(digital_sync_samples), dtype=int)
+    digital_samples['d_ch0'] = np.append(digital_samples['d_ch0'], digital_sync_pulse)
+    digital_samples['d_ch2'] = np.append(digital_samples['d_ch2'], digital_sync_pulse)
+
+    for norm_freq in norm_freq_list:
+        analog_samples['a_ch0'] = np.append(analog_samples['a_ch0'], np.sin(2 * np.pi * norm_freq * x))
+        analog_samples['a_ch1'] = np.append(analog_samples['a_ch1'], np.sin(2 * np.pi * norm_freq * x - np.pi / 2))
+        digital_samples['d_ch0'] = np.append(digital_samples['d_ch0'], single_digital_pulse)
+
+    analog_samples['a_ch0'] = np.append(analog_samples['a_ch0'], np.zeros(2 * digital_pulse_samples + digital_sync_samples))
+    analog_samples['a_ch1'] = np.append(analog_samples['a_ch1'], np.zeros(2 * digital_pulse_samples + digital_sync_samples))
+    digital_samples['d_ch0'] = np.append(digital_samples['d_ch0'], np.ones(digital_pulse_samples, dtype=int))
+    digital_samples['d_ch0'] = np.append(digital_samples['d_ch0'], np.zeros(digital_pulse_samples, dtype=int))
+    digital_samples['d_ch5'] = digital_samples['d_ch0']
+    digital_samples['d_ch2'] = np.append(digital_samples['d_ch2'], np.ones(len(analog_samples['a_ch0']) - len(digital_sync_pulse), dtype=int))
+    return analog_samples, digital_samples
+
+
+class SweepLogic:
+    """ The waveform part of ODMRAWGLogic, without the Qudi module around it. """
+    sample_rate = ODMRAWGLogic.sample_rate
+    samples_per_freq = ODMRAWGLogic.samples_per_freq
+    digital_pulse_length = ODMRAWGLogic.digital_pulse_length
+    digital_sync_length = ODMRAWGLogic.digital_sync_length
+    phase_continuous = False
+
+    list_to_waveform = ODMRAWGLogic.list_to_waveform
+    upload_sweep = ODMRAWGLogic.upload_sweep
+
+    def __init__(self, awg_device=None):
+        self.log = logging.getLogger('odmr_awg_waveform')
+        self.cw_mw_frequency = CW_FREQUENCY
+        self.freq_list = np.array([])
+        self._awg_device = awg_device
+        self._waveform_cache = None
+        self._uploaded_waveform_key = None
+        self._uploaded_waveforms = list()
+
+
+def best_time(func, repetitions):
+    """ Shortest duration of repeated calls in s. """
+    durations = list()
+    for i in range(repetitions):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def frequency_list(num_frequencies):
+    return np.linspace(2820e6, 2920e6, num_frequencies)
+
+
+def check_equal(logic, freq_list):
+    """ Compare the vectorized with the former samples, raise AssertionError if they differ. """
+    logic._waveform_cache = None
+    analog, digital = logic.list_to_waveform(freq_list)
+    legacy_analog, legacy_digital = legacy_list_to_waveform(logic, freq_list)
+    for chnl, samples in legacy_analog.items():
+        assert np.allclose(analog[chnl], samples, atol=1e-9), chnl
+    for chnl, samples in legacy_digital.items():
+        assert np.array_equal(digital[chnl], samples.astype(bool)), chnl
+
+
+def max_border_step(logic, freq_list):
+    """ Largest change of the I samples at a frequency border, relative to its ideal value. """
+    logic._waveform_cache = None
+    analog, digital = logic.list_to_waveform(freq_list)
+    spf = logic.samples_per_freq
+    i_samples = analog['a_ch0'][:freq_list.size * spf].reshape(freq_list.size, spf)
+    q_samples = analog['a_ch1'][:freq_list.size * spf].reshape(freq_list.size, spf)
+    # continue every segment by one sample and compare with the first sample of the next one
+    phase = np.arctan2(i_samples[:-1, -1], -q_samples[:-1, -1])
+    phase += 2 * np.pi * logic.norm_freq_list[:-1]
+    next_phase = np.arctan2(i_samples[1:, 0], -q_samples[1:, 0])
+    return np.max(np.abs(np.angle(np.exp(1j * (next_phase - phase)))))
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    logic = SweepLogic()
+
+    print('{0:>12}{1:>12}{2:>14}{3:>14}{4:>14}{5:>10}'.format(
+        'frequencies', 'samples', 'former (ms)', 'vector (ms)', 'cached (ms)', 'speedup'))
+    for num_frequencies in NUM_FREQUENCIES:
+        freq_list = frequency_list(num_frequencies)
+        check_equal(logic, freq_list)
+
+        def synthesize():
+            logic._waveform_cache = None
+            logic.list_to_waveform(freq_list)
+
+        legacy = best_time(lambda: legacy_list_to_waveform(logic, freq_list), repetitions)
+        vectorized = best_time(synthesize, repetitions)
+        cached = best_time(lambda: logic.list_to_waveform(freq_list), repetitions)
+        samples = logic._waveform_cache[1]['a_ch0'].size
+        print('{0:>12d}{1:>12d}{2:>14.2f}{3:>14.2f}{4:>14.4f}{5:>9.1f}x'.format(
+            num_frequencies, samples, 1e3 * legacy, 1e3 * vectorized, 1e3 * cached,
+            legacy / vectorized))
+
+    freq_list = frequency_list(NUM_FREQUENCIES[1])
+    print('\nLargest phase jump at a frequency border ({0:d} frequencies):'.format(freq_list.size))
+    for phase_continuous in (False, True):
+        logic.phase_continuous = phase_continuous
+        print('    phase_continuous={0!s:<6} {1:.3f} rad'.format(
+            phase_continuous, max_border_step(logic, freq_list)))
+    logic.phase_continuous = False
+
+    # Upload to the dummy pulser. Its channels are named like the ones of the spectrum AWG.
+    pulser = PulserDummy(manager=None, name='pulser_dummy', config={})
+    pulser.on_activate()
+    pulser.activation_config = {'a_ch0', 'a_ch1', 'd_ch0', 'd_ch2', 'd_ch5'}
+    writes = list()
+    write_waveform = pulser.write_waveform
+
+    def counting_write_waveform(*args, **kwargs):
+        writes.append(kwargs.get('name'))
+        return write_waveform(*args, **kwargs)
+
+    pulser.write_waveform = counting_write_waveform
+    logic = SweepLogic(awg_device=pulser)
+    logic.freq_list = freq_list
+
+    print('\nUpload to pulser_dummy ({0:d} frequencies):'.format(freq_list.size))
+    for label in ('first sweep', 'unchanged sweep', 'changed CW frequency'):
+        if label == 'changed CW frequency':
+            logic.cw_mw_frequency += 1e6
+        start = time.perf_counter()
+        names = logic.upload_sweep()
+        duration = time.perf_counter() - start
+        print('    {0:<22}{1:>10.2f} ms   writes: {2:d}   loaded: {3}'.format(
+            label, 1e3 * duration, len(writes), ', '.join(sorted(names))))
+    assert len(writes) == 2, 'The unchanged sweep was written again.'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Loopback benchmark of the array transport used for qudi remote modules.
+
+Starts a rpyc server on localhost that shares a dummy module holding a fast counter like trace
+and compares element-wise netref access, rpyc.utils.classic.obtain, netobtain (raw buffers via
+socket, with and without zlib compression, and via shared memory) and batched netfetch.
+
+Run from the qudi root directory:
+    python tools/benchmarks/remote_transport.py
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import os
+import sys
+import time
+import threading
+import numpy as np
+import rpyc
+import rpyc.utils.classic
+from rpyc.utils.server import ThreadedServer
+
+sys.path.append(os.getcwd())
+
+from core.util.network import evaluate_requests, netfetch, netobtain, send_data
+from core.util.network import register_local_connection, shared_memory
+
+rpyc.core.protocol.DEFAULT_CONFIG['allow_pickle'] = True
+
+PORT = 18861
+REPETITIONS = 5
+
+
+class DummyCounter:
+    """ Stands in for a fast counter hardware module. """
+    def __init__(self, gates=100, bins=10000):
+        self.trace = np.random.poisson(5, (gates, bins)).astype(np.int64)
+        self.elapsed_sweeps = 1000
+        self.elapsed_time = 10.0
+
+    def get_data_trace(self):
+        return self.trace, {'elapsed_sweeps': self.elapsed_sweeps,
+                            'elapsed_time': self.elapsed_time}
+
+
+class BenchmarkService(rpyc.Service):
+    """ Minimal version of the RemoteModuleService in core/remote.py """
+    module = DummyCounter()
+
+    def exposed_getModule(self, name):
+        return self.module
+
+    def exposed_pack_object(self, obj, compression=None, shared_memory=False):
+        return send_data(obj, compression, shared_memory)
+
+    def exposed_fetch(self, module, requests, compression=None, shared_memory=False):
+        return send_data(evaluate_requests(module, requests), compression, shared_memory)
+
+
+def timeit(func, repetitions=REPETITIONS):
+    """ Return the best wall time of repetitions calls of func in seconds. """
+    best = np.inf
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    server = ThreadedServer(BenchmarkService,
+                            hostname='localhost',
+                            port=PORT,
+                            protocol_config={'allow_all_attrs': True})
+    threading.Thread(target=server.start, daemon=True).start()
+    time.sleep(0.5)
+
+    conn = rpyc.connect('localhost', PORT, config={'allow_all_attrs': True})
+    module = conn.root.getModule('counter')
+    megabytes = BenchmarkService.module.trace.nbytes / 2**20
+    print('Transferring a {0} {1} trace ({2:.1f} MB)'.format(
+        BenchmarkService.module.trace.shape, BenchmarkService.module.trace.dtype, megabytes))
+
+    results = dict()
+    # element-wise access through the netref is far too slow for the full trace, extrapolate
+    row = module.trace[0]
+    results['netref element-wise (extrapolated)'] = timeit(
+        lambda: [row[i] for i in range(100)], repetitions=1) * module.trace.size / 100
+    results['rpyc classic obtain'] = timeit(
+        lambda: rpyc.utils.classic.obtain(module.get_data_trace()[0]))
+    results['netobtain'] = timeit(lambda: netobtain(module.get_data_trace()))
+    results['netobtain zlib'] = timeit(lambda: netobtain(module.get_data_trace(), 'zlib'))
+    results['netfetch 3 values'] = timeit(
+        lambda: netfetch(module, ['trace', 'elapsed_sweeps', 'elapsed_time']))
+    if shared_memory is not None:
+        register_local_connection(conn)
+        results['netobtain shared memory'] = timeit(lambda: netobtain(module.get_data_trace()))
+        results['netfetch 3 values shared memory'] = timeit(
+            lambda: netfetch(module, ['trace', 'elapsed_sweeps', 'elapsed_time']))
+
+    for name, seconds in results.items():
+        print('{0:<35s} {1:10.4f} s {2:10.1f} MB/s'.format(name, seconds, megabytes / seconds))
+    conn.close()
+    server.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark and equivalence check of the merged coordinate transformation of the scanner interfuses.
+
+Stacks of the tilt and the lateral polynomial correction interfuses are built on a scanner which
+records the lines it is given. Every line of an xy image is scanned through the former interfuses,
+which transformed the line one after the other, through the interfuses merging their corrections
+into one CoordinateTransform and through ConfocalLogic, which transforms the whole image grid at
+the start of the scan. All of them have to give the same positions to the scanner. The time to
+transform the lines of an image, which delays the scanner between the lines, and the time to
+transform the image grid at the start of the scan are reported, the shortest of several
+repetitions.
+
+Run from the qudi root directory:
+    python tools/benchmarks/scanner_transform.py [resolution] [repetitions]
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import logging
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from logic.confocal_logic import ConfocalLogic
+from logic.interfuse.scanner_lateral_poly_correct_interfuse import \
+    ScannerLateralPolyCorrectInterfuse
+from logic.interfuse.scanner_tilt_interfuse import ScannerTiltInterfuse
+
+POLY2D_X = np.array([[0, 1, 2e3], [0.05, 1e3, 0], [-3e3, 0, 0]])
+POLY2D_Y = np.array([[1e-7, 0.98], [1.01, 5e2], [2e3, 0]])
+IMAGE_RANGE = 50e-6
+
+
+class RecordingScanner:
+    """ Scanner recording the lines it scans. """
+
+    def __init__(self):
+        self.lines = list()
+
+    def scan_line(self, line_path=None, pixel_clock=False):
+        self.lines.append(np.array(line_path, dtype=float))
+        return np.zeros((line_path.shape[1], 1))
+
+
+class LegacyTilt:
+    """ ScannerTiltInterfuse.scan_line before the corrections were merged. """
+    _calc_dz = ScannerTiltInterfuse._calc_dz
+
+    def __init__(self, scanner):
+        self._scanning_device = scanner
+        self.tiltcorrection = True
+        self.tilt_variable_ax = 0.02
+        self.tilt_variable_ay = -0.03
+        self.tilt_reference_x = 20e-6
+        self.tilt_reference_y = 10e-6
+        self._transform_cache = None
+
+    def scan_line(self, line_path=None, pixel_clock=False):
+        if self.tiltcorrection:
+            line_path[:][2] += self._calc_dz(line_path[:][0], line_path[:][1])
+        return self._scanning_device.scan_line(line_path, pixel_clock)
+
+
+class LegacyPoly:
+    """ ScannerLateralPolyCorrectInterfuse.scan_line before the corrections were merged. """
+    _convert_point = ScannerLateralPolyCorrectInterfuse._convert_point
+
+    def __init__(self, scanner):
+        self._scanner = scanner
+        self._poly2d_x = POLY2D_X
+        self._poly2d_y = POLY2D_Y
+        self._transform_cache = None
+
+    def scanner(self):
+        return self._scanner
+
+    def scan_line(self, line_path=None, pixel_clock=False):
+        transformed = line_path.copy()
+        points_x, points_y = self._convert_point(line_path[0, :], line_path[1, :])
+        transformed[0, :] = points_x
+        transformed[1, :] = points_y
+        return self.scanner().scan_line(transformed, pixel_clock)
+
+
+class Tilt(LegacyTilt):
+    """ The ScannerTiltInterfuse without the Qudi module around it. """
+    scan_line = ScannerTiltInterfuse.scan_line
+    get_coordinate_transform = ScannerTiltInterfuse.get_coordinate_transform
+
+
+class Poly(LegacyPoly):
+    """ The ScannerLateralPolyCorrectInterfuse without the Qudi module around it. """
+    scan_line = ScannerLateralPolyCorrectInterfuse.scan_line
+    get_coordinate_transform = ScannerLateralPolyCorrectInterfuse.get_coordinate_transform
+
+
+class ScanLogic:
+    """ The line scanning part of ConfocalLogic, without the Qudi module around it. """
+    _transform_scan_grid = ConfocalLogic._transform_scan_grid
+    _scan_device_line = ConfocalLogic._scan_device_line
+
+    def __init__(self, scanner, resolution):
+        self.log = logging.getLogger('scanner_transform')
+        self._scanning_device = scanner
+        self._zscan = False
+        self._current_z = 1e-6
+        self._current_a = 0.0
+        axis = np.linspace(0, IMAGE_RANGE, resolution)
+        self.xy_image = np.zeros((resolution, resolution, 4))
+        self.xy_image[:, :, 0] = axis[np.newaxis, :]
+        self.xy_image[:, :, 1] = axis[:, np.newaxis]
+        self.xy_image[:, :, 2] = self._current_z
+
+    def get_scanner_axes(self):
+        return ['x', 'y', 'z', 'a']
+
+    def line(self, row):
+        return np.vstack([self.xy_image[row, :, 0], self.xy_image[row, :, 1],
+                          np.full(self.xy_image.shape[1], self._current_z),
+                          np.full(self.xy_image.shape[1], self._current_a)])
+
+
+def build_stack(layers, legacy):
+    """ Stack of interfuses on a RecordingScanner, the first layer is connected to the logic. """
+    recorder = RecordingScanner()
+    device = recorder
+    for layer in reversed(layers):
+        if layer == 'tilt':
+            device = LegacyTilt(device) if legacy else Tilt(device)
+        else:
+            device = LegacyPoly(device) if legacy else Poly(device)
+    return device, recorder
+
+
+def scan_image(layers, mode, resolution, repetitions):
+    """ Scan all lines of the image repeatedly.
+
+    @return list, float, float: lines given to the scanner, shortest durations in s of the set up
+                                at the start of the scan and of transforming the lines
+    """
+    durations = list()
+    for repetition in range(repetitions):
+        lines, set_up_time, line_time = scan_image_once(layers, mode, resolution)
+        durations.append((set_up_time, line_time))
+    return (lines, ) + min(durations, key=lambda duration: sum(duration))
+
+
+def scan_image_once(layers, mode, resolution):
+    """ Scan all lines of the image.
+
+    @return list, float, float: lines given to the scanner, durations in s of the set up at the
+                                start of the scan and of transforming the lines
+    """
+    top, recorder = build_stack(layers, legacy=mode == 'former')
+    logic = ScanLogic(top, resolution)
+    lines = [logic.line(row)[:, ::-1] if row % 2 == 1 else logic.line(row)
+             for row in range(resolution)]
+    start = time.perf_counter()
+    if mode == 'image grid':
+        logic._transform_scan_grid()
+    set_up_time = time.perf_counter() - start
+    start = time.perf_counter()
+    if mode == 'image grid':
+        for row, line in enumerate(lines):
+            # every second line backwards as in a bidirectional scan
+            logic._scan_device_line(line, row=row, backward=row % 2 == 1, pixel_clock=True)
+    else:
+        for line in lines:
+            top.scan_line(np.array(line), pixel_clock=True)
+    return recorder.lines, set_up_time, time.perf_counter() - start
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    resolution = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    print('Transformation of a {0:d}x{0:d} xy image'.format(resolution))
+    print('{0:<16}{1:<12}{2:>12}{3:>12}{4:>22}{5:>10}'.format(
+        'interfuses', 'transform', 'start (ms)', 'lines (ms)', 'largest deviation (m)',
+        'speedup'))
+    for layers in (('tilt',), ('poly',), ('tilt', 'poly'), ('poly', 'tilt'),
+                   ('tilt', 'poly', 'poly')):
+        former_lines = former_time = None
+        for mode in ('former', 'merged', 'image grid'):
+            lines, set_up_time, line_time = scan_image(layers, mode, resolution, repetitions)
+            if former_lines is None:
+                former_lines, former_time = lines, line_time
+            deviation = max(np.max(np.abs(line - former_line))
+                            for line, former_line in zip(lines, former_lines))
+            assert len(lines) == len(former_lines) and deviation < 1e-12 * IMAGE_RANGE, \
+                'The {0} transformation of {1} differs.'.format(mode, layers)
+            print('{0:<16}{1:<12}{2:>12.2f}{3:>12.2f}{4:>22.1e}{5:>9.1f}x'.format(
+                '+'.join(layers), mode, 1e3 * set_up_time, 1e3 * line_time, deviation,
+                former_time / line_time))
+    print('speedup of the transformation between the scanned lines')
+
+
+if __name__ == '__main__':
+    main()
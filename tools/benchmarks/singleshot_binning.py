@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the prefix sum based laser pulse summation and rebinning of SingleShotLogic
+(core.util.trace_analysis.window_sums and iter_binnings) against the former row by row
+implementations. Also checks that the results agree.
+
+Run from the qudi root directory:
+    python tools/benchmarks/singleshot_binning.py [number_of_rows]
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from core.util.trace_analysis import iter_binnings, window_sums
+
+
+def reference_sum_laserpulse(data, start_stop_tupel_list):
+    sum_single_pulses = []
+    for row in data:
+        laser_pulses = [np.sum(row[jj[0]:jj[1]]) for jj in start_stop_tupel_list]
+        sum_single_pulses.append(laser_pulses)
+    return np.array(sum_single_pulses)
+
+
+def reference_calc_all_binnings(signal, NN, num_bins):
+    # np.int has been removed from numpy, int is what it aliased
+    max_bin = NN // num_bins
+    count_var = 1
+    bin_list = []
+    temp_list = []
+    while count_var <= max_bin:
+        if temp_list:
+            app_arr = np.array(temp_list)
+            bin_list.append(app_arr)
+            temp_list = []
+        jj = 0
+        while jj < NN:
+            sum_ind = np.linspace(jj, jj + count_var - 1, count_var, dtype=int)
+            jj += count_var
+            if sum_ind[-1] < NN:
+                temp_list.append(np.array([np.sum(signal[sum_ind, 0]), np.sum(signal[sum_ind, 1])]))
+            else:
+                jj = NN
+        count_var += 1
+    return bin_list
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    n_columns = 3000
+    num_bins = n_rows // 20
+    windows = [(400, 1200), (1800, 2600)]
+
+    rng = np.random.default_rng(0)
+    data = rng.poisson(0.05, size=(n_rows, n_columns)).astype(np.int32)
+    print('{0} rows x {1} columns, {2} binnings'.format(n_rows, n_columns, n_rows // num_bins - 1))
+
+    reference, t_reference = timed(reference_sum_laserpulse, data, windows)
+    result, t_new = timed(window_sums, data, windows)
+    assert result.dtype == reference.dtype and np.array_equal(result, reference)
+    print('sum_laserpulse:     {0:8.3f} s -> {1:8.4f} s  ({2:.1f}x)'.format(
+        t_reference, t_new, t_reference / t_new))
+
+    signal = result
+    reference, t_reference = timed(reference_calc_all_binnings, signal, n_rows, num_bins)
+    result, t_new = timed(lambda: list(iter_binnings(signal, range(1, n_rows // num_bins))))
+    assert len(result) == len(reference)
+    assert all(np.array_equal(a, b) for a, b in zip(result, reference))
+    print('calc_all_binnings:  {0:8.3f} s -> {1:8.4f} s  ({2:.1f}x)'.format(
+        t_reference, t_new, t_reference / t_new))
+
+    normalized_reference = [(b[:, 0] - b[:, 1]) / (b[:, 0] + b[:, 1]) for b in reference]
+    peak = 0
+    for ii, binning in enumerate(iter_binnings(signal, range(1, n_rows // num_bins))):
+        normalized = (binning[:, 0] - binning[:, 1]) / (binning[:, 0] + binning[:, 1])
+        assert np.allclose(normalized, normalized_reference[ii], equal_nan=True)
+        peak = max(peak, binning.nbytes)
+    print('lazy binnings: largest binning held in memory {0:.1f} kB, all binnings {1:.1f} kB'.format(
+        peak / 1e3, sum(b.nbytes for b in reference) / 1e3))
+    print('results identical')
+
+
+if __name__ == '__main__':
+    main()
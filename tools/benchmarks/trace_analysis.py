@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the vectorized trace analysis primitives in core.util.trace_analysis against the
+former pure python implementations of TraceAnalysisLogic. Also checks that the results agree.
+
+Run from the qudi root directory:
+    python tools/benchmarks/trace_analysis.py [number_of_points]
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from core.util.trace_analysis import classify_trace, count_transitions, digitize_trace
+from core.util.trace_analysis import dwell_times, transition_matrix
+
+
+def reference_digitize(cut_off, data):
+    new_digital_trace = []
+    for data_point in data:
+        if data_point >= cut_off:
+            new_digital_trace.append(1)
+        else:
+            new_digital_trace.append(0)
+    return new_digital_trace
+
+
+def reference_time_in_high_low(raw_digital_trace, local_dt):
+    occurances = []
+    index = 0
+    index2 = 0
+    while index < len(raw_digital_trace):
+        occurances.append(0)
+        while raw_digital_trace[index] == 1:
+            occurances[index2] += 1
+            if index == (len(raw_digital_trace) - 1):
+                return np.array(occurances) * local_dt
+            index += 1
+        if raw_digital_trace[index - 1] == 1:
+            index2 += 1
+            occurances.append(0)
+        while raw_digital_trace[index] == 0:
+            occurances[index2] -= 1
+            if index == (len(raw_digital_trace) - 1):
+                return np.array(occurances) * local_dt
+            index += 1
+        index2 += 1
+
+
+def reference_flip_prob2_full(trace, threshold):
+    no_flip = 0.0
+    for ii in range(len(trace) - 1):
+        if trace[ii] > threshold and trace[ii + 1] > threshold:
+            no_flip = no_flip + 1
+        elif trace[ii] < threshold and trace[ii + 1] < threshold:
+            no_flip = no_flip + 1
+    return 1.0 - (no_flip / len(trace))
+
+
+def reference_flip_counts(trace, init_threshold, ana_threshold):
+    no_flip = 0.0
+    flip = 0.0
+    init_high = np.where(trace[:-1] > init_threshold[1])[0]
+    init_low = np.where(trace[:-1] < init_threshold[0])[0]
+    # sets instead of the original array membership test, which is O(N) per lookup
+    ana_high = set(np.where(trace > ana_threshold[1])[0])
+    ana_low = set(np.where(trace < ana_threshold[0])[0])
+    for index in init_high:
+        if index + 1 in ana_high:
+            no_flip = no_flip + 1
+        elif index + 1 in ana_low:
+            flip = flip + 1
+    for index in init_low:
+        if index + 1 in ana_high:
+            flip = flip + 1
+        elif index + 1 in ana_low:
+            no_flip = no_flip + 1
+    return no_flip, flip
+
+
+def flip_prob2_full(trace, threshold):
+    transitions = transition_matrix(classify_trace(trace, threshold, threshold), num_states=3)
+    return 1.0 - float(transitions[0, 0] + transitions[1, 1]) / len(trace)
+
+
+def flip_counts(trace, init_threshold, ana_threshold):
+    ana_states = classify_trace(trace, ana_threshold[0], ana_threshold[1])
+    init_high = trace > init_threshold[1]
+    init_low = trace < init_threshold[0]
+    no_flip = count_transitions(init_high, ana_states == 1) + count_transitions(init_low,
+                                                                               ana_states == 0)
+    flip = count_transitions(init_high, ana_states == 0) + count_transitions(init_low,
+                                                                            ana_states == 1)
+    return float(no_flip), float(flip)
+
+
+def make_trace(num_points):
+    """ Telegraph noise between a dark and a bright state with poissonian counts """
+    flips = np.random.random(num_points) < 0.01
+    state = np.cumsum(flips) % 2
+    return np.random.poisson(np.where(state, 20, 5)).astype(float)
+
+
+def compare(name, reference, vectorized):
+    start = time.perf_counter()
+    ref_result = reference()
+    ref_time = time.perf_counter() - start
+    start = time.perf_counter()
+    vec_result = vectorized()
+    vec_time = time.perf_counter() - start
+    equal = np.array_equal(np.asarray(ref_result), np.asarray(vec_result))
+    print('{0:<25s} python {1:9.4f} s  vectorized {2:9.5f} s  speedup {3:8.0f}  identical: {4}'
+          ''.format(name, ref_time, vec_time, ref_time / vec_time, equal))
+
+
+def main():
+    num_points = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    trace = make_trace(num_points)
+    threshold = 12
+    dt = 1e-3
+    print('Trace with {0:d} points'.format(num_points))
+
+    digital = digitize_trace(trace, threshold)
+    compare('digitize', lambda: reference_digitize(threshold, trace),
+            lambda: digitize_trace(trace, threshold))
+    # the python implementation inserts zero length runs, which are discarded by the analysis
+    compare('dwell times',
+            lambda: [t for t in reference_time_in_high_low(list(digital), dt) if t != 0],
+            lambda: dwell_times(digital, dt))
+    compare('flip prob 2 (full)', lambda: reference_flip_prob2_full(trace, threshold),
+            lambda: flip_prob2_full(trace, threshold))
+    compare('flip prob 3/4 counts', lambda: reference_flip_counts(trace, [10, 14], [8, 16]),
+            lambda: flip_counts(trace, [10, 14], [8, 16]))
+
+
+if __name__ == '__main__':
+    main()